@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: import time of the API and worker modules and time to first request.
+
+    python -m benchmarks.cold_start                 # import times and time to first request
+    python -m benchmarks.cold_start --warmup        # with STARTUP_WARMUP (LLM clients and a stub MCP session)
+    python -m benchmarks.cold_start --top 15        # also list the slowest imports
+
+Every sample runs in a fresh interpreter against the load benchmark's
+stand-ins (``benchmarks.fakes``), answering instantly so only the app's own
+work is measured. Time to first request is taken from spawning
+``uvicorn src.main:app`` until ``GET /health`` first succeeds, and until the
+first ``POST /analyze`` (tarball ingestion plus an LLM analysis) completes.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.load import BACKEND_DIR, _free_port, stand_in_environment, start_fakes
+
+IMPORT_TIME_PATTERN = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| +(\S+)")
+GITHUB_TOKEN = "bench-token"
+
+
+def _environment(args: argparse.Namespace, data_dir: str) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        **stand_in_environment(args, data_dir),
+        "STARTUP_WARMUP": "true" if args.warmup else "false",
+        "DOCKERIZE_WORKERS": "0",
+    }
+    if args.warmup:
+        env["STARTUP_WARMUP_GITHUB_TOKENS"] = GITHUB_TOKEN
+    return env
+
+
+def import_time(module: str, env: Dict[str, str]) -> float:
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, env: Dict[str, str], top: int) -> List[Dict[str, Any]]:
+    """Packages by cumulative import time (``python -X importtime``), with the app's own modules"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    packages: Dict[str, int] = {}
+    for match in IMPORT_TIME_PATTERN.finditer(output.stderr):
+        cumulative, name = int(match.group(1)), match.group(2)
+        # A package is imported once, so its own line carries all of its cost
+        if "." not in name or name.count(".") == 2 and name.startswith("src."):
+            packages[name] = cumulative
+    ordered = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": name, "seconds": round(micros / 1e6, 3)} for name, micros in ordered]
+
+
+def time_to_first_request(env: Dict[str, str], timeout: float = 120.0) -> Dict[str, float]:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result: Dict[str, float] = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30.0) as client:
+            while "health" not in result:
+                if time.perf_counter() - start > timeout or server.poll() is not None:
+                    raise RuntimeError("Server did not become ready")
+                try:
+                    if client.get("/health").status_code == 200:
+                        result["health"] = time.perf_counter() - start
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            response = client.post("/analyze", json={
+                "repo_url": "https://github.com/bench/cold-start", "github_token": GITHUB_TOKEN,
+            })
+            if response.status_code != 200:
+                raise RuntimeError(f"First analysis failed: HTTP {response.status_code} {response.text[:200]}")
+            result["first_analyze"] = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {"min": round(min(samples), 3), "median": round(statistics.median(samples), 3), "max": round(max(samples), 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--warmup", action="store_true", help="enable the startup warm-up (stub MCP server)")
+    parser.add_argument("--fixture", default="fastapi-service", help="repository served by the fake GitHub (stacks.json)")
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest imports of src.main")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+    # Instant stand-ins, with the LLM path taken for the analysis
+    args.llm_port, args.github_port = _free_port(), _free_port()
+    args.latency, args.tokens_per_second = 0.0, 0.0
+    args.workers, args.concurrency, args.stack_detection = 0, 0, False
+    args.state_store, args.kv_port = "memory", 0
+
+    results: Dict[str, Any] = {"runs": args.runs, "warmup": args.warmup}
+    fakes = start_fakes(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix="devops-agent-cold-start-") as data_dir:
+            env = _environment(args, data_dir)
+            for module in ("src.main", "src.worker"):
+                results[f"import {module}"] = _summary([import_time(module, env) for _ in range(args.runs)])
+            samples = [time_to_first_request(env) for _ in range(args.runs)]
+            results["time to /health"] = _summary([sample["health"] for sample in samples])
+            results["time to first /analyze"] = _summary([sample["first_analyze"] for sample in samples])
+            if args.top:
+                results["slowest_imports"] = slowest_imports("src.main", env, args.top)
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    print(f"\nCold start ({args.runs} runs, warm-up {'on' if args.warmup else 'off'})")
+    for name, summary in results.items():
+        if isinstance(summary, dict):
+            print(f"  {name:<24} min={summary['min'] * 1000:>7.0f}ms median={summary['median'] * 1000:>7.0f}ms max={summary['max'] * 1000:>7.0f}ms")
+    for item in results.get("slowest_imports", []):
+        print(f"    {item['module']:<40} {item['seconds'] * 1000:>7.0f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the LLM provider and the GitHub REST API used by the load benchmark.
+
+    python -m benchmarks.fakes --llm-port 8101 --github-port 8102 --latency 0.3 --tokens-per-second 400
+    python -m benchmarks.fakes --kv-port 8103     # also a Redis-compatible KV server for STATE_STORE_URL
+
+The chat server speaks the OpenAI chat completions API (plain and streamed)
+and answers with canned JSON from ``fixtures/llm_replies.json``, picked by the
+``response_format`` schema name. Requests that offer tools get one tool call
+planned from the prompt (as the MCP agent would) and then a final answer that
+echoes the tool result. The GitHub server keeps branches, commits and pull
+requests in memory and serves every repository from one fixture tarball. The
+KV server is the one the state store tests use (``tests.fake_kv``).
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import socketserver
+import tarfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from tests.fake_kv import FakeKV, KVHandler
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+STREAM_CHUNK_TOKENS = 16
+
+# Tool -> argument patterns matched against the MCP agent's query
+TOOL_PLANS: List[Tuple[str, str, Dict[str, str]]] = [
+    ("create_pull_request", r"pull request", {
+        "title": r"title '(.+?)' from branch",
+        "head": r"from branch '([^']+)'",
+        "base": r"' to '([^']+)'",
+        "body": r"description:\n\n(.*)",
+    }),
+    ("create_branch", r"new branch", {
+        "branch": r"branch named '([^']+)'",
+        "from_branch": r"based on the '([^']+)' branch",
+    }),
+    ("create_or_update_file", r"create or update a file", {
+        "path": r"(?:file named|file at path) '([^']+)'",
+        "branch": r"on branch '([^']+)'",
+        "content": r"following content:\n\n(.*?)\n\nUse the commit message",
+        "message": r"commit message: '([^']+)'",
+    }),
+    ("get_file_contents", r"file structure|contents", {"path": r"$^"}),
+]
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def plan_tool_call(prompt: str, tool_names: List[str]) -> Optional[Dict[str, Any]]:
+    """The tool call an agent would make for ``prompt``, if any offered tool fits"""
+    repository = re.search(r"repository ([\w.-]+)/([\w.-]+)", prompt)
+    for name, trigger, patterns in TOOL_PLANS:
+        if name not in tool_names or not re.search(trigger, prompt, re.I):
+            continue
+        arguments: Dict[str, Any] = {}
+        if repository:
+            arguments.update(owner=repository.group(1), repo=repository.group(2))
+        for argument, pattern in patterns.items():
+            match = re.search(pattern, prompt, re.S)
+            arguments[argument] = match.group(1) if match else ""
+        return {"name": name, "arguments": arguments}
+    return None
+
+
+class FakeLLM:
+    def __init__(self, latency: float, tokens_per_second: float, replies: Dict[str, Any]):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.replies = replies
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def reply(self, body: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Content or tool call answering a chat completion request"""
+        with self.lock:
+            self.requests += 1
+        messages = body.get("messages", [])
+        tools = [tool["function"]["name"] for tool in body.get("tools") or []]
+        if tools:
+            results = [message for message in messages if message.get("role") == "tool"]
+            if results:
+                return str(results[-1].get("content") or "Done."), None
+            prompt = next((str(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+            call = plan_tool_call(prompt, tools)
+            if call:
+                return None, call
+            return "Done.", None
+
+        schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+        if schema in self.replies:
+            return json.dumps(self.replies[schema]), None
+        return self.replies["text"], None
+
+    def generation_seconds(self, content: str) -> float:
+        return _tokens(content) / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+
+class FakeGitHub:
+    def __init__(self, archive: bytes):
+        self.archive = archive
+        self.lock = threading.Lock()
+        self.refs: Dict[str, str] = {}
+        self.commits: Dict[str, Dict[str, Any]] = {}
+        self.trees: Dict[str, List[str]] = {}
+        self.pulls: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests = 0
+
+    def head(self, owner: str, repo: str) -> str:
+        key = f"{owner}/{repo}/main"
+        with self.lock:
+            if key not in self.refs:
+                sha = hashlib.sha1(key.encode()).hexdigest()
+                self.refs[key] = sha
+                self.commits[sha] = {"sha": sha, "message": "Initial commit", "tree": {"sha": sha}}
+            return self.refs[key]
+
+    def compare(self, base: str, head: str) -> Dict[str, Any]:
+        """Files changed by the commits after ``base`` up to ``head`` (first parents only)"""
+        files: Dict[str, Dict[str, str]] = {}
+        sha: Optional[str] = head
+        while sha and sha != base:
+            commit = self.commits.get(sha)
+            if commit is None:
+                return {"status": "diverged", "files": []}
+            for path in self.trees.get(commit["tree"]["sha"], []):
+                files.setdefault(path, {"filename": path, "status": "modified"})
+            sha = commit["parents"][0]["sha"] if commit.get("parents") else None
+        if sha != base:
+            return {"status": "diverged", "files": []}
+        return {"status": "ahead" if files else "identical", "files": list(files.values())}
+
+    def new_sha(self) -> str:
+        return uuid.uuid4().hex + uuid.uuid4().hex[:8]
+
+
+def fixture_archive(fixture_name: str) -> bytes:
+    """Gzipped tarball (GitHub layout) of a repository from ``fixtures/stacks.json``"""
+    with open(os.path.join(FIXTURES_DIR, "stacks.json")) as f:
+        fixture = next(item for item in json.load(f) if item["name"] == fixture_name)
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path in fixture["paths"]:
+            data = fixture["key_files"].get(path, f"// {path}\n").encode()
+            info = tarfile.TarInfo(f"bench-{fixture_name}-0000000/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _send(self, status: int, payload: Any = None, content_type: str = "application/json",
+              raw: Optional[bytes] = None) -> None:
+        data = raw if raw is not None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class LLMHandler(_Handler):
+    llm: FakeLLM
+
+    def do_POST(self) -> None:
+        if not self.path.endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": "not found"}})
+        body = self._body()
+        content, call = self.llm.reply(body)
+        prompt_tokens = _tokens(json.dumps(body.get("messages", [])))
+        completion_tokens = _tokens(content or json.dumps(call))
+        time.sleep(self.llm.latency)
+
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        if call:
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }]
+        finish_reason = "tool_calls" if call else "stop"
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": body.get("model")}
+
+        if not body.get("stream"):
+            time.sleep(self.llm.generation_seconds(content or ""))
+            return self._send(200, {
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(delta: Dict[str, Any], finish: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> None:
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **(extra or {})}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        if call:
+            event({"role": "assistant", "tool_calls": [{"index": 0, **message["tool_calls"][0]}]})
+        else:
+            step = STREAM_CHUNK_TOKENS * 4
+            for start in range(0, len(content), step):
+                time.sleep(self.llm.generation_seconds(content[start:start + step]))
+                event({"role": "assistant", "content": content[start:start + step]} if start == 0
+                      else {"content": content[start:start + step]})
+        event({}, finish_reason)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class GitHubHandler(_Handler):
+    github: FakeGitHub
+
+    def _route(self, method: str) -> None:
+        with self.github.lock:
+            self.github.requests += 1
+        path = self.path.split("?")[0]
+        query = self.path.partition("?")[2]
+        match = re.match(r"/repos/([^/]+)/([^/]+)(/.*)?$", path)
+        if not match:
+            if re.match(r"/orgs/[^/]+/repos$", path):
+                return self._send(200, [])
+            return self._send(404, {"message": "Not Found"})
+        owner, repo, rest = match.group(1), match.group(2), match.group(3) or ""
+        github = self.github
+        head = github.head(owner, repo)
+        prefix = f"{owner}/{repo}/"
+
+        if method == "GET" and rest == "":
+            return self._send(200, {"name": repo, "full_name": f"{owner}/{repo}", "default_branch": "main",
+                                    "visibility": "public", "private": False, "size": 1,
+                                    "html_url": f"https://github.com/{owner}/{repo}"})
+        if method == "GET" and rest.startswith("/commits/"):
+            return self._send(200, raw=head.encode(), content_type="text/plain")
+        if method == "GET" and rest.startswith("/tarball"):
+            return self._send(200, raw=github.archive, content_type="application/x-gzip")
+        if method == "GET" and rest.startswith("/git/ref/heads/"):
+            sha = github.refs.get(prefix + rest[len("/git/ref/heads/"):])
+            if sha is None:
+                return self._send(404, {"message": "Not Found"})
+            return self._send(200, {"object": {"sha": sha, "type": "commit"}})
+        if method == "GET" and rest.startswith("/compare/"):
+            base, _, compared = rest[len("/compare/"):].partition("...")
+            with github.lock:
+                return self._send(200, github.compare(base, compared))
+        if method == "GET" and rest.startswith("/git/commits/"):
+            commit = github.commits.get(rest[len("/git/commits/"):])
+            return self._send(200, commit) if commit else self._send(404, {"message": "Not Found"})
+        if method == "POST" and rest == "/git/refs":
+            body = self._body()
+            with github.lock:
+                github.refs[prefix + body["ref"].removeprefix("refs/heads/")] = body["sha"]
+            return self._send(201, {"ref": body["ref"], "object": {"sha": body["sha"]}})
+        if method == "POST" and rest == "/git/trees":
+            body = self._body()
+            sha = github.new_sha()
+            with github.lock:
+                github.trees[sha] = [entry["path"] for entry in body.get("tree", [])]
+            return self._send(201, {"sha": sha})
+        if method == "POST" and rest == "/git/commits":
+            body = self._body()
+            sha = github.new_sha()
+            with github.lock:
+                github.commits[sha] = {"sha": sha, "message": body["message"], "tree": {"sha": body["tree"]},
+                                       "parents": [{"sha": parent} for parent in body.get("parents", [])]}
+            return self._send(201, {"sha": sha})
+        if method == "PATCH" and rest.startswith("/git/refs/heads/"):
+            body = self._body()
+            with github.lock:
+                github.refs[prefix + rest[len("/git/refs/heads/"):]] = body["sha"]
+            return self._send(200, {"object": {"sha": body["sha"]}})
+        if method == "PUT" and rest.startswith("/contents/"):
+            body = self._body()
+            return self._send(201, {"commit": {"sha": github.new_sha(), "message": body.get("message")}})
+        if method == "GET" and rest == "/pulls":
+            branch = re.search(r"head=[^:&]+(?::|%3A)([^&]+)", query)
+            pulls = github.pulls.get(prefix.rstrip("/"), [])
+            branch_name = branch.group(1).replace("%2F", "/") if branch else None
+            return self._send(200, [pull for pull in pulls if branch_name in (None, pull["head"]["ref"])])
+        if method == "POST" and rest == "/pulls":
+            body = self._body()
+            with github.lock:
+                pulls = github.pulls.setdefault(prefix.rstrip("/"), [])
+                number = len(pulls) + 1
+                pull = {"number": number, "html_url": f"https://github.com/{owner}/{repo}/pull/{number}",
+                        "head": {"ref": body.get("head")}, "title": body.get("title")}
+                pulls.append(pull)
+            return self._send(201, pull)
+        return self._send(404, {"message": "Not Found"})
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+    def do_PATCH(self) -> None:
+        self._route("PATCH")
+
+    def do_PUT(self) -> None:
+        self._route("PUT")
+
+
+def serve(handler: type, port: int) -> ThreadingHTTPServer:
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-port", type=int, default=8101)
+    parser.add_argument("--github-port", type=int, default=8102)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="completion token rate (0 = instant)")
+    parser.add_argument("--fixture", default="fastapi-service", help="repository served as every tarball (stacks.json)")
+    parser.add_argument("--kv-port", type=int, default=0, help="also serve a Redis-compatible KV store (0 = off)")
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES_DIR, "llm_replies.json")) as f:
+        replies = json.load(f)
+    LLMHandler.llm = FakeLLM(args.latency, args.tokens_per_second, replies)
+    GitHubHandler.github = FakeGitHub(fixture_archive(args.fixture))
+    serve(LLMHandler, args.llm_port)
+    serve(GitHubHandler, args.github_port)
+    if args.kv_port:
+        KVHandler.kv = FakeKV()
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", args.kv_port), KVHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    print("ready", flush=True)
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
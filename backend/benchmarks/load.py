@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Offline load benchmark of /analyze and /dockerize against local stand-ins.
+
+    python -m benchmarks.load --requests 20 --concurrency 5
+    python -m benchmarks.load --output benchmarks/baseline.json      # save a baseline
+    python -m benchmarks.load --baseline benchmarks/baseline.json    # exit 1 on regressions
+    python -m benchmarks.load --state-store kv                       # shared state on the fake KV server
+
+Starts the fake OpenAI-compatible and GitHub REST servers (``benchmarks.fakes``),
+points the app, its GitHub MCP sessions (``benchmarks.stub_github_mcp``) and
+its LLM clients at them, and drives the FastAPI app in-process with the given
+concurrency. Reports req/s and p50/p95/p99 per endpoint and per pipeline
+stage, LLM calls and tokens, and the peak RSS of the process. No credentials or
+network access are needed.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+FINAL_STATUSES = {"completed", "failed"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))]
+
+
+def summarize(latencies: List[float], errors: int = 0, wall: Optional[float] = None) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"count": len(latencies), "errors": errors}
+    if wall:
+        summary["req_per_s"] = round(len(latencies) / wall, 3)
+    if latencies:
+        summary.update({f"p{p}": round(_percentile(latencies, p), 4) for p in (50, 95, 99)})
+        summary["max"] = round(max(latencies), 4)
+    return summary
+
+
+def start_fakes(args: argparse.Namespace) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.fakes",
+            "--llm-port", str(args.llm_port), "--github-port", str(args.github_port),
+            "--latency", str(args.latency), "--tokens-per-second", str(args.tokens_per_second),
+            "--fixture", args.fixture,
+            *(["--kv-port", str(args.kv_port)] if args.state_store == "kv" else []),
+        ],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    if process.stdout.readline().strip() != "ready":
+        process.kill()
+        raise RuntimeError("Fake servers failed to start")
+    return process
+
+
+def stand_in_environment(args: argparse.Namespace, data_dir: str) -> Dict[str, str]:
+    """Environment pointing the app at the stand-ins; must be set before ``src.main`` is imported"""
+    env = {
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "OPENROUTER_API_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "GITHUB_API_URL": f"http://127.0.0.1:{args.github_port}",
+        "GITHUB_MCP_SERVER_COMMAND": shlex.join([
+            sys.executable, os.path.join(BENCHMARKS_DIR, "stub_github_mcp.py"),
+            "--github-url", f"http://127.0.0.1:{args.github_port}",
+        ]),
+        "JOB_QUEUE_URL": f"sqlite:///{os.path.join(data_dir, 'jobs.sqlite3')}",
+        "CHECKPOINT_STORE_URL": f"sqlite:///{os.path.join(data_dir, 'jobs.sqlite3')}",
+        "LLM_CACHE_MODE": "off",
+        "LLM_CACHE_DIR": os.path.join(data_dir, "llm_cache"),
+        "ANALYSIS_CACHE_DIR": "",
+        "DOCKERIZE_WORKERS": str(args.workers or args.concurrency),
+        "MCP_USE_ANONYMIZED_TELEMETRY": "false",
+        "STATE_STORE_URL": {
+            "memory": "memory://",
+            "sqlite": f"sqlite:///{os.path.join(data_dir, 'state.sqlite3')}",
+            "kv": f"redis://127.0.0.1:{args.kv_port}",
+        }[args.state_store],
+    }
+    if not args.stack_detection:
+        # Send every analysis through the LLM path
+        env["STACK_DETECTION_MIN_CONFIDENCE"] = "1.01"
+    return env
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from src.main import app
+    from src.services.metrics import llm_requests_total, llm_tokens_total
+
+    for name in ("mcp_use", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: Dict[str, Any] = {"endpoints": {}, "stages": {}}
+
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        analyze_latencies: List[float] = []
+        analyze_errors = 0
+        analysis_ids: List[str] = []
+
+        async def analyze(index: int) -> None:
+            nonlocal analyze_errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/analyze", json={
+                    "repo_url": f"https://github.com/bench/repo-{index}", "github_token": f"bench-token-{index % 4}",
+                })
+                if response.status_code != 200:
+                    analyze_errors += 1
+                    print(f"  analyze repo-{index} failed: HTTP {response.status_code} {response.text[:200]}")
+                    return
+                analyze_latencies.append(time.perf_counter() - start)
+                analysis_ids.append(response.json()["analysis_id"])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(analyze(index) for index in range(args.requests)))
+        results["endpoints"]["POST /analyze"] = summarize(analyze_latencies, analyze_errors, time.perf_counter() - start)
+
+        accept_latencies: List[float] = []
+        task_latencies: List[float] = []
+        accept_errors = task_errors = 0
+        stages: Dict[str, List[float]] = {}
+
+        async def dockerize(index: int, analysis_id: str) -> None:
+            nonlocal accept_errors, task_errors
+            async with semaphore:
+                start = time.perf_counter()
+                # Submitted as form data, like the frontend
+                response = await client.post("/dockerize", data={
+                    "repo_url": f"https://github.com/bench/repo-{index}",
+                    "github_token": f"bench-token-{index % 4}",
+                    "analysis_id": analysis_id,
+                    "bypass_artifact_cache": str(not args.use_artifact_cache).lower(),
+                })
+                accept_latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    accept_errors += 1
+                    print(f"  dockerize repo-{index} rejected: HTTP {response.status_code} {response.text[:200]}")
+                    return
+                task_id = response.json()["task_id"]
+                while True:
+                    status = (await client.get(f"/status/{task_id}")).json()
+                    if status["status"] in FINAL_STATUSES:
+                        break
+                    await asyncio.sleep(args.poll_interval)
+                if status["status"] != "completed":
+                    task_errors += 1
+                    print(f"  dockerize repo-{index} failed: {status['message']}")
+                    return
+                task_latencies.append(time.perf_counter() - start)
+                for stage, seconds in status.get("timings", {}).items():
+                    stages.setdefault(stage, []).append(seconds)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(dockerize(index, analysis_id) for index, analysis_id in enumerate(analysis_ids)))
+        wall = time.perf_counter() - start
+        results["endpoints"]["POST /dockerize"] = summarize(accept_latencies, accept_errors, wall)
+        results["endpoints"]["dockerize task"] = summarize(task_latencies, task_errors, wall)
+        results["stages"] = {stage: summarize(samples) for stage, samples in sorted(stages.items())}
+
+    results["llm"] = {
+        "calls": int(sum(llm_requests_total.values.values())),
+        "prompt_tokens": int(sum(v for k, v in llm_tokens_total.values.items() if k[1] == "prompt")),
+        "completion_tokens": int(sum(v for k, v in llm_tokens_total.values.items() if k[1] == "completion")),
+    }
+    # ru_maxrss is in kilobytes on Linux
+    results["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    def row(name: str, summary: Dict[str, Any]) -> None:
+        rate = f"{summary['req_per_s']:>8.2f}/s" if "req_per_s" in summary else " " * 10
+        if summary["count"]:
+            timings = " ".join(f"p{p}={summary[f'p{p}'] * 1000:>8.1f}ms" for p in (50, 95, 99))
+        else:
+            timings = "no samples"
+        print(f"  {name:<18} n={summary['count']:<4} err={summary['errors']:<3} {rate} {timings}")
+
+    print("\nEndpoints")
+    for name, summary in results["endpoints"].items():
+        row(name, summary)
+    print("\nPipeline stages")
+    for name, summary in results["stages"].items():
+        row(name, summary)
+    llm = results["llm"]
+    print(f"\nLLM calls={llm['calls']} prompt_tokens={llm['prompt_tokens']} completion_tokens={llm['completion_tokens']}")
+    print(f"Peak RSS {results['peak_rss_mb']} MB")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of p95 latency, throughput and peak RSS beyond ``tolerance``"""
+    regressions = []
+    for section in ("endpoints", "stages"):
+        for name, base in baseline.get(section, {}).items():
+            current = results[section].get(name)
+            if not current:
+                continue
+            if base.get("p95") and current.get("p95") and current["p95"] > base["p95"] * (1 + tolerance):
+                regressions.append(f"{name} p95 {base['p95'] * 1000:.1f}ms -> {current['p95'] * 1000:.1f}ms")
+            if base.get("req_per_s") and current.get("req_per_s", 0) < base["req_per_s"] * (1 - tolerance):
+                regressions.append(f"{name} throughput {base['req_per_s']:.2f}/s -> {current.get('req_per_s', 0):.2f}/s")
+            if current["errors"] > base.get("errors", 0):
+                regressions.append(f"{name} errors {base.get('errors', 0)} -> {current['errors']}")
+    if baseline.get("peak_rss_mb") and results["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {baseline['peak_rss_mb']} MB -> {results['peak_rss_mb']} MB")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="repositories analyzed and then dockerized")
+    parser.add_argument("--concurrency", type=int, default=5, help="requests in flight at once")
+    parser.add_argument("--workers", type=int, default=0, help="in-process dockerization workers (default: concurrency)")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="fake LLM completion token rate")
+    parser.add_argument("--fixture", default="fastapi-service", help="repository served by the fake GitHub (stacks.json)")
+    parser.add_argument("--stack-detection", action="store_true", help="let confident stack detection skip the LLM")
+    parser.add_argument("--use-artifact-cache", action="store_true", help="reuse artifacts generated for the same stack")
+    parser.add_argument("--state-store", choices=("memory", "sqlite", "kv"), default="memory",
+                        help="STATE_STORE_URL backend (kv runs the fake Redis-compatible server)")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="seconds between status polls")
+    parser.add_argument("--output", help="write the results as JSON (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="compare against a saved baseline and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+    args.llm_port, args.github_port, args.kv_port = _free_port(), _free_port(), _free_port()
+
+    fakes = start_fakes(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix="devops-agent-bench-") as data_dir:
+            os.environ.update(stand_in_environment(args, data_dir))
+            results = asyncio.run(run_load(args))
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    results["config"] = {
+        key: getattr(args, key)
+        for key in ("requests", "concurrency", "workers", "latency", "tokens_per_second", "fixture",
+                    "stack_detection", "use_artifact_cache", "state_store")
+    }
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
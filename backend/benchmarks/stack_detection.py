@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency benchmark for the rule-based stack detector vs. the LLM path.
+
+    python -m benchmarks.stack_detection           # detector only
+    python -m benchmarks.stack_detection --llm     # also run LLMAnalyzer (needs OPENROUTER_API_KEY)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from src.services.stack_detector import detect_stack
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "stacks.json")
+FIELDS = ["language", "framework", "package_manager", "database"]
+
+
+def _matches(expected, actual) -> bool:
+    if expected is None:
+        return actual is None
+    return actual is not None and str(expected).lower() == str(actual).lower()
+
+
+def _report(name: str, latencies: list, correct: dict, total: int, skipped: int = 0) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else 0.0
+    print(f"\n{name}")
+    print(f"  latency p50={statistics.median(latencies) * 1000:.3f}ms p95={p95 * 1000:.3f}ms" if latencies else "  no samples")
+    for field in FIELDS:
+        print(f"  {field:<16} {correct[field]}/{total}")
+    if skipped:
+        print(f"  below confidence threshold (would use LLM): {skipped}/{total}")
+
+
+def run_detector(fixtures: list, repeat: int) -> None:
+    latencies, correct, low_confidence = [], {field: 0 for field in FIELDS}, 0
+    for fixture in fixtures:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            detection = detect_stack(fixture["key_files"], fixture["paths"])
+            latencies.append(time.perf_counter() - start)
+
+        stack = detection.technology_stack
+        low_confidence += 0 if detection.is_confident else 1
+        for field in FIELDS:
+            correct[field] += _matches(fixture["expected"][field], getattr(stack, field) if stack else None)
+        print(f"  {fixture['name']:<18} confidence={detection.confidence:.2f} {stack.model_dump(exclude={'dependencies'}) if stack else None}")
+    _report("Rule-based detector", latencies, correct, len(fixtures), low_confidence)
+
+
+async def run_llm(fixtures: list) -> None:
+    from src.services.llm_analyzer import LLMAnalyzer
+
+    analyzer = LLMAnalyzer()
+    latencies, correct = [], {field: 0 for field in FIELDS}
+    for fixture in fixtures:
+        structure = {"paths": fixture["paths"], "file_count": len(fixture["paths"])}
+        start = time.perf_counter()
+        analysis = await analyzer.analyze_repository_intelligence(structure, fixture["key_files"], fixture["name"])
+        latencies.append(time.perf_counter() - start)
+
+        stack = analysis.technical_architecture.technology_stack
+        for field in FIELDS:
+            correct[field] += _matches(fixture["expected"][field], getattr(stack, field))
+    _report("LLM analysis", latencies, correct, len(fixtures))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="also benchmark the LLM analysis path")
+    parser.add_argument("--repeat", type=int, default=200, help="detector iterations per fixture")
+    args = parser.parse_args()
+
+    with open(FIXTURES) as f:
+        fixtures = json.load(f)
+
+    run_detector(fixtures, args.repeat)
+    if args.llm:
+        asyncio.run(run_llm(fixtures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Stub GitHub MCP server for the load benchmark, backed by the fake GitHub REST API.
+
+    GITHUB_MCP_SERVER_COMMAND="python -m benchmarks.stub_github_mcp --github-url http://127.0.0.1:8102"
+
+Implements the tools of the official server that the dockerization agent uses,
+with the same names and arguments, over stdio.
+"""
+
+import argparse
+import base64
+
+import httpx
+from mcp.server.fastmcp import FastMCP
+
+server = FastMCP("stub-github", log_level="WARNING")
+github: httpx.Client
+
+
+def _call(method: str, path: str, **kwargs) -> dict:
+    response = github.request(method, path, **kwargs)
+    response.raise_for_status()
+    return response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+
+
+@server.tool()
+def get_me() -> str:
+    """Details of the authenticated user"""
+    return '{"login": "bench"}'
+
+
+@server.tool()
+def get_file_contents(owner: str, repo: str, path: str = "", ref: str = "") -> str:
+    """Contents of a file or directory"""
+    return f"Repository {owner}/{repo} at {ref or 'main'}: {path or '/'}"
+
+
+@server.tool()
+def create_branch(owner: str, repo: str, branch: str, from_branch: str = "main") -> str:
+    """Create a new branch"""
+    base = _call("GET", f"/repos/{owner}/{repo}/git/ref/heads/{from_branch or 'main'}")["object"]["sha"]
+    _call("POST", f"/repos/{owner}/{repo}/git/refs", json={"ref": f"refs/heads/{branch}", "sha": base})
+    return f"Created branch {branch} from {from_branch} at {base}"
+
+
+@server.tool()
+def create_or_update_file(owner: str, repo: str, path: str, content: str, message: str, branch: str, sha: str = "") -> str:
+    """Create or update a single file"""
+    result = _call("PUT", f"/repos/{owner}/{repo}/contents/{path}", json={
+        "message": message, "branch": branch, "content": base64.b64encode(content.encode()).decode(),
+    })
+    return f"Committed {path} to {branch} as {result['commit']['sha']}"
+
+
+@server.tool()
+def create_pull_request(owner: str, repo: str, title: str, head: str, base: str, body: str = "") -> str:
+    """Open a pull request"""
+    pull = _call("POST", f"/repos/{owner}/{repo}/pulls", json={"title": title, "head": head, "base": base, "body": body})
+    return f"Created pull request #{pull['number']}: {pull['html_url']}"
+
+
+def main() -> None:
+    global github
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--github-url", default="http://127.0.0.1:8102", help="fake GitHub REST API")
+    args = parser.parse_args()
+    github = httpx.Client(base_url=args.github_url, timeout=30.0)
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Form
+from fastapi import FastAPI, HTTPException, Form, Header, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import os
+from typing import Any, Dict, Optional
 from datetime import datetime
 import uuid
 from dotenv import load_dotenv
@@ -10,13 +14,44 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import services
-from .services import RepositoryAnalyzer
-from .utils import dockerize_repository_task
+from .services import (
+    RepositoryAnalyzer, SingleFlight, token_fingerprint,
+    mcp_pool, repo_metadata, task_events, artifact_cache, llm_cache, analysis_stream_timings,
+    prompt_compactor, llm_clients, rate_limits, structured_output, metrics, startup_warmup, dockerfile_optimizer,
+    GitHubAPIError, GitHubClient
+)
+from .utils import (
+    DOCKERIZE_JOB, CheckpointStore, DockerizationWorkerPool, JobQueue, StateStore,
+    create_checkpoint_store, create_job_queue, create_state_store, relay_queue_progress
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    global state_store, job_queue, checkpoint_store, worker_pool
+    # Stores are opened here rather than at import, so importing the app creates no files
+    state_store = create_state_store()
+    job_queue = create_job_queue()
+    checkpoint_store = create_checkpoint_store()
+    worker_pool = DockerizationWorkerPool.from_env(job_queue, state=state_store, checkpoints=checkpoint_store)
+    # Optionally build LLM clients and MCP sessions before the first request is accepted
+    if startup_warmup.enabled:
+        await startup_warmup.run()
+    # Run dockerization workers in-process unless DOCKERIZE_WORKERS=0 (standalone workers)
+    if worker_pool.concurrency > 0:
+        worker_pool.start()
+    yield
+    await worker_pool.stop()
+    await state_store.close()
+    # Shut down warm MCP server sessions and the shared LLM connection pool
+    await mcp_pool.close()
+    await llm_clients.close()
 
 app = FastAPI(
     title="AI-Powered Repository Dockerization Agent",
     description="Automatically analyze and dockerize GitHub repositories using AI",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend integration
@@ -30,16 +65,78 @@ app.add_middleware(
 
 # Import models
 from .models import (
-    RepositoryRequest, AnalysisResponse, DockerizationStatus, 
-    TaskStatus, DockerizeRequest
+    RepositoryRequest, BatchAnalysisRequest, AnalysisResponse, DockerizationStatus, 
+    TaskStatus, DockerizeRequest, ResumeRequest
 )
 
-# In-memory storage (use Redis/DB in production)
-analysis_cache: Dict[str, AnalysisResponse] = {}
-task_status: Dict[str, DockerizationStatus] = {}
+# Analyses and task statuses; per-process by default, set STATE_STORE_URL to a
+# shared backend to run several uvicorn workers or replicas (opened in the lifespan)
+state_store: StateStore
+
+# Deduplicates concurrent /analyze calls for the same repository revision
+analysis_flights: SingleFlight[AnalysisResponse] = SingleFlight()
+
+# Batch analyses run this many repositories at a time (per request, capped at the max)
+BATCH_ANALYSIS_CONCURRENCY = int(os.getenv("BATCH_ANALYSIS_CONCURRENCY", "4"))
+BATCH_ANALYSIS_MAX_CONCURRENCY = int(os.getenv("BATCH_ANALYSIS_MAX_CONCURRENCY", "16"))
+BATCH_ANALYSIS_MAX_REPOS = int(os.getenv("BATCH_ANALYSIS_MAX_REPOS", "500"))
+
+# Durable dockerization queue; jobs survive restarts and are retried on failure (opened in the lifespan)
+job_queue: JobQueue
+checkpoint_store: CheckpointStore
+worker_pool: DockerizationWorkerPool
+DOCKERIZE_MAX_ATTEMPTS = int(os.getenv("DOCKERIZE_MAX_ATTEMPTS", "3"))
+
+# Progress of tasks run by standalone workers is relayed from the queue onto the event bus
+STATUS_STREAM_POLL_SECONDS = float(os.getenv("STATUS_STREAM_POLL_SECONDS", "1"))
+STATUS_STREAM_KEEPALIVE_SECONDS = 15.0
+queue_relays: Dict[str, asyncio.Task] = {}
 
 # API Endpoints
 
+async def run_analysis(
+    github_token: str,
+    openai_api_key: str,
+    owner: str,
+    repo: str,
+    commit_sha: Optional[str]
+) -> AnalysisResponse:
+    """Run a full analysis and cache it; executed once per coalesced flight"""
+    analyzer = RepositoryAnalyzer(github_token, openai_api_key)
+    try:
+        # AI-powered repository analysis (the MCP session is leased only if needed),
+        # skipped when nothing relevant changed since the last analyzed revision
+        previous = await state_store.latest_analysis(owner, repo)
+        analysis = await analyzer.analyze_repository(owner, repo, commit_sha, previous)
+        
+        # Cache the analysis
+        await state_store.put_analysis(analysis, owner, repo, commit_sha)
+        
+        return analysis
+    finally:
+        await analyzer.close()
+
+async def get_or_run_analysis(
+    github_token: str,
+    openai_api_key: str,
+    owner: str,
+    repo: str,
+    commit_sha: Optional[str]
+) -> AnalysisResponse:
+    """Return the cached analysis of this revision, or join/start its analysis flight"""
+    # Serve unchanged repositories straight from the cache
+    cached = await state_store.lookup_analysis(owner, repo, commit_sha)
+    if cached:
+        return cached
+    
+    # Concurrent requests for the same revision share one analysis. Without a
+    # SHA the caller's access is unproven, so the flight is scoped to the token.
+    flight_key = f"{owner.lower()}/{repo.lower()}@{commit_sha or token_fingerprint(github_token)}"
+    return await analysis_flights.do(
+        flight_key,
+        lambda: run_analysis(github_token, openai_api_key, owner, repo, commit_sha)
+    )
+
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze_repository(request: RepositoryRequest):
     """Analyze a GitHub repository using AI intelligence"""
@@ -49,35 +146,151 @@ async def analyze_repository(request: RepositoryRequest):
     if not openai_api_key:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
     
-    analyzer = None
+    analyzer = RepositoryAnalyzer(request.github_token, openai_api_key)
     try:
-        # Initialize analyzer with AI capabilities
-        analyzer = RepositoryAnalyzer(request.github_token, openai_api_key)
-        await analyzer.initialize_mcp()
-        
         # Parse repository URL
         owner, repo = analyzer.parse_repo_url(str(request.repo_url))
         
-        # AI-powered repository analysis
-        analysis = await analyzer.analyze_repository(owner, repo)
-        
-        # Cache the analysis
-        analysis_cache[analysis.analysis_id] = analysis
-        
-        return analysis
+        commit_sha = await analyzer.get_head_sha(owner, repo)
+        return await get_or_run_analysis(request.github_token, openai_api_key, owner, repo, commit_sha)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        if analyzer:
+        await analyzer.close()
+
+@app.post("/analyze/stream")
+async def analyze_repository_stream(request: RepositoryRequest):
+    """Analyze a GitHub repository, streaming sections as NDJSON as soon as they are known
+    
+    Emits ``project_overview`` and ``technology_stack`` events before the full
+    ``analysis`` event, or a final ``error`` event.
+    """
+    
+    # Get API keys from environment
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    
+    analyzer = RepositoryAnalyzer(request.github_token, openai_api_key)
+    try:
+        owner, repo = analyzer.parse_repo_url(str(request.repo_url))
+        commit_sha = await analyzer.get_head_sha(owner, repo)
+    except Exception as e:
+        await analyzer.close()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    cached = await state_store.lookup_analysis(owner, repo, commit_sha)
+    
+    async def cached_sections():
+        yield "project_overview", cached.project_overview
+        yield "technology_stack", cached.technical_architecture.technology_stack
+        yield "analysis", cached
+    
+    async def events():
+        try:
+            if cached:
+                sections = cached_sections()
+            else:
+                previous = await state_store.latest_analysis(owner, repo)
+                sections = analyzer.analyze_repository_stream(owner, repo, commit_sha, previous)
+            async for name, value in sections:
+                if name == "analysis" and not cached:
+                    await state_store.put_analysis(value, owner, repo, commit_sha)
+                yield json.dumps({"event": name, "data": value.model_dump(mode="json")}) + "\n"
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield json.dumps({"event": "error", "detail": detail}) + "\n"
+        finally:
             await analyzer.close()
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/analyze/batch")
+async def analyze_repositories_batch(request: BatchAnalysisRequest):
+    """Analyze many repositories (or a whole organization), streaming results as NDJSON
+    
+    Repositories are analyzed ``concurrency`` at a time and each ``analysis``
+    or per-repository ``error`` event is sent as soon as it finishes; failures
+    never abort the batch. A final ``done`` event carries the totals.
+    """
+    
+    # Get API keys from environment
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    if not request.repo_urls and not request.org:
+        raise HTTPException(status_code=422, detail="Provide repo_urls or org")
+    
+    # One GitHub client serves every head-SHA lookup of the batch; analyses share
+    # the pooled MCP sessions and LLM connections
+    github = GitHubClient(request.github_token)
+    try:
+        repo_urls = [str(url) for url in request.repo_urls]
+        if request.org:
+            repo_urls += await github.list_org_repositories(request.org, limit=BATCH_ANALYSIS_MAX_REPOS + 1)
+    except GitHubAPIError as e:
+        await github.close()
+        raise HTTPException(status_code=e.status_code or 500, detail=str(e))
+    
+    repo_urls = list(dict.fromkeys(repo_urls))
+    if len(repo_urls) > BATCH_ANALYSIS_MAX_REPOS:
+        await github.close()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has more than {BATCH_ANALYSIS_MAX_REPOS} repositories"
+        )
+    concurrency = max(1, min(request.concurrency or BATCH_ANALYSIS_CONCURRENCY, BATCH_ANALYSIS_MAX_CONCURRENCY))
+    
+    async def analyze_item(repo_url: str) -> Dict[str, Any]:
+        try:
+            owner, repo = RepositoryAnalyzer.parse_repo_url(repo_url)
+            try:
+                commit_sha = (await repo_metadata.get(github, owner, repo)).head_sha
+            except GitHubAPIError:
+                commit_sha = None
+            analysis = await get_or_run_analysis(request.github_token, openai_api_key, owner, repo, commit_sha)
+            return {"event": "analysis", "repo_url": repo_url, "data": analysis.model_dump(mode="json")}
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            return {"event": "error", "repo_url": repo_url, "detail": detail}
+    
+    async def events():
+        results: asyncio.Queue = asyncio.Queue()
+        pending = iter(repo_urls)
+        
+        async def worker():
+            for repo_url in pending:
+                results.put_nowait(await analyze_item(repo_url))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(repo_urls)))]
+        failed = 0
+        try:
+            for _ in repo_urls:
+                result = await results.get()
+                failed += result["event"] == "error"
+                yield json.dumps(result) + "\n"
+            yield json.dumps({
+                "event": "done",
+                "total": len(repo_urls),
+                "succeeded": len(repo_urls) - failed,
+                "failed": failed
+            }) + "\n"
+        finally:
+            # Client disconnects cancel the analyses still running
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await github.close()
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 @app.post("/dockerize")
 async def start_dockerization(
-    background_tasks: BackgroundTasks,
     repo_url: str = Form(None),
     github_token: str = Form(None),
     analysis_id: str = Form(None),
+    bypass_artifact_cache: bool = Form(False),
     request: DockerizeRequest = None
 ):
     """Start the AI-powered dockerization process"""
@@ -90,14 +303,17 @@ async def start_dockerization(
         final_repo_url = repo_url
         final_github_token = github_token
         final_analysis_id = analysis_id
+        final_bypass_artifact_cache = bypass_artifact_cache
     else:
         # JSON request submission
         final_repo_url = request.repo_url
         final_github_token = request.github_token
         final_analysis_id = request.analysis_id
+        final_bypass_artifact_cache = request.bypass_artifact_cache
     
     # Validate analysis exists
-    if final_analysis_id not in analysis_cache:
+    analysis = await state_store.get_analysis(final_analysis_id)
+    if analysis is None:
         raise HTTPException(status_code=404, detail="Analysis not found. Please run analysis first.")
     
     # Check OpenAI API key
@@ -109,38 +325,139 @@ async def start_dockerization(
     task_id = str(uuid.uuid4())
     
     # Initialize task status
-    task_status[task_id] = DockerizationStatus(
+    status = DockerizationStatus(
         task_id=task_id,
         status=TaskStatus.PENDING,
         message="AI dockerization task queued",
         progress=0,
         timestamp=datetime.now()
     )
+    await state_store.put_status(status)
+    task_events.publish(status)
     
-    # Start background task
-    background_tasks.add_task(
-        dockerize_repository_task,
-        task_id,
-        final_repo_url,
-        final_github_token,
-        openai_api_key,
-        final_analysis_id,
-        task_status,
-        analysis_cache
+    # Queue the job; the analysis travels with it so any worker process can run it
+    await job_queue.enqueue(
+        DOCKERIZE_JOB,
+        {
+            "task_id": task_id,
+            "repo_url": final_repo_url,
+            "github_token": final_github_token,
+            "analysis_id": final_analysis_id,
+            "analysis": analysis.model_dump(mode="json"),
+            "bypass_artifact_cache": final_bypass_artifact_cache,
+        },
+        job_id=task_id,
+        max_attempts=DOCKERIZE_MAX_ATTEMPTS
     )
+    worker_pool.notify()
     
     return {"task_id": task_id, "status": "started"}
 
+@app.post("/dockerize/{task_id}/resume")
+async def resume_dockerization(task_id: str, request: Optional[ResumeRequest] = None):
+    """Continue a failed dockerization from its last completed stage
+    
+    Branch, generated artifacts, commit and pull request are checkpointed as
+    they complete, so no LLM generation or GitHub write is repeated. The
+    GitHub token is dropped from the job once it is dead, so it has to be
+    sent again.
+    """
+    state = await job_queue.get_state(task_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if state in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="Task is still in progress")
+    
+    progress = await job_queue.get_progress(task_id)
+    status = await state_store.get_status(task_id) or (DockerizationStatus.model_validate_json(progress) if progress else None)
+    if status is not None and status.status == TaskStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail="Task already completed")
+    
+    credentials = {"github_token": request.github_token} if request and request.github_token else {}
+    if not credentials and "github_token" not in (await job_queue.get_payload(task_id) or {}):
+        raise HTTPException(status_code=422, detail="github_token is required to resume a finished task")
+    
+    completed = await checkpoint_store.load(task_id)
+    status = DockerizationStatus(
+        task_id=task_id,
+        status=TaskStatus.PENDING,
+        message=f"AI dockerization resume queued ({len(completed)} stages already completed)",
+        progress=status.progress if status else 0,
+        artifacts=status.artifacts if status else [],
+        timestamp=datetime.now()
+    )
+    if not await job_queue.requeue(task_id, DOCKERIZE_MAX_ATTEMPTS, status.model_dump_json(), credentials):
+        raise HTTPException(status_code=409, detail="Task is still in progress")
+    await state_store.put_status(status)
+    task_events.publish(status)
+    worker_pool.notify()
+    
+    return {"task_id": task_id, "status": "resumed", "completed_stages": list(completed)}
+
 @app.get("/status/{task_id}", response_model=DockerizationStatus)
 async def get_dockerization_status(task_id: str):
     """Get the status of a dockerization task"""
     
-    if task_id not in task_status:
+    # Workers write to the state store unless they run standalone with a per-process store
+    status = await state_store.get_status(task_id)
+    if status is not None and (state_store.shared or worker_pool.concurrency > 0):
+        return status
+    
+    # Otherwise (or for tasks from before a restart) they report through the queue
+    progress = await job_queue.get_progress(task_id)
+    if progress is not None:
+        status = DockerizationStatus.model_validate_json(progress)
+        await state_store.put_status(status)
+    
+    if status is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    return task_status[task_id]
+    return status
 
-# Background task is now imported from utils
+async def ensure_task_events(task_id: str) -> None:
+    """Make sure a task's transitions reach the local event bus; 404 for unknown tasks"""
+    state = await job_queue.get_state(task_id)
+    status = await state_store.get_status(task_id)
+    if state is None and status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if worker_pool.is_running(task_id) and status is not None:
+        # Jobs running in this process publish directly; re-seed history that may have been evicted
+        task_events.publish(status)
+    elif task_id not in queue_relays:
+        # Relays only while the job is out of process; stops if a local worker claims it
+        relay = asyncio.create_task(
+            relay_queue_progress(job_queue, task_id, STATUS_STREAM_POLL_SECONDS, running_here=worker_pool.is_running)
+        )
+        queue_relays[task_id] = relay
+        relay.add_done_callback(lambda _: queue_relays.pop(task_id, None))
+
+@app.get("/status/{task_id}/stream")
+async def stream_dockerization_status(
+    task_id: str,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Push status transitions of a dockerization task as Server-Sent Events.
+    
+    Reconnecting clients resume after ``Last-Event-ID`` (or ``?last_event_id=``).
+    The stream ends with an ``end`` event once the task is final.
+    """
+    await ensure_task_events(task_id)
+    
+    if last_event_id is None:
+        last_event_id = int(last_event_id_header) if last_event_id_header and last_event_id_header.isdigit() else 0
+    
+    async def events():
+        async for event in task_events.subscribe(task_id, last_event_id, STATUS_STREAM_KEEPALIVE_SECONDS):
+            yield event.frame if event else ": keep-alive\n\n"
+        yield "event: end\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/")
 async def root():
@@ -157,27 +474,64 @@ async def root():
         ],
         "endpoints": {
             "analyze": "POST /analyze - AI repository analysis",
+            "analyze_stream": "POST /analyze/stream - AI repository analysis streamed as NDJSON",
+            "analyze_batch": "POST /analyze/batch - Bulk analysis of repositories or an organization as NDJSON",
             "dockerize": "POST /dockerize - AI dockerization process",
-            "status": "GET /status/{task_id} - Task status"
+            "resume": "POST /dockerize/{task_id}/resume - Resume a failed dockerization from its last completed stage",
+            "status": "GET /status/{task_id} - Task status",
+            "status_stream": "GET /status/{task_id}/stream - Task status as Server-Sent Events",
+            "metrics": "GET /metrics - Prometheus metrics for LLM calls, MCP agents and pipeline stages"
         }
     }
 
 @app.get("/health")
-async def health_check():
-    """Health check endpoint"""
+async def health_check(response: Response):
+    """Health check endpoint; 503 until the startup warm-up has finished"""
     openai_configured = bool(os.getenv("OPENAI_API_KEY"))
+    if not startup_warmup.ready:
+        response.status_code = 503
     return {
-        "status": "healthy",
+        "status": "healthy" if startup_warmup.ready else "starting",
+        "ready": startup_warmup.ready,
         "ai_configured": openai_configured,
+        "warmup": startup_warmup.stats(),
         "timestamp": datetime.now()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Latency, token, cost and stage metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/debug/analyses")
 async def list_analyses():
     """Debug endpoint to list all cached analyses"""
+    analysis_ids = await state_store.analysis_ids()
+    return {
+        "cached_analyses": analysis_ids,
+        "count": len(analysis_ids),
+        "state_store": await state_store.stats(),
+        "analysis_flights": analysis_flights.stats(),
+        "analysis_streams": analysis_stream_timings.stats(),
+        "prompt_compaction": prompt_compactor.stats(),
+        "mcp_pool": mcp_pool.stats(),
+        "repo_metadata": repo_metadata.stats(),
+        "artifact_cache": artifact_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_clients": llm_clients.stats(),
+        "rate_limits": rate_limits.stats(),
+        "structured_output": structured_output.stats(),
+        "dockerfile_optimizer": dockerfile_optimizer.stats()
+    }
+
+@app.get("/debug/queue")
+async def queue_stats():
+    """Debug endpoint for dockerization queue depth, wait times and workers"""
     return {
-        "cached_analyses": list(analysis_cache.keys()),
-        "count": len(analysis_cache)
+        "queue": await job_queue.stats(),
+        "checkpoints": await checkpoint_store.stats(),
+        "workers": worker_pool.stats(),
+        "events": task_events.stats()
     }
 
 if __name__ == "__main__":
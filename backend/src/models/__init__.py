@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -7,6 +7,12 @@ class RepositoryRequest(BaseModel):
     repo_url: HttpUrl
     github_token: str
 
+class BatchAnalysisRequest(BaseModel):
+    github_token: str
+    repo_urls: List[HttpUrl] = []
+    org: Optional[str] = None  # analyze every non-archived repository of this organization
+    concurrency: Optional[int] = None  # defaults to BATCH_ANALYSIS_CONCURRENCY
+
 class TechnologyStack(BaseModel):
     framework: Optional[str] = None
     language: str
@@ -32,11 +38,17 @@ class ProjectOverview(BaseModel):
     domain: Optional[str] = None
     complexity_score: int  # 1-10
 
+class AnalysisContent(BaseModel):
+    """The part of an analysis the LLM produces"""
+    project_overview: ProjectOverview
+    technical_architecture: TechnicalArchitecture
+
 class AnalysisResponse(BaseModel):
     project_overview: ProjectOverview
     technical_architecture: TechnicalArchitecture
     analysis_id: str
     timestamp: datetime
+    commit_sha: Optional[str] = None
 
 class TaskStatus(str, Enum):
     PENDING = "pending"
@@ -54,17 +66,27 @@ class DockerizationStatus(BaseModel):
     message: str
     progress: int  # 0-100
     pr_url: Optional[str] = None
+    artifacts: List[str] = []  # generated artifacts completed so far
+    timings: Dict[str, float] = {}  # seconds spent per pipeline stage
     timestamp: datetime
 
 class DockerizeRequest(BaseModel):
     repo_url: str
     github_token: str
     analysis_id: str
+    bypass_artifact_cache: bool = False  # regenerate artifacts even if the stack is cached
+
+class ResumeRequest(BaseModel):
+    github_token: Optional[str] = None  # required once the task has finished; its token is not kept
 
 class DockerfileContent(BaseModel):
     content: str
     explanation: str
 
+class OptimizedDockerfile(DockerfileContent):
+    dockerignore: Optional[str] = None  # .dockerignore generated alongside, if any
+    optimizations: List[str] = []  # build-performance rewrites applied to the generated Dockerfile
+
 class DockerComposeContent(BaseModel):
     content: str
     services: List[str]
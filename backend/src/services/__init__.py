@@ -1,5 +1,40 @@
-from .llm_analyzer import LLMAnalyzer
+from .llm_analyzer import LLMAnalyzer, stream_timings as analysis_stream_timings
 from .repository_analyzer import RepositoryAnalyzer
 from .dockerization_agent import DockerizationAgent
+from .mcp_pool import MCPSessionPool, mcp_pool
+from .stack_detector import StackDetection, detect_stack
+from .github_api import GitHubAPIError, GitHubClient
+from .repo_metadata import RepoMetadataCache, RepositoryMetadata, repo_metadata
+from .single_flight import SingleFlight
+from .tokens import token_fingerprint
+from .artifact_cache import ArtifactCache, artifact_cache, stack_fingerprint
+from .llm_cache import LLMCacheMiss, LLMResponseCache, llm_cache
+from .prompt_compactor import CompactionReport, PromptCompactor, Tokenizer, prompt_compactor
+from .llm_clients import LLMClientRegistry, llm_clients
+from .structured_output import StructuredOutput, StructuredOutputError, structured_output
+from .rate_limiter import RateLimitBucket, RateLimitScheduler, RateLimitWaitTimeout, rate_limits
+from .metrics import LLMMetricsCallback, MetricsRegistry, llm_metrics, metrics, run_agent, timed
+from .warmup import StartupWarmup, startup_warmup
+from .task_events import TaskEvent, TaskEventBus, task_events
+from .dockerfile_optimizer import (
+    Dockerfile, DockerfileOptimization, DockerfileOptimizer, dockerfile_optimizer, merge_dockerignore
+)
+from .analysis_cache import AnalysisCache, BoundedCache, create_analysis_cache, create_task_status_store
 
-__all__ = ["LLMAnalyzer", "RepositoryAnalyzer", "DockerizationAgent"]
\ No newline at end of file
+__all__ = [
+    "LLMAnalyzer", "analysis_stream_timings", "RepositoryAnalyzer", "DockerizationAgent",
+    "AnalysisCache", "BoundedCache", "create_analysis_cache", "create_task_status_store",
+    "SingleFlight", "token_fingerprint", "MCPSessionPool", "mcp_pool",
+    "StackDetection", "detect_stack",
+    "GitHubAPIError", "GitHubClient", "RepoMetadataCache", "RepositoryMetadata", "repo_metadata",
+    "TaskEvent", "TaskEventBus", "task_events",
+    "ArtifactCache", "artifact_cache", "stack_fingerprint",
+    "LLMCacheMiss", "LLMResponseCache", "llm_cache",
+    "LLMClientRegistry", "llm_clients",
+    "StructuredOutput", "StructuredOutputError", "structured_output",
+    "RateLimitBucket", "RateLimitScheduler", "RateLimitWaitTimeout", "rate_limits",
+    "CompactionReport", "PromptCompactor", "Tokenizer", "prompt_compactor",
+    "LLMMetricsCallback", "MetricsRegistry", "llm_metrics", "metrics", "run_agent", "timed",
+    "StartupWarmup", "startup_warmup",
+    "Dockerfile", "DockerfileOptimization", "DockerfileOptimizer", "dockerfile_optimizer", "merge_dockerignore",
+]
\ No newline at end of file
@@ -0,0 +1,422 @@
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from ..models import AnalysisResponse, DockerizationStatus, TaskStatus
+
+V = TypeVar("V")
+
+# Bumped whenever the analysis prompt or detection logic changes so stale entries miss
+ANALYZER_VERSION = "2"
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    size: int
+    stored_at: float
+
+
+class BoundedCache(Generic[V]):
+    """LRU cache with TTL expiry, a byte budget and an optional on-disk tier.
+
+    The TTL runs from the last ``set`` of a key. Entries for which
+    ``evictable(value)`` is False are pinned: they are never evicted or
+    expired, so callers that unpin a value by mutating it in place re-set it.
+    The on-disk tier is pruned by the same TTL and by ``max_disk_bytes``.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        persist_dir: Optional[str] = None,
+        serializer: Optional[Callable[[V], str]] = None,
+        deserializer: Optional[Callable[[str], V]] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+        evictable: Optional[Callable[[V], bool]] = None,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.serializer = serializer
+        self.deserializer = deserializer
+        self.sizeof = sizeof or (lambda value: len(serializer(value)) if serializer else sys.getsizeof(value))
+        self.evictable = evictable or (lambda value: True)
+        self.persist_dir = persist_dir if serializer and deserializer else None
+
+        self._entries: "OrderedDict[str, _Entry[V]]" = OrderedDict()
+        # (deadline, seq, key, entry) in expiry order; superseded items are skipped when popped
+        self._deadlines: List[Tuple[float, int, str, _Entry[V]]] = []
+        self._seq = itertools.count()
+        # Files of the on-disk tier in write order, with their size and write time
+        self._disk: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.total_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # The disk tier is created and scanned on first use, so building a cache touches no files
+        self._disk_opened = False
+
+    # Dict-compatible access
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> V:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: V) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if self.pop(key) is None:
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries.keys()))
+
+    def keys(self) -> List[str]:
+        return list(self._entries.keys())
+
+    # Cache operations
+
+    def get(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._remove(key)
+            self._delete_from_disk(key)
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            entry = self._load_from_disk(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._insert(key, entry)
+        else:
+            self._entries.move_to_end(key)
+
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: V) -> None:
+        entry = _Entry(value=value, size=self.sizeof(value), stored_at=time.time())
+        if key in self._entries:
+            self._remove(key)
+        self._insert(key, entry)
+        self._write_to_disk(key, entry)
+
+    def pop(self, key: str) -> Optional[V]:
+        entry = self._remove(key)
+        self._delete_from_disk(key)
+        return entry.value if entry else None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "disk_bytes": self.disk_bytes,
+        }
+
+    # Internals
+
+    def _expired(self, entry: _Entry[V]) -> bool:
+        if self.ttl_seconds is None or not self.evictable(entry.value):
+            return False
+        return time.time() - entry.stored_at > self.ttl_seconds
+
+    def _insert(self, key: str, entry: _Entry[V]) -> None:
+        self._entries[key] = entry
+        self.total_bytes += entry.size
+        if self.ttl_seconds is not None:
+            self._schedule(key, entry, entry.stored_at + self.ttl_seconds)
+        self._enforce_bounds()
+
+    def _remove(self, key: str) -> Optional[_Entry[V]]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+        return entry
+
+    def _schedule(self, key: str, entry: _Entry[V], deadline: float) -> None:
+        heapq.heappush(self._deadlines, (deadline, next(self._seq), key, entry))
+        if len(self._deadlines) > 2 * len(self._entries) + 64:
+            # Rewritten and removed keys leave superseded items behind; rebuild
+            # from the live entries before they outnumber them
+            live = {id(e) for e in self._entries.values()}
+            self._deadlines = [item for item in self._deadlines if id(item[3]) in live]
+            heapq.heapify(self._deadlines)
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def _expire_due(self) -> None:
+        # Deadlines are ordered, so this stops at the first entry still live
+        now = time.time()
+        while self._deadlines and self._deadlines[0][0] < now:
+            _, _, key, entry = heapq.heappop(self._deadlines)
+            if self._entries.get(key) is not entry:
+                continue
+            if not self.evictable(entry.value):
+                # Pinned: look again one TTL later
+                self._schedule(key, entry, now + self.ttl_seconds)
+                continue
+            self._remove(key)
+            self._delete_from_disk(key)
+            self.expirations += 1
+
+    def _enforce_bounds(self) -> None:
+        # Expired entries go first, then least recently used ones
+        self._expire_due()
+        if not self._over_budget():
+            return
+        for key in list(self._entries.keys()):
+            if not self._over_budget():
+                break
+            if self.evictable(self._entries[key].value):
+                # Evicted entries stay on disk, within the disk budget, until they expire
+                self._remove(key)
+                self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.persist_dir, f"{digest}.json")
+
+    def _open_disk(self) -> None:
+        if self._disk_opened:
+            return
+        self._disk_opened = True
+        os.makedirs(self.persist_dir, exist_ok=True)
+        self._scan_disk()
+
+    def _write_to_disk(self, key: str, entry: _Entry[V]) -> None:
+        if not self.persist_dir:
+            return
+        self._open_disk()
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        record = json.dumps({"key": key, "stored_at": entry.stored_at, "value": self.serializer(entry.value)})
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(record)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._forget_file(path)
+        self._disk[path] = (len(record.encode("utf-8")), entry.stored_at)
+        self.disk_bytes += self._disk[path][0]
+        self._prune_disk()
+
+    def _load_from_disk(self, key: str) -> Optional[_Entry[V]]:
+        if not self.persist_dir:
+            return None
+        self._open_disk()
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            value = self.deserializer(record["value"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        entry = _Entry(value=value, size=self.sizeof(value), stored_at=record["stored_at"])
+        if self._expired(entry):
+            self._delete_from_disk(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _delete_from_disk(self, key: str) -> None:
+        if not self.persist_dir:
+            return
+        self._open_disk()
+        path = self._path(key)
+        self._forget_file(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _forget_file(self, path: str) -> None:
+        size_and_time = self._disk.pop(path, None)
+        if size_and_time is not None:
+            self.disk_bytes -= size_and_time[0]
+
+    def _scan_disk(self) -> None:
+        # File mtimes stand in for stored_at so startup does not parse every record
+        files = []
+        for name in os.listdir(self.persist_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.persist_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+        for mtime, path, size in sorted(files):
+            self._disk[path] = (size, mtime)
+            self.disk_bytes += size
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        # Oldest files go first: expired ones, then any beyond the disk budget
+        now = time.time()
+        while self._disk:
+            path, (size, written_at) = next(iter(self._disk.items()))
+            expired = self.ttl_seconds is not None and now - written_at > self.ttl_seconds
+            if not expired and (self.max_disk_bytes is None or self.disk_bytes <= self.max_disk_bytes):
+                break
+            self._forget_file(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class AnalysisCache:
+    """Content-addressed store of analyses.
+
+    Analyses are stored by ``analysis_id`` and additionally indexed by
+    (owner, repo, head commit SHA, analyzer version) so an unchanged repository
+    is served without re-running the MCP crawl and LLM analysis, and by
+    (owner, repo, analyzer version) for the latest analyzed revision, from
+    which a newer revision can be re-analyzed incrementally.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        persist_dir: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None,
+        max_index_entries: Optional[int] = None,
+    ):
+        self.analyses: BoundedCache[AnalysisResponse] = BoundedCache(
+            max_bytes=max_bytes,
+            max_disk_bytes=max_disk_bytes,
+            ttl_seconds=ttl_seconds,
+            persist_dir=os.path.join(persist_dir, "analyses") if persist_dir else None,
+            serializer=lambda analysis: analysis.model_dump_json(),
+            deserializer=AnalysisResponse.model_validate_json,
+        )
+        # Two keys per analysis; evicted keys stay on disk, within its budget, like evicted analyses
+        self.content_index: BoundedCache[str] = BoundedCache(
+            max_entries=max_index_entries,
+            max_disk_bytes=max_disk_bytes,
+            ttl_seconds=ttl_seconds,
+            persist_dir=os.path.join(persist_dir, "index") if persist_dir else None,
+            serializer=lambda analysis_id: analysis_id,
+            deserializer=lambda analysis_id: analysis_id,
+            sizeof=len,
+        )
+
+    @staticmethod
+    def content_key(owner: str, repo: str, commit_sha: str, version: str = ANALYZER_VERSION) -> str:
+        return f"{owner.lower()}/{repo.lower()}@{commit_sha}#{version}"
+
+    @staticmethod
+    def repo_key(owner: str, repo: str, version: str = ANALYZER_VERSION) -> str:
+        return f"{owner.lower()}/{repo.lower()}#{version}"
+
+    def __contains__(self, analysis_id: str) -> bool:
+        return analysis_id in self.analyses
+
+    def __getitem__(self, analysis_id: str) -> AnalysisResponse:
+        return self.analyses[analysis_id]
+
+    def __setitem__(self, analysis_id: str, analysis: AnalysisResponse) -> None:
+        self.analyses[analysis_id] = analysis
+
+    def __len__(self) -> int:
+        return len(self.analyses)
+
+    def get(self, analysis_id: str) -> Optional[AnalysisResponse]:
+        return self.analyses.get(analysis_id)
+
+    def keys(self) -> List[str]:
+        return self.analyses.keys()
+
+    def lookup(self, owner: str, repo: str, commit_sha: Optional[str]) -> Optional[AnalysisResponse]:
+        """Return the stored analysis for this exact repository revision, if any"""
+        if not commit_sha:
+            return None
+        analysis_id = self.content_index.get(self.content_key(owner, repo, commit_sha))
+        if analysis_id is None:
+            return None
+        analysis = self.analyses.get(analysis_id)
+        if analysis is None:
+            # The analysis itself was evicted; drop the dangling index entry
+            self.content_index.pop(self.content_key(owner, repo, commit_sha))
+        return analysis
+
+    def latest(self, owner: str, repo: str) -> Optional[AnalysisResponse]:
+        """Return the analysis of the most recently stored revision of the repository, if any"""
+        analysis_id = self.content_index.get(self.repo_key(owner, repo))
+        return self.analyses.get(analysis_id) if analysis_id is not None else None
+
+    def put(self, analysis: AnalysisResponse, owner: str, repo: str, commit_sha: Optional[str] = None) -> None:
+        """Store an analysis by id and, when the commit SHA is known, by content and repository key"""
+        self.analyses[analysis.analysis_id] = analysis
+        if commit_sha:
+            self.content_index[self.content_key(owner, repo, commit_sha)] = analysis.analysis_id
+            self.content_index[self.repo_key(owner, repo)] = analysis.analysis_id
+
+    def stats(self) -> Dict[str, Any]:
+        return {"analyses": self.analyses.stats(), "content_index": self.content_index.stats()}
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def create_analysis_cache() -> AnalysisCache:
+    """Build the process analysis cache from environment configuration"""
+    return AnalysisCache(
+        max_bytes=_env_int("ANALYSIS_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+        ttl_seconds=_env_int("ANALYSIS_CACHE_TTL_SECONDS", 24 * 60 * 60),
+        persist_dir=os.getenv("ANALYSIS_CACHE_DIR") or None,
+        max_disk_bytes=_env_int("ANALYSIS_CACHE_MAX_DISK_BYTES", 512 * 1024 * 1024),
+        max_index_entries=_env_int("ANALYSIS_INDEX_MAX_ENTRIES", 100_000),
+    )
+
+
+def create_task_status_store() -> BoundedCache[DockerizationStatus]:
+    """Build the task status store; only finished tasks are subject to eviction"""
+    return BoundedCache(
+        max_bytes=_env_int("TASK_STATUS_MAX_BYTES", 16 * 1024 * 1024),
+        max_entries=_env_int("TASK_STATUS_MAX_ENTRIES", 10_000),
+        ttl_seconds=_env_int("TASK_STATUS_TTL_SECONDS", 24 * 60 * 60),
+        sizeof=lambda status: len(status.model_dump_json()),
+        evictable=lambda status: status.status in (TaskStatus.COMPLETED, TaskStatus.FAILED),
+    )
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from ..models import AnalysisResponse
+from .analysis_cache import BoundedCache, _env_int
+from .single_flight import SingleFlight
+
+A = TypeVar("A", bound=BaseModel)
+
+# Bumped whenever a generation prompt changes so artifacts from older prompts miss
+ARTIFACT_PROMPT_VERSION = "1"
+
+# Generation prompts use this instead of the project name so artifacts can be
+# shared between repositories; the real name is substituted on the way out
+PROJECT_NAME_PLACEHOLDER = "{{PROJECT_NAME}}"
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*project[_-]?name\s*\}\}", re.IGNORECASE)
+
+# The analysis fields each generation prompt actually reads
+ARTIFACT_FIELDS = {
+    "dockerfile": ("language", "framework", "runtime", "package_manager", "dependencies", "domain"),
+    "docker_compose": ("language", "framework", "database", "domain"),
+    "workflow": ("language", "framework", "package_manager", "domain"),
+}
+
+
+def normalize_dependency(dependency: str) -> str:
+    """Reduce a dependency spec to its lowercase package name (``Django>=4.2`` -> ``django``)"""
+    dependency = dependency.strip().lower()
+    # Keep the leading @ of scoped npm packages; cut at the first version/extra/marker separator
+    scope, rest = ("@", dependency[1:]) if dependency.startswith("@") else ("", dependency)
+    name = re.split(r"[\s<>=!~^@\[;:,(]", rest, maxsplit=1)[0]
+    return scope + name if name else ""
+
+
+def stack_fingerprint(kind: str, analysis: AnalysisResponse, salt: str = "") -> str:
+    """Canonical hash of the stack fields that determine a generated artifact"""
+    stack = analysis.technical_architecture.technology_stack
+    values = {**stack.model_dump(), "domain": analysis.project_overview.domain}
+    canonical: Dict[str, Any] = {"kind": kind, "version": ARTIFACT_PROMPT_VERSION, "salt": salt}
+    for field in ARTIFACT_FIELDS[kind]:
+        value = values.get(field)
+        if field == "dependencies":
+            canonical[field] = sorted({name for name in map(normalize_dependency, value or []) if name})
+        else:
+            canonical[field] = value.strip().lower() if isinstance(value, str) and value.strip() else None
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return f"{kind}:{hashlib.sha256(encoded.encode('utf-8')).hexdigest()}"
+
+
+def render_project_name(value: Any, project_name: str) -> Any:
+    """Replace the project name placeholder throughout a generated artifact.
+
+    The placeholder lands in image, service and container names, so it is
+    always replaced with a lowercase slug of the repository name.
+    """
+    if isinstance(value, str):
+        slug = re.sub(r"[^a-z0-9._-]+", "-", project_name.lower()).strip("-._") or "app"
+        return _PLACEHOLDER_PATTERN.sub(lambda match: slug, value)
+    if isinstance(value, list):
+        return [render_project_name(item, project_name) for item in value]
+    if isinstance(value, dict):
+        return {key: render_project_name(item, project_name) for key, item in value.items()}
+    return value
+
+
+class ArtifactCache:
+    """Persistent cache of generated Docker/CI artifacts keyed by stack fingerprint.
+
+    Repositories that share a technology stack reuse one generation, so repeat
+    stacks skip the LLM entirely. Concurrent generations for the same
+    fingerprint are coalesced. ``bypass`` (globally or per call) forces a fresh
+    generation, which then replaces the cached artifact.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        persist_dir: Optional[str] = None,
+        bypass: bool = False,
+    ):
+        self.bypass = bypass
+        self._entries: BoundedCache[Dict[str, Any]] = BoundedCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            persist_dir=persist_dir,
+            serializer=json.dumps,
+            deserializer=json.loads,
+        )
+        self._flights: SingleFlight[Dict[str, Any]] = SingleFlight()
+        self.bypassed = 0
+
+    async def get_or_generate(
+        self,
+        kind: str,
+        analysis: AnalysisResponse,
+        model: Type[A],
+        generate: Callable[[AnalysisResponse], Awaitable[A]],
+        salt: str = "",
+        bypass: bool = False,
+    ) -> A:
+        """Return the artifact for this analysis' stack, generating it on a miss"""
+        key = stack_fingerprint(kind, analysis, salt)
+
+        async def _generate() -> Dict[str, Any]:
+            artifact = (await generate(analysis)).model_dump()
+            self._entries[key] = artifact
+            return artifact
+
+        if bypass or self.bypass:
+            self.bypassed += 1
+            data = await _generate()
+        else:
+            data = self._entries.get(key)
+            if data is None:
+                data = await self._flights.do(key, _generate)
+        return model.model_validate(render_project_name(data, analysis.project_overview.name))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._entries.stats(), "bypassed": self.bypassed, "flights": self._flights.stats()}
+
+
+def create_artifact_cache() -> ArtifactCache:
+    """Build the process artifact cache from environment configuration"""
+    return ArtifactCache(
+        max_entries=_env_int("ARTIFACT_CACHE_MAX_ENTRIES", 5000),
+        ttl_seconds=_env_int("ARTIFACT_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60),
+        persist_dir=os.getenv("ARTIFACT_CACHE_DIR", "data/artifact_cache") or None,
+        bypass=os.getenv("ARTIFACT_CACHE_BYPASS", "false").lower() in ("1", "true", "yes"),
+    )
+
+
+# Shared by every dockerization task in the process
+artifact_cache = create_artifact_cache()
@@ -0,0 +1,947 @@
+import fnmatch
+import json
+import logging
+import os
+import posixpath
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..models import DockerfileContent, OptimizedDockerfile
+from .metrics import dockerfile_rewrites_total
+
+logger = logging.getLogger(__name__)
+
+SYNTAX_DIRECTIVE = "docker/dockerfile:1"
+
+_DIRECTIVE_PATTERN = re.compile(r"^#\s*([A-Za-z][A-Za-z0-9_-]*)\s*=\s*(.*?)\s*$")
+_HEREDOC_PATTERN = re.compile(r"<<(-?)\s*([\"']?)([A-Za-z_][A-Za-z0-9_]*)\2")
+_FLAG_PATTERN = re.compile(r"--[A-Za-z-]+(?:=\S*)?")
+_CHAIN_PATTERN = re.compile(r"\s*&&\s*")
+
+# Instructions that may sit between a broad COPY and the install it is moved past
+_NEUTRAL_INSTRUCTIONS = {"ENV", "ARG", "LABEL", "EXPOSE"}
+
+# Cache mount targets by ecosystem, for the official images running as root
+CACHE_TARGETS = {
+    "pip": ("/root/.cache/pip",),
+    "npm": ("/root/.npm",),
+    "yarn": ("/usr/local/share/.cache/yarn",),
+    "pnpm": ("/root/.local/share/pnpm/store",),
+    "go": ("/go/pkg/mod",),
+    "go-build": ("/root/.cache/go-build",),
+    "maven": ("/root/.m2",),
+}
+_CACHE_COMMANDS = {
+    "pip": re.compile(r"\bpip[\d.]*\s+install\b|\bpython[\d.]*\s+-m\s+pip\s+install\b"),
+    "npm": re.compile(r"\bnpm\s+(?:ci|install|i)\b"),
+    "yarn": re.compile(r"\byarn(?:\s+install\b|\s*(?:&&|;|$)|\s+--)"),
+    "pnpm": re.compile(r"\bpnpm\s+(?:install|i)\b"),
+    "go": re.compile(r"\bgo\s+(?:mod\s+download|build|install|test|get)\b"),
+    "go-build": re.compile(r"\bgo\s+(?:build|install|test)\b"),
+    "maven": re.compile(r"(?:^|[\s;&|])(?:mvn|\./mvnw)\b"),
+}
+_ECOSYSTEM_LANGUAGES = {
+    "pip": "python", "npm": "node", "yarn": "node", "pnpm": "node", "go": "go", "go-build": "go", "maven": "java",
+}
+
+# Options of ``pip install`` that take a value
+_PIP_VALUE_OPTIONS = {
+    "-r", "--requirement", "-c", "--constraint", "-i", "--index-url", "--extra-index-url", "-f", "--find-links",
+    "-t", "--target", "--prefix", "--root", "--trusted-host", "--platform", "--python-version",
+    "--implementation", "--abi", "--only-binary", "--no-binary", "--progress-bar", "--timeout", "--retries",
+    "--cache-dir", "--src", "--upgrade-strategy", "-e", "--editable",
+}
+_REQUIREMENT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*(?:\[[^\]]*\])?(?:[<>=!~]=?\S*)?$")
+
+# Official images with a ``-slim`` variant, and build images that should not ship
+SLIM_IMAGES = {"python", "node", "ruby"}
+BUILD_IMAGES = {"golang", "maven", "gradle", "rust"}
+_DEBIAN_SUITES = r"(?:trixie|bookworm|bullseye|buster)"
+_SLIM_TAG = re.compile(rf"^(?:(?P<version>[\w.]*\d|latest|\$\{{?\w+\}}?)(?:-(?P<suite>{_DEBIAN_SUITES}))?|(?P<bare>{_DEBIAN_SUITES}))$")
+
+# Compilers and build tools only needed to build dependencies, never to run them
+BUILD_TOOLS = {
+    "build-essential", "gcc", "g++", "make", "cmake", "pkg-config", "autoconf", "automake", "libtool", "clang",
+}
+
+# Runtime installs that may compile native extensions, so their stage keeps the build tools
+_RUNTIME_INSTALL = re.compile(
+    r"\bpip[\d.]*\s+install\b|\bpython[\d.]*\s+-m\s+pip\s+install\b|\bnpm\s+(?:ci|install|i)\b|\byarn\b|"
+    r"\bpnpm\s+(?:install|i)\b|\bbundle\s+install\b|\bgem\s+install\b|\bpoetry\s+install\b"
+)
+# Copied paths that carry an interpreter, installed packages or native extensions
+_NATIVE_PATHS = re.compile(
+    r"site-packages|dist-packages|node_modules|(?:^|/)\.?venv(?:/|$)|^/usr(?:/local)?(?:/lib\w*)?/?$|"
+    r"^/usr(?:/local)?/lib\w*/|^/opt/venv|^/install/?$|^/root/\.local|/usr/local/bundle|(?:^|/)vendor/bundle"
+)
+_JAVA_BUILD = re.compile(r"(?:^|[\s;&|])(?:mvn|\./mvnw|gradle|\./gradlew|javac|jlink)\b")
+
+DOCKERIGNORE_COMMON = [
+    ("Version control and CI", [".git", ".github", ".gitlab-ci.yml"]),
+    ("Editors and OS files", [".idea", ".vscode", "*.swp", ".DS_Store"]),
+    ("Local environment and secrets", [".env", ".env.*", "!.env.example", "*.log"]),
+    ("Container configuration", ["Dockerfile*", "docker-compose*.yml", ".dockerignore"]),
+]
+DOCKERIGNORE_LANGUAGES = {
+    "python": ("Python", [
+        "**/__pycache__", "**/*.py[cod]", ".venv", "venv", ".pytest_cache", ".mypy_cache", ".ruff_cache",
+        ".tox", ".coverage", "htmlcov", "*.egg-info",
+    ]),
+    "node": ("Node.js", [
+        "node_modules", "**/node_modules", "npm-debug.log*", "yarn-error.log*", ".next", ".nuxt", "coverage",
+    ]),
+    "go": ("Go", ["*.test", "coverage.out"]),
+    "java": ("Java", ["**/target", ".gradle", "*.class"]),
+}
+_LANGUAGE_ALIASES = {
+    "python": "python", "javascript": "node", "typescript": "node", "node": "node", "node.js": "node",
+    "go": "go", "golang": "go", "java": "java", "kotlin": "java",
+}
+_IMAGE_LANGUAGES = {
+    "python": "python", "node": "node", "golang": "go", "maven": "java", "gradle": "java",
+    "eclipse-temurin": "java", "openjdk": "java", "amazoncorretto": "java",
+}
+
+
+class DockerfileParseError(Exception):
+    pass
+
+
+@dataclass
+class Instruction:
+    """One Dockerfile instruction with its leading comments, kept as written until rewritten"""
+    keyword: str
+    flags: List[str]
+    body: str
+    leading: List[str] = field(default_factory=list)
+    raw: Optional[str] = None
+    heredoc: bool = False
+    escape: str = "\\"
+
+    @classmethod
+    def build(cls, text: str, escape: str = "\\", leading: Optional[List[str]] = None) -> "Instruction":
+        match = re.match(r"\s*(\S+)\s*(.*)", text, re.S)
+        if match is None:
+            raise DockerfileParseError(f"Empty instruction: {text!r}")
+        keyword, rest = match.group(1), match.group(2)
+        flags: List[str] = []
+        continuation = re.compile(rf"(?:\s|{re.escape(escape)}\r?\n)+")
+        while rest.startswith("--"):
+            flag = _FLAG_PATTERN.match(rest)
+            if flag is None:
+                break
+            flags.append(flag.group(0))
+            gap = continuation.match(rest, flag.end())
+            rest = rest[gap.end() if gap else flag.end():]
+        return cls(
+            keyword=keyword.upper(), flags=flags, body=rest, leading=list(leading or []), raw=text,
+            heredoc=_HEREDOC_PATTERN.search(text) is not None and keyword.upper() in ("RUN", "COPY", "ADD"),
+            escape=escape,
+        )
+
+    @property
+    def command(self) -> str:
+        """The arguments on one line, continuations and embedded comment lines removed"""
+        lines = re.split(rf"{re.escape(self.escape)}\r?\n", self.body)
+        kept = [line for index, line in enumerate(lines) if index == 0 or not line.lstrip().startswith("#")]
+        return " ".join(part.strip() for part in kept).strip()
+
+    def arguments(self) -> List[str]:
+        """Whitespace-separated arguments, or the items of the JSON (exec) form"""
+        command = self.command
+        if command.startswith("["):
+            try:
+                return [str(item) for item in json.loads(command)]
+            except ValueError:
+                pass
+        return command.split()
+
+    def has_flag(self, prefix: str) -> bool:
+        return any(flag.startswith(prefix) for flag in self.flags)
+
+    def set_body(self, body: str) -> None:
+        self.body = body
+        self.raw = None
+
+    def add_flags(self, *flags: str) -> None:
+        self.flags.extend(flags)
+        self.raw = None
+
+    def render(self) -> str:
+        text = self.raw
+        if text is None:
+            text = " ".join([self.keyword, *self.flags, self.body] if self.body else [self.keyword, *self.flags])
+        return "\n".join([*self.leading, text])
+
+
+@dataclass
+class Stage:
+    header: Instruction
+    instructions: List[Instruction] = field(default_factory=list)
+
+    @property
+    def image(self) -> str:
+        arguments = self.header.arguments()
+        return arguments[0] if arguments else ""
+
+    @property
+    def name(self) -> Optional[str]:
+        arguments = self.header.arguments()
+        if len(arguments) >= 3 and arguments[1].upper() == "AS":
+            return arguments[2]
+        return None
+
+    def set_image(self, image: str) -> None:
+        arguments = self.header.arguments()
+        self.header.set_body(" ".join([image, *arguments[1:]]))
+
+
+@dataclass
+class Dockerfile:
+    """A parsed Dockerfile: parser directives, instructions before the first FROM, and build stages"""
+    directives: List[str] = field(default_factory=list)
+    preamble: List[Instruction] = field(default_factory=list)
+    stages: List[Stage] = field(default_factory=list)
+    trailing: List[str] = field(default_factory=list)
+    escape: str = "\\"
+    final_newline: bool = True
+
+    @classmethod
+    def parse(cls, content: str) -> "Dockerfile":
+        lines = content.splitlines()
+        dockerfile = cls(final_newline=content.endswith("\n"))
+        index = 0
+        # Parser directives are only recognised before any comment, blank line or instruction
+        while index < len(lines):
+            match = _DIRECTIVE_PATTERN.match(lines[index])
+            if match is None:
+                break
+            if match.group(1).lower() == "escape" and match.group(2) in ("\\", "`"):
+                dockerfile.escape = match.group(2)
+            dockerfile.directives.append(lines[index])
+            index += 1
+        escape = dockerfile.escape
+
+        leading: List[str] = []
+        while index < len(lines):
+            line = lines[index]
+            if not line.strip() or line.lstrip().startswith("#"):
+                leading.append(line)
+                index += 1
+                continue
+            text = [line]
+            index += 1
+            while text[-1].rstrip().endswith(escape) and index < len(lines):
+                text.append(lines[index])
+                index += 1
+            keyword = line.split(None, 1)[0].upper()
+            if keyword in ("RUN", "COPY", "ADD"):
+                for match in _HEREDOC_PATTERN.finditer("\n".join(text)):
+                    strip_tabs, delimiter = match.group(1) == "-", match.group(3)
+                    while index < len(lines):
+                        text.append(lines[index])
+                        index += 1
+                        end = text[-1].lstrip("\t") if strip_tabs else text[-1]
+                        if end == delimiter:
+                            break
+                    else:
+                        raise DockerfileParseError(f"Unterminated heredoc {delimiter}")
+            instruction = Instruction.build("\n".join(text), escape, leading)
+            leading = []
+            if instruction.keyword == "FROM":
+                dockerfile.stages.append(Stage(header=instruction))
+            elif dockerfile.stages:
+                dockerfile.stages[-1].instructions.append(instruction)
+            elif instruction.keyword == "ARG":
+                dockerfile.preamble.append(instruction)
+            else:
+                raise DockerfileParseError(f"{instruction.keyword} before the first FROM")
+        dockerfile.trailing = leading
+        if not dockerfile.stages:
+            raise DockerfileParseError("No FROM instruction")
+        return dockerfile
+
+    def directive(self, name: str) -> Optional[str]:
+        for line in self.directives:
+            match = _DIRECTIVE_PATTERN.match(line)
+            if match and match.group(1).lower() == name:
+                return match.group(2)
+        return None
+
+    def stage(self, name: str) -> Optional[Stage]:
+        for stage in self.stages:
+            if stage.name is not None and stage.name.lower() == name.lower():
+                return stage
+        return None
+
+    def render(self) -> str:
+        parts = [*self.directives]
+        parts.extend(instruction.render() for instruction in self.preamble)
+        for stage in self.stages:
+            parts.append(stage.header.render())
+            parts.extend(instruction.render() for instruction in stage.instructions)
+        parts.extend(self.trailing)
+        return "\n".join(parts) + ("\n" if self.final_newline else "")
+
+
+@dataclass(frozen=True)
+class Rewrite:
+    kind: str
+    detail: str
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.detail}"
+
+
+@dataclass
+class DockerfileOptimization:
+    content: str
+    dockerignore: Optional[str] = None
+    rewrites: List[Rewrite] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rewrites": [str(rewrite) for rewrite in self.rewrites],
+            "warnings": self.warnings,
+            "dockerignore": self.dockerignore is not None,
+        }
+
+
+@dataclass(frozen=True)
+class _Install:
+    """A dependency install that needs only the manifests, not the source tree"""
+    ecosystem: str
+    manifests: Tuple[str, ...]
+
+
+def _tokens(segment: str) -> Optional[List[str]]:
+    try:
+        return shlex.split(segment)
+    except ValueError:
+        return None
+
+
+def _subcommand(tokens: List[str], *programs: str) -> Optional[int]:
+    """Index just past ``program`` when the segment runs one of ``programs`` (after env assignments)"""
+    for index, token in enumerate(tokens):
+        if re.match(r"^\w+=", token):
+            continue
+        if posixpath.basename(token) in programs:
+            return index + 1
+        if re.match(r"^python[\d.]*$", posixpath.basename(token)) and tokens[index + 1:index + 3] == ["-m", "pip"]:
+            return index + 3 if "pip" in programs or "pip3" in programs else None
+        return None
+    return None
+
+
+def _pip_arguments(tokens: List[str]) -> Optional[Tuple[List[str], List[str], bool]]:
+    """Requirement and constraint files, positional requirements and editable flag of ``pip install``"""
+    start = _subcommand(tokens, "pip", "pip3")
+    if start is None or start >= len(tokens) or tokens[start] != "install":
+        return None
+    files: List[str] = []
+    positional: List[str] = []
+    editable = False
+    index = start + 1
+    while index < len(tokens):
+        token = tokens[index]
+        if token.startswith("-"):
+            option, _, value = token.partition("=")
+            if re.match(r"^-[rce]\S", token):
+                option, value = token[:2], token[2:]
+            elif option in _PIP_VALUE_OPTIONS and not value:
+                index += 1
+                value = tokens[index] if index < len(tokens) else ""
+            if option in ("-r", "--requirement", "-c", "--constraint") and value:
+                files.append(value)
+            editable = editable or option in ("-e", "--editable")
+        else:
+            positional.append(token)
+        index += 1
+    return files, positional, editable
+
+
+def _dependency_install(segment: str) -> Optional[_Install]:
+    """The manifest-only install run by one ``&&`` segment, if any"""
+    tokens = _tokens(segment)
+    if not tokens:
+        return None
+    pip = _pip_arguments(tokens)
+    if pip is not None:
+        files, positional, editable = pip
+        if files and not positional and not editable:
+            # A nested requirements file may include its siblings, so its directory is copied
+            manifests = []
+            for path in files:
+                directory = posixpath.dirname(path)
+                manifests.append(f"{directory}/" if directory and not posixpath.isabs(path) else path)
+            return _Install("pip", tuple(dict.fromkeys(manifests)))
+        return None
+    start = _subcommand(tokens, "npm")
+    if start is not None and start < len(tokens):
+        arguments = tokens[start + 1:]
+        if tokens[start] == "ci" or (
+            tokens[start] in ("install", "i")
+            and not any(argument in ("-g", "--global") for argument in arguments)
+            and all(argument.startswith("-") for argument in arguments)
+        ):
+            return _Install("npm", ("package*.json",))
+        return None
+    start = _subcommand(tokens, "yarn")
+    if start is not None:
+        arguments = tokens[start:]
+        if arguments[:1] == ["install"]:
+            arguments = arguments[1:]
+        # Yarn 2+ (--immutable) also needs .yarnrc.yml and the .yarn directory
+        if all(argument.startswith("-") for argument in arguments) and "--immutable" not in arguments:
+            return _Install("yarn", ("package.json", "yarn.lock*"))
+        return None
+    start = _subcommand(tokens, "pnpm")
+    if start is not None and start < len(tokens) and tokens[start] in ("install", "i"):
+        if all(argument.startswith("-") for argument in tokens[start + 1:]):
+            return _Install("pnpm", ("package.json", "pnpm-lock.yaml*"))
+        return None
+    start = _subcommand(tokens, "go")
+    if start is not None and tokens[start:start + 2] == ["mod", "download"]:
+        return _Install("go", ("go.mod", "go.sum*"))
+    start = _subcommand(tokens, "mvn")
+    if start is not None and any(
+        goal.startswith(("dependency:go-offline", "dependency:resolve")) for goal in tokens[start:]
+    ):
+        if "-f" in tokens or "--file" in tokens or any(token.startswith("-pl") for token in tokens):
+            return None
+        return _Install("maven", ("pom.xml",))
+    return None
+
+
+def _download_step(command: str) -> Optional[str]:
+    """Dependency download to run ahead of a ``go build`` or maven build that lacks one"""
+    tokens = _tokens(_CHAIN_PATTERN.split(command.strip())[0]) or []
+    start = _subcommand(tokens, "go")
+    if start is not None and tokens[start:start + 1] == ["build"]:
+        return "go mod download"
+    start = _subcommand(tokens, "mvn")
+    if start is not None and not any(token in ("-f", "--file") or token.startswith("-pl") for token in tokens) and any(
+        goal in ("compile", "package", "verify", "install") for goal in tokens[start:]
+    ):
+        return "mvn -B dependency:go-offline"
+    return None
+
+
+def _is_setup(segment: str) -> bool:
+    """Tooling set up before the install (pip upgrades, global CLIs), independent of the source"""
+    tokens = _tokens(segment)
+    if not tokens:
+        return False
+    pip = _pip_arguments(tokens)
+    if pip is not None:
+        files, positional, editable = pip
+        return not files and not editable and bool(positional) and all(
+            _REQUIREMENT_NAME.match(requirement) for requirement in positional
+        )
+    for program in ("npm", "yarn", "pnpm"):
+        start = _subcommand(tokens, program)
+        if start is not None:
+            arguments = tokens[start:]
+            return arguments[:1] == ["config"] or (
+                arguments[:1] in (["install"], ["i"], ["add"]) and ("-g" in arguments or "--global" in arguments)
+            )
+    return _subcommand(tokens, "corepack") is not None
+
+
+def _split_install(command: str) -> Optional[Tuple[List[str], List[_Install], List[str]]]:
+    """Split ``&&``-chained commands into the leading dependency installs and the rest"""
+    if re.search(r"[\"'`]|\$\(|\|\||;", command):
+        return None
+    segments = _CHAIN_PATTERN.split(command.strip())
+    installs: List[_Install] = []
+    for index, segment in enumerate(segments):
+        install = _dependency_install(segment)
+        if install is not None:
+            installs.append(install)
+        elif not _is_setup(segment):
+            return (segments[:index], installs, segments[index:]) if installs else None
+    return (segments, installs, []) if installs else None
+
+
+def _parse_user(value: str) -> bool:
+    """Whether a USER value runs as root"""
+    user = value.split(":", 1)[0].strip()
+    return user in ("root", "0")
+
+
+def _mount_target(flag: str) -> Optional[str]:
+    match = re.search(r"(?:target|dst|destination)=([^,\s]+)", flag)
+    return match.group(1) if match else None
+
+
+def _apt_segment(body: str) -> Optional[Tuple[int, int]]:
+    """Span of the package list of the first ``apt-get install`` in a RUN body"""
+    match = re.search(r"\bapt(?:-get)?\s+(?:-\S+\s+)*install\b", body)
+    if match is None:
+        return None
+    end = re.compile(r"&&|\|\||;|\|").search(body, match.end())
+    return match.end(), end.start() if end else len(body)
+
+
+def _apt_packages(segment: str, escape: str) -> List[str]:
+    text = re.sub(rf"{re.escape(escape)}\r?\n", " ", segment)
+    return [token for token in text.split() if not token.startswith("-")]
+
+
+def _package_pattern(package: str) -> re.Pattern:
+    return re.compile(rf"[ \t]*(?<![\w.+:=-]){re.escape(package)}(?:=\S+)?(?![\w.+:-])")
+
+
+def merge_dockerignore(existing: Optional[str], generated: str) -> Optional[str]:
+    """The repository's .dockerignore with the generated patterns it lacks appended.
+
+    Returns ``generated`` when there is no file yet and None when the existing
+    one already covers every pattern. Patterns the repository explicitly
+    re-includes (``!pattern``) are never added back.
+    """
+    if existing is None:
+        return generated
+    present = {line.strip() for line in existing.splitlines() if line.strip() and not line.lstrip().startswith("#")}
+    missing = [
+        line for line in generated.splitlines()
+        if line and not line.startswith("#") and line not in present and f"!{line}" not in present
+    ]
+    if not missing:
+        return None
+    return existing.rstrip("\n") + "\n\n# Added for the container build\n" + "\n".join(missing) + "\n"
+
+
+class DockerfileOptimizer:
+    """Deterministic build-performance pass over generated Dockerfiles.
+
+    The Dockerfile is parsed into stages and instructions and rewritten so
+    that dependency installs run before the source tree is copied (their
+    layer is reused until a manifest changes), package-manager downloads go
+    to BuildKit cache mounts (pip, npm, yarn, pnpm, go, maven), and the final
+    stage of a multi-stage build uses a slim base without compilers. A
+    ``.dockerignore`` matching the stack keeps the build context small. Each
+    applied rewrite is reported; Dockerfiles that cannot be parsed are
+    returned unchanged.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.optimized = 0
+        self.failures = 0
+        self.rewrites: Dict[str, int] = {}
+        self.last: Optional[DockerfileOptimization] = None
+
+    @classmethod
+    def from_env(cls) -> "DockerfileOptimizer":
+        return cls(enabled=os.getenv("DOCKERFILE_OPTIMIZATION", "true").lower() in ("1", "true", "yes"))
+
+    def apply(self, dockerfile: DockerfileContent, language: str = "") -> OptimizedDockerfile:
+        """Optimize a generated Dockerfile, recording the applied rewrites on the result"""
+        if not self.enabled:
+            return OptimizedDockerfile(**dockerfile.model_dump())
+        result = self.optimize(dockerfile.content, language)
+        return OptimizedDockerfile(
+            content=result.content,
+            explanation=dockerfile.explanation,
+            dockerignore=result.dockerignore,
+            optimizations=[str(rewrite) for rewrite in result.rewrites],
+        )
+
+    def optimize(self, content: str, language: str = "") -> DockerfileOptimization:
+        try:
+            dockerfile = Dockerfile.parse(content)
+            result = DockerfileOptimization(content=content)
+            self._reorder_dependency_installs(dockerfile, result)
+            self._add_cache_mounts(dockerfile, result)
+            self._slim_final_stage(dockerfile, result)
+            if any(rewrite.kind == "cache_mount" for rewrite in result.rewrites) and dockerfile.directive("syntax") is None:
+                dockerfile.directives.insert(0, f"# syntax={SYNTAX_DIRECTIVE}")
+                result.rewrites.append(Rewrite("syntax_directive", SYNTAX_DIRECTIVE))
+            result.content = dockerfile.render()
+            # The rewritten file must still parse into the same stages
+            if len(Dockerfile.parse(result.content).stages) != len(dockerfile.stages):
+                raise DockerfileParseError("Rewrite changed the build stages")
+            result.dockerignore = self._dockerignore(dockerfile, language, result)
+        except Exception as e:
+            self.failures += 1
+            logger.warning("Dockerfile left unoptimized: %s", e)
+            return DockerfileOptimization(content=content, warnings=[f"not optimized: {str(e)}"])
+
+        self.optimized += 1
+        for rewrite in result.rewrites:
+            self.rewrites[rewrite.kind] = self.rewrites.get(rewrite.kind, 0) + 1
+            dockerfile_rewrites_total.inc(rewrite=rewrite.kind)
+        self.last = result
+        if result.rewrites:
+            logger.info("Dockerfile optimized: %s", "; ".join(str(rewrite) for rewrite in result.rewrites))
+        for warning in result.warnings:
+            logger.info("Dockerfile warning: %s", warning)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "optimized": self.optimized,
+            "failures": self.failures,
+            "rewrites": dict(self.rewrites),
+            "last": self.last.to_dict() if self.last else None,
+        }
+
+    @staticmethod
+    def _stage_label(dockerfile: Dockerfile, stage: Stage) -> str:
+        return stage.name or f"#{dockerfile.stages.index(stage)}"
+
+    def _reorder_dependency_installs(self, dockerfile: Dockerfile, result: DockerfileOptimization) -> None:
+        """Copy only the manifests before a dependency install and the source tree after it"""
+        for stage in dockerfile.stages:
+            workdir = "/"
+            index = 0
+            while index < len(stage.instructions):
+                instruction = stage.instructions[index]
+                if instruction.keyword == "WORKDIR":
+                    target = instruction.command
+                    workdir = posixpath.normpath(posixpath.join(workdir, target)) if "$" not in target else None
+                if self._is_broad_copy(instruction):
+                    moved = self._move_source_copy(dockerfile, stage, index, workdir, result)
+                    if moved:
+                        index = moved
+                        continue
+                index += 1
+
+    @staticmethod
+    def _is_broad_copy(instruction: Instruction) -> bool:
+        if instruction.keyword not in ("COPY", "ADD") or instruction.heredoc or instruction.has_flag("--from"):
+            return False
+        arguments = instruction.arguments()
+        return len(arguments) == 2 and arguments[0] in (".", "./")
+
+    def _move_source_copy(
+        self, dockerfile: Dockerfile, stage: Stage, index: int, workdir: Optional[str], result: DockerfileOptimization
+    ) -> Optional[int]:
+        """Rewrite ``COPY . <dest>`` followed by an install; returns the index to continue from"""
+        copy = stage.instructions[index]
+        install_index = index + 1
+        while install_index < len(stage.instructions) and stage.instructions[install_index].keyword in _NEUTRAL_INSTRUCTIONS:
+            install_index += 1
+        if install_index >= len(stage.instructions):
+            return None
+        run = stage.instructions[install_index]
+        if run.keyword != "RUN" or run.heredoc or run.command.startswith("["):
+            return None
+
+        split = _split_install(run.command)
+        added_download = None
+        if split is None:
+            # Builds without a separate download step get one
+            added_download = _download_step(run.command)
+            if added_download is None or any(
+                earlier.keyword == "RUN" and _dependency_install(earlier.command) == _dependency_install(added_download)
+                for earlier in stage.instructions[:index]
+            ):
+                return None
+            split = ([], [_dependency_install(added_download)], [])
+        install_segments, installs, rest = split
+
+        destination = copy.arguments()[1]
+        base = workdir if workdir is not None else "/__workdir__"
+        destination_dir = posixpath.normpath(posixpath.join(base, destination))
+        sources: List[str] = []
+        for install in installs:
+            for manifest in install.manifests:
+                if posixpath.isabs(manifest) and workdir is None:
+                    return None
+                relative = posixpath.relpath(posixpath.normpath(posixpath.join(base, manifest)), destination_dir)
+                if relative.startswith(".."):
+                    return None
+                sources.append(relative + "/" if manifest.endswith("/") else relative)
+        # Manifests keep their path below the destination; directories are copied on their own
+        groups: Dict[str, List[str]] = {}
+        for source in dict.fromkeys(sources):
+            groups.setdefault(source if source.endswith("/") else posixpath.dirname(source), []).append(source)
+        copies: List[Instruction] = []
+        for directory, group in groups.items():
+            target = posixpath.join(destination.rstrip("/") or "/", directory)
+            if not target.endswith("/"):
+                target += "/"
+            copies.append(Instruction.build(" ".join([copy.keyword, *copy.flags, *group, target]), dockerfile.escape))
+
+        copies[0].leading = copy.leading
+        copy.leading = []
+        between = stage.instructions[index + 1:install_index]
+        if added_download:
+            # The build itself stays as written, after the source tree
+            tail = [Instruction.build(f"RUN {added_download}", dockerfile.escape), copy, run]
+        elif rest:
+            install_run = Instruction.build(
+                " ".join(["RUN", *run.flags, " && ".join(install_segments)]), dockerfile.escape, run.leading
+            )
+            tail = [install_run, copy, Instruction.build(" ".join(["RUN", *run.flags, " && ".join(rest)]), dockerfile.escape)]
+        else:
+            tail = [run, copy]
+        stage.instructions[index:install_index + 1] = [*copies, *between, *tail]
+
+        label = self._stage_label(dockerfile, stage)
+        ecosystems = ", ".join(dict.fromkeys(install.ecosystem for install in installs))
+        result.rewrites.append(Rewrite(
+            "dependency_layer_order",
+            f"{ecosystems} dependencies installed from {' '.join(sources)} before copying the source tree (stage {label})",
+        ))
+        if added_download:
+            result.rewrites.append(Rewrite("dependency_download_step", f"added `{added_download}` (stage {label})"))
+        return index + len(copies) + len(between) + len(tail)
+
+    def _add_cache_mounts(self, dockerfile: Dockerfile, result: DockerfileOptimization) -> None:
+        """Keep package-manager downloads in BuildKit cache mounts instead of the image"""
+        users: Dict[str, bool] = {}
+        for stage in dockerfile.stages:
+            parent = dockerfile.stage(stage.image)
+            root = users.get(parent.name.lower(), True) if parent else "nonroot" not in stage.image
+            pip_cache_disabled = False
+            label = self._stage_label(dockerfile, stage)
+            skipped: Set[str] = set()
+            for instruction in stage.instructions:
+                if instruction.keyword == "USER":
+                    root = _parse_user(instruction.command)
+                    continue
+                if instruction.keyword == "ENV" and re.search(r"\bPIP_NO_CACHE_DIR\b", instruction.command):
+                    pip_cache_disabled = True
+                if instruction.keyword != "RUN" or instruction.command.startswith("["):
+                    continue
+                command = instruction.command
+                ecosystems = [name for name, pattern in _CACHE_COMMANDS.items() if pattern.search(command)]
+                if not ecosystems:
+                    continue
+                if not root:
+                    skipped.update(ecosystems)
+                    continue
+                existing = {_mount_target(flag) for flag in instruction.flags if flag.startswith("--mount=")}
+                added: List[str] = []
+                for ecosystem in ecosystems:
+                    targets = CACHE_TARGETS[ecosystem]
+                    if ecosystem == "go" and not stage.image.split("/")[-1].startswith("golang"):
+                        targets = ("/root/go/pkg/mod",)
+                    for target in targets:
+                        if target not in existing:
+                            instruction.add_flags(f"--mount=type=cache,target={target}")
+                            existing.add(target)
+                            added.append(ecosystem)
+                if "pip" in added:
+                    body = re.sub(r"[ \t]+--no-cache-dir\b", "", instruction.body)
+                    if body != instruction.body:
+                        instruction.set_body(body)
+                    if pip_cache_disabled:
+                        result.warnings.append(f"PIP_NO_CACHE_DIR disables the pip cache mount (stage {label})")
+                if "npm" in added:
+                    body = re.sub(r"\s*&&\s*npm\s+cache\s+clean\s+--force\b", "", instruction.body)
+                    if body != instruction.body:
+                        instruction.set_body(body)
+                for ecosystem in dict.fromkeys(added):
+                    result.rewrites.append(Rewrite(
+                        "cache_mount", f"{ecosystem} cache mount on `{instruction.command[:60]}` (stage {label})"
+                    ))
+            if stage.name:
+                users[stage.name.lower()] = root
+            if skipped:
+                result.warnings.append(
+                    f"no cache mounts for {', '.join(sorted(skipped))} in stage {label}: it runs as a non-root user"
+                )
+
+    def _slim_final_stage(self, dockerfile: Dockerfile, result: DockerfileOptimization) -> None:
+        """Run the final stage on a slim base image without compilers or recommended packages"""
+        final = dockerfile.stages[-1]
+        label = self._stage_label(dockerfile, final)
+        image = final.image
+        repository, _, tag = image.partition(":") if "@" not in image else (image, "", "")
+        name = repository.split("/")[-1]
+        if repository.count("/") > 1 or (repository.count("/") == 1 and not repository.startswith("library/")):
+            name = ""  # Only official images have known variants
+        commands = [instruction.command for instruction in final.instructions if instruction.keyword == "RUN"]
+        builds_in_final = any(_RUNTIME_INSTALL.search(command) for command in commands)
+        multi_stage = len(dockerfile.stages) > 1
+        # Packages built on a full image may link against libraries the slim variant lacks
+        native = self._native_copies(dockerfile, final)
+        slimmable = multi_stage and not builds_in_final and not native
+
+        if name in BUILD_IMAGES:
+            result.warnings.append(
+                f"final stage {label} runs on the {name} build image; copy the build output into a smaller runtime stage"
+            )
+        elif not multi_stage:
+            result.warnings.append("single-stage build: the final image keeps every build dependency")
+        elif not builds_in_final and name in SLIM_IMAGES and "slim" not in tag and "alpine" not in tag:
+            match = _SLIM_TAG.match(tag or "latest")
+            if match and native:
+                result.warnings.append(
+                    f"final stage {label} keeps {image}: it copies {', '.join(native)} built on a full image; "
+                    f"base those stages on a slim image as well"
+                )
+            elif match:
+                if match.group("bare"):
+                    slim_tag = f"slim-{match.group('bare')}"
+                elif match.group("version") in (None, "latest"):
+                    slim_tag = "slim"
+                else:
+                    slim_tag = "-".join(filter(None, [match.group("version"), "slim", match.group("suite")]))
+                final.set_image(f"{repository}:{slim_tag}")
+                result.rewrites.append(Rewrite("slim_base_image", f"{image} -> {repository}:{slim_tag} (stage {label})"))
+        elif (
+            not any(_JAVA_BUILD.search(command) for command in commands)
+            and name == "eclipse-temurin" and "jre" not in tag
+        ):
+            jre_tag = tag.replace("jdk", "jre") if "jdk" in tag else f"{tag}-jre" if tag and tag != "latest" else "jre"
+            final.set_image(f"{repository}:{jre_tag}")
+            result.rewrites.append(Rewrite("slim_base_image", f"{image} -> {repository}:{jre_tag} (stage {label})"))
+
+        for instruction in final.instructions:
+            if instruction.keyword != "RUN" or instruction.heredoc or instruction.command.startswith("["):
+                continue
+            self._slim_apt_install(instruction, slimmable, label, result)
+
+    @staticmethod
+    def _base_image(dockerfile: Dockerfile, reference: str) -> str:
+        """The external image a stage (by name or index) or image reference is built on"""
+        seen: Set[str] = set()
+        while reference not in seen:
+            seen.add(reference)
+            stage = dockerfile.stage(reference)
+            if stage is None and reference.isdigit() and int(reference) < len(dockerfile.stages):
+                stage = dockerfile.stages[int(reference)]
+            if stage is None:
+                return reference
+            reference = stage.image
+        return reference
+
+    def _native_copies(self, dockerfile: Dockerfile, final: Stage) -> List[str]:
+        """Paths the final stage copies from stages on a full base image that may hold native packages"""
+        copies: List[str] = []
+        for instruction in final.instructions:
+            if instruction.keyword != "COPY" or not instruction.has_flag("--from="):
+                continue
+            source = next(flag for flag in instruction.flags if flag.startswith("--from=")).split("=", 1)[1]
+            tag = self._base_image(dockerfile, source).partition(":")[2]
+            if "slim" in tag or "alpine" in tag:
+                continue
+            stage = dockerfile.stage(source)
+            if stage is None and source.isdigit() and int(source) < len(dockerfile.stages):
+                stage = dockerfile.stages[int(source)]
+            # An install in the copied working directory (node_modules, --target, a venv) counts too
+            workdirs: List[str] = []
+            if stage is not None:
+                workdir = "/"
+                for earlier in stage.instructions:
+                    if earlier.keyword == "WORKDIR":
+                        workdir = posixpath.normpath(posixpath.join(workdir, earlier.command))
+                    elif earlier.keyword == "RUN" and _RUNTIME_INSTALL.search(earlier.command):
+                        workdirs.append(workdir)
+            arguments = instruction.arguments()
+            for path in arguments[:-1]:
+                normalized = posixpath.normpath(path)
+                if _NATIVE_PATHS.search(path) or _NATIVE_PATHS.search(arguments[-1]) or any(
+                    workdir == normalized or workdir.startswith(normalized.rstrip("/") + "/") for workdir in workdirs
+                ):
+                    copies.append(f"{path} from {source}")
+        return copies
+
+    def _slim_apt_install(self, instruction: Instruction, strip_tools: bool, label: str, result: DockerfileOptimization) -> None:
+        span = _apt_segment(instruction.body)
+        if span is None:
+            return
+        body = instruction.body
+        start, end = span
+        segment = body[start:end]
+        packages = _apt_packages(segment, instruction.escape)
+
+        removed = []
+        if strip_tools:
+            stripped = segment
+            for package in packages:
+                if package.split("=")[0] in BUILD_TOOLS:
+                    stripped = _package_pattern(package).sub("", stripped, count=1)
+                    removed.append(package.split("=")[0])
+            if removed and len(packages) > len(removed):
+                # Drop continuation lines left empty by the removal
+                stripped = re.sub(rf"(?m)^[ \t]*{re.escape(instruction.escape)}[ \t]*\r?\n", "", stripped)
+                segment = stripped
+                result.rewrites.append(Rewrite("build_tools_removed", f"{', '.join(removed)} (stage {label})"))
+            elif removed:
+                result.warnings.append(f"stage {label} only installs build tools ({', '.join(removed)}); left as is")
+                removed = []
+
+        flag = ""
+        if "--no-install-recommends" not in instruction.command:
+            flag = " --no-install-recommends"
+            result.rewrites.append(Rewrite("apt_no_install_recommends", f"stage {label}"))
+            # curl and wget only recommend the CA bundle they need for HTTPS
+            if {"curl", "wget"} & set(packages) and "ca-certificates" not in packages:
+                trimmed = segment.rstrip()
+                segment = trimmed + " ca-certificates" + segment[len(trimmed):]
+        body = body[:start] + flag + segment + body[end:]
+
+        apt_cache = any("/var/lib/apt" in flag for flag in instruction.flags)
+        if re.search(r"\bapt(?:-get)?\s+update\b", body) and "/var/lib/apt/lists" not in body and not apt_cache:
+            body = body.rstrip() + " && rm -rf /var/lib/apt/lists/*"
+            result.rewrites.append(Rewrite("apt_lists_cleanup", f"stage {label}"))
+        if body != instruction.body:
+            instruction.set_body(body)
+
+    def _dockerignore(self, dockerfile: Dockerfile, language: str, result: DockerfileOptimization) -> str:
+        """A .dockerignore for the stack that keeps every path the Dockerfile copies explicitly"""
+        languages: List[str] = []
+        hint = _LANGUAGE_ALIASES.get(language.strip().lower())
+        if hint:
+            languages.append(hint)
+        copied: List[str] = []
+        uses_git = False
+        for stage in dockerfile.stages:
+            name = stage.image.split("@")[0].split(":")[0].split("/")[-1]
+            if name in _IMAGE_LANGUAGES:
+                languages.append(_IMAGE_LANGUAGES[name])
+            for instruction in stage.instructions:
+                if instruction.keyword == "RUN":
+                    command = instruction.command
+                    languages.extend(
+                        _ECOSYSTEM_LANGUAGES[ecosystem] for ecosystem, pattern in _CACHE_COMMANDS.items()
+                        if pattern.search(command)
+                    )
+                    uses_git = uses_git or re.search(r"(?:^|[\s;&|])git\s", command) is not None
+                elif instruction.keyword in ("COPY", "ADD") and not instruction.has_flag("--from") and not instruction.heredoc:
+                    copied.extend(
+                        posixpath.normpath(source).lstrip("/") for source in instruction.arguments()[:-1]
+                    )
+
+        def kept(pattern: str) -> bool:
+            if pattern.startswith("!"):
+                return True
+            normalized = pattern[3:] if pattern.startswith("**/") else pattern
+            for source in copied:
+                if source == ".":
+                    continue
+                if (
+                    fnmatch.fnmatch(source, normalized) or source.startswith(normalized + "/")
+                    or normalized.startswith(source + "/") or fnmatch.fnmatch(posixpath.basename(source), normalized)
+                ):
+                    return False
+            return not (pattern == ".git" and uses_git)
+
+        sections = list(DOCKERIGNORE_COMMON)
+        for key in dict.fromkeys(languages):
+            sections.append(DOCKERIGNORE_LANGUAGES[key])
+        lines: List[str] = []
+        patterns = 0
+        for title, entries in sections:
+            entries = [pattern for pattern in entries if kept(pattern)]
+            if entries:
+                lines.extend([*([""] if lines else []), f"# {title}", *entries])
+                patterns += sum(1 for pattern in entries if not pattern.startswith("!"))
+        result.rewrites.append(Rewrite(
+            "dockerignore", f"{patterns} patterns for {', '.join(dict.fromkeys(languages)) or 'any stack'}"
+        ))
+        return "\n".join(lines) + "\n"
+
+
+# Applied to every generated Dockerfile in the process
+dockerfile_optimizer = DockerfileOptimizer.from_env()
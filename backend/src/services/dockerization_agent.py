@@ -1,15 +1,17 @@
 import uuid
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
-
-# MCP imports with correct pattern
-from mcp_use import MCPAgent, MCPClient
+from typing import Dict, Optional
+from langchain_core.messages import HumanMessage, SystemMessage
 
 from ..models import AnalysisResponse
+from .github_api import GitHubAPIError, GitHubClient
 from .llm_analyzer import LLMAnalyzer
-import dotenv
-import os
-dotenv.load_dotenv()
+from .llm_clients import llm_clients
+from .mcp_pool import mcp_pool
+from .metrics import mcp_initialize_seconds, run_agent, timed
+from .repo_metadata import repo_metadata
+
+# Model driving the GitHub MCP tool calls (branch and pull request creation)
+AGENT_MODEL = "openai/gpt-4o-mini"
 
 class DockerizationAgent:
     def __init__(self, github_token: str, openai_api_key: str, owner: str, repo: str):
@@ -18,62 +20,31 @@ class DockerizationAgent:
         self.repo = repo
         self.mcp_client = None
         self.mcp_agent = None
-        self.llm_analyzer = LLMAnalyzer(openai_api_key)
+        self.llm_analyzer = LLMAnalyzer()
+        self.github = GitHubClient(github_token)
 
     async def initialize_mcp(self):
         """Initialize MCP client using correct pattern"""
-        try:
-            # Create configuration dictionary for GitHub MCP server
-            config = {
-                "mcpServers": {
-                    "github": {
-                        "command": "docker",
-                        "args": [
-                            "run",
-                            "-i",
-                            "--rm",
-                            "-e",
-                            "GITHUB_PERSONAL_ACCESS_TOKEN",
-                            "ghcr.io/github/github-mcp-server"
-                        ],
-                        "env": {
-                            "GITHUB_PERSONAL_ACCESS_TOKEN": self.github_token
-                        }
-                    }
-                }
-            }
-            
-            # Create MCPClient from configuration dictionary
-            self.mcp_client = MCPClient.from_dict(config)
-            
-            # Create LLM for the agent (configured via environment, no hardcoded keys)
-            llm = ChatOpenAI(
-                model="openai/gpt-4o-mini",
-                temperature=0.1,
-                api_key=os.getenv("OPENROUTER_API_KEY"),
-                base_url="https://openrouter.ai/api/v1",
-            )
+        # mcp_use (and the LangChain agent stack under it) is imported on first use
+        from mcp_use import MCPAgent
         
-            
-            # Create agent with the client
-            self.mcp_agent = MCPAgent(llm=llm, client=self.mcp_client, max_steps=20)
+        try:
+            async with timed(mcp_initialize_seconds, component="dockerization_agent"):
+                # Lease a warm GitHub MCP session from the shared pool
+                self.mcp_client = await mcp_pool.acquire(self.github_token)
+                
+                # Create agent with the client and the shared LLM client
+                self.mcp_agent = MCPAgent(llm=llm_clients.get(AGENT_MODEL), client=self.mcp_client, max_steps=20)
             
         except Exception as e:
             raise Exception(f"Failed to initialize MCP: {str(e)}")
 
     async def get_default_branch(self) -> str:
-        """Get the default branch of the repository"""
+        """Get the default branch of the repository from the shared metadata cache"""
         try:
-            query = f"Get the default branch name for the GitHub repository {self.owner}/{self.repo}"
-            result = await self.mcp_agent.run(query)
-            # Parse result to extract branch name, defaulting to 'main' if unclear
-            if 'main' in str(result).lower():
-                return 'main'
-            elif 'master' in str(result).lower():
-                return 'master'
-            else:
-                return 'main'
-        except:
+            metadata = await repo_metadata.get(self.github, self.owner, self.repo)
+            return metadata.default_branch
+        except GitHubAPIError:
             return 'main'
 
     async def create_branch(self, branch_name: str = None) -> str:
@@ -84,57 +55,44 @@ class DockerizationAgent:
                 unique_id = str(uuid.uuid4())[:8]
                 branch_name = f"feature/dockerize-and-ci-{unique_id}"
             
+            # A resumed task reuses the branch it already created
+            if await self._branch_exists(branch_name):
+                return branch_name
+            
             # Get default branch
             default_branch = await self.get_default_branch()
             
             # Create branch using MCP agent
             query = f"Create a new branch named '{branch_name}' in the GitHub repository {self.owner}/{self.repo} based on the '{default_branch}' branch"
-            result = await self.mcp_agent.run(query)
+            result = await run_agent(self.mcp_agent, query, "create_branch")
             
             return branch_name
         except Exception as e:
             raise Exception(f"Failed to create branch: {str(e)}")
 
-    async def create_dockerfile(self, analysis: AnalysisResponse, branch: str) -> str:
-        """Generate and create Dockerfile using LLM"""
-        
-        dockerfile = await self.llm_analyzer.generate_dockerfile(analysis)
-        
-        # Create file using MCP agent
-        query = f"Create or update a file named 'Dockerfile' in the GitHub repository {self.owner}/{self.repo} on branch '{branch}' with the following content:\n\n{dockerfile.content}\n\nUse the commit message: 'feat: Add AI-generated multi-stage Dockerfile with production optimization'"
-        
-        await self.mcp_agent.run(query)
-        
-        return f"Dockerfile created: {dockerfile.explanation}"
+    async def _branch_exists(self, branch: str) -> bool:
+        try:
+            return await self.github.branch_exists(self.owner, self.repo, branch)
+        except GitHubAPIError:
+            return False
 
-    async def create_docker_compose(self, analysis: AnalysisResponse, branch: str) -> str:
-        """Create docker-compose.yml using LLM"""
-        
-        compose = await self.llm_analyzer.generate_docker_compose(analysis)
-        
-        # Create file using MCP agent
-        query = f"Create or update a file named 'docker-compose.yml' in the GitHub repository {self.owner}/{self.repo} on branch '{branch}' with the following content:\n\n{compose.content}\n\nUse the commit message: 'feat: Add AI-generated docker-compose.yml with integrated services'"
-        
-        await self.mcp_agent.run(query)
-        
-        return f"docker-compose.yml created with services: {', '.join(compose.services)}"
+    async def read_file(self, path: str, branch: str) -> Optional[str]:
+        """Current text of a file on the branch, or None when it does not exist"""
+        try:
+            return await self.github.get_file(self.owner, self.repo, path, branch)
+        except GitHubAPIError as e:
+            raise Exception(f"Failed to read {path}: {str(e)}")
 
-    async def create_github_workflow(self, analysis: AnalysisResponse, branch: str) -> str:
-        """Create GitHub Actions workflow using LLM"""
-        
-        workflow = await self.llm_analyzer.generate_github_workflow(analysis)
-        
-        # Create workflow file using MCP agent
-        query = f"Create or update a file at path '.github/workflows/ci-cd.yml' in the GitHub repository {self.owner}/{self.repo} on branch '{branch}' with the following content:\n\n{workflow.content}\n\nUse the commit message: 'feat: Add AI-generated comprehensive GitHub Actions CI/CD workflow'"
-        
-        await self.mcp_agent.run(query)
-        
-        return f"GitHub workflow created with features: {', '.join(workflow.features)}"
+    async def commit_files(self, files: Dict[str, str], branch: str, message: str, idempotency_key: Optional[str] = None) -> str:
+        """Write several files to the branch atomically in a single commit"""
+        try:
+            return await self.github.commit_files(self.owner, self.repo, branch, files, message, idempotency_key)
+        except GitHubAPIError as e:
+            raise Exception(f"Failed to commit files: {str(e)}")
 
-    async def create_pull_request(self, branch: str, analysis: AnalysisResponse) -> str:
-        """Create pull request with AI-generated description"""
+    async def generate_pr_description(self, analysis: AnalysisResponse) -> str:
+        """Use LLM to generate the pull request description"""
         
-        # Use LLM to generate PR description
         pr_prompt = f"""
 Create a comprehensive pull request description for dockerization of {analysis.project_overview.name}.
 
@@ -155,12 +113,19 @@ Include:
             SystemMessage(content="You are a technical writer. Create professional PR descriptions."),
             HumanMessage(content=pr_prompt)
         ])
+        return pr_response.content
+
+    async def create_pull_request(self, branch: str, analysis: AnalysisResponse, description: Optional[str] = None) -> str:
+        """Create pull request with AI-generated description"""
+        
+        if description is None:
+            description = await self.generate_pr_description(analysis)
         
         title = f"🐳 feat: Add AI-powered Docker support and CI/CD pipeline for {analysis.project_overview.name}"
         
         body = f"""## 🚀 AI-Powered Dockerization and CI/CD Implementation
 
-{pr_response.content}
+{description}
 
 ### 📊 Project Analysis
 - **Name:** {analysis.project_overview.name}
@@ -180,13 +145,21 @@ Include:
 """
 
         try:
+            # A resumed task reuses the pull request it already opened
+            try:
+                existing = await self.github.find_pull_request(self.owner, self.repo, branch)
+            except GitHubAPIError:
+                existing = None
+            if existing:
+                return existing
+            
             # Get default branch
             default_branch = await self.get_default_branch()
             
             # Create pull request using MCP agent
             query = f"Create a pull request in the GitHub repository {self.owner}/{self.repo} with title '{title}' from branch '{branch}' to '{default_branch}' with the following description:\n\n{body}"
             
-            result = await self.mcp_agent.run(query)
+            result = await run_agent(self.mcp_agent, query, "create_pull_request")
             
             # Extract URL from result (this is a simplified approach)
             result_str = str(result)
@@ -203,9 +176,8 @@ Include:
             raise Exception(f"Failed to create pull request: {str(e)}")
 
     async def close(self):
-        """Close connections"""
+        """Return the MCP session to the pool and close the GitHub client"""
         if self.mcp_client:
-            try:
-                await self.mcp_client.close()
-            except:
-                pass
+            await mcp_pool.release(self.mcp_client)
+            self.mcp_client = None
+        await self.github.close()
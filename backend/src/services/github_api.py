@@ -0,0 +1,174 @@
+import base64
+import os
+from typing import Dict, List, Optional
+
+import httpx
+
+from .rate_limiter import RateLimitedTransport
+from .tokens import token_fingerprint
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+# GitHub lists at most this many files in a commit comparison
+COMPARE_MAX_FILES = 300
+
+
+class GitHubAPIError(Exception):
+    """Raised when a GitHub REST call fails"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def github_transport(github_token: str) -> RateLimitedTransport:
+    """HTTP transport that schedules calls through the token's rate-limit bucket"""
+    key = f"github:{token_fingerprint(github_token)}"
+    return RateLimitedTransport(httpx.AsyncHTTPTransport(), "github", lambda request: key)
+
+
+class GitHubClient:
+    """Thin async client for the GitHub REST API calls that don't need an agent"""
+
+    def __init__(self, github_token: str, timeout: float = 30.0):
+        self.github_token = github_token
+        self.http = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            timeout=timeout,
+            transport=github_transport(github_token),
+            headers={
+                "Accept": "application/vnd.github+json",
+                "Authorization": f"Bearer {github_token}",
+                "X-GitHub-Api-Version": "2022-11-28",
+            },
+        )
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        try:
+            response = await self.http.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            raise GitHubAPIError(f"{method} {path} failed: {str(e)}")
+        if response.status_code >= 400:
+            raise GitHubAPIError(
+                f"{method} {path} failed with HTTP {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code
+            )
+        return response
+
+    async def list_org_repositories(self, org: str, limit: int = 1000) -> List[str]:
+        """URLs of an organization's non-archived repositories, at most ``limit``"""
+        urls: List[str] = []
+        page = 1
+        while len(urls) < limit:
+            response = await self.request(
+                "GET", f"/orgs/{org}/repos", params={"type": "all", "per_page": 100, "page": page}
+            )
+            repos = response.json()
+            urls.extend(repo["html_url"] for repo in repos if not repo.get("archived"))
+            if len(repos) < 100:
+                break
+            page += 1
+        return urls[:limit]
+
+    async def get_branch_head(self, owner: str, repo: str, branch: str) -> str:
+        response = await self.request("GET", f"/repos/{owner}/{repo}/git/ref/heads/{branch}")
+        return response.json()["object"]["sha"]
+
+    async def branch_exists(self, owner: str, repo: str, branch: str) -> bool:
+        try:
+            await self.get_branch_head(owner, repo, branch)
+        except GitHubAPIError as e:
+            if e.status_code == 404:
+                return False
+            raise
+        return True
+
+    async def find_pull_request(self, owner: str, repo: str, branch: str) -> Optional[str]:
+        """URL of an open pull request from ``branch``, if there is one"""
+        response = await self.request(
+            "GET", f"/repos/{owner}/{repo}/pulls", params={"head": f"{owner}:{branch}", "state": "open"}
+        )
+        pulls = response.json()
+        return pulls[0]["html_url"] if pulls else None
+
+    async def changed_paths(self, owner: str, repo: str, base: str, head: str) -> Optional[List[str]]:
+        """Paths changed from ``base`` to ``head`` (both sides of renames).
+
+        Returns None when the list would be incomplete: ``head`` does not
+        descend from ``base`` (force pushes) or the comparison exceeds the
+        files GitHub lists.
+        """
+        response = await self.request("GET", f"/repos/{owner}/{repo}/compare/{base}...{head}")
+        comparison = response.json()
+        files = comparison.get("files") or []
+        if comparison.get("status") not in ("ahead", "identical") or len(files) >= COMPARE_MAX_FILES:
+            return None
+        paths: List[str] = []
+        for changed in files:
+            paths.append(changed["filename"])
+            if changed.get("previous_filename"):
+                paths.append(changed["previous_filename"])
+        return paths
+
+    async def get_file(self, owner: str, repo: str, path: str, ref: str) -> Optional[str]:
+        """Text of a file at ``ref``, or None when it does not exist"""
+        try:
+            response = await self.request("GET", f"/repos/{owner}/{repo}/contents/{path}", params={"ref": ref})
+        except GitHubAPIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+        content = response.json()
+        if not isinstance(content, dict) or content.get("type") != "file":
+            return None
+        return base64.b64decode(content.get("content", "")).decode("utf-8", errors="replace")
+
+    async def commit_files(
+        self,
+        owner: str,
+        repo: str,
+        branch: str,
+        files: Dict[str, str],
+        message: str,
+        idempotency_key: Optional[str] = None
+    ) -> str:
+        """Commit several files to a branch as one commit with a single ref update.
+
+        Uses the Git Data API: one tree (with inline blob contents) on top of the
+        branch head, one commit, then a fast-forward of the branch ref. Nothing is
+        visible on the branch until the final ref update succeeds, so a failure at
+        any step leaves the branch untouched.
+
+        With an ``idempotency_key`` the commit message carries it as a trailer,
+        and a branch whose head already has that trailer is left as is.
+        """
+        parent_sha = await self.get_branch_head(owner, repo, branch)
+        parent = await self.request("GET", f"/repos/{owner}/{repo}/git/commits/{parent_sha}")
+        if idempotency_key:
+            trailer = f"Idempotency-Key: {idempotency_key}"
+            if trailer in parent.json().get("message", ""):
+                return parent_sha
+            message = f"{message}\n\n{trailer}"
+
+        tree = await self.request("POST", f"/repos/{owner}/{repo}/git/trees", json={
+            "base_tree": parent.json()["tree"]["sha"],
+            "tree": [
+                {"path": path, "mode": "100644", "type": "blob", "content": content}
+                for path, content in files.items()
+            ],
+        })
+        commit = await self.request("POST", f"/repos/{owner}/{repo}/git/commits", json={
+            "message": message,
+            "tree": tree.json()["sha"],
+            "parents": [parent_sha],
+        })
+        commit_sha = commit.json()["sha"]
+
+        # Non-forced update: fails instead of clobbering concurrent pushes
+        await self.request("PATCH", f"/repos/{owner}/{repo}/git/refs/heads/{branch}", json={
+            "sha": commit_sha,
+            "force": False,
+        })
+        return commit_sha
+
+    async def close(self) -> None:
+        await self.http.aclose()
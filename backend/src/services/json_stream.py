@@ -0,0 +1,162 @@
+import json
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+PathItem = Union[str, int]
+
+
+class JSONStreamError(ValueError):
+    """Raised as soon as a streamed document can no longer be valid JSON"""
+
+
+class _Frame:
+    __slots__ = ("closer", "path", "start", "expect_key", "key", "index")
+
+    def __init__(self, closer: str, path: Tuple[PathItem, ...], start: int):
+        self.closer = closer
+        self.path = path
+        self.start = start
+        self.expect_key = closer == "}"
+        self.key: Optional[str] = None
+        self.index = 0
+
+
+class IncrementalJSONParser:
+    """Scans a JSON object as it streams in and reports watched sub-objects once complete.
+
+    ``feed`` returns ``(path, value)`` for every watched path whose value has
+    just been closed, so callers can act on e.g. ``("project_overview",)``
+    long before the whole document has arrived. A leading Markdown code fence
+    is tolerated. Structural errors (text before the object, mismatched
+    brackets, non-string keys, trailing content) raise ``JSONStreamError`` at
+    the offending character instead of after the full generation. Scalars are
+    not validated while scanning, so a watched value that is not valid JSON
+    (e.g. ``"score": 1-10``) is not reported and is left to the caller's
+    handling of the full document.
+    """
+
+    def __init__(self, watch: Sequence[Tuple[PathItem, ...]] = ()):
+        self.watch = {tuple(path) for path in watch}
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._started = False
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._end = 0
+
+    def feed(self, chunk: str) -> List[Tuple[Tuple[PathItem, ...], Any]]:
+        self.buffer += chunk
+        completed: List[Tuple[Tuple[PathItem, ...], Any]] = []
+        while self._pos < len(self.buffer):
+            if not self._started:
+                if not self._skip_preamble():
+                    break
+                continue
+            char = self.buffer[self._pos]
+            if self.done:
+                self._check_trailing(char)
+            elif self._in_string:
+                self._scan_string(char)
+            else:
+                frame = self._scan_structure(char)
+                if frame is not None and frame.path in self.watch:
+                    try:
+                        completed.append((frame.path, json.loads(self.buffer[frame.start:self._pos + 1])))
+                    except json.JSONDecodeError:
+                        pass
+            self._pos += 1
+        return completed
+
+    def result(self) -> Any:
+        """Parse the complete document; raises if the stream ended early"""
+        if not self.done:
+            raise JSONStreamError("Stream ended before the JSON object was complete")
+        return json.loads(self.buffer[self._start_of_document():self._end + 1])
+
+    # Internals
+
+    def _skip_preamble(self) -> bool:
+        """Consume whitespace and an optional ```json fence; False if more input is needed"""
+        rest = self.buffer[self._pos:]
+        stripped = rest.lstrip()
+        if not stripped:
+            self._pos = len(self.buffer)
+            return False
+        self._pos += len(rest) - len(stripped)
+        if stripped.startswith("{"):
+            self._started = True
+            return True
+        if stripped.startswith("`"):
+            newline = stripped.find("\n")
+            if newline < 0:
+                if len(stripped) > 16:
+                    raise JSONStreamError("Unterminated code fence before JSON")
+                return False
+            fence = stripped[:newline].strip()
+            if not fence.startswith("```") or fence[3:].strip().lower() not in ("", "json"):
+                raise JSONStreamError(f"Unexpected code fence: {fence[:20]!r}")
+            self._pos += newline + 1
+            return True
+        raise JSONStreamError(f"Expected a JSON object, got {stripped[:20]!r}")
+
+    def _start_of_document(self) -> int:
+        return self.buffer.index("{")
+
+    def _scan_string(self, char: str) -> None:
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"':
+            self._in_string = False
+            frame = self._stack[-1]
+            if frame.closer == "}" and frame.expect_key:
+                try:
+                    frame.key = json.loads(self.buffer[self._string_start:self._pos + 1])
+                except json.JSONDecodeError as e:
+                    raise JSONStreamError(f"Invalid object key at offset {self._string_start}: {e}")
+                frame.expect_key = False
+
+    def _scan_structure(self, char: str) -> Optional[_Frame]:
+        frame = self._stack[-1] if self._stack else None
+        if char in " \t\r\n":
+            return None
+        if frame is not None and frame.closer == "}" and frame.expect_key and char not in '"}':
+            raise JSONStreamError(f"Expected an object key at offset {self._pos}, got {char!r}")
+
+        if char == '"':
+            self._in_string = True
+            self._string_start = self._pos
+        elif char in "{[":
+            if frame is None:
+                path: Tuple[PathItem, ...] = ()
+            elif frame.closer == "}":
+                path = frame.path + (frame.key,)
+            else:
+                path = frame.path + (frame.index,)
+            self._stack.append(_Frame("}" if char == "{" else "]", path, self._pos))
+        elif char in "}]":
+            if frame is None or char != frame.closer:
+                raise JSONStreamError(f"Mismatched {char!r} at offset {self._pos}")
+            self._stack.pop()
+            if not self._stack:
+                self.done = True
+                self._end = self._pos
+            return frame
+        elif char == ",":
+            if frame is None:
+                raise JSONStreamError(f"Unexpected ',' at offset {self._pos}")
+            if frame.closer == "}":
+                frame.expect_key = True
+            else:
+                frame.index += 1
+        elif frame is None:
+            raise JSONStreamError(f"Unexpected {char!r} at offset {self._pos}")
+        return None
+
+    def _check_trailing(self, char: str) -> None:
+        # Only whitespace and a closing code fence may follow the object
+        if char not in " \t\r\n`":
+            raise JSONStreamError(f"Unexpected content after the JSON object at offset {self._pos}")
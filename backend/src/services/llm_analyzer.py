@@ -1,38 +1,103 @@
 from fastapi import HTTPException
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, List, Optional, Tuple
+from collections import deque
+from contextlib import aclosing
 import json
+import time
 import uuid
 from datetime import datetime
-import dotenv
-import os
-dotenv.load_dotenv()
 # LangChain for intelligent analysis and generation
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain.schema import HumanMessage, SystemMessage
-from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from pydantic import ValidationError
 
 from ..models import (
-    AnalysisResponse, ProjectOverview, TechnicalArchitecture,
-    DockerfileContent, DockerComposeContent, WorkflowContent
+    AnalysisContent, AnalysisResponse, ProjectOverview, TechnologyStack,
+    DockerfileContent, DockerComposeContent, OptimizedDockerfile, WorkflowContent
 )
+from .artifact_cache import PROJECT_NAME_PLACEHOLDER, artifact_cache
+from .dockerfile_optimizer import dockerfile_optimizer
+from .json_stream import IncrementalJSONParser, JSONStreamError
+from .llm_cache import llm_cache
+from .llm_clients import llm_clients
+from .structured_output import StructuredOutputError, structured_output
+
+if TYPE_CHECKING:
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_openai import ChatOpenAI
+
+ANALYSIS_MODEL = "openrouter/horizon-beta"
+
+
+def _chat_prompt(messages: List[Any]) -> "ChatPromptTemplate":
+    # langchain_core.prompts is imported on first use, it is slow to import
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages(messages)
+
+
+# Sections of the analysis JSON that streaming callers receive as soon as they complete
+ANALYSIS_SECTIONS = {
+    "project_overview": ("project_overview",),
+    "technology_stack": ("technical_architecture", "technology_stack"),
+}
+
+
+class StreamTimings:
+    """Rolling latency samples of streamed analyses.
+
+    ``first_useful`` is the time until the first complete section could be
+    handed to the caller, the figure streaming is meant to improve.
+    """
+
+    def __init__(self, max_samples: int = 500):
+        self.first_token: deque = deque(maxlen=max_samples)
+        self.first_useful: deque = deque(maxlen=max_samples)
+        self.total: deque = deque(maxlen=max_samples)
+        self.completed = 0
+        self.aborted = 0
+
+    def record(self, first_token: Optional[float], first_useful: Optional[float], total: float) -> None:
+        self.completed += 1
+        self.total.append(total)
+        if first_token is not None:
+            self.first_token.append(first_token)
+        if first_useful is not None:
+            self.first_useful.append(first_useful)
+
+    def stats(self) -> Dict[str, Any]:
+        def percentiles(samples: deque) -> Dict[str, Optional[float]]:
+            ordered = sorted(samples)
+            if not ordered:
+                return {"p50": None, "p95": None}
+            return {
+                "p50": round(ordered[len(ordered) // 2], 4),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            }
+
+        return {
+            "completed": self.completed,
+            "aborted": self.aborted,
+            "time_to_first_token_seconds": percentiles(self.first_token),
+            "time_to_first_useful_byte_seconds": percentiles(self.first_useful),
+            "total_seconds": percentiles(self.total),
+        }
+
+
+stream_timings = StreamTimings()
 
 
 class LLMAnalyzer:
-    def __init__(self, openai_api_key: str):
-        self.llm = ChatOpenAI(
-            model="openrouter/horizon-beta",
-            temperature=0.1,
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1"
-        )
+    def __init__(self):
+        # The shared client authenticates with OPENROUTER_API_KEY (see llm_clients)
+        self.model = ANALYSIS_MODEL
     
-    async def analyze_repository_intelligence(self, repo_structure: Dict, file_contents: Dict, repo_name: str) -> AnalysisResponse:
-        """Use LLM to intelligently analyze repository"""
-        
-        # Create analysis prompt
-
-        analysis_prompt = ChatPromptTemplate.from_messages([
+    @property
+    def llm(self) -> "ChatOpenAI":
+        """Shared process-wide client, built on first use"""
+        return llm_clients.get(self.model)
+    
+    def _analysis_messages(self, repo_structure: Dict, file_contents: Dict, repo_name: str) -> List[BaseMessage]:
+        """Build the repository analysis prompt"""
+        analysis_prompt = _chat_prompt([
             SystemMessage(content="""You are an expert software architect and DevOps engineer. 
             Analyze the provided repository structure and files to extract:
             1. Project Overview (name, description, purpose, domain, complexity 1-10)
@@ -76,42 +141,105 @@ class LLMAnalyzer:
             }}
             """)
         ])
+        return analysis_prompt.format_messages()
+    
+    async def analyze_repository_intelligence(self, repo_structure: Dict, file_contents: Dict, repo_name: str) -> AnalysisResponse:
+        """Use LLM to intelligently analyze repository"""
         
-        # Get LLM response
-        response = await self.llm.ainvoke(analysis_prompt.format_messages())
-        
+        # Schema-constrained LLM response, repaired or corrected once if invalid
         try:
-            if not response.content or response.content.strip() == "":
-                raise HTTPException(status_code=500, detail="LLM returned empty response")
-            
-            # Extract JSON from markdown code blocks if present
-            content = response.content.strip()
-            if content.startswith("```json") and content.endswith("```"):
-                content = content[7:-3].strip()  # Remove ```json and ```
-            elif content.startswith("```") and content.endswith("```"):
-                content = content[3:-3].strip()   # Remove ``` and ```
-            
-            analysis_data = json.loads(content)
-            
-            # Create structured response
-            project_overview = ProjectOverview(**analysis_data["project_overview"])
-            technical_architecture = TechnicalArchitecture(**analysis_data["technical_architecture"])
-            
-            analysis_id = str(uuid.uuid4())
-            return AnalysisResponse(
-                project_overview=project_overview,
-                technical_architecture=technical_architecture,
-                analysis_id=analysis_id,
-                timestamp=datetime.now()
+            content = await structured_output.generate(
+                self.llm, self._analysis_messages(repo_structure, file_contents, repo_name), AnalysisContent, "analysis"
             )
-            
-        except json.JSONDecodeError as e:
+        except StructuredOutputError as e:
             raise HTTPException(status_code=500, detail=f"LLM response parsing failed: {str(e)}")
+        
+        return AnalysisResponse(
+            project_overview=content.project_overview,
+            technical_architecture=content.technical_architecture,
+            analysis_id=str(uuid.uuid4()),
+            timestamp=datetime.now()
+        )
     
-    async def generate_dockerfile(self, analysis: AnalysisResponse) -> DockerfileContent:
+    async def stream_repository_intelligence(
+        self,
+        repo_structure: Dict,
+        file_contents: Dict,
+        repo_name: str
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream the LLM analysis, yielding each section as soon as it is complete.
+        
+        Yields ("project_overview", ProjectOverview), ("technology_stack", TechnologyStack)
+        and finally ("analysis", AnalysisResponse). A malformed completion is aborted at
+        the first structural error instead of after the full generation, then
+        repaired locally or corrected with one more (non-streamed) call.
+        """
+        parser = IncrementalJSONParser(watch=[ANALYSIS_SECTIONS["project_overview"], ANALYSIS_SECTIONS["technology_stack"]])
+        messages = self._analysis_messages(repo_structure, file_contents, repo_name)
+        started = time.perf_counter()
+        first_token = first_section = None
+        
+        try:
+            async with aclosing(self._stream_content(messages)) as chunks:
+                async for chunk in chunks:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    for path, value in parser.feed(chunk):
+                        if first_section is None:
+                            first_section = time.perf_counter() - started
+                        # Sections that fail validation are left to the repair of the full reply
+                        try:
+                            if path == ANALYSIS_SECTIONS["project_overview"]:
+                                section = "project_overview", ProjectOverview(**value)
+                            else:
+                                section = "technology_stack", TechnologyStack(**value)
+                        except ValidationError:
+                            continue
+                        yield section
+                    if parser.done:
+                        break
+        except JSONStreamError:
+            stream_timings.aborted += 1
+        else:
+            stream_timings.record(first_token, first_section, time.perf_counter() - started)
+        
+        try:
+            content = await structured_output.recover(self.llm, messages, parser.buffer, AnalysisContent, "analysis")
+        except StructuredOutputError as e:
+            raise HTTPException(status_code=500, detail=f"LLM response parsing failed: {str(e)}")
+        yield "analysis", AnalysisResponse(
+            project_overview=content.project_overview,
+            technical_architecture=content.technical_architecture,
+            analysis_id=str(uuid.uuid4()),
+            timestamp=datetime.now()
+        )
+    
+    async def _stream_content(self, messages: List[BaseMessage]) -> AsyncIterator[str]:
+        """Yield completion text as it arrives"""
+        if llm_cache.mode != "off":
+            # astream bypasses LangChain's cache hook; use ainvoke so cached and
+            # replayed responses keep working and hand over the completion at once
+            response = await structured_output.constrain(self.llm, AnalysisContent).ainvoke(messages)
+            yield response.content
+            return
+        # Closing the stream early (invalid output, gone client) stops the generation
+        async with aclosing(structured_output.constrain(self.llm, AnalysisContent).astream(messages)) as stream:
+            async for chunk in stream:
+                if chunk.content:
+                    yield chunk.content
+    
+    async def generate_dockerfile(self, analysis: AnalysisResponse, bypass_cache: bool = False) -> OptimizedDockerfile:
+        """Generate Dockerfile, reusing the artifact of an identical stack when cached, and optimize its build"""
+        dockerfile = await artifact_cache.get_or_generate(
+            "dockerfile", analysis, DockerfileContent, self._generate_dockerfile, salt=self.model, bypass=bypass_cache
+        )
+        # The cache keeps the model's output, so optimizer changes apply to cached artifacts too
+        return dockerfile_optimizer.apply(dockerfile, analysis.technical_architecture.technology_stack.language)
+    
+    async def _generate_dockerfile(self, analysis: AnalysisResponse) -> DockerfileContent:
         """Generate Dockerfile using LLM"""
         
-        prompt = ChatPromptTemplate.from_messages([
+        prompt = _chat_prompt([
             SystemMessage(content="""You are a Docker expert. Generate production-ready, multi-stage Dockerfiles.
             Create optimized Dockerfiles with:
             - Multi-stage builds (development and production)
@@ -131,7 +259,7 @@ class LLMAnalyzer:
             Package Manager: {analysis.technical_architecture.technology_stack.package_manager}
             Dependencies: {analysis.technical_architecture.technology_stack.dependencies}
             
-            Project: {analysis.project_overview.name}
+            Project: {PROJECT_NAME_PLACEHOLDER} (placeholder; use it verbatim wherever the project name belongs)
             Domain: {analysis.project_overview.domain}
             
             Return JSON format:
@@ -142,18 +270,21 @@ class LLMAnalyzer:
             """)
         ])
         
-        response = await self.llm.ainvoke(prompt.format_messages())
-        
         try:
-            dockerfile_data = json.loads(response.content)
-            return DockerfileContent(**dockerfile_data)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Failed to generate Dockerfile")
+            return await structured_output.generate(self.llm, prompt.format_messages(), DockerfileContent, "dockerfile")
+        except StructuredOutputError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to generate Dockerfile: {str(e)}")
     
-    async def generate_docker_compose(self, analysis: AnalysisResponse) -> DockerComposeContent:
+    async def generate_docker_compose(self, analysis: AnalysisResponse, bypass_cache: bool = False) -> DockerComposeContent:
+        """Generate docker-compose.yml, reusing the artifact of an identical stack when cached"""
+        return await artifact_cache.get_or_generate(
+            "docker_compose", analysis, DockerComposeContent, self._generate_docker_compose, salt=self.model, bypass=bypass_cache
+        )
+    
+    async def _generate_docker_compose(self, analysis: AnalysisResponse) -> DockerComposeContent:
         """Generate docker-compose.yml using LLM"""
         
-        prompt = ChatPromptTemplate.from_messages([
+        prompt = _chat_prompt([
             SystemMessage(content="""You are a Docker Compose expert. Generate production-ready docker-compose.yml files.
             Include:
             - Main application service
@@ -169,7 +300,7 @@ class LLMAnalyzer:
             HumanMessage(content=f"""
             Generate docker-compose.yml for:
             
-            Project: {analysis.project_overview.name}
+            Project: {PROJECT_NAME_PLACEHOLDER} (placeholder; use it verbatim wherever the project name belongs)
             Language: {analysis.technical_architecture.technology_stack.language}
             Framework: {analysis.technical_architecture.technology_stack.framework}
             Database: {analysis.technical_architecture.technology_stack.database}
@@ -183,18 +314,21 @@ class LLMAnalyzer:
             """)
         ])
         
-        response = await self.llm.ainvoke(prompt.format_messages())
-        
         try:
-            compose_data = json.loads(response.content)
-            return DockerComposeContent(**compose_data)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Failed to generate docker-compose.yml")
+            return await structured_output.generate(self.llm, prompt.format_messages(), DockerComposeContent, "docker_compose")
+        except StructuredOutputError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to generate docker-compose.yml: {str(e)}")
     
-    async def generate_github_workflow(self, analysis: AnalysisResponse) -> WorkflowContent:
+    async def generate_github_workflow(self, analysis: AnalysisResponse, bypass_cache: bool = False) -> WorkflowContent:
+        """Generate GitHub Actions workflow, reusing the artifact of an identical stack when cached"""
+        return await artifact_cache.get_or_generate(
+            "workflow", analysis, WorkflowContent, self._generate_github_workflow, salt=self.model, bypass=bypass_cache
+        )
+    
+    async def _generate_github_workflow(self, analysis: AnalysisResponse) -> WorkflowContent:
         """Generate GitHub Actions workflow using LLM"""
         
-        prompt = ChatPromptTemplate.from_messages([
+        prompt = _chat_prompt([
             SystemMessage(content="""You are a CI/CD expert. Generate comprehensive GitHub Actions workflows.
             Include:
             - Code quality checks (linting, formatting)
@@ -209,7 +343,7 @@ class LLMAnalyzer:
             HumanMessage(content=f"""
             Generate GitHub Actions workflow for:
             
-            Project: {analysis.project_overview.name}
+            Project: {PROJECT_NAME_PLACEHOLDER} (placeholder; use it verbatim wherever the project name belongs)
             Language: {analysis.technical_architecture.technology_stack.language}
             Framework: {analysis.technical_architecture.technology_stack.framework}
             Package Manager: {analysis.technical_architecture.technology_stack.package_manager}
@@ -223,10 +357,7 @@ class LLMAnalyzer:
             """)
         ])
         
-        response = await self.llm.ainvoke(prompt.format_messages())
-        
         try:
-            workflow_data = json.loads(response.content)
-            return WorkflowContent(**workflow_data)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Failed to generate GitHub workflow")
+            return await structured_output.generate(self.llm, prompt.format_messages(), WorkflowContent, "workflow")
+        except StructuredOutputError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to generate GitHub workflow: {str(e)}")
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import warnings
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+from .analysis_cache import BoundedCache, _env_int
+
+if TYPE_CHECKING:
+    from langchain_core.caches import BaseCache
+    from langchain_core.outputs import Generation
+
+LLM_CACHE_MODES = ("off", "cache", "record", "replay")
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a prompt has no recorded response"""
+
+
+class LLMResponseCache:
+    """Response cache for the chat models, plugged in through LangChain's ``cache=`` hook.
+
+    Entries are keyed by a hash of the model configuration (model name,
+    temperature, endpoint) and the serialized message list. Modes:
+
+    - ``off``: every call goes to the provider
+    - ``cache``: identical prompts are answered locally, misses are stored
+    - ``record``: every call goes to the provider and the response is stored
+    - ``replay``: only stored responses are served; a miss raises ``LLMCacheMiss``
+
+    Recorded responses never expire, so a recorded directory can drive the whole
+    pipeline deterministically without network access. ``langchain()`` returns
+    the ``BaseCache`` the chat models take; langchain_core is only imported then.
+    """
+
+    def __init__(
+        self,
+        mode: str = "off",
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        persist_dir: Optional[str] = None,
+    ):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}', expected one of {', '.join(LLM_CACHE_MODES)}")
+        self.mode = mode
+        self._entries: BoundedCache[str] = BoundedCache(
+            max_bytes=max_bytes,
+            ttl_seconds=None if mode in ("record", "replay") else ttl_seconds,
+            persist_dir=persist_dir if mode != "off" else None,
+            serializer=lambda value: value,
+            deserializer=lambda value: value,
+            sizeof=len,
+        )
+        self.recorded = 0
+        self.replay_misses = 0
+        self._langchain: Optional["BaseCache"] = None
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(json.dumps([llm_string, prompt]).encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence["Generation"]]:
+        if self.mode in ("off", "record"):
+            return None
+        value = self._entries.get(self.key(prompt, llm_string))
+        if value is None:
+            if self.mode == "replay":
+                self.replay_misses += 1
+                raise LLMCacheMiss("No recorded LLM response for this prompt (LLM_CACHE_MODE=replay)")
+            return None
+        from langchain_core._api import LangChainBetaWarning
+        from langchain_core.load import loads
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return loads(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence["Generation"]) -> None:
+        if self.mode in ("off", "replay"):
+            return
+        from langchain_core.load import dumps
+
+        self._entries[self.key(prompt, llm_string)] = dumps(list(return_val))
+        self.recorded += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        for key in self._entries.keys():
+            self._entries.pop(key)
+
+    def langchain(self) -> "BaseCache":
+        """This cache behind LangChain's ``BaseCache`` interface, built on first use"""
+        if self._langchain is None:
+            self._langchain = _langchain_cache(self)
+        return self._langchain
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, **self._entries.stats(), "recorded": self.recorded, "replay_misses": self.replay_misses}
+
+
+def _langchain_cache(cache: LLMResponseCache) -> "BaseCache":
+    from langchain_core.caches import BaseCache
+
+    class LangChainResponseCache(BaseCache):
+        def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence["Generation"]]:
+            return cache.lookup(prompt, llm_string)
+
+        def update(self, prompt: str, llm_string: str, return_val: Sequence["Generation"]) -> None:
+            cache.update(prompt, llm_string, return_val)
+
+        def clear(self, **kwargs: Any) -> None:
+            cache.clear(**kwargs)
+
+        # The store is in-process and cheap; skip the executor hop of the default async methods
+
+        async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence["Generation"]]:
+            return cache.lookup(prompt, llm_string)
+
+        async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence["Generation"]) -> None:
+            cache.update(prompt, llm_string, return_val)
+
+        async def aclear(self, **kwargs: Any) -> None:
+            cache.clear(**kwargs)
+
+    return LangChainResponseCache()
+
+
+def create_llm_cache() -> LLMResponseCache:
+    """Build the LLM response cache from environment configuration"""
+    return LLMResponseCache(
+        mode=os.getenv("LLM_CACHE_MODE", "off").lower(),
+        max_bytes=_env_int("LLM_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+        ttl_seconds=_env_int("LLM_CACHE_TTL_SECONDS", 24 * 60 * 60),
+        persist_dir=os.getenv("LLM_CACHE_DIR", "data/llm_cache") or None,
+    )
+
+
+# Attached to every chat model the services construct
+llm_cache = create_llm_cache()
@@ -0,0 +1,131 @@
+import os
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import httpx
+
+from .llm_cache import llm_cache
+from .metrics import llm_metrics
+from .rate_limiter import ReleasingStream, RateLimitedTransport, llm_bucket_key
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+
+class _MeteredTransport(httpx.AsyncBaseTransport):
+    """Counts requests in flight (including streamed bodies) on the shared pool"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.active += 1
+        self.requests += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self.active -= 1
+            raise
+        response.stream = ReleasingStream(response.stream, self._release)
+        return response
+
+    def _release(self) -> None:
+        self.active -= 1
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class LLMClientRegistry:
+    """Process-wide chat model clients.
+
+    Each (model, base_url, temperature) client is built once, on first use,
+    and all of them share one keep-alive HTTP connection pool whose requests
+    are scheduled per provider and model by the shared rate limiter. ``close``
+    is called from the application lifespan.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 120.0,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._clients: Dict[Tuple[str, str, float], "ChatOpenAI"] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[_MeteredTransport] = None
+
+    @classmethod
+    def from_env(cls) -> "LLMClientRegistry":
+        return cls(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "60")),
+        )
+
+    def get(self, model: str, base_url: str = OPENROUTER_BASE_URL, temperature: float = 0.1) -> "ChatOpenAI":
+        """Return the shared client for this model, creating it on first use"""
+        key = (model, base_url, temperature)
+        client = self._clients.get(key)
+        if client is None:
+            # langchain_openai (and the openai SDK) is imported on first use
+            from langchain_openai import ChatOpenAI
+            
+            client = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=os.getenv("OPENROUTER_API_KEY"),
+                base_url=base_url,
+                cache=llm_cache.langchain(),
+                callbacks=[llm_metrics],
+                # Token usage of streamed completions feeds the metrics
+                stream_usage=True,
+                http_async_client=self._http_client(),
+            )
+            self._clients[key] = client
+        return client
+
+    async def close(self) -> None:
+        self._clients.clear()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._transport = None
+
+    def stats(self) -> Dict[str, Any]:
+        transport = self._transport
+        active = transport.active if transport else 0
+        return {
+            "clients": [f"{model}@{base_url}" for model, base_url, _ in self._clients],
+            "max_connections": self.limits.max_connections,
+            "active_requests": active,
+            "peak_requests": transport.peak if transport else 0,
+            "total_requests": transport.requests if transport else 0,
+            # Above 1.0 requests are queueing for a connection
+            "utilization": round(active / self.limits.max_connections, 4) if self.limits.max_connections else 0.0,
+        }
+
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            # Metering sits outside rate limiting so queued calls show up as active
+            self._transport = _MeteredTransport(
+                RateLimitedTransport(httpx.AsyncHTTPTransport(limits=self.limits), "llm", llm_bucket_key)
+            )
+            self._http = httpx.AsyncClient(transport=self._transport, timeout=self.timeout)
+        return self._http
+
+
+# Shared by every analyzer and agent in the process
+llm_clients = LLMClientRegistry.from_env()
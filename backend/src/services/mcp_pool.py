@@ -0,0 +1,364 @@
+import asyncio
+import logging
+import os
+import shlex
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Optional, Tuple
+
+from .tokens import token_fingerprint
+
+if TYPE_CHECKING:
+    from mcp_use import MCPClient
+
+logger = logging.getLogger(__name__)
+
+GITHUB_MCP_SERVER = "github"
+DEFAULT_GITHUB_MCP_COMMAND = [
+    "docker", "run", "-i", "--rm",
+    "-e", "GITHUB_PERSONAL_ACCESS_TOKEN",
+    "ghcr.io/github/github-mcp-server",
+]
+
+
+def github_mcp_config(github_token: str) -> Dict[str, Any]:
+    """MCP client configuration for the GitHub server.
+
+    ``GITHUB_MCP_SERVER_COMMAND`` replaces the docker invocation, e.g. to point
+    at a local stub server during development.
+    """
+    command = shlex.split(os.getenv("GITHUB_MCP_SERVER_COMMAND", "")) or DEFAULT_GITHUB_MCP_COMMAND
+    return {
+        "mcpServers": {
+            GITHUB_MCP_SERVER: {
+                "command": command[0],
+                "args": command[1:],
+                "env": {
+                    "GITHUB_PERSONAL_ACCESS_TOKEN": github_token
+                }
+            }
+        }
+    }
+
+
+@dataclass
+class _PooledSession:
+    client: "MCPClient"
+    created_at: float
+    last_used: float
+    owner: asyncio.Task
+    closing: asyncio.Event
+    leased_at: Optional[float] = None
+    lease_site: str = ""
+    leak_reported: bool = False
+
+
+class _TokenPool:
+    def __init__(self, github_token: str):
+        self.github_token = github_token
+        self.idle: Deque[_PooledSession] = deque()
+        self.leased: Dict[int, _PooledSession] = {}
+        self.spawning = 0
+        self.last_used = time.monotonic()
+        self.condition = asyncio.Condition()
+
+    @property
+    def size(self) -> int:
+        return len(self.idle) + len(self.leased) + self.spawning
+
+
+class MCPSessionPool:
+    """Process-wide pool of warm GitHub MCP client sessions.
+
+    Sessions are partitioned by a fingerprint of the GitHub token so a lease
+    never crosses credentials. Each partition keeps between ``min_size`` and
+    ``max_size`` sessions; idle sessions beyond ``min_size`` are closed after
+    ``idle_timeout`` seconds, sessions idle longer than ``health_check_after``
+    are pinged before being handed out, and leases held longer than
+    ``leak_timeout`` are reported as probable leaks. A partition unused for
+    ``partition_idle_timeout`` seconds is dropped with its warm sessions, so
+    ``min_size`` applies to tokens in use rather than to every token seen.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 0,
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        partition_idle_timeout: float = 3600.0,
+        health_check_after: float = 30.0,
+        leak_timeout: float = 900.0,
+        acquire_timeout: float = 120.0,
+        maintenance_interval: float = 15.0,
+        config_factory: Callable[[str], Dict[str, Any]] = github_mcp_config,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.partition_idle_timeout = partition_idle_timeout
+        self.health_check_after = health_check_after
+        self.leak_timeout = leak_timeout
+        self.acquire_timeout = acquire_timeout
+        self.maintenance_interval = maintenance_interval
+        self.config_factory = config_factory
+
+        self._pools: Dict[str, _TokenPool] = {}
+        self._leases: Dict[int, Tuple[str, _TokenPool, _PooledSession]] = {}
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.partitions_evicted = 0
+        self.health_check_failures = 0
+        self.leaks_detected = 0
+        self.acquire_timeouts = 0
+
+    @classmethod
+    def from_env(cls) -> "MCPSessionPool":
+        return cls(
+            min_size=int(os.getenv("MCP_POOL_MIN_SIZE", "0")),
+            max_size=int(os.getenv("MCP_POOL_MAX_SIZE", "4")),
+            idle_timeout=float(os.getenv("MCP_POOL_IDLE_TIMEOUT_SECONDS", "300")),
+            partition_idle_timeout=float(os.getenv("MCP_POOL_PARTITION_IDLE_TIMEOUT_SECONDS", "3600")),
+            leak_timeout=float(os.getenv("MCP_POOL_LEAK_TIMEOUT_SECONDS", "900")),
+        )
+
+    async def acquire(self, github_token: str) -> "MCPClient":
+        """Lease a connected client for this token, spawning one if needed"""
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed")
+        self._ensure_maintenance()
+
+        key = token_fingerprint(github_token)
+        pool = self._pools.setdefault(key, _TokenPool(github_token))
+        # Set before the first await so maintenance never drops a partition being acquired from
+        pool.last_used = time.monotonic()
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            entry = await self._reserve(pool, deadline)
+            if entry is None:
+                try:
+                    entry = await self._spawn(pool)
+                except BaseException:
+                    async with pool.condition:
+                        pool.spawning -= 1
+                        pool.condition.notify()
+                    raise
+                pool.spawning -= 1
+                pool.leased[id(entry.client)] = entry
+            elif await self._is_healthy(entry):
+                self.reused += 1
+            else:
+                self.health_check_failures += 1
+                await self._discard(pool, entry)
+                continue
+
+            entry.leased_at = time.monotonic()
+            entry.lease_site = "".join(traceback.format_stack(limit=6)[:-1])
+            entry.leak_reported = False
+            self._leases[id(entry.client)] = (key, pool, entry)
+            return entry.client
+
+    async def release(self, client: "MCPClient", discard: bool = False) -> None:
+        """Return a leased client; ``discard`` closes it instead of keeping it warm"""
+        lease = self._leases.pop(id(client), None)
+        if lease is None:
+            await self._close_client(client)
+            return
+
+        _, pool, entry = lease
+        pool.last_used = time.monotonic()
+        if discard or self._closed:
+            await self._discard(pool, entry)
+            return
+
+        async with pool.condition:
+            pool.leased.pop(id(client), None)
+            entry.leased_at = None
+            entry.last_used = time.monotonic()
+            pool.idle.append(entry)
+            pool.condition.notify()
+
+    async def prewarm(self, github_token: str, count: Optional[int] = None) -> None:
+        """Spawn sessions for a token ahead of the first request"""
+        clients = [await self.acquire(github_token) for _ in range(count or max(self.min_size, 1))]
+        for client in clients:
+            await self.release(client)
+
+    async def close(self) -> None:
+        """Stop maintenance and close every idle session; leased ones close on release"""
+        self._closed = True
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        for pool in self._pools.values():
+            while pool.idle:
+                await self._close(pool.idle.popleft())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "partitions": len(self._pools),
+            "idle": sum(len(pool.idle) for pool in self._pools.values()),
+            "leased": len(self._leases),
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+            "partitions_evicted": self.partitions_evicted,
+            "health_check_failures": self.health_check_failures,
+            "leaks_detected": self.leaks_detected,
+            "acquire_timeouts": self.acquire_timeouts,
+        }
+
+    # Internals
+
+    async def _reserve(self, pool: _TokenPool, deadline: float) -> Optional[_PooledSession]:
+        """Take an idle session, or return None after reserving a slot to spawn one"""
+        async with pool.condition:
+            while True:
+                if pool.idle:
+                    # LIFO keeps the most recently used sessions hot
+                    entry = pool.idle.pop()
+                    pool.leased[id(entry.client)] = entry
+                    return entry
+                if pool.size < self.max_size:
+                    pool.spawning += 1
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.acquire_timeouts += 1
+                    raise TimeoutError("Timed out waiting for a free MCP session")
+                try:
+                    await asyncio.wait_for(pool.condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _spawn(self, pool: _TokenPool) -> _PooledSession:
+        # MCP sessions must be closed by the task that opened them, so each pooled
+        # session lives in a dedicated owner task until it is asked to close
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        closing = asyncio.Event()
+
+        # mcp_use is imported on first use to keep it out of process startup
+        from mcp_use import MCPClient
+
+        async def _own() -> None:
+            client = MCPClient.from_dict(self.config_factory(pool.github_token))
+            try:
+                await client.create_session(GITHUB_MCP_SERVER)
+            except Exception as e:
+                await self._close_client(client)
+                if not ready.done():
+                    ready.set_exception(e)
+                return
+            if not ready.done():
+                ready.set_result(client)
+            try:
+                await closing.wait()
+            finally:
+                await self._close_client(client)
+
+        owner = asyncio.create_task(_own())
+        try:
+            client = await asyncio.shield(ready)
+        except asyncio.CancelledError:
+            closing.set()
+            raise
+        self.created += 1
+        now = time.monotonic()
+        return _PooledSession(client=client, created_at=now, last_used=now, owner=owner, closing=closing)
+
+    async def _is_healthy(self, entry: _PooledSession) -> bool:
+        try:
+            session = entry.client.get_session(GITHUB_MCP_SERVER)
+            if not session.is_connected:
+                return False
+            if time.monotonic() - entry.last_used > self.health_check_after:
+                await asyncio.wait_for(session.connector.list_tools(), timeout=10.0)
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, pool: _TokenPool, entry: _PooledSession) -> None:
+        async with pool.condition:
+            pool.leased.pop(id(entry.client), None)
+            pool.condition.notify()
+        self.discarded += 1
+        await self._close(entry)
+
+    async def _close(self, entry: _PooledSession) -> None:
+        entry.closing.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(entry.owner), timeout=10.0)
+        except Exception:
+            pass
+
+    async def _close_client(self, client: "MCPClient") -> None:
+        try:
+            await client.close_all_sessions()
+        except Exception:
+            pass
+
+    def _ensure_maintenance(self) -> None:
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            for key, pool in list(self._pools.items()):
+                try:
+                    await self._maintain_pool(key, pool)
+                except Exception:
+                    logger.exception("MCP pool maintenance failed")
+
+    async def _maintain_pool(self, key: str, pool: _TokenPool) -> None:
+        now = time.monotonic()
+
+        # Close sessions idle past the timeout, oldest first, keeping min_size warm
+        expired = []
+        async with pool.condition:
+            while pool.idle and pool.size > self.min_size and now - pool.idle[0].last_used > self.idle_timeout:
+                expired.append(pool.idle.popleft())
+        for entry in expired:
+            await self._close(entry)
+
+        for entry in list(pool.leased.values()):
+            if entry.leased_at and not entry.leak_reported and now - entry.leased_at > self.leak_timeout:
+                entry.leak_reported = True
+                self.leaks_detected += 1
+                logger.warning(
+                    "MCP session for token %s leased for %.0fs without release; acquired at:\n%s",
+                    key, now - entry.leased_at, entry.lease_site
+                )
+
+        unused = not pool.leased and not pool.spawning and (
+            now - pool.last_used > self.partition_idle_timeout or (pool.size == 0 and self.min_size == 0)
+        )
+        if unused:
+            # Dropped before the first await, so no acquire can pick it up meanwhile
+            self._pools.pop(key, None)
+            self.partitions_evicted += 1
+            while pool.idle:
+                await self._close(pool.idle.popleft())
+            return
+
+        while pool.size < self.min_size and not self._closed:
+            async with pool.condition:
+                pool.spawning += 1
+            try:
+                entry = await self._spawn(pool)
+            finally:
+                pool.spawning -= 1
+            async with pool.condition:
+                pool.idle.append(entry)
+                pool.condition.notify()
+
+
+# Shared by every analyzer and dockerization agent in the process
+mcp_pool = MCPSessionPool.from_env()
@@ -0,0 +1,300 @@
+import json
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+STEP_BUCKETS = (1, 2, 3, 5, 8, 10, 15, 20, 30)
+
+# USD per million prompt/completion tokens; extend or override with LLM_PRICES
+DEFAULT_LLM_PRICES = {
+    "openai/gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_format(value)}" for key, value in sorted(self.values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        counts, totals = self.series.setdefault(self._key(labels), ([0] * len(self.buckets), [0.0, 0.0]))
+        counts[bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def summary(self, **labels: str) -> Dict[str, float]:
+        _, totals = self.series.get(self._key(labels), ([], [0.0, 0.0]))
+        return {"count": totals[1], "sum": round(totals[0], 4)}
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, totals) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, {'le': _format(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format(round(totals[0], 6))}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_format(totals[1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self, namespace: str = "devops_agent"):
+        self.namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.namespace}_{name}", documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics.values() for line in metric.render()) + "\n"
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+metrics = MetricsRegistry()
+
+llm_request_seconds = metrics.histogram(
+    "llm_request_duration_seconds", "Latency of chat model calls", ["model"]
+)
+llm_requests_total = metrics.counter(
+    "llm_requests_total", "Chat model calls by outcome", ["model", "outcome"]
+)
+llm_tokens_total = metrics.counter(
+    "llm_tokens_total", "Tokens used by chat model calls", ["model", "type"]
+)
+llm_cost_usd_total = metrics.counter(
+    "llm_cost_usd_total", "Estimated chat model spend in USD (see LLM_PRICES)", ["model"]
+)
+mcp_initialize_seconds = metrics.histogram(
+    "mcp_initialize_duration_seconds", "Time to lease an MCP session and build its agent", ["component"]
+)
+mcp_agent_run_seconds = metrics.histogram(
+    "mcp_agent_run_duration_seconds", "Latency of MCP agent runs", ["operation"]
+)
+mcp_agent_steps = metrics.histogram(
+    "mcp_agent_steps", "Tool steps taken per MCP agent run", ["operation"], buckets=STEP_BUCKETS
+)
+mcp_agent_runs_total = metrics.counter(
+    "mcp_agent_runs_total", "MCP agent runs by outcome", ["operation", "outcome"]
+)
+dockerize_stage_seconds = metrics.histogram(
+    "dockerize_stage_duration_seconds", "Latency of dockerization pipeline stages", ["stage"]
+)
+dockerize_stages_total = metrics.counter(
+    "dockerize_stages_total", "Dockerization pipeline stages by outcome", ["stage", "outcome"]
+)
+
+repository_analyses_total = metrics.counter(
+    "repository_analyses_total",
+    "Repository analyses by path: incremental (carried forward from an earlier commit), "
+    "incremental_readme_changed (carried forward with a possibly stale description), changed "
+    "(manifests or entrypoints changed), no_diff (changes could not be listed) or fresh",
+    ["path"]
+)
+
+rate_limit_wait_seconds = metrics.histogram(
+    "rate_limit_wait_seconds",
+    "Time outbound GitHub and LLM calls waited for their rate-limit bucket",
+    ["bucket"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+rate_limit_waits_total = metrics.counter(
+    "rate_limit_waits_total", "Outbound calls that had to wait for their rate-limit bucket", ["bucket"]
+)
+
+dockerfile_rewrites_total = metrics.counter(
+    "dockerfile_rewrites_total",
+    "Build-performance rewrites applied to generated Dockerfiles, e.g. cache_mount or dependency_layer_order",
+    ["rewrite"]
+)
+
+class Timer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+
+@asynccontextmanager
+async def timed(histogram: Histogram, counter: Optional[Counter] = None, **labels: str) -> AsyncIterator[Timer]:
+    """Observe the duration of the block and count its outcome (``ok`` or ``error``)"""
+    timer = Timer()
+    outcome = "error"
+    try:
+        yield timer
+        outcome = "ok"
+    finally:
+        timer.seconds = time.perf_counter() - timer.started
+        histogram.observe(timer.seconds, **labels)
+        if counter is not None:
+            counter.inc(outcome=outcome, **labels)
+
+
+async def run_agent(agent: Any, query: str, operation: str) -> Any:
+    """``MCPAgent.run`` with latency, step and outcome metrics.
+
+    Consumes ``agent.stream`` the way ``run`` does, counting the
+    ``(action, observation)`` steps before the final result.
+    """
+    steps = 0
+    result: Any = ""
+    async with timed(mcp_agent_run_seconds, mcp_agent_runs_total, operation=operation):
+        async with aclosing(agent.stream(query)) as items:
+            async for item in items:
+                if isinstance(item, tuple):
+                    steps += 1
+                else:
+                    result = item
+                    break
+        mcp_agent_steps.observe(steps, operation=operation)
+    return result
+
+
+def _load_prices() -> Dict[str, Dict[str, float]]:
+    prices = dict(DEFAULT_LLM_PRICES)
+    raw = os.getenv("LLM_PRICES")
+    if raw:
+        try:
+            prices.update(json.loads(raw))
+        except ValueError:
+            logger.warning("Ignoring invalid LLM_PRICES: %s", raw)
+    return prices
+
+
+class LLMMetricsCallback(AsyncCallbackHandler):
+    """Records latency, outcome, token usage and cost of every chat model call.
+
+    Attached to the shared LLM clients, so calls made inside MCP agents are
+    counted as well.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self.prices = prices if prices is not None else _load_prices()
+        self._runs: Dict[UUID, Tuple[str, float]] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                                  **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (kwargs.get("metadata") or {}).get("ls_model_name", "unknown")
+        self._runs[run_id] = (model, time.perf_counter())
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        model, started = run
+        llm_request_seconds.observe(time.perf_counter() - started, model=model)
+        llm_requests_total.inc(model=model, outcome="ok")
+
+        prompt_tokens, completion_tokens = self._usage(response)
+        llm_tokens_total.inc(prompt_tokens, model=model, type="prompt")
+        llm_tokens_total.inc(completion_tokens, model=model, type="completion")
+        price = self.prices.get(model)
+        if price:
+            llm_cost_usd_total.inc(
+                (prompt_tokens * price.get("prompt", 0) + completion_tokens * price.get("completion", 0)) / 1_000_000,
+                model=model
+            )
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        model, started = run
+        llm_request_seconds.observe(time.perf_counter() - started, model=model)
+        llm_requests_total.inc(model=model, outcome="error")
+
+    @staticmethod
+    def _usage(response: LLMResult) -> Tuple[int, int]:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+        # Streamed completions report usage on the message instead
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+        return 0, 0
+
+
+llm_metrics = LLMMetricsCallback()
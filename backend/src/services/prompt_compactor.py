@@ -0,0 +1,299 @@
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOCKFILE_NAMES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+    "poetry.lock", "Pipfile.lock", "pdm.lock", "uv.lock", "Cargo.lock", "composer.lock",
+    "Gemfile.lock", "go.sum", "mix.lock", "gradle.lockfile", "packages.lock.json",
+}
+
+# Relative value of a key file for stack detection; unknown files rank lowest
+FILE_PRIORITY = {
+    "package.json": 100, "requirements.txt": 100, "pyproject.toml": 100, "go.mod": 100,
+    "pom.xml": 100, "build.gradle": 100, "build.gradle.kts": 100, "Cargo.toml": 100,
+    "composer.json": 100, "Gemfile": 100, "mix.exs": 100, "Pipfile": 95, "setup.py": 90,
+    "setup.cfg": 85, "manage.py": 80, "Dockerfile": 75, "docker-compose.yml": 75,
+    "docker-compose.yaml": 75, "Procfile": 70, "README.md": 65, "README.rst": 65,
+    "tsconfig.json": 50, "angular.json": 50, "next.config.js": 50, "next.config.mjs": 50,
+    "nuxt.config.js": 50, "vue.config.js": 50, "vite.config.ts": 50, "vite.config.js": 50,
+}
+
+# package.json keys that matter for the analysis; the rest is dropped when summarizing
+PACKAGE_JSON_KEYS = (
+    "name", "description", "main", "type", "engines", "packageManager", "scripts",
+    "dependencies", "devDependencies", "peerDependencies", "workspaces",
+)
+
+_APPROX_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+class Tokenizer:
+    """Counts tokens locally with tiktoken, falling back to an estimate.
+
+    tiktoken needs its encoding file (downloaded once or provided through
+    ``TIKTOKEN_CACHE_DIR``); without it, tokens are approximated as runs of
+    up to four word characters plus individual punctuation.
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def exact(self) -> bool:
+        self._load()
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        self._load()
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(_APPROX_TOKEN_PATTERN.findall(text))
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        except Exception as e:
+            logger.warning("tiktoken encoding %s unavailable (%s); using approximate token counts", self.encoding_name, e)
+
+
+@dataclass
+class CompactionReport:
+    tokens_before: int
+    tokens_after: int
+    budget: int
+    exact_tokens: bool
+    files_kept: List[str] = field(default_factory=list)
+    files_truncated: List[str] = field(default_factory=list)
+    files_dropped: List[str] = field(default_factory=list)
+    duplicates: List[str] = field(default_factory=list)
+    paths_collapsed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "budget": self.budget,
+            "exact_tokens": self.exact_tokens,
+            "files_kept": self.files_kept,
+            "files_truncated": self.files_truncated,
+            "files_dropped": self.files_dropped,
+            "duplicates": self.duplicates,
+            "paths_collapsed": self.paths_collapsed,
+        }
+
+
+class PromptCompactor:
+    """Shrinks repository structure and key files to fit an analysis token budget.
+
+    Lockfiles and duplicate files are dropped, manifests are summarized, the
+    path list is collapsed below ``max_tree_depth``, and the remaining files
+    are added in relevance order, truncated or dropped once the budget is
+    exhausted. Roughly ``structure_share`` of the budget goes to the structure.
+    """
+
+    def __init__(
+        self,
+        budget: int = 12_000,
+        tokenizer: Optional[Tokenizer] = None,
+        max_file_tokens: int = 2_000,
+        max_tree_depth: int = 3,
+        structure_share: float = 0.3,
+        min_file_tokens: int = 100,
+    ):
+        self.budget = budget
+        self.tokenizer = tokenizer or Tokenizer()
+        self.max_file_tokens = max_file_tokens
+        self.max_tree_depth = max_tree_depth
+        self.structure_share = structure_share
+        self.min_file_tokens = min_file_tokens
+        self.compactions = 0
+        self.total_tokens_before = 0
+        self.total_tokens_after = 0
+        self.last_report: Optional[CompactionReport] = None
+
+    @classmethod
+    def from_env(cls) -> "PromptCompactor":
+        return cls(
+            budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "12000")),
+            tokenizer=Tokenizer(os.getenv("PROMPT_TOKENIZER_ENCODING", "cl100k_base")),
+        )
+
+    def compact(self, structure: Any, key_files: Dict[str, str]) -> Tuple[Any, Dict[str, str], CompactionReport]:
+        """Return the compacted structure and key files plus a report of what changed"""
+        report = CompactionReport(
+            tokens_before=self._prompt_tokens(structure, key_files),
+            tokens_after=0,
+            budget=self.budget,
+            exact_tokens=self.tokenizer.exact,
+        )
+
+        structure_budget = int(self.budget * self.structure_share)
+        structure = self._compact_structure(structure, structure_budget, report)
+        remaining = self.budget - self._tokens(json.dumps(structure, indent=2))
+
+        compacted: Dict[str, str] = {}
+        seen: Dict[str, str] = {}
+        for path in sorted(key_files, key=self._rank):
+            name = posixpath.basename(path)
+            if name in LOCKFILE_NAMES:
+                report.files_dropped.append(path)
+                continue
+
+            content = self._summarize(name, key_files[path])
+            digest = hashlib.sha256(" ".join(content.split()).encode("utf-8")).hexdigest()
+            if digest in seen:
+                report.duplicates.append(path)
+                continue
+
+            # Each file also costs its JSON framing in the prompt
+            cost = self._tokens(json.dumps({path: content}, indent=2))
+            limit = min(self.max_file_tokens, remaining)
+            if cost > limit:
+                if limit < self.min_file_tokens:
+                    report.files_dropped.append(path)
+                    continue
+                # JSON escaping grows with the kept lines, so the framing is re-measured until it fits
+                original, target = content, limit - self._tokens(json.dumps({path: ""}, indent=2))
+                while True:
+                    content = self._truncate(original, target)
+                    cost = self._tokens(json.dumps({path: content}, indent=2))
+                    if cost <= limit or target <= 1:
+                        break
+                    target -= max(cost - limit, 1)
+                report.files_truncated.append(path)
+
+            seen[digest] = path
+            compacted[path] = content
+            report.files_kept.append(path)
+            remaining -= cost
+
+        report.tokens_after = self._prompt_tokens(structure, compacted)
+        self.compactions += 1
+        self.total_tokens_before += report.tokens_before
+        self.total_tokens_after += report.tokens_after
+        self.last_report = report
+        return structure, compacted, report
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "compactions": self.compactions,
+            "budget": self.budget,
+            "tokens_before": self.total_tokens_before,
+            "tokens_after": self.total_tokens_after,
+            "reduction": round(1 - self.total_tokens_after / self.total_tokens_before, 4)
+            if self.total_tokens_before else 0.0,
+            "last": self.last_report.to_dict() if self.last_report else None,
+        }
+
+    # Internals
+
+    def _tokens(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def _prompt_tokens(self, structure: Any, key_files: Dict[str, str]) -> int:
+        # Mirrors how the analysis prompt embeds both parts
+        return self._tokens(json.dumps(structure, indent=2)) + self._tokens(json.dumps(key_files, indent=2))
+
+    @staticmethod
+    def _rank(path: str) -> Tuple[int, int, str]:
+        name = posixpath.basename(path)
+        return (-FILE_PRIORITY.get(name, 10), path.count("/"), path)
+
+    def _summarize(self, name: str, content: str) -> str:
+        """Reduce files with a lot of irrelevant bulk to the parts the analysis reads"""
+        if name == "package.json":
+            try:
+                data = json.loads(content)
+            except ValueError:
+                return content
+            if isinstance(data, dict):
+                return json.dumps({key: data[key] for key in PACKAGE_JSON_KEYS if key in data}, indent=2)
+        if name in ("README.md", "README.rst"):
+            # Drop badges, images and HTML noise that carry no stack information
+            lines = [
+                line for line in content.splitlines()
+                if not re.match(r"^\s*(\[!\[|!\[|<img|<p align|<a href|<br)", line)
+            ]
+            return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+        return content
+
+    def _truncate(self, content: str, max_tokens: int) -> str:
+        """Keep the head and a little of the tail of a file within ``max_tokens``"""
+        if self._tokens(content) <= max_tokens:
+            return content
+        lines = content.splitlines()
+        head: List[str] = []
+        tail: List[str] = []
+        used = self._tokens("... [truncated 0000 lines] ...")
+        head_budget = int(max_tokens * 0.8)
+        for line in lines:
+            cost = self._tokens(line) + 1
+            if used + cost > head_budget:
+                break
+            head.append(line)
+            used += cost
+        for line in reversed(lines[len(head):]):
+            cost = self._tokens(line) + 1
+            if used + cost > max_tokens:
+                break
+            tail.insert(0, line)
+            used += cost
+        omitted = len(lines) - len(head) - len(tail)
+        if not head and not tail:
+            # A single huge line: cut by characters instead
+            return content[: max(max_tokens, 1) * 3] + "\n... [truncated] ..."
+        return "\n".join(head + [f"... [truncated {omitted} lines] ..."] + tail)
+
+    def _compact_structure(self, structure: Any, budget: int, report: CompactionReport) -> Any:
+        if isinstance(structure, dict) and isinstance(structure.get("paths"), list):
+            structure = dict(structure)
+            paths = [path for path in structure["paths"] if posixpath.basename(path) not in LOCKFILE_NAMES]
+            collapsed = self._collapse_paths(paths, self.max_tree_depth)
+            depth = self.max_tree_depth
+            while depth > 1 and self._tokens(json.dumps(collapsed, indent=2)) > budget:
+                depth -= 1
+                collapsed = self._collapse_paths(paths, depth)
+            while collapsed and self._tokens(json.dumps(collapsed, indent=2)) > budget:
+                collapsed = collapsed[: len(collapsed) * 3 // 4]
+                structure["paths_truncated"] = True
+            report.paths_collapsed = len(paths) - len(collapsed)
+            structure["paths"] = collapsed
+            return structure
+
+        # Free-form structure (e.g. the MCP agent's answer): truncate the text
+        text = structure if isinstance(structure, str) else json.dumps(structure, indent=2)
+        if self._tokens(json.dumps(text)) <= budget:
+            return structure
+        return self._truncate(text, budget)
+
+    @staticmethod
+    def _collapse_paths(paths: List[str], max_depth: int) -> List[str]:
+        """Replace files below ``max_depth`` directories with one ``dir/... (N files)`` entry"""
+        shallow: List[str] = []
+        deep: Counter = Counter()
+        for path in paths:
+            parts = path.split("/")
+            if len(parts) - 1 <= max_depth:
+                shallow.append(path)
+            else:
+                deep["/".join(parts[:max_depth])] += 1
+        return shallow + [f"{directory}/... ({count} files)" for directory, count in sorted(deep.items())]
+
+
+# Shared by the repository analyzers
+prompt_compactor = PromptCompactor.from_env()
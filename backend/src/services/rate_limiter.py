@@ -0,0 +1,348 @@
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from .analysis_cache import BoundedCache
+from .metrics import rate_limit_wait_seconds, rate_limit_waits_total
+
+_DURATION_PATTERN = re.compile(
+    r"(?:(?P<h>\d+(?:\.\d+)?)h)?(?:(?P<m>\d+(?:\.\d+)?)m(?!s))?(?:(?P<s>\d+(?:\.\d+)?)s)?(?:(?P<ms>\d+(?:\.\d+)?)ms)?"
+)
+
+
+class RateLimitWaitTimeout(httpx.TimeoutException):
+    """Raised when a call would have to wait longer than the scheduler's ``max_wait``"""
+
+
+@dataclass
+class BucketConfig:
+    rate: float  # calls per second
+    burst: int
+    max_concurrency: int
+
+
+def _parse_seconds(value: Optional[str], now: float) -> Optional[float]:
+    """Seconds from now described by a rate-limit header.
+
+    Accepts delta seconds, epoch seconds (GitHub), epoch milliseconds
+    (OpenRouter), Go-style durations such as ``6m0s`` (OpenAI) and HTTP dates.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        match = _DURATION_PATTERN.fullmatch(value)
+        if match and any(match.groupdict().values()):
+            parts = {unit: float(amount or 0) for unit, amount in match.groupdict().items()}
+            return parts["h"] * 3600 + parts["m"] * 60 + parts["s"] + parts["ms"] / 1000
+        try:
+            return parsedate_to_datetime(value).timestamp() - now
+        except (TypeError, ValueError):
+            return None
+    if number > 1e12:
+        return number / 1000 - now
+    if number > 1e9:
+        return number - now
+    return number
+
+
+class ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that reports when the request has fully finished"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self.stream = stream
+        self.release = release
+        self.released = False
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            if not self.released:
+                self.released = True
+                self.release()
+
+
+class RateLimitBucket:
+    """Token bucket plus an AIMD concurrency window for one upstream quota.
+
+    The refill rate starts at the configured rate and, once a provider reports
+    less than a burst of quota remaining, is lowered to spread it until reset. The concurrency
+    window grows by one call per window of successes and halves on every
+    throttled response, which also pauses the bucket for the advertised
+    ``Retry-After`` (or an exponential backoff).
+    """
+
+    def __init__(self, key: str, kind: str, config: BucketConfig):
+        self.key = key
+        self.kind = kind
+        self.config = config
+        self.rate = config.rate
+        self.tokens = float(config.burst)
+        self.window = float(config.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self._rate_restores_at = 0.0
+        self._updated = time.monotonic()
+        self._changed = asyncio.Event()
+        self._consecutive_throttles = 0
+
+        self.calls = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.throttled = 0
+        self.retries = 0
+        self.remaining: Optional[int] = None
+
+    async def acquire(self, max_wait: Optional[float] = None) -> float:
+        """Wait for a token and a concurrency slot; returns the time spent waiting"""
+        start = time.monotonic()
+        deadline = start + max_wait if max_wait is not None else None
+        self.waiting += 1
+        try:
+            while True:
+                now = time.monotonic()
+                delay = self._delay(now)
+                if delay == 0:
+                    break
+                if deadline is not None:
+                    if now + (delay or 0) >= deadline:
+                        raise RateLimitWaitTimeout(f"Rate limit bucket {self.key} would wait more than {max_wait:.0f}s")
+                    if delay is None:
+                        delay = deadline - now
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.waiting -= 1
+
+        self.tokens -= 1
+        self.in_flight += 1
+        self.calls += 1
+        waited = time.monotonic() - start
+        rate_limit_wait_seconds.observe(waited, bucket=self.key)
+        if waited > 0.001:
+            rate_limit_waits_total.inc(bucket=self.key)
+            self.waited += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._notify()
+
+    def observe(self, status_code: int, headers: httpx.Headers) -> Optional[float]:
+        """Learn from a response; returns the pause before a retry if it was throttled"""
+        now = time.monotonic()
+        wall = time.time()
+        remaining_header = headers.get("x-ratelimit-remaining") or headers.get("x-ratelimit-remaining-requests")
+        reset_in = _parse_seconds(headers.get("x-ratelimit-reset") or headers.get("x-ratelimit-reset-requests"), wall)
+        retry_after = (
+            float(headers["retry-after-ms"]) / 1000 if headers.get("retry-after-ms")
+            else _parse_seconds(headers.get("retry-after"), wall)
+        )
+        try:
+            remaining = int(float(remaining_header)) if remaining_header is not None else None
+        except ValueError:
+            remaining = None
+        self.remaining = remaining
+
+        if remaining is not None and reset_in is not None and reset_in > 0:
+            if remaining <= 0:
+                self.paused_until = max(self.paused_until, now + reset_in)
+            elif remaining <= self.config.burst:
+                # Nearly exhausted: spread what is left over the rest of the quota window
+                self.rate = min(self.config.rate, max(remaining / reset_in, 0.01))
+                self._rate_restores_at = now + reset_in
+
+        # GitHub reports primary and secondary rate limits as 403s
+        throttled = status_code == 429 or (status_code == 403 and (retry_after is not None or remaining == 0))
+        if not throttled:
+            self._consecutive_throttles = 0
+            self.window = min(float(self.config.max_concurrency), self.window + 1 / self.window)
+            return None
+
+        self.throttled += 1
+        self._consecutive_throttles += 1
+        self.window = max(1.0, self.window / 2)
+        if retry_after is None:
+            retry_after = reset_in if remaining == 0 and reset_in else min(2.0 ** (self._consecutive_throttles - 1), 60.0)
+        retry_after = max(retry_after, 0.0)
+        self.paused_until = max(self.paused_until, now + retry_after)
+        self._notify()
+        return retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "rate": round(self.rate, 4),
+            "window": round(self.window, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "remaining": self.remaining,
+            "paused_for_seconds": round(max(0.0, self.paused_until - time.monotonic()), 3),
+            "calls": self.calls,
+            "waited": self.waited,
+            "wait_seconds_total": round(self.wait_seconds, 3),
+            "wait_seconds_avg": round(self.wait_seconds / self.calls, 4) if self.calls else 0.0,
+            "wait_seconds_max": round(self.max_wait_seconds, 3),
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+    def _delay(self, now: float) -> Optional[float]:
+        """0 if a call may start now, seconds until it may, or None to wait for a release"""
+        if now >= self._rate_restores_at:
+            self.rate = self.config.rate
+        elapsed = now - self._updated
+        self._updated = now
+        self.tokens = min(float(self.config.burst), self.tokens + elapsed * self.rate)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.window):
+            return None
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class RateLimitScheduler:
+    """Shared outbound call scheduler with one bucket per upstream quota.
+
+    Keys identify the quota (a GitHub token, an LLM provider and model);
+    ``limits`` holds the starting configuration per kind of upstream.
+    Throttled calls are queued and retried up to ``max_retries`` times instead
+    of failing, as long as the advertised wait stays within ``max_wait``.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, BucketConfig],
+        max_retries: int = 5,
+        max_wait: float = 120.0,
+        max_buckets: int = 1024,
+    ):
+        self.limits = limits
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        # Busy buckets are pinned so their learned state survives eviction pressure
+        self._buckets: BoundedCache[RateLimitBucket] = BoundedCache(
+            max_entries=max_buckets,
+            sizeof=lambda bucket: 1,
+            evictable=lambda bucket: bucket.in_flight == 0 and bucket.waiting == 0,
+        )
+
+    @classmethod
+    def from_env(cls) -> "RateLimitScheduler":
+        return cls(
+            limits={
+                "github": BucketConfig(
+                    rate=float(os.getenv("RATE_LIMIT_GITHUB_RPS", "10")),
+                    burst=int(os.getenv("RATE_LIMIT_GITHUB_BURST", "20")),
+                    max_concurrency=int(os.getenv("RATE_LIMIT_GITHUB_CONCURRENCY", "8")),
+                ),
+                "llm": BucketConfig(
+                    rate=float(os.getenv("RATE_LIMIT_LLM_RPS", "5")),
+                    burst=int(os.getenv("RATE_LIMIT_LLM_BURST", "10")),
+                    max_concurrency=int(os.getenv("RATE_LIMIT_LLM_CONCURRENCY", "16")),
+                ),
+            },
+            max_retries=int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5")),
+            max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "120")),
+        )
+
+    def bucket(self, key: str, kind: str) -> RateLimitBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = RateLimitBucket(key, kind, self.limits[kind])
+            self._buckets[key] = bucket
+        return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        buckets = {key: self._buckets[key].stats() for key in self._buckets.keys()}
+        return {
+            "buckets": buckets,
+            "waiting": sum(bucket["waiting"] for bucket in buckets.values()),
+            "throttled": sum(bucket["throttled"] for bucket in buckets.values()),
+        }
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """Schedules every request of an httpx client through a rate-limit bucket.
+
+    ``key`` maps a request to its bucket. Throttled responses are retried after
+    the bucket's pause when the request body can be replayed; the concurrency
+    slot is held until a streamed response body is closed.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        kind: str,
+        key: Callable[[httpx.Request], str],
+        scheduler: Optional[RateLimitScheduler] = None,
+    ):
+        self.transport = transport
+        self.kind = kind
+        self.key = key
+        self.scheduler = scheduler or rate_limits
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        bucket = self.scheduler.bucket(self.key(request), self.kind)
+        attempt = 0
+        while True:
+            await bucket.acquire(self.scheduler.max_wait)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except BaseException:
+                bucket.release()
+                raise
+
+            pause = bucket.observe(response.status_code, response.headers)
+            replayable = isinstance(request.stream, httpx.ByteStream)
+            if pause is None or attempt >= self.scheduler.max_retries or pause > self.scheduler.max_wait or not replayable:
+                response.stream = ReleasingStream(response.stream, bucket.release)
+                return response
+
+            await response.aclose()
+            bucket.release()
+            bucket.retries += 1
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def llm_bucket_key(request: httpx.Request) -> str:
+    """Bucket per provider host and requested model"""
+    try:
+        model = json.loads(request.content).get("model", "default")
+    except (httpx.RequestNotRead, ValueError, AttributeError):
+        model = "default"
+    return f"llm:{request.url.host}/{model}"
+
+
+# Shared by the GitHub and LLM clients of the process
+rate_limits = RateLimitScheduler.from_env()
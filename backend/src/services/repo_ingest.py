@@ -0,0 +1,303 @@
+import asyncio
+import io
+import posixpath
+import queue
+import tarfile
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+import httpx
+
+from .github_api import GITHUB_API_URL, github_transport
+
+# Manifests and config files whose contents drive stack detection
+KEY_FILE_NAMES = {
+    "package.json", "requirements.txt", "pyproject.toml", "setup.py", "setup.cfg", "Pipfile",
+    "go.mod", "Cargo.toml", "pom.xml", "build.gradle", "build.gradle.kts", "composer.json",
+    "Gemfile", "mix.exs", "tsconfig.json", "next.config.js", "next.config.mjs", "nuxt.config.js",
+    "angular.json", "vue.config.js", "vite.config.ts", "vite.config.js", "manage.py",
+    "Dockerfile", "docker-compose.yml", "docker-compose.yaml", "Procfile",
+    "README.md", "README.rst",
+}
+
+# Conventional entrypoints; a change to one can change how the project is run
+ENTRYPOINT_NAMES = {
+    "main.py", "app.py", "server.py", "wsgi.py", "asgi.py", "__main__.py",
+    "index.js", "index.ts", "main.js", "main.ts", "app.js", "app.ts", "server.js", "server.ts",
+    "main.go", "main.rs", "Main.java", "Application.java", "Program.cs", "config.ru",
+}
+
+# Key files are read this many directory levels deep at most
+MAX_KEY_FILE_DEPTH = 2
+
+SKIPPED_DIRS = {
+    ".git", "node_modules", "vendor", "third_party", "bower_components", "dist", "build", "target",
+    "out", ".next", ".nuxt", "__pycache__", ".venv", "venv", ".tox", ".mypy_cache", ".gradle", ".idea",
+}
+
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".svg", ".pdf", ".zip", ".gz", ".tgz",
+    ".bz2", ".xz", ".7z", ".rar", ".jar", ".war", ".class", ".so", ".dll", ".dylib", ".exe", ".bin",
+    ".o", ".a", ".pyc", ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".mov", ".avi",
+    ".wav", ".psd", ".sqlite", ".db", ".parquet", ".onnx", ".pt", ".h5",
+}
+
+
+class IngestionError(Exception):
+    """Raised when a repository archive cannot be fetched or indexed"""
+
+
+@dataclass
+class FileEntry:
+    path: str
+    size: int
+    type: str  # "file", "dir" or "symlink"
+
+
+@dataclass
+class RepositoryIndex:
+    """In-memory path index of a repository archive plus extracted key files"""
+    files: Dict[str, FileEntry] = field(default_factory=dict)
+    key_files: Dict[str, str] = field(default_factory=dict)
+    archive_bytes: int = 0
+    skipped: int = 0
+    truncated: bool = False
+
+    @property
+    def file_count(self) -> int:
+        return sum(1 for entry in self.files.values() if entry.type == "file")
+
+    def to_structure(self, max_paths: int = 500) -> Dict[str, Any]:
+        """Compact, JSON-serializable summary used as the analysis prompt structure"""
+        file_paths = sorted(path for path, entry in self.files.items() if entry.type == "file")
+        extensions = Counter(posixpath.splitext(path)[1] or posixpath.basename(path) for path in file_paths)
+        return {
+            "file_count": len(file_paths),
+            "total_bytes": sum(self.files[path].size for path in file_paths),
+            "extensions": dict(extensions.most_common(20)),
+            "paths": file_paths[:max_paths],
+            "paths_truncated": len(file_paths) > max_paths or self.truncated,
+        }
+
+
+class ArchivePipe(io.RawIOBase):
+    """Bounded in-memory pipe from the downloading event loop to the parsing thread.
+
+    At most ``max_chunks`` chunks are in flight: the writer waits while the
+    parser catches up, so memory stays bounded whatever the archive size. Once
+    the reader closes the pipe (done or failed), further writes are refused.
+    """
+
+    def __init__(self, max_chunks: int = 16):
+        super().__init__()
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(max_chunks)
+        self._pending = b""
+        self._eof = False
+        self._aborted = False
+        self.reader_closed = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._eof:
+            try:
+                chunk = self._chunks.get(timeout=0.1)
+            except queue.Empty:
+                if self._aborted:
+                    raise IngestionError("Tarball download aborted")
+                continue
+            if chunk is None:
+                self._eof = True
+            else:
+                self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close_reader(self) -> None:
+        self.reader_closed = True
+
+    def _put(self, item: Optional[bytes]) -> bool:
+        while not self.reader_closed:
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def write_chunk(self, chunk: Optional[bytes]) -> bool:
+        """Hand a chunk (``None`` for end of archive) to the reader; False once it stopped reading"""
+        if self.reader_closed:
+            return False
+        try:
+            self._chunks.put_nowait(chunk)
+            return True
+        except queue.Full:
+            return await asyncio.to_thread(self._put, chunk)
+
+    def abort(self) -> None:
+        """Stop a reader waiting for chunks that will never come"""
+        self._aborted = True
+
+
+class TarballIngestor:
+    """Builds a RepositoryIndex from a single download of the repository tarball.
+
+    The archive is never written to disk or held whole in memory: the download
+    is streamed through a bounded ``ArchivePipe`` into a parsing thread that
+    reads it as a tar stream. Vendored/build directories and binary files are
+    skipped, and the archive size, file count and key-file sizes are all bounded.
+    """
+
+    def __init__(
+        self,
+        github_token: str,
+        max_archive_bytes: int = 100 * 1024 * 1024,
+        max_files: int = 20_000,
+        max_key_file_bytes: int = 256 * 1024,
+        max_key_files: int = 50,
+        max_key_file_depth: int = MAX_KEY_FILE_DEPTH,
+        timeout: float = 60.0,
+        chunk_bytes: int = 64 * 1024,
+        max_chunks: int = 16,
+    ):
+        self.github_token = github_token
+        self.max_archive_bytes = max_archive_bytes
+        self.max_files = max_files
+        self.max_key_file_bytes = max_key_file_bytes
+        self.max_key_files = max_key_files
+        self.max_key_file_depth = max_key_file_depth
+        self.timeout = timeout
+        self.chunk_bytes = chunk_bytes
+        self.max_chunks = max_chunks
+
+    async def ingest(self, owner: str, repo: str, ref: Optional[str] = None) -> RepositoryIndex:
+        pipe = ArchivePipe(self.max_chunks)
+        parser = asyncio.create_task(asyncio.to_thread(self._parse, pipe))
+        try:
+            archive_bytes = await self.download(owner, repo, ref, pipe)
+        except BaseException:
+            # Let the parsing thread finish before the error propagates
+            pipe.abort()
+            await asyncio.wait([parser])
+            if not parser.cancelled():
+                parser.exception()  # retrieved, so it is not reported as unhandled
+            raise
+        # Raises the parser's error, such as an invalid archive, if it stopped reading
+        index = await parser
+        index.archive_bytes = archive_bytes
+        return index
+
+    def _parse(self, pipe: ArchivePipe) -> RepositoryIndex:
+        try:
+            return self.build_index(pipe)
+        finally:
+            pipe.close_reader()
+
+    async def download(self, owner: str, repo: str, ref: Optional[str], pipe: ArchivePipe) -> int:
+        """Stream the tarball into ``pipe``; returns the bytes downloaded"""
+        url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/tarball"
+        if ref:
+            url = f"{url}/{ref}"
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {self.github_token}",
+        }
+
+        received = 0
+        try:
+            async with httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=True, transport=github_transport(self.github_token)
+            ) as client:
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code != 200:
+                        raise IngestionError(f"Tarball download failed with HTTP {response.status_code}")
+                    declared = int(response.headers.get("content-length") or 0)
+                    if declared > self.max_archive_bytes:
+                        raise IngestionError(f"Repository archive exceeds {self.max_archive_bytes} bytes")
+                    async for chunk in response.aiter_bytes(self.chunk_bytes):
+                        received += len(chunk)
+                        if received > self.max_archive_bytes:
+                            raise IngestionError(f"Repository archive exceeds {self.max_archive_bytes} bytes")
+                        if not await pipe.write_chunk(chunk):
+                            # The parser stopped early (file limit reached); the rest is not needed
+                            return received
+        except httpx.HTTPError as e:
+            raise IngestionError(f"Tarball download failed: {str(e)}")
+        await pipe.write_chunk(None)
+        return received
+
+    def build_index(self, archive: Union[bytes, BinaryIO]) -> RepositoryIndex:
+        index = RepositoryIndex()
+        fileobj = io.BytesIO(archive) if isinstance(archive, bytes) else archive
+        try:
+            with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+                for member in tar:
+                    path = self._relative_path(member.name)
+                    if not path:
+                        continue
+                    if self._is_skipped(path):
+                        index.skipped += 1
+                        continue
+                    if len(index.files) >= self.max_files:
+                        index.truncated = True
+                        break
+
+                    if member.isdir():
+                        index.files[path] = FileEntry(path=path, size=0, type="dir")
+                    elif member.issym():
+                        index.files[path] = FileEntry(path=path, size=0, type="symlink")
+                    elif member.isfile():
+                        index.files[path] = FileEntry(path=path, size=member.size, type="file")
+                        if self._is_key_file(path, member.size) and len(index.key_files) < self.max_key_files:
+                            content = tar.extractfile(member).read()
+                            index.key_files[path] = content.decode("utf-8", errors="replace")
+        except tarfile.TarError as e:
+            raise IngestionError(f"Invalid repository archive: {str(e)}")
+        return index
+
+    @staticmethod
+    def _relative_path(name: str) -> str:
+        # GitHub tarballs wrap everything in a single "<owner>-<repo>-<sha>/" directory
+        parts = name.strip("/").split("/", 1)
+        return parts[1] if len(parts) == 2 else ""
+
+    @staticmethod
+    def _is_skipped(path: str) -> bool:
+        parts = path.split("/")
+        if any(part in SKIPPED_DIRS for part in parts[:-1]) or parts[-1] in SKIPPED_DIRS:
+            return True
+        return posixpath.splitext(path)[1].lower() in BINARY_EXTENSIONS
+
+    def _is_key_file(self, path: str, size: int) -> bool:
+        name = posixpath.basename(path)
+        return (
+            name in KEY_FILE_NAMES
+            and size <= self.max_key_file_bytes
+            and path.count("/") < self.max_key_file_depth
+        )
+
+
+def affects_analysis(path: str) -> bool:
+    """Whether a change to ``path`` can change the analysis of its repository.
+
+    True for the manifests and configs stack detection reads (READMEs only
+    feed the description) and for entrypoints near the repository root.
+    """
+    if TarballIngestor._is_skipped(path):
+        return False
+    name = posixpath.basename(path)
+    depth = path.count("/")
+    if name in KEY_FILE_NAMES and not name.startswith("README"):
+        return depth < MAX_KEY_FILE_DEPTH
+    return name in ENTRYPOINT_NAMES and depth <= MAX_KEY_FILE_DEPTH
+
+
+def feeds_description(path: str) -> bool:
+    """Whether ``path`` is a README the analysis reads for the project description"""
+    name = posixpath.basename(path)
+    return name in KEY_FILE_NAMES and name.startswith("README") and path.count("/") < MAX_KEY_FILE_DEPTH
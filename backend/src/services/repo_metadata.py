@@ -0,0 +1,150 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .analysis_cache import BoundedCache
+from .github_api import GitHubClient
+from .single_flight import SingleFlight
+from .tokens import token_fingerprint
+
+
+@dataclass
+class RepositoryMetadata:
+    owner: str
+    repo: str
+    default_branch: str
+    head_sha: Optional[str]
+    visibility: str
+    size_kb: int
+    fetched_at: float
+    repo_etag: Optional[str] = None
+    head_etag: Optional[str] = None
+
+
+class RepoMetadataCache:
+    """Shared cache of repository metadata (default branch, head SHA, visibility, size).
+
+    Entries are served from memory for ``ttl_seconds``; after that they are
+    revalidated with ``If-None-Match`` so an unchanged repository costs two
+    304 responses instead of full fetches. Entries are scoped to the token
+    fingerprint so metadata of private repositories never crosses credentials.
+
+    A fetch is shared by every concurrent caller for the key, so it runs on
+    its own client rather than the leader's, which the leader may close first.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 2048):
+        self.ttl_seconds = ttl_seconds
+        self._entries: BoundedCache[RepositoryMetadata] = BoundedCache(max_entries=max_entries)
+        self._flights: SingleFlight[RepositoryMetadata] = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.refreshed = 0
+
+    @classmethod
+    def from_env(cls) -> "RepoMetadataCache":
+        return cls(ttl_seconds=float(os.getenv("REPO_METADATA_TTL_SECONDS", "30")))
+
+    async def get(self, github: GitHubClient, owner: str, repo: str) -> RepositoryMetadata:
+        key = f"{token_fingerprint(github.github_token)}:{owner.lower()}/{repo.lower()}"
+        cached = self._entries.get(key)
+        if cached and time.monotonic() - cached.fetched_at < self.ttl_seconds:
+            self.hits += 1
+            return cached
+        return await self._flights.do(key, lambda: self._fetch(github.github_token, key, owner, repo, cached))
+
+    def invalidate(self, github: GitHubClient, owner: str, repo: str) -> None:
+        self._entries.pop(f"{token_fingerprint(github.github_token)}:{owner.lower()}/{repo.lower()}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.revalidated + self.refreshed
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "refreshed": self.refreshed,
+            "hit_rate": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+        }
+
+    async def _fetch(
+        self,
+        github_token: str,
+        key: str,
+        owner: str,
+        repo: str,
+        cached: Optional[RepositoryMetadata]
+    ) -> RepositoryMetadata:
+        if cached is None:
+            self.misses += 1
+
+        github = GitHubClient(github_token)
+        try:
+            return await self._fetch_with(github, key, owner, repo, cached)
+        finally:
+            await github.close()
+
+    async def _fetch_with(
+        self,
+        github: GitHubClient,
+        key: str,
+        owner: str,
+        repo: str,
+        cached: Optional[RepositoryMetadata]
+    ) -> RepositoryMetadata:
+        repo_response = await github.request(
+            "GET", f"/repos/{owner}/{repo}",
+            headers=_conditional(cached.repo_etag if cached else None)
+        )
+        if repo_response.status_code == 304 and cached:
+            default_branch, visibility, size_kb = cached.default_branch, cached.visibility, cached.size_kb
+            repo_etag = cached.repo_etag
+        else:
+            data = repo_response.json()
+            default_branch = data.get("default_branch") or "main"
+            visibility = data.get("visibility") or ("private" if data.get("private") else "public")
+            size_kb = int(data.get("size") or 0)
+            repo_etag = repo_response.headers.get("etag")
+
+        # The head ETag is only reusable while the default branch is unchanged
+        head_etag = cached.head_etag if cached and cached.default_branch == default_branch else None
+        head_response = await github.request(
+            "GET", f"/repos/{owner}/{repo}/commits/{default_branch}",
+            headers={"Accept": "application/vnd.github.sha", **_conditional(head_etag)}
+        )
+        if head_response.status_code == 304 and head_etag:
+            head_sha = cached.head_sha
+        else:
+            head_sha = head_response.text.strip() or None
+            head_etag = head_response.headers.get("etag")
+
+        if cached is not None:
+            unchanged = repo_response.status_code == 304 and head_response.status_code == 304
+            if unchanged:
+                self.revalidated += 1
+            else:
+                self.refreshed += 1
+
+        metadata = RepositoryMetadata(
+            owner=owner,
+            repo=repo,
+            default_branch=default_branch,
+            head_sha=head_sha,
+            visibility=visibility,
+            size_kb=size_kb,
+            fetched_at=time.monotonic(),
+            repo_etag=repo_etag,
+            head_etag=head_etag,
+        )
+        self._entries[key] = metadata
+        return metadata
+
+
+def _conditional(etag: Optional[str]) -> Dict[str, str]:
+    return {"If-None-Match": etag} if etag else {}
+
+
+# Shared by the analyzer and the dockerization agent
+repo_metadata = RepoMetadataCache.from_env()
@@ -1,15 +1,27 @@
 from fastapi import HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from contextlib import aclosing
+from datetime import datetime
+import logging
 import re
-from langchain_openai import ChatOpenAI
-import dotenv
 import os
-dotenv.load_dotenv()
-# MCP imports with correct pattern
-from mcp_use import MCPAgent, MCPClient
+import uuid
 
 from ..models import AnalysisResponse
-from .llm_analyzer import LLMAnalyzer
+from .llm_analyzer import ANALYSIS_MODEL, LLMAnalyzer
+from .llm_clients import llm_clients
+from .mcp_pool import mcp_pool
+from .metrics import mcp_initialize_seconds, repository_analyses_total, run_agent, timed
+from .github_api import GitHubAPIError, GitHubClient
+from .repo_metadata import repo_metadata
+from .repo_ingest import IngestionError, TarballIngestor, affects_analysis, feeds_description
+from .prompt_compactor import prompt_compactor
+from .stack_detector import detect_stack
+
+logger = logging.getLogger(__name__)
+
+# "tarball" indexes the repository archive directly; "mcp" asks the MCP agent to crawl it
+REPO_INGESTION_MODE = os.getenv("REPO_INGESTION_MODE", "tarball")
 
 
 class RepositoryAnalyzer:
@@ -17,49 +29,27 @@ class RepositoryAnalyzer:
         self.github_token = github_token
         self.mcp_client = None
         self.mcp_agent = None
-        self.llm_analyzer = LLMAnalyzer(openai_api_key)
+        self.llm_analyzer = LLMAnalyzer()
+        self.github = GitHubClient(github_token)
     
     async def initialize_mcp(self):
         """Initialize MCP client with GitHub server using correct pattern"""
+        # mcp_use (and the LangChain agent stack under it) is imported on first use
+        from mcp_use import MCPAgent
+        
         try:
-            # Create configuration dictionary for GitHub MCP server
-            config = {
-                "mcpServers": {
-                    "github": {
-                        "command": "docker",
-                        "args": [
-                            "run",
-                            "-i",
-                            "--rm",
-                            "-e",
-                            "GITHUB_PERSONAL_ACCESS_TOKEN",
-                            "ghcr.io/github/github-mcp-server"
-                        ],
-                        "env": {
-                            "GITHUB_PERSONAL_ACCESS_TOKEN": self.github_token
-                        }
-                    }
-                }
-            }
-            
-            # Create MCPClient from configuration dictionary
-            self.mcp_client = MCPClient.from_dict(config)
-            
-            # Create LLM for the agent
-            llm =  ChatOpenAI(
-            model="openrouter/horizon-beta",
-            temperature=0.1,
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1"
-        )
-            
-            # Create agent with the client
-            self.mcp_agent = MCPAgent(llm=llm, client=self.mcp_client, max_steps=10)
+            async with timed(mcp_initialize_seconds, component="repository_analyzer"):
+                # Lease a warm GitHub MCP session from the shared pool
+                self.mcp_client = await mcp_pool.acquire(self.github_token)
+                
+                # Create agent with the client and the shared LLM client
+                self.mcp_agent = MCPAgent(llm=llm_clients.get(ANALYSIS_MODEL), client=self.mcp_client, max_steps=10)
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to initialize MCP: {str(e)}")
 
-    def parse_repo_url(self, repo_url: str) -> tuple[str, str]:
+    @staticmethod
+    def parse_repo_url(repo_url: str) -> tuple[str, str]:
         """Extract owner and repo from GitHub URL"""
         pattern = r"github\.com/([^/]+)/([^/]+)(?:\.git)?/?$"
         match = re.search(pattern, str(repo_url))
@@ -67,46 +57,202 @@ class RepositoryAnalyzer:
             raise HTTPException(status_code=400, detail="Invalid GitHub repository URL")
         return match.group(1), match.group(2).rstrip('.git')
 
-    async def get_repository_structure(self, owner: str, repo: str) -> Dict[str, Any]:
+    async def get_head_sha(self, owner: str, repo: str) -> Optional[str]:
+        """Resolve the head commit SHA of the default branch, or None if unavailable"""
+        try:
+            metadata = await repo_metadata.get(self.github, owner, repo)
+            return metadata.head_sha
+        except GitHubAPIError:
+            return None
+
+    async def get_repository_structure(self, owner: str, repo: str, ref: Optional[str] = None) -> Dict[str, Any]:
+        """Get repository structure and key files, preferring tarball ingestion"""
+        if REPO_INGESTION_MODE == "tarball":
+            try:
+                index = await TarballIngestor(self.github_token).ingest(owner, repo, ref)
+                return {
+                    "structure": index.to_structure(),
+                    "key_files": index.key_files,
+                    "paths": [path for path, entry in index.files.items() if entry.type == "file"],
+                    "repo_name": repo,
+                    "owner": owner,
+                    "index": index
+                }
+            except IngestionError:
+                # Fall back to the MCP crawl, e.g. for archives over the size limit
+                pass
+        
+        return await self.get_repository_structure_via_mcp(owner, repo)
+
+    async def get_repository_structure_via_mcp(self, owner: str, repo: str) -> Dict[str, Any]:
         """Get comprehensive repository structure using MCP agent"""
         try:
+            if self.mcp_agent is None:
+                await self.initialize_mcp()
+            
             # Use MCP agent to get repository structure
             structure_query = f"Get the file structure and contents of the GitHub repository {owner}/{repo}. Focus on getting the root directory structure and the contents of important configuration files like package.json, requirements.txt, Cargo.toml, pom.xml, build.gradle, composer.json, go.mod, Pipfile, README.md, README.rst, tsconfig.json, next.config.js, angular.json, vue.config.js, nuxt.config.js."
             
-            result = await self.mcp_agent.run(structure_query)
+            result = await run_agent(self.mcp_agent, structure_query, "repository_structure")
             
             # Parse the result to extract structure and key files
             # For now, return a structured format that the LLM analyzer can work with
             return {
                 "structure": str(result),  # The MCP agent result contains the structure
                 "key_files": {},  # Will be populated from the agent result
+                "paths": [],
                 "repo_name": repo,
                 "owner": owner,
                 "raw_result": result
             }
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to fetch repository: {str(e)}")
 
-    async def analyze_repository(self, owner: str, repo: str) -> AnalysisResponse:
-        """Analyze repository using LLM intelligence"""
+    def compact_prompt_inputs(self, repo_data: Dict[str, Any]) -> Tuple[Any, Dict[str, str]]:
+        """Fit the repository structure and key files into the analysis token budget"""
+        structure, key_files, report = prompt_compactor.compact(repo_data["structure"], repo_data["key_files"])
+        logger.info(
+            "Analysis prompt for %s/%s compacted from %d to %d tokens (budget %d)",
+            repo_data["owner"], repo_data["repo_name"], report.tokens_before, report.tokens_after, report.budget
+        )
+        return structure, key_files
+
+    async def refresh_analysis(
+        self,
+        owner: str,
+        repo: str,
+        previous: Optional[AnalysisResponse],
+        commit_sha: Optional[str]
+    ) -> Optional[AnalysisResponse]:
+        """Carry an earlier analysis of the repository forward to ``commit_sha``.
+        
+        Only the paths changed since ``previous.commit_sha`` are fetched. When
+        none of them is a manifest or entrypoint the analysis is copied with the
+        new commit SHA; otherwise (or when the changes cannot be listed) None is
+        returned and the repository needs a full analysis. The path taken is
+        counted in ``repository_analyses_total``.
+        
+        A README change alone does not trigger a re-analysis, so the carried
+        forward ``project_overview.description`` may be stale; such refreshes
+        are counted under ``incremental_readme_changed``.
+        """
+        if previous is None or not previous.commit_sha:
+            repository_analyses_total.inc(path="fresh")
+            return None
+        
+        changed: Optional[List[str]] = []
+        if commit_sha is None:
+            changed = None
+        elif commit_sha != previous.commit_sha:
+            try:
+                changed = await self.github.changed_paths(owner, repo, previous.commit_sha, commit_sha)
+            except GitHubAPIError as e:
+                logger.info("Cannot list changes of %s/%s since %s: %s", owner, repo, previous.commit_sha, e)
+                changed = None
+        if changed is None:
+            repository_analyses_total.inc(path="no_diff")
+            return None
+        
+        relevant = [path for path in changed if affects_analysis(path)]
+        if relevant:
+            logger.info("Re-analyzing %s/%s: %s changed", owner, repo, ", ".join(relevant[:5]))
+            repository_analyses_total.inc(path="changed")
+            return None
+        
+        readme_changed = any(feeds_description(path) for path in changed)
+        repository_analyses_total.inc(path="incremental_readme_changed" if readme_changed else "incremental")
+        return previous.model_copy(deep=True, update={
+            "analysis_id": str(uuid.uuid4()),
+            "timestamp": datetime.now(),
+            "commit_sha": commit_sha,
+        })
+
+    async def analyze_repository(
+        self,
+        owner: str,
+        repo: str,
+        commit_sha: Optional[str] = None,
+        previous: Optional[AnalysisResponse] = None
+    ) -> AnalysisResponse:
+        """Analyze repository using LLM intelligence
+        
+        With the ``previous`` analysis of an earlier revision, the repository is
+        only re-analyzed if its manifests or entrypoints changed since then.
+        """
+        refreshed = await self.refresh_analysis(owner, repo, previous, commit_sha)
+        if refreshed is not None:
+            return refreshed
         
         # Get repository structure and files
-        repo_data = await self.get_repository_structure(owner, repo)
+        repo_data = await self.get_repository_structure(owner, repo, commit_sha)
         
-        # Use LLM for intelligent analysis
-        analysis = await self.llm_analyzer.analyze_repository_intelligence(
-            repo_data["structure"], 
-            repo_data["key_files"],
-            repo_data["repo_name"]
-        )
+        # Common stacks are detected straight from their manifests; the LLM is
+        # only consulted when the rule-based detection is not confident
+        detection = detect_stack(repo_data["key_files"], repo_data["paths"])
+        if detection.is_confident:
+            analysis = detection.to_analysis(repo_data["repo_name"], repo_data["paths"])
+        else:
+            # Use LLM for intelligent analysis on a prompt compacted to the token budget
+            structure, key_files = self.compact_prompt_inputs(repo_data)
+            analysis = await self.llm_analyzer.analyze_repository_intelligence(
+                structure,
+                key_files,
+                repo_data["repo_name"]
+            )
+        analysis.commit_sha = commit_sha
         
         return analysis
 
+    async def analyze_repository_stream(
+        self,
+        owner: str,
+        repo: str,
+        commit_sha: Optional[str] = None,
+        previous: Optional[AnalysisResponse] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Analyze a repository, yielding sections as soon as they are known.
+        
+        Yields ("project_overview", ...), ("technology_stack", ...) and finally
+        ("analysis", AnalysisResponse), like ``LLMAnalyzer.stream_repository_intelligence``.
+        ``previous`` is carried forward as in ``analyze_repository``.
+        """
+        refreshed = await self.refresh_analysis(owner, repo, previous, commit_sha)
+        if refreshed is not None:
+            yield "project_overview", refreshed.project_overview
+            yield "technology_stack", refreshed.technical_architecture.technology_stack
+            yield "analysis", refreshed
+            return
+        
+        repo_data = await self.get_repository_structure(owner, repo, commit_sha)
+        
+        detection = detect_stack(repo_data["key_files"], repo_data["paths"])
+        if detection.is_confident:
+            analysis = detection.to_analysis(repo_data["repo_name"], repo_data["paths"])
+            yield "project_overview", analysis.project_overview
+            yield "technology_stack", analysis.technical_architecture.technology_stack
+        else:
+            analysis = None
+            structure, key_files = self.compact_prompt_inputs(repo_data)
+            async with aclosing(self.llm_analyzer.stream_repository_intelligence(
+                structure,
+                key_files,
+                repo_data["repo_name"]
+            )) as events:
+                async for name, value in events:
+                    if name == "analysis":
+                        analysis = value
+                    else:
+                        yield name, value
+        
+        analysis.commit_sha = commit_sha
+        yield "analysis", analysis
+
     async def close(self):
-        """Close connections"""
+        """Return the MCP session to the pool and close the GitHub client"""
         if self.mcp_client:
-            try:
-                await self.mcp_client.close()
-            except:
-                pass
+            await mcp_pool.release(self.mcp_client)
+            self.mcp_client = None
+        await self.github.close()
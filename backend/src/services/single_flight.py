@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) starts the work as a separate task;
+    callers arriving while it runs (followers) await the same task and receive
+    the same result or exception. The shared task is only cancelled once every
+    waiter has gone away, and if it is cancelled underneath a waiter that is
+    itself still live, that waiter retries as a new leader.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight[T]] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._start(key, fn)
+            else:
+                self.coalesced += 1
+
+            flight.waiters += 1
+            try:
+                return await asyncio.shield(flight.task)
+            except asyncio.CancelledError:
+                if flight.task.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+            finally:
+                flight.waiters -= 1
+                if flight.waiters == 0 and not flight.task.done():
+                    flight.task.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "in_flight": self.in_flight(),
+        }
+
+    def _start(self, key: str, fn: Callable[[], Awaitable[T]]) -> _Flight[T]:
+        flight = _Flight(asyncio.ensure_future(fn()))
+        self._flights[key] = flight
+        self.executed += 1
+
+        def _done(task: "asyncio.Task[T]") -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not task.cancelled() and task.exception() is not None:
+                self.failed += 1
+
+        flight.task.add_done_callback(_done)
+        return flight
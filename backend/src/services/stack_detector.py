@@ -0,0 +1,462 @@
+import json
+import os
+import posixpath
+import re
+import tomllib
+import uuid
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models import (
+    AnalysisResponse, ProjectOverview, SystemArchitecture, TechnicalArchitecture, TechnologyStack
+)
+
+# Detections at or above this confidence skip the LLM analysis entirely
+STACK_DETECTION_MIN_CONFIDENCE = float(os.getenv("STACK_DETECTION_MIN_CONFIDENCE", "0.8"))
+
+# (dependency, framework, domain) in priority order; meta-frameworks before the libraries they wrap
+NODE_FRAMEWORKS = [
+    ("next", "Next.js", "Frontend/Web"),
+    ("nuxt", "Nuxt", "Frontend/Web"),
+    ("@remix-run/react", "Remix", "Frontend/Web"),
+    ("@sveltejs/kit", "SvelteKit", "Frontend/Web"),
+    ("gatsby", "Gatsby", "Frontend/Web"),
+    ("@nestjs/core", "NestJS", "Backend/API"),
+    ("@angular/core", "Angular", "Frontend/Web"),
+    ("express", "Express", "Backend/API"),
+    ("fastify", "Fastify", "Backend/API"),
+    ("koa", "Koa", "Backend/API"),
+    ("vue", "Vue", "Frontend/Web"),
+    ("react", "React", "Frontend/Web"),
+]
+PYTHON_FRAMEWORKS = [
+    ("django", "Django", "Backend/API"),
+    ("fastapi", "FastAPI", "Backend/API"),
+    ("flask", "Flask", "Backend/API"),
+    ("starlette", "Starlette", "Backend/API"),
+    ("tornado", "Tornado", "Backend/API"),
+    ("aiohttp", "aiohttp", "Backend/API"),
+    ("streamlit", "Streamlit", "AI/ML"),
+]
+GO_FRAMEWORKS = [
+    ("github.com/gin-gonic/gin", "Gin", "Backend/API"),
+    ("github.com/labstack/echo", "Echo", "Backend/API"),
+    ("github.com/gofiber/fiber", "Fiber", "Backend/API"),
+    ("github.com/go-chi/chi", "Chi", "Backend/API"),
+    ("github.com/gorilla/mux", "Gorilla Mux", "Backend/API"),
+]
+JAVA_FRAMEWORKS = [
+    ("spring-boot", "Spring Boot", "Backend/API"),
+    ("quarkus", "Quarkus", "Backend/API"),
+    ("micronaut", "Micronaut", "Backend/API"),
+]
+
+# Dependency name tokens that imply a database, in priority order
+DATABASE_HINTS = [
+    (("psycopg", "psycopg2", "asyncpg", "pg", "postgres", "postgresql", "pgx", "pq"), "PostgreSQL"),
+    (("mysql", "mysqlclient", "pymysql", "mysql2"), "MySQL"),
+    (("mariadb",), "MariaDB"),
+    (("mongodb", "mongo", "pymongo", "mongoose", "motor"), "MongoDB"),
+    (("sqlite", "sqlite3"), "SQLite"),
+    (("redis", "ioredis"), "Redis"),
+]
+
+FRAMEWORK_PATTERNS = {
+    "Django": ["MVT"],
+    "Spring Boot": ["MVC", "Dependency Injection"],
+    "NestJS": ["Modular", "Dependency Injection"],
+    "Angular": ["Component-based", "Dependency Injection"],
+    "Next.js": ["Component-based", "Server-side Rendering"],
+    "Nuxt": ["Component-based", "Server-side Rendering"],
+    "React": ["Component-based"],
+    "Vue": ["Component-based"],
+}
+
+MANIFESTS = {
+    "package.json", "requirements.txt", "pyproject.toml", "Pipfile", "setup.py",
+    "go.mod", "pom.xml", "build.gradle", "build.gradle.kts",
+}
+
+
+@dataclass
+class _Candidate:
+    language: str
+    runtime: str
+    package_manager: str
+    manifest: str
+    dependencies: List[str] = field(default_factory=list)
+    framework: Optional[str] = None
+    domain: Optional[str] = None
+    database: Optional[str] = None
+    description: Optional[str] = None
+    package_manager_certain: bool = False
+    runtime_version_known: bool = False
+
+
+@dataclass
+class StackDetection:
+    """Outcome of rule-based stack detection; ``confidence`` is in [0, 1]"""
+    technology_stack: Optional[TechnologyStack]
+    confidence: float
+    evidence: List[str] = field(default_factory=list)
+    domain: Optional[str] = None
+    description: Optional[str] = None
+    manifests: List[str] = field(default_factory=list)
+
+    @property
+    def is_confident(self) -> bool:
+        return self.technology_stack is not None and self.confidence >= STACK_DETECTION_MIN_CONFIDENCE
+
+    def to_analysis(self, repo_name: str, paths: Iterable[str] = ()) -> AnalysisResponse:
+        """Build a full AnalysisResponse without the LLM from the detected stack"""
+        stack = self.technology_stack
+        paths = list(paths)
+        file_count = len(paths)
+        framework = stack.framework or stack.language
+        domain = self.domain or "General Software"
+        kind = "web application" if domain == "Frontend/Web" else "service" if domain == "Backend/API" else "application"
+
+        complexity = 2 if file_count < 20 else 4 if file_count < 100 else 6 if file_count < 500 else 8 if file_count < 2000 else 9
+        manifest_dirs = {posixpath.dirname(path) for path in self.manifests}
+        if len(manifest_dirs) > 1:
+            complexity += 1
+
+        key_features = []
+        if domain == "Backend/API":
+            key_features.append("HTTP API")
+        if domain == "Frontend/Web":
+            key_features.append("Web user interface")
+        if stack.database:
+            key_features.append(f"{stack.database} persistence")
+
+        return AnalysisResponse(
+            project_overview=ProjectOverview(
+                name=repo_name,
+                description=self.description or f"{framework} {kind}",
+                purpose=f"{framework} {kind}",
+                domain=domain,
+                complexity_score=min(complexity, 10)
+            ),
+            technical_architecture=TechnicalArchitecture(
+                technology_stack=stack,
+                system_architecture=SystemArchitecture(
+                    architecture_type="Modular" if len(manifest_dirs) > 1 else "Monolithic",
+                    modules=_top_level_dirs(paths),
+                    key_features=key_features,
+                    patterns=FRAMEWORK_PATTERNS.get(stack.framework, [])
+                )
+            ),
+            analysis_id=str(uuid.uuid4()),
+            timestamp=datetime.now()
+        )
+
+
+def detect_stack(key_files: Dict[str, str], paths: Iterable[str] = ()) -> StackDetection:
+    """Detect the technology stack from manifest contents and the repository path list"""
+    paths = set(paths) | set(key_files)
+    candidates: List[_Candidate] = []
+    for path, content in key_files.items():
+        name = posixpath.basename(path)
+        try:
+            candidate = _PARSERS[name](path, content, paths) if name in _PARSERS else None
+        except (ValueError, TypeError, KeyError, AttributeError, ET.ParseError, tomllib.TOMLDecodeError):
+            candidate = None
+        if candidate:
+            candidates.append(candidate)
+
+    if not candidates:
+        return StackDetection(technology_stack=None, confidence=0.0, evidence=["no recognised manifest"])
+
+    candidates = _merge_by_language(candidates)
+    candidates.sort(key=lambda c: (c.manifest.count("/"), c.framework is None, -len(c.dependencies)))
+    primary = candidates[0]
+
+    evidence = [f"{primary.language} manifest {primary.manifest}"]
+    confidence = 0.5 if "/" not in primary.manifest else 0.3
+    if primary.framework:
+        confidence += 0.3
+        evidence.append(f"framework {primary.framework}")
+    elif primary.dependencies:
+        confidence += 0.1
+    if primary.package_manager_certain:
+        confidence += 0.1
+    if primary.runtime_version_known:
+        confidence += 0.1
+
+    # Competing root-level stacks make the primary pick ambiguous
+    for other in candidates[1:]:
+        if "/" not in other.manifest and other.framework:
+            confidence -= 0.2
+            evidence.append(f"competing {other.language} stack in {other.manifest}")
+
+    database = primary.database or next((c.database for c in candidates if c.database), None)
+    stack = TechnologyStack(
+        framework=primary.framework,
+        language=primary.language,
+        database=database,
+        runtime=primary.runtime,
+        package_manager=primary.package_manager,
+        dependencies=primary.dependencies
+    )
+    return StackDetection(
+        technology_stack=stack,
+        confidence=round(max(0.0, min(confidence, 1.0)), 2),
+        evidence=evidence,
+        domain=primary.domain,
+        description=primary.description or _readme_summary(key_files),
+        manifests=sorted(path for path in key_files if posixpath.basename(path) in MANIFESTS)
+    )
+
+
+# Ecosystem parsers
+
+
+def _parse_package_json(path: str, content: str, paths: set) -> _Candidate:
+    manifest = json.loads(content)
+    runtime_deps = list((manifest.get("dependencies") or {}).keys())
+    all_deps = runtime_deps + list((manifest.get("devDependencies") or {}).keys())
+    directory = posixpath.dirname(path)
+
+    lockfiles = [("pnpm-lock.yaml", "pnpm"), ("yarn.lock", "yarn"), ("bun.lockb", "bun"), ("package-lock.json", "npm")]
+    package_manager, certain = "npm", False
+    for lockfile, manager in lockfiles:
+        if posixpath.join(directory, lockfile) in paths:
+            package_manager, certain = manager, True
+            break
+    if isinstance(manifest.get("packageManager"), str):
+        package_manager, certain = manifest["packageManager"].split("@")[0], True
+
+    typescript = "typescript" in all_deps or posixpath.join(directory, "tsconfig.json") in paths
+    node_version = re.sub(r"^[^\d]*", "", str((manifest.get("engines") or {}).get("node") or "")) or None
+    framework, domain = _match_framework(all_deps, NODE_FRAMEWORKS, exact=True)
+    return _Candidate(
+        language="TypeScript" if typescript else "JavaScript",
+        runtime=f"Node.js {node_version}" if node_version else "Node.js",
+        package_manager=package_manager,
+        manifest=path,
+        dependencies=runtime_deps or all_deps,
+        framework=framework,
+        domain=domain,
+        database=_match_database(all_deps),
+        description=manifest.get("description") or None,
+        package_manager_certain=certain,
+        runtime_version_known=bool(node_version),
+    )
+
+
+def _requirement_name(line: str) -> Optional[str]:
+    line = line.split("#", 1)[0].strip()
+    if not line or line.startswith("-"):
+        return None
+    name = re.split(r"[<>=!~\[;@ ]", line, 1)[0].strip()
+    return name.lower() or None
+
+
+def _python_candidate(path: str, deps: List[str], paths: set, package_manager: str,
+                      certain: bool, python_version: Optional[str] = None,
+                      description: Optional[str] = None) -> _Candidate:
+    framework, domain = _match_framework(deps, PYTHON_FRAMEWORKS, exact=True)
+    return _Candidate(
+        language="Python",
+        runtime=f"Python {python_version}" if python_version else "Python",
+        package_manager=package_manager,
+        manifest=path,
+        dependencies=deps,
+        framework=framework,
+        domain=domain,
+        database=_match_database(deps),
+        description=description,
+        package_manager_certain=certain,
+        runtime_version_known=bool(python_version),
+    )
+
+
+def _parse_requirements(path: str, content: str, paths: set) -> _Candidate:
+    deps = [name for name in (_requirement_name(line) for line in content.splitlines()) if name]
+    return _python_candidate(path, deps, paths, "pip", certain=True)
+
+
+def _parse_pyproject(path: str, content: str, paths: set) -> Optional[_Candidate]:
+    data = tomllib.loads(content)
+    project = data.get("project") or {}
+    poetry = (data.get("tool") or {}).get("poetry") or {}
+
+    deps = [name for name in (_requirement_name(spec) for spec in project.get("dependencies") or []) if name]
+    poetry_deps = {k.lower(): v for k, v in (poetry.get("dependencies") or {}).items()}
+    python_version = project.get("requires-python") or poetry_deps.pop("python", None)
+    deps += [name for name in poetry_deps if name not in deps]
+    if not deps and not project and not poetry:
+        return None
+
+    directory = posixpath.dirname(path)
+    if poetry or posixpath.join(directory, "poetry.lock") in paths:
+        package_manager = "poetry"
+    elif posixpath.join(directory, "uv.lock") in paths:
+        package_manager = "uv"
+    else:
+        package_manager = "pip"
+    version = re.sub(r"^[^\d]*", "", str(python_version)) if python_version else None
+    return _python_candidate(
+        path, deps, paths, package_manager, certain=True,
+        python_version=version or None,
+        description=project.get("description") or poetry.get("description")
+    )
+
+
+def _parse_pipfile(path: str, content: str, paths: set) -> _Candidate:
+    data = tomllib.loads(content)
+    deps = [name.lower() for name in (data.get("packages") or {})]
+    python_version = (data.get("requires") or {}).get("python_version")
+    return _python_candidate(path, deps, paths, "pipenv", certain=True, python_version=python_version)
+
+
+def _parse_setup_py(path: str, content: str, paths: set) -> _Candidate:
+    match = re.search(r"install_requires\s*=\s*\[(.*?)\]", content, re.S)
+    specs = re.findall(r"['\"]([^'\"]+)['\"]", match.group(1)) if match else []
+    deps = [name for name in (_requirement_name(spec) for spec in specs) if name]
+    return _python_candidate(path, deps, paths, "pip", certain=False)
+
+
+def _parse_go_mod(path: str, content: str, paths: set) -> _Candidate:
+    version = re.search(r"^go\s+(\d+(?:\.\d+)*)", content, re.M)
+    deps = []
+    for block in re.findall(r"^require\s*\((.*?)^\)", content, re.S | re.M):
+        deps += [line.split()[0] for line in block.splitlines() if line.strip() and not line.strip().startswith("//")]
+    deps += re.findall(r"^require\s+([^\s(]+)\s", content, re.M)
+    framework, domain = _match_framework(deps, GO_FRAMEWORKS, exact=False)
+    return _Candidate(
+        language="Go",
+        runtime=f"Go {version.group(1)}" if version else "Go",
+        package_manager="go modules",
+        manifest=path,
+        dependencies=deps,
+        framework=framework,
+        domain=domain,
+        database=_match_database(deps),
+        package_manager_certain=True,
+        runtime_version_known=bool(version),
+    )
+
+
+def _parse_pom(path: str, content: str, paths: set) -> _Candidate:
+    root = ET.fromstring(content)
+    namespace = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+
+    artifacts = [
+        f"{(dep.findtext(f'{namespace}groupId') or '').strip()}:{(dep.findtext(f'{namespace}artifactId') or '').strip()}"
+        for dep in root.iter(f"{namespace}dependency")
+    ]
+    parent = root.find(f"{namespace}parent")
+    parent_artifact = (parent.findtext(f"{namespace}artifactId") or "") if parent is not None else ""
+    properties = root.find(f"{namespace}properties")
+    java_version = None
+    if properties is not None:
+        java_version = properties.findtext(f"{namespace}java.version") or properties.findtext(f"{namespace}maven.compiler.source")
+
+    framework, domain = _match_framework(artifacts + [parent_artifact], JAVA_FRAMEWORKS, exact=False, substring=True)
+    return _Candidate(
+        language="Java",
+        runtime=f"Java {java_version.strip()}" if java_version else "Java",
+        package_manager="Maven",
+        manifest=path,
+        dependencies=[artifact.split(":")[-1] for artifact in artifacts],
+        framework=framework,
+        domain=domain,
+        database=_match_database(artifacts),
+        description=(root.findtext(f"{namespace}description") or "").strip() or None,
+        package_manager_certain=True,
+        runtime_version_known=bool(java_version),
+    )
+
+
+def _parse_gradle(path: str, content: str, paths: set) -> _Candidate:
+    artifacts = re.findall(r"(?:implementation|api|compile|runtimeOnly)\s*\(?\s*['\"]([^'\"]+)['\"]", content)
+    plugins = re.findall(r"id\s*\(?\s*['\"]([^'\"]+)['\"]", content)
+    version = re.search(r"(?:sourceCompatibility|languageVersion)\D*(\d+)", content)
+    kotlin = path.endswith(".kts") or any("kotlin" in plugin for plugin in plugins)
+    framework, domain = _match_framework(artifacts + plugins, JAVA_FRAMEWORKS, exact=False, substring=True)
+    return _Candidate(
+        language="Kotlin" if kotlin else "Java",
+        runtime=f"Java {version.group(1)}" if version else "Java",
+        package_manager="Gradle",
+        manifest=path,
+        dependencies=[artifact.split(":")[1] if ":" in artifact else artifact for artifact in artifacts],
+        framework=framework,
+        domain=domain,
+        database=_match_database(artifacts),
+        package_manager_certain=True,
+        runtime_version_known=bool(version),
+    )
+
+
+_PARSERS = {
+    "package.json": _parse_package_json,
+    "requirements.txt": _parse_requirements,
+    "pyproject.toml": _parse_pyproject,
+    "Pipfile": _parse_pipfile,
+    "setup.py": _parse_setup_py,
+    "go.mod": _parse_go_mod,
+    "pom.xml": _parse_pom,
+    "build.gradle": _parse_gradle,
+    "build.gradle.kts": _parse_gradle,
+}
+
+
+# Helpers
+
+
+def _match_framework(deps: List[str], table: List[Tuple[str, str, str]], exact: bool,
+                     substring: bool = False) -> Tuple[Optional[str], Optional[str]]:
+    lowered = [dep.lower() for dep in deps]
+    for needle, framework, domain in table:
+        for dep in lowered:
+            if dep == needle or (not exact and dep.startswith(needle + "/")) or (substring and needle in dep):
+                return framework, domain
+    return None, None
+
+
+def _match_database(deps: List[str]) -> Optional[str]:
+    tokens = set()
+    for dep in deps:
+        tokens.update(re.split(r"[/:\-_.@]", dep.lower()))
+    for needles, database in DATABASE_HINTS:
+        if tokens.intersection(needles):
+            return database
+    return None
+
+
+def _merge_by_language(candidates: List[_Candidate]) -> List[_Candidate]:
+    """Merge manifests of one ecosystem in the same directory (e.g. pyproject.toml + requirements.txt)"""
+    merged: Dict[Tuple[str, str], _Candidate] = {}
+    for candidate in candidates:
+        key = (candidate.language, posixpath.dirname(candidate.manifest))
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = candidate
+            continue
+        existing.dependencies += [dep for dep in candidate.dependencies if dep not in existing.dependencies]
+        existing.framework = existing.framework or candidate.framework
+        existing.domain = existing.domain or candidate.domain
+        existing.database = existing.database or candidate.database
+        existing.description = existing.description or candidate.description
+        if candidate.runtime_version_known and not existing.runtime_version_known:
+            existing.runtime, existing.runtime_version_known = candidate.runtime, True
+    return list(merged.values())
+
+
+def _readme_summary(key_files: Dict[str, str]) -> Optional[str]:
+    readme = key_files.get("README.md") or key_files.get("README.rst")
+    if not readme:
+        return None
+    for paragraph in re.split(r"\n\s*\n", readme):
+        text = paragraph.strip()
+        if text and not text.startswith(("#", "=", "[!", "![", "<", "```", "---")):
+            return " ".join(text.split())[:300]
+    return None
+
+
+def _top_level_dirs(paths: List[str], limit: int = 15) -> List[str]:
+    dirs = sorted({path.split("/", 1)[0] for path in paths if "/" in path and not path.startswith(".")})
+    return dirs[:limit]
@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from pydantic import BaseModel, ValidationError
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+STRUCTURED_OUTPUT_MODES = ("json_schema", "json_object", "prompt")
+
+_FENCE_PATTERN = re.compile(r"^```[\w-]*[ \t]*\n?(.*?)\n?```\s*$", re.S)
+_TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a completion cannot be turned into the requested model"""
+
+
+def response_format(model: Type[BaseModel], mode: str) -> Optional[Dict[str, Any]]:
+    """OpenAI-compatible ``response_format`` constraining a completion to ``model``"""
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": model.__name__, "schema": model.model_json_schema(), "strict": False},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def repair_json(text: str) -> str:
+    """Best-effort local fix of the usual ways a model mangles a JSON object.
+
+    Strips code fences and surrounding prose, drops trailing commas and closes
+    strings, arrays and objects of a truncated completion. Raw newlines inside
+    strings are left for ``json.loads(strict=False)``.
+    """
+    text = text.strip()
+    fenced = _FENCE_PATTERN.match(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    start = text.find("{")
+    if start < 0:
+        return text
+    text = text[start:]
+
+    stack: List[str] = []
+    in_string = escaped = False
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+            if not stack:
+                # Anything after the object is commentary
+                text = text[:position + 1]
+                break
+
+    if stack:
+        # Truncated completion: close the open string and containers
+        if in_string:
+            text += '"'
+        text = text.rstrip().rstrip(",")
+        if text.endswith(":"):
+            text += " null"
+        text += "".join(reversed(stack))
+    return _TRAILING_COMMA_PATTERN.sub(r"\1", text)
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'root'}: {item['msg']}"
+        for item in error.errors()[:10]
+    )
+
+
+def parse_structured(content: str, model: Type[M], repair: bool = True) -> Tuple[M, bool]:
+    """Validate ``content`` as ``model``; returns the instance and whether it needed repair"""
+    try:
+        return model.model_validate_json(content), False
+    except ValidationError as e:
+        first_error = e
+    if not repair:
+        raise StructuredOutputError(_describe(first_error))
+
+    repaired = repair_json(content)
+    try:
+        data = json.loads(repaired, strict=False)
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"invalid JSON: {str(e)}")
+    try:
+        return model.model_validate(data), True
+    except ValidationError as e:
+        raise StructuredOutputError(_describe(e))
+
+
+class StructuredOutput:
+    """Gets pydantic models out of chat models with as few wasted calls as possible.
+
+    Requests are constrained with a JSON schema derived from the model (or JSON
+    mode, depending on ``mode``). Replies that still fail validation go through
+    a local repair pass first; only if that fails is the model asked, at most
+    ``max_retries`` times, to correct its own reply given the validation error.
+    """
+
+    def __init__(self, mode: str = "json_schema", max_retries: int = 1):
+        if mode not in STRUCTURED_OUTPUT_MODES:
+            raise ValueError(f"Unknown structured output mode '{mode}', expected one of {', '.join(STRUCTURED_OUTPUT_MODES)}")
+        self.mode = mode
+        self.max_retries = max_retries
+        self.counters: Dict[str, Counter] = defaultdict(Counter)
+
+    @classmethod
+    def from_env(cls) -> "StructuredOutput":
+        return cls(
+            mode=os.getenv("STRUCTURED_OUTPUT_MODE", "json_schema").lower(),
+            max_retries=int(os.getenv("STRUCTURED_OUTPUT_RETRIES", "1")),
+        )
+
+    def constrain(self, llm: "BaseChatModel", model: Type[BaseModel]):
+        """The chat model bound to the response format for ``model``"""
+        fmt = response_format(model, self.mode)
+        return llm.bind(response_format=fmt) if fmt else llm
+
+    async def generate(self, llm: "BaseChatModel", messages: List[BaseMessage], model: Type[M], kind: str) -> M:
+        response = await self.constrain(llm, model).ainvoke(messages)
+        return await self.recover(llm, messages, response.content, model, kind)
+
+    async def recover(
+        self,
+        llm: "BaseChatModel",
+        messages: List[BaseMessage],
+        content: str,
+        model: Type[M],
+        kind: str
+    ) -> M:
+        """Validate a completion, repairing it locally or asking for a bounded correction"""
+        counters = self.counters[kind]
+        counters["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                value, repaired = parse_structured(content or "", model)
+            except StructuredOutputError as e:
+                counters["wasted_calls"] += 1
+                if attempt == self.max_retries:
+                    counters["failures"] += 1
+                    raise
+                logger.info("Structured %s output invalid (%s); asking the model to correct it", kind, e)
+                counters["retries"] += 1
+                messages = messages + [
+                    AIMessage(content=content or ""),
+                    HumanMessage(content=(
+                        f"Your reply could not be used: {e}. Reply again with only the corrected JSON "
+                        f"object, without markdown, matching this JSON schema:\n"
+                        f"{json.dumps(model.model_json_schema())}"
+                    )),
+                ]
+                content = (await self.constrain(llm, model).ainvoke(messages)).content
+                continue
+            counters["repaired" if repaired else "valid"] += 1
+            if attempt:
+                counters["retry_successes"] += 1
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        totals: Counter = Counter()
+        for counters in self.counters.values():
+            totals.update(counters)
+        return {
+            "mode": self.mode,
+            "max_retries": self.max_retries,
+            **{key: totals[key] for key in ("calls", "valid", "repaired", "retries", "retry_successes", "wasted_calls", "failures")},
+            "by_kind": {kind: dict(counters) for kind, counters in self.counters.items()},
+        }
+
+
+# Shared by the analyzers and generators
+structured_output = StructuredOutput.from_env()
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from ..models import DockerizationStatus
+from .analysis_cache import BoundedCache
+
+
+@dataclass(frozen=True)
+class TaskEvent:
+    id: int
+    task_id: str
+    recorded_at: float
+    data: str   # JSON payload, serialized once and shared by every subscriber
+    frame: str  # the same payload framed as a Server-Sent Event
+
+
+class _Channel:
+    """Event history of one task plus a broadcast signal for new events"""
+
+    def __init__(self, max_history: int):
+        self.events: Deque[TaskEvent] = deque(maxlen=max_history)
+        self.next_id = 1
+        self.closed = False
+        self.subscribers = 0
+        self.fingerprint: Optional[Tuple[Any, ...]] = None
+        # Replaced on every change; waiters hold the previous one
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def since(self, last_event_id: int) -> List[TaskEvent]:
+        if not self.events:
+            return []
+        if last_event_id >= self.next_id:
+            # Ids restart at 1 in every process, so a cursor ahead of the newest
+            # event was issued before a restart: replay the whole history
+            last_event_id = 0
+        # Ids are contiguous, so the offset into the history is arithmetic; a
+        # cursor older than the retained history resumes from the oldest event
+        start = max(last_event_id + 1 - self.events[0].id, 0)
+        return [self.events[i] for i in range(start, len(self.events))]
+
+
+class TaskEventBus:
+    """In-process fan-out of dockerization status transitions.
+
+    Every transition is recorded once, with a timestamp and a per-task event
+    id, in a bounded history. Subscribers keep only a cursor into that shared
+    history, so any number of them can follow a task and resume from the last
+    event id they saw. A task's stream ends when it is closed.
+    """
+
+    def __init__(self, max_history: int = 256, max_tasks: int = 10_000, ttl_seconds: Optional[float] = 3600):
+        self.max_history = max_history
+        self._channels: BoundedCache[_Channel] = BoundedCache(
+            max_entries=max_tasks,
+            ttl_seconds=ttl_seconds,
+            evictable=lambda channel: channel.closed and not channel.subscribers,
+        )
+        self.published = 0
+        self.deduplicated = 0
+        self.active_subscribers = 0
+
+    @classmethod
+    def from_env(cls) -> "TaskEventBus":
+        return cls(
+            max_history=int(os.getenv("TASK_EVENTS_HISTORY", "256")),
+            max_tasks=int(os.getenv("TASK_STATUS_MAX_ENTRIES", "10000")),
+        )
+
+    def _channel(self, task_id: str) -> _Channel:
+        channel = self._channels.get(task_id)
+        if channel is None:
+            channel = _Channel(self.max_history)
+            self._channels[task_id] = channel
+        return channel
+
+    def publish(self, status: DockerizationStatus) -> Optional[TaskEvent]:
+        """Record the current state of a task; unchanged states are not repeated"""
+        channel = self._channel(status.task_id)
+        fingerprint = (status.status, status.message, status.progress, len(status.artifacts), status.pr_url)
+        if fingerprint == channel.fingerprint:
+            self.deduplicated += 1
+            return None
+        channel.fingerprint = fingerprint
+
+        event_id = channel.next_id
+        channel.next_id += 1
+        recorded_at = time.time()
+        data = json.dumps({"event_id": event_id, "recorded_at": recorded_at, **status.model_dump(mode="json")})
+        event = TaskEvent(
+            id=event_id,
+            task_id=status.task_id,
+            recorded_at=recorded_at,
+            data=data,
+            frame=f"id: {event_id}\nevent: status\ndata: {data}\n\n",
+        )
+        channel.events.append(event)
+        channel.closed = False
+        self.published += 1
+        channel.notify()
+        return event
+
+    def close(self, task_id: str) -> None:
+        """Mark a task as final; subscribers drain the history and stop"""
+        channel = self._channel(task_id)
+        channel.closed = True
+        # Re-set so the retention TTL runs from the close
+        self._channels[task_id] = channel
+        channel.notify()
+
+    def last_event_id(self, task_id: str) -> int:
+        channel = self._channels.get(task_id)
+        return channel.next_id - 1 if channel else 0
+
+    def subscribers(self, task_id: str) -> int:
+        channel = self._channels.get(task_id)
+        return channel.subscribers if channel else 0
+
+    async def subscribe(
+        self,
+        task_id: str,
+        last_event_id: int = 0,
+        keepalive_seconds: Optional[float] = None
+    ) -> AsyncIterator[Optional[TaskEvent]]:
+        """Yield events after ``last_event_id`` until the task is closed.
+
+        With ``keepalive_seconds`` set, ``None`` is yielded whenever the task
+        has been quiet that long so transports can keep the connection alive.
+        """
+        channel = self._channel(task_id)
+        channel.subscribers += 1
+        self.active_subscribers += 1
+        try:
+            cursor = last_event_id
+            while True:
+                changed = channel.changed
+                for event in channel.since(cursor):
+                    cursor = event.id
+                    yield event
+                if channel.closed:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            channel.subscribers -= 1
+            self.active_subscribers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tasks": len(self._channels),
+            "subscribers": self.active_subscribers,
+            "published": self.published,
+            "deduplicated": self.deduplicated,
+        }
+
+
+# Process-wide bus shared by the workers and the streaming endpoints
+task_events = TaskEventBus.from_env()
@@ -0,0 +1,6 @@
+import hashlib
+
+
+def token_fingerprint(token: str) -> str:
+    """Stable, non-reversible identifier for a credential, safe to use in keys and logs"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
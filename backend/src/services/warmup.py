@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .dockerization_agent import AGENT_MODEL
+from .llm_analyzer import ANALYSIS_MODEL
+from .llm_clients import llm_clients
+from .mcp_pool import mcp_pool
+from .prompt_compactor import prompt_compactor
+
+logger = logging.getLogger(__name__)
+
+
+class StartupWarmup:
+    """Pays the first-request costs while the process starts.
+
+    The LangChain, OpenAI and MCP client stacks are imported on first use to
+    keep startup fast. When enabled, the warm-up imports them, builds the
+    shared LLM clients, loads the prompt tokenizer and opens ``mcp_sessions``
+    pooled GitHub MCP sessions per configured token before the process starts
+    serving (MCP sessions are partitioned by token, so only requests with
+    those tokens reuse them). Failures are logged and leave that resource cold.
+    """
+
+    def __init__(self, enabled: bool = False, github_tokens: Optional[List[str]] = None, mcp_sessions: int = 1):
+        self.enabled = enabled
+        self.github_tokens = github_tokens or []
+        self.mcp_sessions = mcp_sessions
+        self.timings: Dict[str, float] = {}
+        self.errors: List[str] = []
+        self.completed = False
+
+    @classmethod
+    def from_env(cls) -> "StartupWarmup":
+        return cls(
+            enabled=os.getenv("STARTUP_WARMUP", "false").lower() in ("1", "true", "yes"),
+            github_tokens=[token for token in os.getenv("STARTUP_WARMUP_GITHUB_TOKENS", "").split(",") if token.strip()],
+            mcp_sessions=int(os.getenv("STARTUP_WARMUP_MCP_SESSIONS", "1")),
+        )
+
+    @property
+    def ready(self) -> bool:
+        """Whether the process may take requests: warm-up is off or has finished"""
+        return not self.enabled or self.completed
+
+    async def run(self) -> None:
+        start = time.perf_counter()
+
+        step = time.perf_counter()
+        from langchain_core.prompts import ChatPromptTemplate  # noqa: F401
+        from mcp_use import MCPAgent  # noqa: F401
+        self.timings["imports"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        for model in {ANALYSIS_MODEL, AGENT_MODEL}:
+            llm_clients.get(model)
+        self.timings["llm_clients"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        # May download the encoding file on first use
+        await asyncio.to_thread(prompt_compactor.tokenizer.count, "")
+        self.timings["tokenizer"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        for token in self.github_tokens:
+            try:
+                await mcp_pool.prewarm(token.strip(), self.mcp_sessions)
+            except Exception as e:
+                logger.warning("MCP session warm-up failed: %s", e)
+                self.errors.append(f"mcp: {str(e)}")
+        if self.github_tokens:
+            self.timings["mcp_sessions"] = round(time.perf_counter() - step, 3)
+
+        self.timings["total"] = round(time.perf_counter() - start, 3)
+        self.completed = True
+        logger.info("Startup warm-up finished in %.2fs: %s", self.timings["total"], self.timings)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "completed": self.completed,
+            "ready": self.ready,
+            "timings": self.timings,
+            "errors": self.errors,
+        }
+
+
+# Run from the API lifespan and by standalone workers
+startup_warmup = StartupWarmup.from_env()
@@ -1,3 +1,27 @@
 from .background_tasks import dockerize_repository_task
+from .checkpoints import CheckpointStore, SQLiteCheckpointStore, create_checkpoint_store
+from .job_queue import Job, JobQueue, SQLiteJobQueue, create_job_queue
+from .state_store import (
+    KVStateStore, MemoryStateStore, SQLiteStateStore, StateStore, StateStoreError, create_state_store
+)
+from .workers import DOCKERIZE_JOB, DockerizationWorkerPool, relay_queue_progress
 
-__all__ = ["dockerize_repository_task"]
\ No newline at end of file
+__all__ = [
+    "dockerize_repository_task",
+    "Job",
+    "JobQueue",
+    "SQLiteJobQueue",
+    "create_job_queue",
+    "CheckpointStore",
+    "SQLiteCheckpointStore",
+    "create_checkpoint_store",
+    "StateStore",
+    "StateStoreError",
+    "MemoryStateStore",
+    "SQLiteStateStore",
+    "KVStateStore",
+    "create_state_store",
+    "DOCKERIZE_JOB",
+    "DockerizationWorkerPool",
+    "relay_queue_progress",
+]
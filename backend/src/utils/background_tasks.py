@@ -1,79 +1,246 @@
+import asyncio
+import time
 from datetime import datetime
+from typing import Any, Awaitable, Dict, Optional
 
-from ..models import TaskStatus, DockerizationStatus
-from ..services import RepositoryAnalyzer, DockerizationAgent
+from pydantic import BaseModel
+
+from ..models import (
+    AnalysisResponse, TaskStatus, DockerizationStatus, DockerComposeContent, OptimizedDockerfile, WorkflowContent
+)
+from ..services import RepositoryAnalyzer, DockerizationAgent, merge_dockerignore, task_events
+from ..services.metrics import dockerize_stage_seconds, dockerize_stages_total, timed
+from .checkpoints import CheckpointStore
+from .state_store import StateStore
+
+ARTIFACT_LABELS = {
+    "branch": "Feature branch",
+    "dockerfile": "Dockerfile",
+    "docker_compose": "docker-compose.yml",
+    "workflow": "CI/CD workflow",
+    "pr_description": "Pull request description",
+}
+
+# Stage outputs restored from checkpoints as models; the others are plain strings
+STAGE_MODELS = {
+    "dockerfile": OptimizedDockerfile,
+    "docker_compose": DockerComposeContent,
+    "workflow": WorkflowContent,
+}
+
+
+async def report(
+    state: StateStore, status: DockerizationStatus, /, artifact: Optional[str] = None, **fields: Any
+) -> None:
+    """Apply a transition to the task's status, persist only the changed fields and publish it"""
+    for name, value in fields.items():
+        setattr(status, name, value)
+    if artifact is not None:
+        status.artifacts.append(artifact)
+    await state.update_status(status.task_id, fields, artifacts=[artifact] if artifact is not None else ())
+    task_events.publish(status)
+
+
+async def run_concurrently(
+    state: StateStore,
+    status: DockerizationStatus,
+    jobs: Dict[str, Awaitable[Any]],
+    progress_from: int,
+    progress_to: int
+) -> Dict[str, Any]:
+    """Run independent pipeline steps concurrently, reporting each completion.
+
+    The first failure cancels the remaining steps, waits for them to finish
+    unwinding and is re-raised.
+    """
+    tasks = {asyncio.ensure_future(job): name for name, job in jobs.items()}
+    pending = set(tasks)
+    results: Dict[str, Any] = {}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                results[name] = task.result()
+                await report(
+                    state, status, artifact=name,
+                    progress=progress_from + (progress_to - progress_from) * len(results) // len(tasks),
+                    message=f"{ARTIFACT_LABELS.get(name, name)} ready ({len(results)}/{len(tasks)})"
+                )
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Wait for the cancelled steps to unwind so none outlives the pipeline
+            await asyncio.gather(*pending, return_exceptions=True)
+    return results
+
+
+def _restore(stage: str, output: Any) -> Any:
+    model = STAGE_MODELS.get(stage)
+    return model.model_validate(output) if model else output
+
+
+async def _run_stage(
+    state: StateStore,
+    status: DockerizationStatus,
+    stage: str,
+    job: Awaitable[Any],
+    checkpoints: Optional[CheckpointStore] = None
+) -> Any:
+    """Run a stage, timing it, and persist its output before reporting it done"""
+    async with timed(dockerize_stage_seconds, dockerize_stages_total, stage=stage) as timer:
+        result = await job
+    status.timings[stage] = round(timer.seconds, 3)
+    await state.update_status(status.task_id, timings={stage: status.timings[stage]})
+    if checkpoints is not None:
+        await checkpoints.save(
+            status.task_id, stage, result.model_dump(mode="json") if isinstance(result, BaseModel) else result
+        )
+    return result
 
 
 async def dockerize_repository_task(
-    task_id: str,
+    status: DockerizationStatus,
     repo_url: str,
     github_token: str,
     openai_api_key: str,
-    analysis_id: str,
-    task_status: dict,
-    analysis_cache: dict
+    analysis: AnalysisResponse,
+    state: StateStore,
+    bypass_artifact_cache: bool = False,
+    checkpoints: Optional[CheckpointStore] = None
 ):
-    """Background task to dockerize repository using AI"""
+    """Background task to dockerize repository using AI
     
+    ``status`` is the task's own copy of its status; every transition is
+    applied to it, written to ``state`` field by field and published.
+    With a checkpoint store every stage output (branch, generated artifacts,
+    commit SHA, pull request URL) is persisted as it completes, and a retried
+    or resumed task continues after its last completed stage.
+    """
+    
+    task_id = status.task_id
     agent = None
+    started = time.perf_counter()
     try:
-        # Update status
-        task_status[task_id].status = TaskStatus.ANALYZING
-        task_status[task_id].message = "AI analyzing repository structure..."
-        task_status[task_id].progress = 10
+        restored = {
+            stage: _restore(stage, output)
+            for stage, output in (await checkpoints.load(task_id) if checkpoints is not None else {}).items()
+        }
         
-        # Get analysis
-        analysis = analysis_cache[analysis_id]
+        # Update status
+        await report(
+            state, status,
+            status=TaskStatus.ANALYZING,
+            message=(
+                f"Resuming AI dockerization after {len(restored)} completed stages..." if restored
+                else "AI analyzing repository structure..."
+            ),
+            progress=max(status.progress, 10),
+            artifacts=[stage for stage in ARTIFACT_LABELS if stage in restored]
+        )
         
         # Parse repo URL
-        analyzer = RepositoryAnalyzer(github_token, openai_api_key)
-        owner, repo = analyzer.parse_repo_url(repo_url)
+        owner, repo = RepositoryAnalyzer.parse_repo_url(repo_url)
         
         # Initialize dockerization agent with AI
         agent = DockerizationAgent(github_token, openai_api_key, owner, repo)
-        await agent.initialize_mcp()
-        
-        # Create branch
-        task_status[task_id].status = TaskStatus.CREATING_BRANCH
-        task_status[task_id].message = "Creating feature branch..."
-        task_status[task_id].progress = 20
-        
-        branch = await agent.create_branch()
+        await _run_stage(state, status, "mcp_initialize", agent.initialize_mcp())
         
-        # AI-generated Docker files
-        task_status[task_id].status = TaskStatus.DOCKERIZING
-        task_status[task_id].message = "AI generating Docker configuration..."
-        task_status[task_id].progress = 40
+        # The LLM generations depend only on the analysis, so they overlap with
+        # branch creation; nothing is written to GitHub until all content is ready.
+        # The branch name is derived from the task so a retry finds its own branch.
+        await report(
+            state, status,
+            status=TaskStatus.DOCKERIZING,
+            message="Creating feature branch and AI generating Docker configuration...",
+            progress=max(status.progress, 20)
+        )
         
-        await agent.create_dockerfile(analysis, branch)
-        await agent.create_docker_compose(analysis, branch)
+        stages = {
+            "branch": lambda: agent.create_branch(f"feature/dockerize-and-ci-{task_id[:8]}"),
+            "dockerfile": lambda: agent.llm_analyzer.generate_dockerfile(analysis, bypass_artifact_cache),
+            "docker_compose": lambda: agent.llm_analyzer.generate_docker_compose(analysis, bypass_artifact_cache),
+            "workflow": lambda: agent.llm_analyzer.generate_github_workflow(analysis, bypass_artifact_cache),
+            "pr_description": lambda: agent.generate_pr_description(analysis),
+        }
+        generated = {stage: restored[stage] for stage in stages if stage in restored}
+        if len(generated) < len(stages):
+            generated.update(await run_concurrently(
+                state,
+                status,
+                {
+                    stage: _run_stage(state, status, stage, start(), checkpoints)
+                    for stage, start in stages.items() if stage not in generated
+                },
+                progress_from=20 + 40 * len(generated) // len(stages),
+                progress_to=60
+            ))
+        branch = generated["branch"]
         
-        # AI-generated workflow
-        task_status[task_id].status = TaskStatus.CREATING_WORKFLOW
-        task_status[task_id].message = "AI setting up CI/CD pipeline..."
-        task_status[task_id].progress = 70
-        
-        await agent.create_github_workflow(analysis, branch)
+        # Commit all generated files in one atomic commit
+        if "commit" not in restored:
+            await report(
+                state, status, message="Committing Docker configuration and CI/CD pipeline...", progress=70
+            )
+            
+            files = {
+                "Dockerfile": generated["dockerfile"].content,
+                "docker-compose.yml": generated["docker_compose"].content,
+                ".github/workflows/ci-cd.yml": generated["workflow"].content,
+            }
+            if generated["dockerfile"].dockerignore:
+                # A .dockerignore the repository already has is extended, not replaced
+                dockerignore = merge_dockerignore(
+                    await agent.read_file(".dockerignore", branch), generated["dockerfile"].dockerignore
+                )
+                if dockerignore is not None:
+                    files[".dockerignore"] = dockerignore
+            await _run_stage(state, status, "commit", agent.commit_files(
+                files,
+                branch,
+                "feat: Add AI-generated Dockerfile, docker-compose.yml and GitHub Actions CI/CD workflow",
+                idempotency_key=task_id
+            ), checkpoints)
         
         # Create pull request with AI description
-        task_status[task_id].status = TaskStatus.CREATING_PR
-        task_status[task_id].message = "AI creating pull request..."
-        task_status[task_id].progress = 90
-        
-        pr_url = await agent.create_pull_request(branch, analysis)
+        pr_url = restored.get("pull_request")
+        if pr_url is None:
+            await report(
+                state, status, status=TaskStatus.CREATING_PR, message="AI creating pull request...", progress=90
+            )
+            
+            pr_url = await _run_stage(
+                state, status, "pull_request",
+                agent.create_pull_request(branch, analysis, generated["pr_description"]),
+                checkpoints
+            )
         
         # Complete
-        task_status[task_id].status = TaskStatus.COMPLETED
-        task_status[task_id].message = "AI dockerization completed successfully!"
-        task_status[task_id].progress = 100
-        task_status[task_id].pr_url = pr_url
-        task_status[task_id].timestamp = datetime.now()
+        await report(
+            state, status,
+            status=TaskStatus.COMPLETED,
+            message="AI dockerization completed successfully!",
+            progress=100,
+            pr_url=pr_url,
+            timestamp=datetime.now()
+        )
         
     except Exception as e:
-        task_status[task_id].status = TaskStatus.FAILED
-        task_status[task_id].message = f"AI dockerization failed: {str(e)}"
-        task_status[task_id].progress = 0
-        task_status[task_id].timestamp = datetime.now()
+        # Progress is kept: it reflects the checkpointed stages a resume continues from
+        status.status = TaskStatus.FAILED
+        status.message = f"AI dockerization failed: {str(e)}"
+        status.timestamp = datetime.now()
+        try:
+            await state.update_status(
+                task_id, {"status": status.status, "message": status.message, "timestamp": status.timestamp}
+            )
+        finally:
+            task_events.publish(status)
     finally:
-        if agent:
-            await agent.close()
+        status.timings["total"] = round(time.perf_counter() - started, 3)
+        try:
+            await state.update_status(task_id, timings={"total": status.timings["total"]})
+        finally:
+            if agent:
+                await agent.close()
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class CheckpointStore(ABC):
+    """Durable outputs of completed dockerization stages.
+
+    Every output is stored under the idempotency key ``(task_id, stage)``:
+    the first write wins and later writes for the same key are ignored, so a
+    stage that raced with a re-claimed copy of its job is recorded once.
+    Resumed and retried tasks skip every stage that has a checkpoint.
+    Checkpoints are cleared when their task completes; those of abandoned
+    tasks are dropped once the task has not checkpointed for the TTL.
+    """
+
+    @abstractmethod
+    async def load(self, task_id: str) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def save(self, task_id: str, stage: str, output: Any) -> bool: ...
+
+    @abstractmethod
+    async def clear(self, task_id: str) -> None: ...
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]: ...
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """CheckpointStore in a SQLite database in WAL mode (may share the job queue's file)"""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connect()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _init_schema(self) -> None:
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    task_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (task_id, stage)
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (created_at)")
+
+    async def load(self, task_id: str) -> Dict[str, Any]:
+        """Outputs of the task's completed stages, by stage"""
+        def _load() -> Dict[str, Any]:
+            with self._connection() as connection:
+                rows = connection.execute(
+                    "SELECT stage, output FROM checkpoints WHERE task_id = ? ORDER BY created_at", (task_id,)
+                ).fetchall()
+            return {row["stage"]: json.loads(row["output"]) for row in rows}
+
+        return await asyncio.to_thread(_load)
+
+    async def save(self, task_id: str, stage: str, output: Any) -> bool:
+        """Record a stage output; returns False if the stage was already checkpointed"""
+        def _save() -> bool:
+            now = time.time()
+            with self._connection() as connection:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO checkpoints (task_id, stage, output, created_at) VALUES (?, ?, ?, ?)",
+                    (task_id, stage, json.dumps(output), now)
+                )
+                if self.ttl_seconds is not None:
+                    # Tasks that stopped checkpointing a TTL ago were abandoned
+                    oldest = now - self.ttl_seconds
+                    connection.execute(
+                        "DELETE FROM checkpoints WHERE created_at < ? AND task_id NOT IN "
+                        "(SELECT task_id FROM checkpoints WHERE created_at >= ?)",
+                        (oldest, oldest)
+                    )
+                return cursor.rowcount == 1
+
+        return await asyncio.to_thread(_save)
+
+    async def clear(self, task_id: str) -> None:
+        """Drop the checkpoints of a finished task"""
+        def _clear() -> None:
+            with self._connection() as connection:
+                connection.execute("DELETE FROM checkpoints WHERE task_id = ?", (task_id,))
+
+        await asyncio.to_thread(_clear)
+
+    async def stats(self) -> Dict[str, Any]:
+        def _stats() -> Dict[str, Any]:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT COUNT(DISTINCT task_id) AS tasks, COUNT(*) AS checkpoints FROM checkpoints"
+                ).fetchone()
+                stages = {
+                    row["stage"]: row["count"]
+                    for row in connection.execute("SELECT stage, COUNT(*) AS count FROM checkpoints GROUP BY stage")
+                }
+            return {"tasks": row["tasks"], "checkpoints": row["checkpoints"], "stages": stages}
+
+        return await asyncio.to_thread(_stats)
+
+
+def create_checkpoint_store() -> CheckpointStore:
+    """Build the checkpoint store from ``CHECKPOINT_STORE_URL``, defaulting to the job queue's database"""
+    url = os.getenv("CHECKPOINT_STORE_URL") or os.getenv("JOB_QUEUE_URL", "sqlite:///data/jobs.sqlite3")
+    ttl_seconds = float(os.getenv("CHECKPOINT_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+    if url.startswith("sqlite:///"):
+        return SQLiteCheckpointStore(url[len("sqlite:///"):], ttl_seconds=ttl_seconds or None)
+    raise ValueError(f"Unsupported CHECKPOINT_STORE_URL: {url}")
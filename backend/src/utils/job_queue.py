@@ -0,0 +1,341 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+LEASE_EXPIRED_ERROR = "worker lease expired on the final attempt"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    enqueued_at: float
+    lease_owner: Optional[str] = None
+
+
+class JobQueue(ABC):
+    """Persistent work queue with leases.
+
+    A claimed job is leased to one worker until ``lease_expires_at``; workers
+    extend the lease with heartbeats, and a job whose lease lapses (e.g. the
+    worker died) becomes claimable again. Failed jobs are retried with
+    exponential backoff until ``max_attempts`` is reached; a job whose lease
+    lapses on its last attempt (e.g. it keeps killing its worker) is dead.
+    Payload fields listed in ``secret_fields`` (credentials) are removed once
+    a job is done or dead; ``requeue`` takes them again. Done and dead jobs
+    are deleted once they have been finished for the retention period.
+    """
+
+    @abstractmethod
+    async def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+                      max_attempts: int = 3) -> str: ...
+
+    @abstractmethod
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]: ...
+
+    @abstractmethod
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float,
+                        progress: Optional[str] = None) -> bool: ...
+
+    @abstractmethod
+    async def complete(self, job_id: str, worker_id: str, progress: Optional[str] = None) -> None: ...
+
+    @abstractmethod
+    async def fail(self, job_id: str, worker_id: str, error: str, progress: Optional[str] = None) -> bool: ...
+
+    @abstractmethod
+    async def requeue(self, job_id: str, max_attempts: int, progress: Optional[str] = None,
+                      payload: Optional[Dict[str, Any]] = None) -> bool: ...
+
+    @abstractmethod
+    async def get_payload(self, job_id: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_progress(self, job_id: str) -> Optional[str]: ...
+
+    @abstractmethod
+    async def get_state(self, job_id: str) -> Optional[str]: ...
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]: ...
+
+
+class SQLiteJobQueue(JobQueue):
+    """Single-node JobQueue backed by a SQLite database in WAL mode"""
+
+    def __init__(self, path: str, retry_base_seconds: float = 5.0, retry_max_seconds: float = 300.0,
+                 secret_fields: Sequence[str] = ("github_token",), retention_seconds: Optional[float] = None):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        # SQL expression of the payload without its secrets
+        self._scrubbed = "json_remove(payload, {})".format(
+            ", ".join(f"'$.{field}'" for field in secret_fields)
+        ) if secret_fields else "payload"
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connect()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _init_schema(self) -> None:
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    available_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    wait_seconds REAL,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    last_error TEXT,
+                    progress TEXT
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (state, available_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+            # Finished jobs from before secrets were scrubbed
+            connection.execute(f"UPDATE jobs SET payload = {self._scrubbed} WHERE state IN ('done', 'dead')")
+        # Queued and running payloads hold credentials; keep the database private to this user
+        try:
+            os.chmod(self.path, 0o600)
+        except OSError:
+            pass
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+                      max_attempts: int = 3) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+
+        def _enqueue() -> None:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT INTO jobs (id, kind, payload, state, max_attempts, enqueued_at, available_at) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                    (job_id, kind, json.dumps(payload), max_attempts, now, now)
+                )
+
+        await asyncio.to_thread(_enqueue)
+        return job_id
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        def _claim() -> Optional[Job]:
+            now = time.time()
+            connection = self._connect()
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                # Lapsed leases on the last attempt are not retried; the job's progress reports it failed
+                connection.execute(
+                    f"UPDATE jobs SET state = 'dead', finished_at = ?, last_error = ?, lease_owner = NULL, "
+                    f"payload = {self._scrubbed}, lease_expires_at = NULL, progress = CASE WHEN progress IS NULL THEN NULL "
+                    "ELSE json_set(progress, '$.status', 'failed', '$.message', ?) END "
+                    "WHERE state = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                    (now, LEASE_EXPIRED_ERROR, f"AI dockerization failed: {LEASE_EXPIRED_ERROR}", now)
+                )
+                if self.retention_seconds is not None:
+                    # Finished jobs (and the analysis in their payload) are kept for the retention period only
+                    connection.execute(
+                        "DELETE FROM jobs WHERE state IN ('done', 'dead') AND finished_at < ?",
+                        (now - self.retention_seconds,)
+                    )
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE (state = 'queued' AND available_at <= ?) "
+                    "OR (state = 'running' AND lease_expires_at < ? AND attempts < max_attempts) "
+                    "ORDER BY available_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    connection.execute("COMMIT")
+                    return None
+                connection.execute(
+                    "UPDATE jobs SET state = 'running', attempts = attempts + 1, started_at = ?, "
+                    "wait_seconds = ? - available_at, lease_owner = ?, lease_expires_at = ? WHERE id = ?",
+                    (now, now, worker_id, now + lease_seconds, row["id"])
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            finally:
+                connection.close()
+            return Job(
+                id=row["id"],
+                kind=row["kind"],
+                payload=json.loads(row["payload"]),
+                attempts=row["attempts"] + 1,
+                max_attempts=row["max_attempts"],
+                enqueued_at=row["enqueued_at"],
+                lease_owner=worker_id,
+            )
+
+        return await asyncio.to_thread(_claim)
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float,
+                        progress: Optional[str] = None) -> bool:
+        def _heartbeat() -> bool:
+            with self._connection() as connection:
+                cursor = connection.execute(
+                    "UPDATE jobs SET lease_expires_at = ?, progress = COALESCE(?, progress) "
+                    "WHERE id = ? AND lease_owner = ? AND state = 'running'",
+                    (time.time() + lease_seconds, progress, job_id, worker_id)
+                )
+                return cursor.rowcount == 1
+
+        return await asyncio.to_thread(_heartbeat)
+
+    async def complete(self, job_id: str, worker_id: str, progress: Optional[str] = None) -> None:
+        def _complete() -> None:
+            with self._connection() as connection:
+                connection.execute(
+                    f"UPDATE jobs SET state = 'done', finished_at = ?, lease_expires_at = NULL, "
+                    f"payload = {self._scrubbed}, progress = COALESCE(?, progress) WHERE id = ? AND lease_owner = ?",
+                    (time.time(), progress, job_id, worker_id)
+                )
+
+        await asyncio.to_thread(_complete)
+
+    async def fail(self, job_id: str, worker_id: str, error: str, progress: Optional[str] = None) -> bool:
+        """Record a failed attempt; returns True if the job will be retried"""
+        def _fail() -> bool:
+            now = time.time()
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ?",
+                    (job_id, worker_id)
+                ).fetchone()
+                if row is None:
+                    return False
+                if row["attempts"] >= row["max_attempts"]:
+                    connection.execute(
+                        f"UPDATE jobs SET state = 'dead', finished_at = ?, last_error = ?, lease_expires_at = NULL, "
+                        f"payload = {self._scrubbed}, progress = COALESCE(?, progress) WHERE id = ?",
+                        (now, error, progress, job_id)
+                    )
+                    return False
+
+                backoff = min(self.retry_base_seconds * 2 ** (row["attempts"] - 1), self.retry_max_seconds)
+                connection.execute(
+                    "UPDATE jobs SET state = 'queued', available_at = ?, last_error = ?, lease_owner = NULL, "
+                    "lease_expires_at = NULL, progress = COALESCE(?, progress) WHERE id = ?",
+                    (now + backoff * random.uniform(0.8, 1.2), error, progress, job_id)
+                )
+                return True
+
+        return await asyncio.to_thread(_fail)
+
+    async def requeue(self, job_id: str, max_attempts: int, progress: Optional[str] = None,
+                      payload: Optional[Dict[str, Any]] = None) -> bool:
+        """Make a finished or dead job claimable again with a fresh attempt budget.
+
+        ``payload`` fields (e.g. the credentials scrubbed when it finished) are
+        merged into the stored payload.
+        """
+        def _requeue() -> bool:
+            now = time.time()
+            with self._connection() as connection:
+                cursor = connection.execute(
+                    "UPDATE jobs SET state = 'queued', attempts = 0, max_attempts = ?, available_at = ?, "
+                    "started_at = NULL, finished_at = NULL, last_error = NULL, lease_owner = NULL, "
+                    "lease_expires_at = NULL, progress = COALESCE(?, progress), "
+                    "payload = json_patch(payload, ?) "
+                    "WHERE id = ? AND state IN ('done', 'dead')",
+                    (max_attempts, now, progress, json.dumps(payload or {}), job_id)
+                )
+                return cursor.rowcount == 1
+
+        return await asyncio.to_thread(_requeue)
+
+    async def get_payload(self, job_id: str) -> Optional[Dict[str, Any]]:
+        def _get() -> Optional[Dict[str, Any]]:
+            with self._connection() as connection:
+                row = connection.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                return json.loads(row["payload"]) if row else None
+
+        return await asyncio.to_thread(_get)
+
+    async def get_progress(self, job_id: str) -> Optional[str]:
+        def _get() -> Optional[str]:
+            with self._connection() as connection:
+                row = connection.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                return row["progress"] if row else None
+
+        return await asyncio.to_thread(_get)
+
+    async def get_state(self, job_id: str) -> Optional[str]:
+        """Return ``queued``, ``running``, ``done`` or ``dead`` (None for unknown jobs)"""
+        def _get() -> Optional[str]:
+            with self._connection() as connection:
+                row = connection.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                return row["state"] if row else None
+
+        return await asyncio.to_thread(_get)
+
+    async def stats(self) -> Dict[str, Any]:
+        def _stats() -> Dict[str, Any]:
+            now = time.time()
+            with self._connection() as connection:
+                counts = {
+                    row["state"]: row["count"]
+                    for row in connection.execute("SELECT state, COUNT(*) AS count FROM jobs GROUP BY state")
+                }
+                oldest = connection.execute(
+                    "SELECT MIN(available_at) AS oldest FROM jobs WHERE state = 'queued' AND available_at <= ?",
+                    (now,)
+                ).fetchone()["oldest"]
+                waits = connection.execute(
+                    "SELECT AVG(wait_seconds) AS avg_wait, MAX(wait_seconds) AS max_wait FROM jobs "
+                    "WHERE started_at >= ?",
+                    (now - 3600,)
+                ).fetchone()
+            return {
+                "depth": counts.get("queued", 0),
+                "running": counts.get("running", 0),
+                "done": counts.get("done", 0),
+                "dead": counts.get("dead", 0),
+                "oldest_wait_seconds": round(now - oldest, 3) if oldest else 0.0,
+                "avg_wait_seconds_1h": round(waits["avg_wait"] or 0.0, 3),
+                "max_wait_seconds_1h": round(waits["max_wait"] or 0.0, 3),
+            }
+
+        return await asyncio.to_thread(_stats)
+
+
+def create_job_queue() -> JobQueue:
+    """Build the job queue from ``JOB_QUEUE_URL`` (only ``sqlite:///<path>`` is supported)"""
+    url = os.getenv("JOB_QUEUE_URL", "sqlite:///data/jobs.sqlite3")
+    retention_seconds = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))
+    if url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url[len("sqlite:///"):], retention_seconds=retention_seconds or None)
+    raise ValueError(f"Unsupported JOB_QUEUE_URL: {url}")
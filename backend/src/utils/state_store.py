@@ -0,0 +1,630 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..models import AnalysisResponse, DockerizationStatus, TaskStatus
+from ..services import AnalysisCache, BoundedCache, create_analysis_cache, create_task_status_store
+from ..services.analysis_cache import _env_int
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+FINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+# Fields ``update_status`` may replace; timings are only ever merged
+UPDATABLE_FIELDS = ("status", "message", "progress", "pr_url", "timestamp", "artifacts")
+# Analyses are immutable, so shared stores keep recently used ones in process
+LOCAL_ANALYSES = 256
+# Runs the JSON-encoded commands in ARGV[1] only while the status hash KEYS[1]
+# exists, so an update racing expiry or deletion cannot leave a partial status
+UPDATE_STATUS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for _, command in ipairs(cjson.decode(ARGV[1])) do
+    redis.call(unpack(command))
+end
+return 1
+"""
+
+
+class StateStoreError(Exception):
+    """Raised when a state store backend rejects a command"""
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _check_fields(fields: Dict[str, Any]) -> None:
+    unknown = set(fields) - set(UPDATABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot update status fields: {', '.join(sorted(unknown))}")
+
+
+class StateStore(ABC):
+    """Analyses and dockerization task statuses shared by API and worker processes.
+
+    ``/dockerize`` and ``/status`` only work across uvicorn workers and replicas
+    when every process uses a shared backend (SQLite on one host, a
+    Redis-compatible server across hosts); the in-memory backend is private to
+    its process.
+
+    ``update_status`` replaces the given fields, appends ``artifacts`` and
+    merges ``timings`` in one atomic write, so a progress report never
+    reserializes the whole status and concurrent writers of different fields
+    do not overwrite each other. Analyses are immutable once stored.
+    """
+
+    # Whether other processes see what this store holds
+    shared = False
+
+    @abstractmethod
+    async def get_analysis(self, analysis_id: str) -> Optional[AnalysisResponse]: ...
+
+    @abstractmethod
+    async def put_analysis(self, analysis: AnalysisResponse, owner: str, repo: str,
+                           commit_sha: Optional[str] = None) -> None: ...
+
+    @abstractmethod
+    async def lookup_analysis(self, owner: str, repo: str, commit_sha: Optional[str]) -> Optional[AnalysisResponse]: ...
+
+    @abstractmethod
+    async def latest_analysis(self, owner: str, repo: str) -> Optional[AnalysisResponse]: ...
+
+    @abstractmethod
+    async def analysis_ids(self) -> List[str]: ...
+
+    @abstractmethod
+    async def get_status(self, task_id: str) -> Optional[DockerizationStatus]: ...
+
+    @abstractmethod
+    async def put_status(self, status: DockerizationStatus) -> None: ...
+
+    @abstractmethod
+    async def update_status(self, task_id: str, fields: Optional[Dict[str, Any]] = None,
+                            artifacts: Sequence[str] = (), timings: Optional[Dict[str, float]] = None) -> None: ...
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]: ...
+
+    async def close(self) -> None:
+        """Release connections held by the backend"""
+
+
+class MemoryStateStore(StateStore):
+    """StateStore on the bounded in-process caches (the default, for a single process)"""
+
+    def __init__(self, analyses: Optional[AnalysisCache] = None,
+                 statuses: Optional[BoundedCache[DockerizationStatus]] = None):
+        self.analyses = analyses if analyses is not None else create_analysis_cache()
+        self.statuses = statuses if statuses is not None else create_task_status_store()
+
+    async def get_analysis(self, analysis_id: str) -> Optional[AnalysisResponse]:
+        return self.analyses.get(analysis_id)
+
+    async def put_analysis(self, analysis: AnalysisResponse, owner: str, repo: str,
+                           commit_sha: Optional[str] = None) -> None:
+        self.analyses.put(analysis, owner, repo, commit_sha)
+
+    async def lookup_analysis(self, owner: str, repo: str, commit_sha: Optional[str]) -> Optional[AnalysisResponse]:
+        return self.analyses.lookup(owner, repo, commit_sha)
+
+    async def latest_analysis(self, owner: str, repo: str) -> Optional[AnalysisResponse]:
+        return self.analyses.latest(owner, repo)
+
+    async def analysis_ids(self) -> List[str]:
+        return self.analyses.keys()
+
+    async def get_status(self, task_id: str) -> Optional[DockerizationStatus]:
+        # Copies, so callers see the same snapshot semantics as with shared backends
+        status = self.statuses.get(task_id)
+        return status.model_copy(deep=True) if status is not None else None
+
+    async def put_status(self, status: DockerizationStatus) -> None:
+        self.statuses[status.task_id] = status.model_copy(deep=True)
+
+    async def update_status(self, task_id: str, fields: Optional[Dict[str, Any]] = None,
+                            artifacts: Sequence[str] = (), timings: Optional[Dict[str, float]] = None) -> None:
+        fields = fields or {}
+        _check_fields(fields)
+        status = self.statuses.get(task_id)
+        if status is None:
+            return
+        for name, value in fields.items():
+            setattr(status, name, list(value) if name == "artifacts" else value)
+        status.artifacts.extend(artifacts)
+        status.timings.update(timings or {})
+        # Re-set so the size is re-measured and a final status restarts the TTL
+        self.statuses[task_id] = status
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "analyses": self.analyses.stats(), "task_status": self.statuses.stats()}
+
+
+class SQLiteStateStore(StateStore):
+    """StateStore in a SQLite database in WAL mode, shared by the processes of one host.
+
+    Status fields are columns; ``artifacts`` and ``timings`` are JSON columns
+    updated in place with ``json_insert``/``json_patch``, so every update is a
+    single ``UPDATE`` of the changed columns. Analyses are pruned by TTL and,
+    oldest first, down to ``analysis_max_bytes``.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, analysis_ttl_seconds: Optional[float] = None,
+                 status_ttl_seconds: Optional[float] = None, analysis_max_bytes: Optional[int] = None):
+        self.path = path
+        self.analysis_ttl_seconds = analysis_ttl_seconds
+        self.analysis_max_bytes = analysis_max_bytes
+        self.status_ttl_seconds = status_ttl_seconds
+        self.local_analyses: BoundedCache[AnalysisResponse] = BoundedCache(
+            max_entries=LOCAL_ANALYSES, ttl_seconds=analysis_ttl_seconds
+        )
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connect()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _init_schema(self) -> None:
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    analysis_id TEXT PRIMARY KEY,
+                    analysis TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_index (
+                    content_key TEXT PRIMARY KEY,
+                    analysis_id TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS task_status (
+                    task_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    progress INTEGER NOT NULL,
+                    pr_url TEXT,
+                    artifacts TEXT NOT NULL DEFAULT '[]',
+                    timings TEXT NOT NULL DEFAULT '{}',
+                    timestamp TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS task_status_finished ON task_status (status, updated_at)"
+            )
+
+    def _oldest_live(self, ttl_seconds: Optional[float]) -> float:
+        return time.time() - ttl_seconds if ttl_seconds is not None else 0.0
+
+    async def get_analysis(self, analysis_id: str) -> Optional[AnalysisResponse]:
+        analysis = self.local_analyses.get(analysis_id)
+        if analysis is not None:
+            return analysis
+
+        def _get() -> Optional[str]:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT analysis FROM analyses WHERE analysis_id = ? AND stored_at >= ?",
+                    (analysis_id, self._oldest_live(self.analysis_ttl_seconds))
+                ).fetchone()
+            return row["analysis"] if row else None
+
+        raw = await asyncio.to_thread(_get)
+        if raw is None:
+            return None
+        analysis = AnalysisResponse.model_validate_json(raw)
+        self.local_analyses[analysis_id] = analysis
+        return analysis
+
+    async def put_analysis(self, analysis: AnalysisResponse, owner: str, repo: str,
+                           commit_sha: Optional[str] = None) -> None:
+        raw = analysis.model_dump_json()
+
+        def _put() -> None:
+            now = time.time()
+            oldest = self._oldest_live(self.analysis_ttl_seconds)
+            with self._connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT OR REPLACE INTO analyses (analysis_id, analysis, stored_at) VALUES (?, ?, ?)",
+                    (analysis.analysis_id, raw, now)
+                )
+                if commit_sha:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO analysis_index (content_key, analysis_id, stored_at) VALUES (?, ?, ?)",
+                        [
+                            (AnalysisCache.content_key(owner, repo, commit_sha), analysis.analysis_id, now),
+                            (AnalysisCache.repo_key(owner, repo), analysis.analysis_id, now),
+                        ]
+                    )
+                connection.execute("DELETE FROM analyses WHERE stored_at < ?", (oldest,))
+                connection.execute("DELETE FROM analysis_index WHERE stored_at < ?", (oldest,))
+                if self.analysis_max_bytes is not None:
+                    self._evict_analyses(connection)
+                connection.execute("COMMIT")
+
+        await asyncio.to_thread(_put)
+        self.local_analyses[analysis.analysis_id] = analysis
+
+    def _evict_analyses(self, connection: sqlite3.Connection) -> None:
+        # Oldest analyses beyond the byte budget go first, with their index entries
+        evicted = connection.execute("""
+            DELETE FROM analyses WHERE analysis_id IN (
+                SELECT analysis_id FROM (
+                    SELECT analysis_id, SUM(length(CAST(analysis AS BLOB)))
+                        OVER (ORDER BY stored_at DESC, analysis_id) AS kept_bytes
+                    FROM analyses
+                ) WHERE kept_bytes > ?
+            )
+        """, (self.analysis_max_bytes,)).rowcount
+        if evicted:
+            connection.execute("DELETE FROM analysis_index WHERE analysis_id NOT IN (SELECT analysis_id FROM analyses)")
+
+    async def lookup_analysis(self, owner: str, repo: str, commit_sha: Optional[str]) -> Optional[AnalysisResponse]:
+        """Return the stored analysis for this exact repository revision, if any"""
+        if not commit_sha:
+            return None
+        return await self._indexed(AnalysisCache.content_key(owner, repo, commit_sha))
+
+    async def latest_analysis(self, owner: str, repo: str) -> Optional[AnalysisResponse]:
+        return await self._indexed(AnalysisCache.repo_key(owner, repo))
+
+    async def _indexed(self, key: str) -> Optional[AnalysisResponse]:
+        def _lookup() -> Optional[str]:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT analysis_id FROM analysis_index WHERE content_key = ? AND stored_at >= ?",
+                    (key, self._oldest_live(self.analysis_ttl_seconds))
+                ).fetchone()
+            return row["analysis_id"] if row else None
+
+        analysis_id = await asyncio.to_thread(_lookup)
+        return await self.get_analysis(analysis_id) if analysis_id else None
+
+    async def analysis_ids(self) -> List[str]:
+        def _ids() -> List[str]:
+            with self._connection() as connection:
+                rows = connection.execute(
+                    "SELECT analysis_id FROM analyses WHERE stored_at >= ? ORDER BY stored_at",
+                    (self._oldest_live(self.analysis_ttl_seconds),)
+                ).fetchall()
+            return [row["analysis_id"] for row in rows]
+
+        return await asyncio.to_thread(_ids)
+
+    async def get_status(self, task_id: str) -> Optional[DockerizationStatus]:
+        def _get() -> Optional[sqlite3.Row]:
+            with self._connection() as connection:
+                return connection.execute("SELECT * FROM task_status WHERE task_id = ?", (task_id,)).fetchone()
+
+        row = await asyncio.to_thread(_get)
+        if row is None:
+            return None
+        status = dict(row)
+        status.pop("updated_at")
+        status["artifacts"] = json.loads(status["artifacts"])
+        status["timings"] = json.loads(status["timings"])
+        return DockerizationStatus.model_validate(status)
+
+    async def put_status(self, status: DockerizationStatus) -> None:
+        def _put() -> None:
+            now = time.time()
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO task_status "
+                    "(task_id, status, message, progress, pr_url, artifacts, timings, timestamp, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        status.task_id, status.status.value, status.message, status.progress, status.pr_url,
+                        json.dumps(status.artifacts), json.dumps(status.timings), status.timestamp.isoformat(), now
+                    )
+                )
+                # Finished statuses are retained for the status TTL
+                connection.execute(
+                    "DELETE FROM task_status WHERE status IN (?, ?) AND updated_at < ?",
+                    (*(final.value for final in FINAL_STATUSES), self._oldest_live(self.status_ttl_seconds))
+                )
+
+        await asyncio.to_thread(_put)
+
+    async def update_status(self, task_id: str, fields: Optional[Dict[str, Any]] = None,
+                            artifacts: Sequence[str] = (), timings: Optional[Dict[str, float]] = None) -> None:
+        fields = dict(fields or {})
+        _check_fields(fields)
+        assignments: List[str] = []
+        params: List[Any] = []
+        if "artifacts" in fields:
+            # A replaced list already carries the appended artifacts
+            assignments.append("artifacts = ?")
+            params.append(json.dumps(list(fields.pop("artifacts")) + list(artifacts)))
+        elif artifacts:
+            assignments.append(f"artifacts = json_insert(artifacts{', ?, ?' * len(artifacts)})")
+            for artifact in artifacts:
+                params.extend(("$[#]", artifact))
+        for name, value in fields.items():
+            assignments.append(f"{name} = ?")
+            params.append(_encode(value))
+        if timings:
+            assignments.append("timings = json_patch(timings, ?)")
+            params.append(json.dumps(timings))
+        if not assignments:
+            return
+        assignments.append("updated_at = ?")
+        params.extend((time.time(), task_id))
+
+        def _update() -> None:
+            with self._connection() as connection:
+                connection.execute(f"UPDATE task_status SET {', '.join(assignments)} WHERE task_id = ?", params)
+
+        await asyncio.to_thread(_update)
+
+    async def stats(self) -> Dict[str, Any]:
+        def _stats() -> Dict[str, Any]:
+            with self._connection() as connection:
+                analyses = connection.execute("SELECT COUNT(*) AS count FROM analyses").fetchone()["count"]
+                statuses = {
+                    row["status"]: row["count"]
+                    for row in connection.execute("SELECT status, COUNT(*) AS count FROM task_status GROUP BY status")
+                }
+            return {"analyses": analyses, "task_status": statuses}
+
+        return {"backend": "sqlite", **(await asyncio.to_thread(_stats)), "local_analyses": self.local_analyses.stats()}
+
+
+class KVStateStore(StateStore):
+    """StateStore on a Redis-compatible key-value server, shared across hosts.
+
+    Commands go through redis-py's asyncio client and its connection pool.
+    A status is a hash of its fields (stage timings as ``timing:<stage>``)
+    plus a list of artifacts. Every update is one script call running the
+    ``HSET``/``RPUSH`` commands for the changed fields only, and only while
+    the status exists. Finished statuses and analyses expire after their TTLs.
+    Nothing else bounds them here: the server's ``maxmemory`` with a
+    ``volatile-*`` policy evicts only keys with a TTL, never running statuses.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        client: "Redis",
+        prefix: str = "devops-agent:",
+        analysis_ttl_seconds: Optional[int] = None,
+        status_ttl_seconds: Optional[int] = None,
+    ):
+        self.redis = client
+        self._update_status_script = client.register_script(UPDATE_STATUS_SCRIPT)
+        self.prefix = prefix
+        self.analysis_ttl_seconds = analysis_ttl_seconds
+        self.status_ttl_seconds = status_ttl_seconds
+        self.local_analyses: BoundedCache[AnalysisResponse] = BoundedCache(
+            max_entries=LOCAL_ANALYSES, ttl_seconds=analysis_ttl_seconds
+        )
+        self.commands = 0
+        self.round_trips = 0
+
+    @classmethod
+    def from_url(cls, url: str, max_connections: Optional[int] = None, **kwargs) -> "KVStateStore":
+        """``redis://[:password@]host[:port][/db]`` (or ``rediss://`` for TLS)"""
+        # redis is imported only when a KV store is configured
+        from redis.asyncio import Redis
+
+        # RESP2 unless the URL asks otherwise: not every compatible server speaks HELLO
+        client = Redis.from_url(url, decode_responses=True, protocol=2, max_connections=max_connections)
+        return cls(client, **kwargs)
+
+    # Keys
+
+    def _analysis_key(self, analysis_id: str) -> str:
+        return f"{self.prefix}analysis:{analysis_id}"
+
+    def _index_key(self, key: str) -> str:
+        return f"{self.prefix}analysis-index:{key}"
+
+    def _status_keys(self, task_id: str) -> Tuple[str, str]:
+        return f"{self.prefix}status:{task_id}", f"{self.prefix}status:{task_id}:artifacts"
+
+    # Commands
+
+    async def _execute(self, *commands: Sequence[Any], transaction: bool = False) -> List[Any]:
+        """Send the commands in one pipeline, atomically with ``transaction``"""
+        from redis.exceptions import ResponseError
+
+        async with self.redis.pipeline(transaction=transaction) as pipe:
+            for command in commands:
+                pipe.execute_command(*command)
+            try:
+                replies = await pipe.execute()
+            except ResponseError as e:
+                raise StateStoreError(str(e))
+        self.commands += len(commands)
+        self.round_trips += 1
+        return replies
+
+    async def _transaction(self, *commands: Sequence[Any]) -> List[Any]:
+        """Run the commands atomically; returns their replies"""
+        return await self._execute(*commands, transaction=True)
+
+    # Analyses
+
+    async def get_analysis(self, analysis_id: str) -> Optional[AnalysisResponse]:
+        analysis = self.local_analyses.get(analysis_id)
+        if analysis is not None:
+            return analysis
+        raw = (await self._execute(("GET", self._analysis_key(analysis_id))))[0]
+        if raw is None:
+            return None
+        analysis = AnalysisResponse.model_validate_json(raw)
+        self.local_analyses[analysis_id] = analysis
+        return analysis
+
+    async def put_analysis(self, analysis: AnalysisResponse, owner: str, repo: str,
+                           commit_sha: Optional[str] = None) -> None:
+        expiry = ("EX", self.analysis_ttl_seconds) if self.analysis_ttl_seconds else ()
+        commands = [("SET", self._analysis_key(analysis.analysis_id), analysis.model_dump_json(), *expiry)]
+        if commit_sha:
+            for key in (AnalysisCache.content_key(owner, repo, commit_sha), AnalysisCache.repo_key(owner, repo)):
+                commands.append(("SET", self._index_key(key), analysis.analysis_id, *expiry))
+        await self._transaction(*commands)
+        self.local_analyses[analysis.analysis_id] = analysis
+
+    async def lookup_analysis(self, owner: str, repo: str, commit_sha: Optional[str]) -> Optional[AnalysisResponse]:
+        """Return the stored analysis for this exact repository revision, if any"""
+        if not commit_sha:
+            return None
+        return await self._indexed(AnalysisCache.content_key(owner, repo, commit_sha))
+
+    async def latest_analysis(self, owner: str, repo: str) -> Optional[AnalysisResponse]:
+        return await self._indexed(AnalysisCache.repo_key(owner, repo))
+
+    async def _indexed(self, key: str) -> Optional[AnalysisResponse]:
+        analysis_id = (await self._execute(("GET", self._index_key(key))))[0]
+        return await self.get_analysis(analysis_id) if analysis_id else None
+
+    async def analysis_ids(self) -> List[str]:
+        pattern = self._analysis_key("*")
+        return [key[len(pattern) - 1:] async for key in self.redis.scan_iter(match=pattern, count=500)]
+
+    # Statuses
+
+    def _expiry(self, status: Any, keys: Tuple[str, str]) -> List[Tuple[Any, ...]]:
+        """Finished statuses expire; a status that is running again is kept"""
+        if TaskStatus(status) in FINAL_STATUSES:
+            return [("EXPIRE", key, self.status_ttl_seconds) for key in keys] if self.status_ttl_seconds else []
+        return [("PERSIST", key) for key in keys]
+
+    async def get_status(self, task_id: str) -> Optional[DockerizationStatus]:
+        status_key, artifacts_key = self._status_keys(task_id)
+        fields, artifacts = await self._transaction(("HGETALL", status_key), ("LRANGE", artifacts_key, 0, -1))
+        if not fields:
+            return None
+        status: Dict[str, Any] = {"task_id": task_id, "artifacts": artifacts, "timings": {}}
+        for name, value in fields.items():
+            if name.startswith("timing:"):
+                status["timings"][name[len("timing:"):]] = float(value)
+            else:
+                status[name] = value
+        return DockerizationStatus.model_validate(status)
+
+    async def put_status(self, status: DockerizationStatus) -> None:
+        keys = self._status_keys(status.task_id)
+        values = {
+            "status": status.status.value,
+            "message": status.message,
+            "progress": status.progress,
+            "timestamp": status.timestamp.isoformat(),
+            **({"pr_url": status.pr_url} if status.pr_url is not None else {}),
+            **{f"timing:{stage}": seconds for stage, seconds in status.timings.items()},
+        }
+        commands: List[Tuple[Any, ...]] = [("DEL", *keys), ("HSET", keys[0], *_flatten(values))]
+        if status.artifacts:
+            commands.append(("RPUSH", keys[1], *status.artifacts))
+        await self._transaction(*commands, *self._expiry(status.status, keys))
+
+    async def update_status(self, task_id: str, fields: Optional[Dict[str, Any]] = None,
+                            artifacts: Sequence[str] = (), timings: Optional[Dict[str, float]] = None) -> None:
+        fields = dict(fields or {})
+        _check_fields(fields)
+        keys = self._status_keys(task_id)
+        commands: List[Tuple[Any, ...]] = []
+        if "artifacts" in fields:
+            commands.append(("DEL", keys[1]))
+            artifacts = list(fields.pop("artifacts")) + list(artifacts)
+        if artifacts:
+            commands.append(("RPUSH", keys[1], *artifacts))
+        values = {name: _encode(value) for name, value in fields.items() if value is not None}
+        values.update({f"timing:{stage}": seconds for stage, seconds in (timings or {}).items()})
+        if values:
+            commands.append(("HSET", keys[0], *_flatten(values)))
+        cleared = [name for name, value in fields.items() if value is None]
+        if cleared:
+            commands.append(("HDEL", keys[0], *cleared))
+        if "status" in fields:
+            commands.extend(self._expiry(fields["status"], keys))
+        if not commands:
+            return
+        from redis.exceptions import ResponseError
+
+        try:
+            await self._update_status_script(keys=list(keys), args=[json.dumps(commands)])
+        except ResponseError as e:
+            raise StateStoreError(str(e))
+        self.commands += len(commands)
+        self.round_trips += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        connection = self.redis.connection_pool.connection_kwargs
+        return {
+            "backend": "kv",
+            "server": f"{connection.get('host')}:{connection.get('port')}/{connection.get('db', 0)}",
+            "commands": self.commands,
+            "round_trips": self.round_trips,
+            "local_analyses": self.local_analyses.stats(),
+        }
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+def _flatten(values: Dict[str, Any]) -> List[Any]:
+    return [item for pair in values.items() for item in pair]
+
+
+def create_state_store() -> StateStore:
+    """Build the state store from ``STATE_STORE_URL``.
+
+    ``memory://`` (default, per process), ``sqlite:///<path>`` (processes on
+    one host) or ``redis://[:password@]host[:port][/db]`` (any Redis-compatible
+    server, for replicas across hosts; ``rediss://`` for TLS).
+    """
+    url = os.getenv("STATE_STORE_URL", "memory://")
+    analysis_ttl = _env_int("ANALYSIS_CACHE_TTL_SECONDS", 24 * 60 * 60)
+    status_ttl = _env_int("TASK_STATUS_TTL_SECONDS", 24 * 60 * 60)
+    if url == "memory://":
+        return MemoryStateStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStateStore(
+            url[len("sqlite:///"):],
+            analysis_ttl_seconds=analysis_ttl,
+            status_ttl_seconds=status_ttl,
+            analysis_max_bytes=_env_int("ANALYSIS_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+        )
+    if url.startswith(("redis://", "rediss://")):
+        return KVStateStore.from_url(
+            url,
+            prefix=os.getenv("STATE_STORE_PREFIX", "devops-agent:"),
+            analysis_ttl_seconds=analysis_ttl,
+            status_ttl_seconds=status_ttl,
+        )
+    raise ValueError(f"Unsupported STATE_STORE_URL: {url}")
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from ..models import AnalysisResponse, DockerizationStatus, TaskStatus
+from ..services import task_events
+from .background_tasks import dockerize_repository_task, report
+from .checkpoints import CheckpointStore
+from .job_queue import Job, JobQueue
+from .state_store import MemoryStateStore, StateStore
+
+logger = logging.getLogger(__name__)
+
+DOCKERIZE_JOB = "dockerize"
+
+
+class DockerizationWorkerPool:
+    """Async workers that consume dockerization jobs from a JobQueue.
+
+    Each job runs ``dockerize_repository_task``, checkpointing its stages in
+    ``checkpoints`` so a retried job continues where it failed. Statuses are
+    written to ``state``: the API's store when the pool runs in-process, or a
+    shared store (``STATE_STORE_URL``) in standalone worker processes. Progress
+    is also published through the queue with every heartbeat, for API
+    processes that cannot see the worker's store.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 2,
+        state: Optional[StateStore] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+        lease_seconds: float = 60.0,
+        heartbeat_seconds: float = 15.0,
+        poll_seconds: float = 1.0,
+        shutdown_grace_seconds: float = 30.0,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.state = state if state is not None else MemoryStateStore()
+        self.checkpoints = checkpoints
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.shutdown_grace_seconds = shutdown_grace_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._workers: list = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.leases_lost = 0
+
+    @classmethod
+    def from_env(cls, queue: JobQueue, **kwargs) -> "DockerizationWorkerPool":
+        return cls(
+            queue,
+            concurrency=int(os.getenv("DOCKERIZE_WORKERS", "2")),
+            lease_seconds=float(os.getenv("DOCKERIZE_LEASE_SECONDS", "60")),
+            **kwargs
+        )
+
+    def start(self) -> None:
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._work(slot)) for slot in range(self.concurrency)]
+
+    def is_running(self, task_id: str) -> bool:
+        """Whether the task's job is running in this process"""
+        return task_id in self._running
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was enqueued in this process"""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop claiming jobs and give in-flight jobs a grace period before cancelling them.
+
+        Cancelled jobs keep their lease until it lapses and are then re-claimed.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._running:
+            await asyncio.wait(list(self._running.values()), timeout=self.shutdown_grace_seconds)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "busy": len(self._running),
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "leases_lost": self.leases_lost,
+        }
+
+    # Internals
+
+    async def _work(self, slot: int) -> None:
+        worker_id = f"{self.worker_id}:{slot}"
+        while not self._stopping:
+            try:
+                job = await self.queue.claim(worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("Failed to claim job")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            run = asyncio.create_task(self._run(job, worker_id))
+            self._running[job.id] = run
+            try:
+                await asyncio.shield(run)
+            except asyncio.CancelledError:
+                # Only the pool itself stopping ends the worker; a job cancelled
+                # after losing its lease just frees the slot
+                if asyncio.current_task().cancelling():
+                    run.cancel()
+                    raise
+            except Exception as e:
+                logger.exception("Job %s crashed", job.id)
+                try:
+                    if not await self.queue.fail(job.id, worker_id, str(e)):
+                        task_events.close(job.id)
+                except Exception:
+                    logger.exception("Failed to record failure of job %s", job.id)
+            finally:
+                self._running.pop(job.id, None)
+
+    async def _run(self, job: Job, worker_id: str) -> None:
+        payload = job.payload
+        task_id = payload["task_id"]
+        analysis_id = payload["analysis_id"]
+
+        status = await self.state.get_status(task_id)
+        if status is None:
+            status = DockerizationStatus(
+                task_id=task_id,
+                status=TaskStatus.PENDING,
+                message="AI dockerization task queued",
+                progress=0,
+                timestamp=datetime.now()
+            )
+            await self.state.put_status(status)
+        if job.attempts > 1:
+            await report(
+                self.state, status,
+                status=TaskStatus.PENDING,
+                message=f"Retrying AI dockerization (attempt {job.attempts}/{job.max_attempts})"
+            )
+
+        analysis = await self.state.get_analysis(analysis_id)
+        if analysis is None:
+            analysis = AnalysisResponse.model_validate(payload["analysis"])
+
+        task = asyncio.current_task()
+        heartbeat = asyncio.create_task(self._heartbeat(job, worker_id, status, task))
+        forwarder = asyncio.create_task(self._forward_progress(job, worker_id))
+        try:
+            await dockerize_repository_task(
+                status,
+                payload["repo_url"],
+                payload["github_token"],
+                os.getenv("OPENAI_API_KEY"),
+                analysis,
+                self.state,
+                bypass_artifact_cache=payload.get("bypass_artifact_cache", False),
+                checkpoints=self.checkpoints
+            )
+        finally:
+            heartbeat.cancel()
+            forwarder.cancel()
+
+        if status.status == TaskStatus.FAILED:
+            self.failed += 1
+            if job.attempts < job.max_attempts:
+                self.retried += 1
+                await report(
+                    self.state, status, status=TaskStatus.PENDING, message=f"{status.message} (retry scheduled)"
+                )
+            if not await self.queue.fail(job.id, worker_id, status.message, status.model_dump_json()):
+                task_events.close(task_id)
+        else:
+            self.processed += 1
+            await self.queue.complete(job.id, worker_id, status.model_dump_json())
+            task_events.close(task_id)
+            # A completed task is never resumed; its stage outputs are in the pull request
+            if self.checkpoints is not None:
+                await self.checkpoints.clear(task_id)
+
+    async def _forward_progress(self, job: Job, worker_id: str) -> None:
+        """Persist each published transition so other processes see it without waiting for a heartbeat"""
+        async for event in task_events.subscribe(job.id, task_events.last_event_id(job.id)):
+            try:
+                await self.queue.heartbeat(job.id, worker_id, self.lease_seconds, event.data)
+            except Exception:
+                logger.exception("Failed to persist progress of job %s", job.id)
+
+    async def _heartbeat(self, job: Job, worker_id: str, status: DockerizationStatus, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                still_owner = await self.queue.heartbeat(job.id, worker_id, self.lease_seconds, status.model_dump_json())
+            except Exception:
+                logger.exception("Heartbeat for job %s failed", job.id)
+                continue
+            if not still_owner:
+                # Another worker re-claimed the job; stop rather than run it twice
+                self.leases_lost += 1
+                logger.warning("Lost lease on job %s; cancelling", job.id)
+                task.cancel()
+                return
+
+
+async def relay_queue_progress(
+    queue: JobQueue,
+    task_id: str,
+    poll_seconds: float = 1.0,
+    running_here: Optional[Callable[[str], bool]] = None
+) -> None:
+    """Publish the progress of a job run by another process onto the local event bus.
+
+    Runs until the job is finished or the task has no subscribers left. Stops
+    as soon as ``running_here`` reports that a worker of this process claimed
+    the job: that worker publishes directly, and the queue's copy of its
+    progress lags behind and would replay older states.
+    """
+    last_progress = None
+    while True:
+        if running_here is not None and running_here(task_id):
+            return
+        state = await queue.get_state(task_id)
+        progress = await queue.get_progress(task_id)
+        if progress and progress != last_progress:
+            last_progress = progress
+            task_events.publish(DockerizationStatus.model_validate_json(progress))
+        if state in (None, "done", "dead"):
+            task_events.close(task_id)
+            return
+        await asyncio.sleep(poll_seconds)
+        if not task_events.subscribers(task_id):
+            return
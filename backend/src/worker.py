@@ -0,0 +1,80 @@
+"""Standalone dockerization workers.
+
+Run alongside the API (started with ``DOCKERIZE_WORKERS=0``) to process the
+job queue in separate processes:
+
+    python -m src.worker --processes 2 --concurrency 4
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+from dotenv import load_dotenv
+
+# Before the services read their configuration at import
+load_dotenv()
+
+from .services import llm_clients, mcp_pool, startup_warmup
+from .utils import DockerizationWorkerPool, create_checkpoint_store, create_job_queue, create_state_store
+
+logger = logging.getLogger(__name__)
+
+
+async def serve(concurrency: int) -> None:
+    """Process jobs until SIGINT/SIGTERM, then drain in-flight jobs"""
+    state = create_state_store()
+    pool = DockerizationWorkerPool.from_env(create_job_queue(), state=state, checkpoints=create_checkpoint_store())
+    pool.concurrency = concurrency
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    if startup_warmup.enabled:
+        await startup_warmup.run()
+    pool.start()
+    logger.info("Worker %s started with concurrency %d", pool.worker_id, concurrency)
+    try:
+        await stop.wait()
+    finally:
+        await pool.stop()
+        await state.close()
+        await mcp_pool.close()
+        await llm_clients.close()
+
+
+def run_process(concurrency: int) -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(concurrency))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run dockerization queue workers")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to start")
+    parser.add_argument("--concurrency", type=int, default=2, help="concurrent jobs per process")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_process(args.concurrency)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_process, args=(args.concurrency,), daemon=False)
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Children receive the same SIGINT and drain on their own
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+A Redis-compatible KV server for ``KVStateStore`` tests and the load benchmark.
+
+Speaks enough of the Redis protocol for the state store, including MULTI/EXEC
+transactions, key expiry and its status update script. ``benchmarks.fakes``
+serves it with ``--kv-port``.
+"""
+import fnmatch
+import hashlib
+import json
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class _Simple(str):
+    """A RESP simple string reply such as OK"""
+
+
+class FakeKV:
+    """In-memory subset of Redis: strings, hashes and lists with expiry"""
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+        self.scripts: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key: str) -> bool:
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _get(self, key: str, kind: type) -> Any:
+        if not self._live(key):
+            return None
+        value = self.data[key]
+        if not isinstance(value, kind):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _run_script(self, keys: List[str], args: List[str]) -> int:
+        # Lua is not interpreted: every script is taken to be the state store's
+        # status update, which runs the JSON-encoded commands while KEYS[1] exists
+        if not self._live(keys[0]):
+            return 0
+        for command in json.loads(args[0]):
+            self.execute(command[0].upper(), [str(arg) for arg in command[1:]])
+        return 1
+
+    def execute(self, command: str, args: List[str]) -> Any:
+        if command in ("PING", "SELECT", "AUTH"):
+            return _Simple("PONG" if command == "PING" else "OK")
+        if command == "GET":
+            return self._get(args[0], str)
+        if command == "SET":
+            self.data[args[0]] = args[1]
+            self.expires.pop(args[0], None)
+            if len(args) >= 4 and args[2].upper() == "EX":
+                self.expires[args[0]] = time.time() + int(args[3])
+            return _Simple("OK")
+        if command == "DEL":
+            removed = [key for key in args if self._live(key)]
+            for key in removed:
+                self.data.pop(key)
+                self.expires.pop(key, None)
+            return len(removed)
+        if command == "EXISTS":
+            return sum(self._live(key) for key in args)
+        if command == "EXPIRE":
+            if not self._live(args[0]):
+                return 0
+            self.expires[args[0]] = time.time() + int(args[1])
+            return 1
+        if command == "PERSIST":
+            return int(self._live(args[0]) and self.expires.pop(args[0], None) is not None)
+        if command == "HSET":
+            values = self._get(args[0], dict)
+            if values is None:
+                values = self.data[args[0]] = {}
+            added = sum(field not in values for field in args[1::2])
+            values.update(zip(args[1::2], args[2::2]))
+            return added
+        if command == "HDEL":
+            values = self._get(args[0], dict) or {}
+            return sum(values.pop(field, None) is not None for field in args[1:])
+        if command == "HGETALL":
+            values = self._get(args[0], dict) or {}
+            return [item for pair in values.items() for item in pair]
+        if command == "RPUSH":
+            items = self._get(args[0], list)
+            if items is None:
+                items = self.data[args[0]] = []
+            items.extend(args[1:])
+            return len(items)
+        if command == "LRANGE":
+            items = self._get(args[0], list) or []
+            start, stop = int(args[1]), int(args[2])
+            return items[start:None if stop == -1 else stop + 1]
+        if command == "SCAN":
+            pattern = args[args.index("MATCH") + 1] if "MATCH" in args else "*"
+            return ["0", [key for key in list(self.data) if fnmatch.fnmatchcase(key, pattern) and self._live(key)]]
+        if command == "SCRIPT" and args[0].upper() == "LOAD":
+            sha = hashlib.sha1(args[1].encode("utf-8")).hexdigest()
+            self.scripts[sha] = args[1]
+            return sha
+        if command in ("EVAL", "EVALSHA"):
+            if command == "EVALSHA" and args[0] not in self.scripts:
+                raise ValueError("NOSCRIPT No matching script")
+            return self._run_script(args[2:2 + int(args[1])], args[2 + int(args[1]):])
+        if command == "DBSIZE":
+            return sum(self._live(key) for key in list(self.data))
+        if command == "FLUSHDB":
+            self.data.clear()
+            self.expires.clear()
+            return _Simple("OK")
+        raise ValueError(f"ERR unknown command '{command}'")
+
+
+def _resp(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        message = str(value)
+        return f"-{message if message.split(' ', 1)[0].isupper() else 'ERR ' + message}\r\n".encode()
+    if isinstance(value, bool) or isinstance(value, int):
+        return f":{int(value)}\r\n".encode()
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(_resp(item) for item in value)
+    if isinstance(value, _Simple):
+        return f"+{value}\r\n".encode()
+    data = value.encode("utf-8")
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+class KVHandler(socketserver.StreamRequestHandler):
+    kv: FakeKV
+
+    def _read_command(self) -> Optional[List[str]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+
+    def _run(self, args: List[str]) -> Any:
+        try:
+            return self.kv.execute(args[0].upper(), args[1:])
+        except (TypeError, ValueError, IndexError) as e:
+            return e
+
+    def handle(self) -> None:
+        queued: Optional[List[List[str]]] = None
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            if command == "MULTI":
+                queued, reply = [], _Simple("OK")
+            elif command == "EXEC" and queued is not None:
+                # The lock makes the queued commands atomic to other connections
+                with self.kv.lock:
+                    reply = [self._run(item) for item in queued]
+                queued = None
+            elif queued is not None:
+                queued.append(args)
+                reply = _Simple("QUEUED")
+            else:
+                with self.kv.lock:
+                    reply = self._run(args)
+            self.wfile.write(_resp(reply))
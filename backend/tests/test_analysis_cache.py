@@ -0,0 +1,159 @@
+import os
+
+import pytest
+
+from src.services import analysis_cache as analysis_cache_module
+from src.models import AnalysisResponse
+from src.services.analysis_cache import BoundedCache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(analysis_cache_module.time, "time", clock)
+    return clock
+
+
+def test_expired_entries_are_dropped_in_deadline_order(clock):
+    cache = BoundedCache(ttl_seconds=10)
+    cache["old"] = "a"
+    clock.now += 6
+    cache["new"] = "b"
+    clock.now += 5
+    cache["trigger"] = "c"
+
+    assert cache.keys() == ["new", "trigger"]
+    assert cache.expirations == 1
+
+
+def test_rewritten_key_keeps_its_new_deadline(clock):
+    cache = BoundedCache(ttl_seconds=10)
+    cache["key"] = "first"
+    clock.now += 8
+    cache["key"] = "second"
+    clock.now += 5
+    cache["other"] = "x"
+
+    assert cache.get("key") == "second"
+
+
+def test_pinned_entries_do_not_expire_or_change(clock):
+    cache = BoundedCache(ttl_seconds=10, evictable=lambda value: value["done"])
+    value = {"done": False}
+    cache["task"] = value
+    stored_at = cache._entries["task"].stored_at
+    clock.now += 60
+    cache["other"] = {"done": True}
+
+    assert cache.get("task") is value
+    assert cache._entries["task"].stored_at == stored_at
+
+    # Unpinned in place: the next check after its deadline expires it
+    value["done"] = True
+    clock.now += 11
+    cache["another"] = {"done": True}
+    assert "task" not in cache
+
+
+def test_pinned_entries_survive_eviction():
+    cache = BoundedCache(max_entries=2, evictable=lambda value: value != "pinned")
+    cache["a"] = "pinned"
+    cache["b"] = "x"
+    cache["c"] = "y"
+
+    assert cache.keys() == ["a", "c"]
+    assert cache.evictions == 1
+
+
+def test_deadline_heap_is_compacted():
+    cache = BoundedCache(ttl_seconds=3600)
+    for i in range(1_000):
+        cache["key"] = str(i)
+    assert len(cache._deadlines) <= 2 * len(cache) + 64 + 1
+
+
+def test_disk_tier_serves_evicted_entries(tmp_path):
+    cache = BoundedCache(max_entries=1, persist_dir=str(tmp_path), serializer=str, deserializer=str)
+    cache["a"] = "1"
+    cache["b"] = "2"
+    assert cache.keys() == ["b"]
+    assert cache.get("a") == "1"
+
+
+def test_disk_tier_is_pruned_to_its_budget(tmp_path):
+    cache = BoundedCache(
+        max_entries=1, max_disk_bytes=250, persist_dir=str(tmp_path), serializer=str, deserializer=str
+    )
+    for i in range(10):
+        cache[f"key{i}"] = "v" * 50
+
+    assert cache.disk_bytes <= 250
+    assert cache.disk_bytes == sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert cache.get("key0") is None
+    assert cache.get("key9") == "v" * 50
+
+
+def test_disk_tier_is_pruned_by_ttl(tmp_path, clock):
+    cache = BoundedCache(max_entries=1, ttl_seconds=10, persist_dir=str(tmp_path), serializer=str, deserializer=str)
+    cache["a"] = "1"
+    clock.now += 11
+    cache["b"] = "2"
+
+    assert len(os.listdir(tmp_path)) == 1
+    assert cache.get("a") is None
+
+
+def test_existing_disk_tier_is_scanned_and_pruned_on_first_use(tmp_path):
+    cache = BoundedCache(persist_dir=str(tmp_path), serializer=str, deserializer=str)
+    for i in range(5):
+        cache[f"key{i}"] = "v" * 50
+    size = cache.disk_bytes
+
+    reopened = BoundedCache(max_disk_bytes=size // 2, persist_dir=str(tmp_path), serializer=str, deserializer=str)
+    assert reopened.get("missing") is None
+    assert 0 < reopened.disk_bytes <= size // 2
+    assert reopened.disk_bytes == sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+
+
+def test_disk_tier_is_not_created_until_used(tmp_path):
+    persist_dir = tmp_path / "cache"
+    cache = BoundedCache(persist_dir=str(persist_dir), serializer=str, deserializer=str)
+    assert not persist_dir.exists()
+
+    cache["a"] = "1"
+    assert len(os.listdir(persist_dir)) == 1
+
+
+def test_content_index_is_bounded(monkeypatch):
+    def analysis(analysis_id: str) -> AnalysisResponse:
+        return AnalysisResponse.model_validate({
+            "project_overview": {"name": "app", "description": "", "purpose": "", "complexity_score": 1},
+            "technical_architecture": {
+                "technology_stack": {"language": "Python"},
+                "system_architecture": {"architecture_type": "monolith"},
+            },
+            "analysis_id": analysis_id,
+            "timestamp": "2026-01-01T00:00:00",
+        })
+
+    monkeypatch.setenv("ANALYSIS_INDEX_MAX_ENTRIES", "4")
+    cache = analysis_cache_module.create_analysis_cache()
+    for i in range(4):
+        cache.put(analysis(f"a{i}"), "octo", f"repo-{i}", commit_sha=f"sha{i}")
+
+    # Two index keys per analysis: only the two most recent repositories remain indexed
+    assert cache.stats()["content_index"]["entries"] == 4
+    assert cache.lookup("octo", "repo-0", "sha0") is None
+    assert cache.latest("octo", "repo-1") is None
+    assert cache.lookup("octo", "repo-3", "sha3").analysis_id == "a3"
+    assert cache.latest("octo", "repo-2").analysis_id == "a2"
+    # The analyses themselves are bounded separately
+    assert cache.get("a0") is not None
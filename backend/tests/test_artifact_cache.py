@@ -0,0 +1,37 @@
+import pytest
+
+from src.services.artifact_cache import PROJECT_NAME_PLACEHOLDER, normalize_dependency, render_project_name
+
+
+@pytest.mark.parametrize("placeholder", [PROJECT_NAME_PLACEHOLDER, "{{project_name}}", "{{ Project-Name }}"])
+def test_placeholder_is_rendered_as_a_slug(placeholder):
+    rendered = render_project_name(f"docker build -t {placeholder}:latest .", "My Repo_Name")
+    assert rendered == "docker build -t my-repo_name:latest ."
+
+
+def test_slug_is_a_valid_image_name():
+    assert render_project_name(PROJECT_NAME_PLACEHOLDER, ".Dotted.Repo.") == "dotted.repo"
+    assert render_project_name(PROJECT_NAME_PLACEHOLDER, "***") == "app"
+
+
+def test_placeholder_is_rendered_throughout_nested_values():
+    artifact = {
+        "content": f"services:\n  {PROJECT_NAME_PLACEHOLDER}:\n    image: {PROJECT_NAME_PLACEHOLDER}",
+        "services": [PROJECT_NAME_PLACEHOLDER, "db"],
+        "port": 8000,
+    }
+    assert render_project_name(artifact, "WebApp") == {
+        "content": "services:\n  webapp:\n    image: webapp",
+        "services": ["webapp", "db"],
+        "port": 8000,
+    }
+
+
+@pytest.mark.parametrize("spec, name", [
+    ("Django>=4.2", "django"),
+    ("@nestjs/core@^10", "@nestjs/core"),
+    ("uvicorn[standard]==0.30", "uvicorn"),
+    ("  ", ""),
+])
+def test_normalize_dependency(spec, name):
+    assert normalize_dependency(spec) == name
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import pytest
+
+from src.models import (
+    AnalysisResponse, DockerComposeContent, DockerizationStatus, OptimizedDockerfile, TaskStatus, WorkflowContent
+)
+from src.services.task_events import TaskEventBus
+from src.utils import background_tasks
+from src.utils import checkpoints as checkpoints_module
+from src.utils import workers as workers_module
+from src.utils.background_tasks import dockerize_repository_task, run_concurrently
+from src.utils.checkpoints import SQLiteCheckpointStore
+from src.utils.job_queue import SQLiteJobQueue
+from src.utils.state_store import MemoryStateStore
+from src.utils.workers import DOCKERIZE_JOB, DockerizationWorkerPool, relay_queue_progress
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_and_awaits_the_other_steps():
+    state = MemoryStateStore()
+    status = DockerizationStatus(
+        task_id="t1", status=TaskStatus.DOCKERIZING, message="", progress=0, timestamp=datetime.now()
+    )
+    await state.put_status(status)
+    unwound = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            await asyncio.sleep(0.01)
+            unwound.append("slow")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await run_concurrently(state, status, {"dockerfile": slow(), "workflow": failing()}, 0, 100)
+
+    assert unwound == ["slow"]
+
+
+@pytest.mark.asyncio
+async def test_completions_are_reported_in_order():
+    state = MemoryStateStore()
+    status = DockerizationStatus(
+        task_id="t1", status=TaskStatus.DOCKERIZING, message="", progress=0, timestamp=datetime.now()
+    )
+    await state.put_status(status)
+
+    async def step(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    results = await run_concurrently(
+        state, status, {"dockerfile": step("a", 0.02), "workflow": step("b", 0.01)}, 40, 80
+    )
+
+    assert results == {"dockerfile": "a", "workflow": "b"}
+    stored = await state.get_status("t1")
+    assert stored.artifacts == ["workflow", "dockerfile"]
+    assert stored.progress == 80
+
+
+ANALYSIS = AnalysisResponse.model_validate({
+    "project_overview": {"name": "app", "description": "An API", "purpose": "Serve", "complexity_score": 3},
+    "technical_architecture": {
+        "technology_stack": {"language": "Python", "framework": "FastAPI"},
+        "system_architecture": {"architecture_type": "monolith"},
+    },
+    "analysis_id": "a1",
+    "timestamp": "2026-01-01T00:00:00",
+})
+
+
+class FakeAgent:
+    """Records the pipeline's calls; ``fail_on`` makes that call raise (for ``failing_repo`` only, if set)"""
+
+    calls: List[str] = []
+    fail_on: Optional[str] = None
+    failing_repo: Optional[str] = None
+
+    def __init__(self, github_token, openai_api_key, owner, repo):
+        self.repo = repo
+        self.llm_analyzer = self
+
+    def _call(self, name: str) -> None:
+        FakeAgent.calls.append(name)
+        if name == FakeAgent.fail_on and FakeAgent.failing_repo in (None, self.repo):
+            raise RuntimeError(f"{name} failed")
+
+    async def initialize_mcp(self):
+        self._call("mcp_initialize")
+
+    async def create_branch(self, branch_name):
+        self._call("branch")
+        return branch_name
+
+    async def generate_dockerfile(self, analysis, bypass_artifact_cache):
+        self._call("dockerfile")
+        return OptimizedDockerfile(content="FROM python:3.12-slim\n", explanation="")
+
+    async def generate_docker_compose(self, analysis, bypass_artifact_cache):
+        self._call("docker_compose")
+        return DockerComposeContent(content="services: {}\n", services=["app"])
+
+    async def generate_github_workflow(self, analysis, bypass_artifact_cache):
+        self._call("workflow")
+        return WorkflowContent(content="on: push\n", features=[])
+
+    async def generate_pr_description(self, analysis):
+        self._call("pr_description")
+        return "Adds a container build"
+
+    async def commit_files(self, files, branch, message, idempotency_key=None):
+        self._call("commit")
+        return "sha1"
+
+    async def create_pull_request(self, branch, analysis, description):
+        self._call("pull_request")
+        return "https://github.com/octo/app/pull/1"
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    FakeAgent.calls = []
+    FakeAgent.fail_on = None
+    FakeAgent.failing_repo = None
+    monkeypatch.setattr(background_tasks, "DockerizationAgent", FakeAgent)
+    return FakeAgent
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    return SQLiteCheckpointStore(str(tmp_path / "jobs.sqlite3"))
+
+
+async def run_task(state: MemoryStateStore, checkpoints: SQLiteCheckpointStore) -> DockerizationStatus:
+    status = DockerizationStatus(
+        task_id="t1", status=TaskStatus.PENDING, message="", progress=0, timestamp=datetime.now()
+    )
+    await state.put_status(status)
+    await dockerize_repository_task(
+        status, "https://github.com/octo/app", "token", "key", ANALYSIS, state, checkpoints=checkpoints
+    )
+    return status
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_the_checkpointed_stages(agent, checkpoints):
+    state = MemoryStateStore()
+    agent.fail_on = "pull_request"
+    failed = await run_task(state, checkpoints)
+
+    assert failed.status == TaskStatus.FAILED
+    assert set(await checkpoints.load("t1")) == {
+        "branch", "dockerfile", "docker_compose", "workflow", "pr_description", "commit"
+    }
+
+    agent.calls = []
+    agent.fail_on = None
+    resumed = await run_task(state, checkpoints)
+
+    assert resumed.status == TaskStatus.COMPLETED
+    assert resumed.pr_url == "https://github.com/octo/app/pull/1"
+    # Only the MCP session is rebuilt; no generation or commit is repeated
+    assert agent.calls == ["mcp_initialize", "pull_request"]
+
+
+@pytest.mark.asyncio
+async def test_resume_restores_checkpointed_models(agent, checkpoints):
+    state = MemoryStateStore()
+    await checkpoints.save("t1", "branch", "feature/dockerize-and-ci-t1")
+    await checkpoints.save("t1", "dockerfile", {"content": "FROM scratch\n", "explanation": "restored"})
+
+    status = await run_task(state, checkpoints)
+
+    assert status.status == TaskStatus.COMPLETED
+    assert "branch" not in agent.calls and "dockerfile" not in agent.calls
+    assert set(agent.calls) >= {"docker_compose", "workflow", "pr_description", "commit", "pull_request"}
+    assert status.artifacts[:2] == ["branch", "dockerfile"]
+
+
+@pytest.mark.asyncio
+async def test_worker_clears_checkpoints_of_completed_tasks(agent, checkpoints, tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    state = MemoryStateStore()
+    pool = DockerizationWorkerPool(queue, concurrency=2, state=state, checkpoints=checkpoints, poll_seconds=0.01)
+    agent.fail_on, agent.failing_repo = "pull_request", "broken"
+    for task_id in ("ok", "broken"):
+        await queue.enqueue(
+            DOCKERIZE_JOB,
+            {"task_id": task_id, "repo_url": f"https://github.com/octo/{task_id}", "github_token": "token",
+             "analysis_id": "a1", "analysis": ANALYSIS.model_dump(mode="json")},
+            job_id=task_id,
+            max_attempts=1
+        )
+
+    pool.start()
+    try:
+        for _ in range(500):
+            if await queue.get_state("ok") == "done" and await queue.get_state("broken") == "dead":
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await pool.stop()
+
+    assert await queue.get_state("ok") == "done"
+    assert await checkpoints.load("ok") == {}
+    # A failed task keeps its checkpoints for a resume
+    assert "commit" in await checkpoints.load("broken")
+
+
+@pytest.mark.asyncio
+async def test_abandoned_checkpoints_are_pruned_after_the_ttl(tmp_path, monkeypatch):
+    checkpoints = SQLiteCheckpointStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=60)
+    now = time.time()
+    monkeypatch.setattr(checkpoints_module.time, "time", lambda: now - 120)
+    await checkpoints.save("abandoned", "branch", "feature/a")
+    await checkpoints.save("active", "branch", "feature/b")
+    monkeypatch.setattr(checkpoints_module.time, "time", lambda: now)
+    await checkpoints.save("active", "dockerfile", {"content": "", "explanation": ""})
+
+    assert await checkpoints.load("abandoned") == {}
+    assert set(await checkpoints.load("active")) == {"branch", "dockerfile"}
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_remote_progress_until_the_job_is_claimed_here(tmp_path, monkeypatch):
+    bus = TaskEventBus()
+    monkeypatch.setattr(workers_module, "task_events", bus)
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    await queue.enqueue(DOCKERIZE_JOB, {"task_id": "t1"}, job_id="t1")
+    await queue.claim("remote", lease_seconds=60)
+
+    def progress(value: int) -> str:
+        return DockerizationStatus(
+            task_id="t1", status=TaskStatus.DOCKERIZING, message=f"{value}%", progress=value, timestamp=datetime.now()
+        ).model_dump_json()
+
+    running_here = set()
+    events = []
+
+    async def follow():
+        async for event in bus.subscribe("t1"):
+            events.append(event)
+
+    follower = asyncio.create_task(follow())
+    await queue.heartbeat("t1", "remote", 60, progress(20))
+    relay = asyncio.create_task(relay_queue_progress(queue, "t1", 0.01, running_here=running_here.__contains__))
+    await asyncio.sleep(0.05)
+    assert [json.loads(event.data)["progress"] for event in events] == [20]
+
+    # A local worker took over: the queue's lagging copy must not be replayed
+    running_here.add("t1")
+    await queue.heartbeat("t1", "remote", 60, progress(10))
+    await asyncio.wait_for(relay, 1)
+    assert [json.loads(event.data)["progress"] for event in events] == [20]
+    assert not follower.done()
+    follower.cancel()
+
+
+@pytest.mark.asyncio
+async def test_relay_closes_the_stream_when_the_remote_job_finishes(tmp_path, monkeypatch):
+    bus = TaskEventBus()
+    monkeypatch.setattr(workers_module, "task_events", bus)
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    await queue.enqueue(DOCKERIZE_JOB, {"task_id": "t1"}, job_id="t1")
+    job = await queue.claim("remote", lease_seconds=60)
+    final = DockerizationStatus(
+        task_id="t1", status=TaskStatus.COMPLETED, message="done", progress=100, timestamp=datetime.now()
+    )
+    await queue.complete(job.id, "remote", final.model_dump_json())
+
+    await asyncio.wait_for(relay_queue_progress(queue, "t1", 0.01, running_here=lambda task_id: False), 1)
+
+    events = [event async for event in bus.subscribe("t1")]
+    assert [json.loads(event.data)["status"] for event in events] == ["completed"]
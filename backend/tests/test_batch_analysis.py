@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from src import main
+from src.models import AnalysisResponse
+from src.services.github_api import GitHubAPIError, GitHubClient
+
+
+def analysis(repo: str) -> AnalysisResponse:
+    return AnalysisResponse.model_validate({
+        "project_overview": {"name": repo, "description": "", "purpose": "", "complexity_score": 1},
+        "technical_architecture": {
+            "technology_stack": {"language": "Python"},
+            "system_architecture": {"architecture_type": "monolith"},
+        },
+        "analysis_id": f"id-{repo}",
+        "timestamp": "2026-01-01T00:00:00",
+    })
+
+
+class StubAnalyses:
+    """Stands in for ``get_or_run_analysis``, tracking how many run at once"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+
+    async def __call__(self, github_token, openai_api_key, owner, repo, commit_sha):
+        self.calls.append(repo)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if repo in self.failing:
+                raise RuntimeError(f"{repo} exploded")
+            return analysis(repo)
+        finally:
+            self.active -= 1
+
+
+class StubMetadata:
+    async def get(self, github, owner, repo):
+        raise GitHubAPIError("not found", status_code=404)
+
+
+@pytest.fixture
+def analyses(monkeypatch):
+    stub = StubAnalyses(failing={"repo-3", "repo-7"})
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(main, "get_or_run_analysis", stub)
+    monkeypatch.setattr(main, "repo_metadata", StubMetadata())
+    return stub
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        yield client
+
+
+def urls(count: int):
+    return [f"https://github.com/octo/repo-{i}" for i in range(count)]
+
+
+async def batch(client: httpx.AsyncClient, **body):
+    response = await client.post("/analyze/batch", json={"github_token": "token", **body})
+    return response, [json.loads(line) for line in response.text.splitlines() if line]
+
+
+@pytest.mark.asyncio
+async def test_item_failures_are_reported_without_aborting_the_batch(analyses, client):
+    response, events = await batch(client, repo_urls=urls(10), concurrency=3)
+
+    assert response.status_code == 200
+    results = events[:-1]
+    assert sorted(event["repo_url"] for event in results) == sorted(urls(10))
+    errors = {event["repo_url"]: event["detail"] for event in results if event["event"] == "error"}
+    assert errors == {
+        "https://github.com/octo/repo-3": "repo-3 exploded",
+        "https://github.com/octo/repo-7": "repo-7 exploded",
+    }
+    assert all(event["data"]["analysis_id"] == f"id-{event['repo_url'].rsplit('/', 1)[1]}"
+               for event in results if event["event"] == "analysis")
+    assert events[-1] == {"event": "done", "total": 10, "succeeded": 8, "failed": 2}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("requested, expected", [(3, 3), (1, 1), (None, 4), (100, 16)])
+async def test_concurrency_is_bounded(analyses, client, monkeypatch, requested, expected):
+    monkeypatch.setattr(main, "BATCH_ANALYSIS_CONCURRENCY", 4)
+    monkeypatch.setattr(main, "BATCH_ANALYSIS_MAX_CONCURRENCY", 16)
+
+    _, events = await batch(client, repo_urls=urls(40), concurrency=requested)
+
+    assert events[-1]["total"] == 40
+    assert analyses.peak == expected
+
+
+@pytest.mark.asyncio
+async def test_duplicate_urls_are_analyzed_once(analyses, client):
+    _, events = await batch(client, repo_urls=urls(2) + urls(2))
+
+    assert sorted(analyses.calls) == ["repo-0", "repo-1"]
+    assert events[-1] == {"event": "done", "total": 2, "succeeded": 2, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_batches_over_the_maximum_are_rejected(analyses, client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_ANALYSIS_MAX_REPOS", 5)
+
+    response, _ = await batch(client, repo_urls=urls(6))
+    assert response.status_code == 400
+    assert "more than 5 repositories" in response.json()["detail"]
+    assert analyses.calls == []
+
+    async def list_org_repositories(self, org, limit):
+        assert limit == 6
+        return [f"https://github.com/{org}/repo-{i}" for i in range(limit)]
+
+    monkeypatch.setattr(GitHubClient, "list_org_repositories", list_org_repositories)
+    response, _ = await batch(client, org="octo")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_needs_repositories_or_an_organization(analyses, client):
+    response, _ = await batch(client)
+    assert response.status_code == 422
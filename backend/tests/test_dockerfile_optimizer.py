@@ -0,0 +1,231 @@
+import pytest
+
+from src.services.dockerfile_optimizer import Dockerfile, DockerfileOptimizer, merge_dockerignore
+
+
+@pytest.fixture
+def optimizer():
+    return DockerfileOptimizer()
+
+
+def kinds(result):
+    return [rewrite.kind for rewrite in result.rewrites]
+
+
+def lines(result):
+    return result.content.splitlines()
+
+
+def test_parse_and_render_round_trip():
+    content = (
+        "# syntax=docker/dockerfile:1\n"
+        "ARG PY=3.12\n"
+        "FROM python:${PY}-slim AS base\n"
+        "# dependencies\n"
+        "RUN apt-get update && \\\n"
+        "    apt-get install -y curl\n"
+        "RUN <<EOF\n"
+        "echo hi\n"
+        "EOF\n"
+        "FROM base\n"
+        "CMD [\"python\"]\n"
+    )
+    dockerfile = Dockerfile.parse(content)
+
+    assert [stage.name for stage in dockerfile.stages] == ["base", None]
+    assert dockerfile.directive("syntax") == "docker/dockerfile:1"
+    assert dockerfile.stages[0].instructions[0].command == "apt-get update && apt-get install -y curl"
+    assert dockerfile.stages[0].instructions[1].heredoc
+    assert dockerfile.render() == content
+
+
+def test_source_copy_moves_after_pip_install(optimizer):
+    result = optimizer.optimize(
+        "FROM python:3.11-slim\n"
+        "WORKDIR /app\n"
+        "COPY . .\n"
+        "ENV PYTHONUNBUFFERED=1\n"
+        "RUN pip install --upgrade pip && pip install --no-cache-dir -r requirements.txt && python -m compileall .\n"
+    )
+
+    assert lines(result)[2:] == [
+        "WORKDIR /app",
+        "COPY requirements.txt ./",
+        "ENV PYTHONUNBUFFERED=1",
+        "RUN --mount=type=cache,target=/root/.cache/pip pip install --upgrade pip && pip install -r requirements.txt",
+        "COPY . .",
+        "RUN python -m compileall .",
+    ]
+    assert "dependency_layer_order" in kinds(result)
+
+
+def test_nested_requirements_copy_their_directory(optimizer):
+    result = optimizer.optimize("FROM python:3.11-slim\nCOPY . /app\nWORKDIR /app\nRUN pip install -r requirements/prod.txt\n")
+    # WORKDIR between the copy and the install: left as is
+    assert "dependency_layer_order" not in kinds(result)
+
+    result = optimizer.optimize("FROM python:3.11-slim\nWORKDIR /app\nCOPY . /app\nRUN pip install -r requirements/prod.txt\n")
+    assert "COPY requirements/ /app/requirements/" in lines(result)
+
+
+def test_source_dependent_installs_are_not_reordered(optimizer):
+    for install in ("pip install .", "pip install -e .", "npm install express", "cd web && npm ci"):
+        result = optimizer.optimize(f"FROM node:20\nCOPY . .\nRUN {install}\n")
+        assert "dependency_layer_order" not in kinds(result), install
+
+
+def test_npm_install_is_split_from_the_build(optimizer):
+    result = optimizer.optimize("FROM node:20 AS build\nWORKDIR /src\nCOPY . .\nRUN npm ci && npm run build\n")
+
+    assert lines(result)[3:] == [
+        "COPY package*.json ./",
+        "RUN --mount=type=cache,target=/root/.npm npm ci",
+        "COPY . .",
+        "RUN npm run build",
+    ]
+
+
+def test_go_build_gets_a_download_step_once(optimizer):
+    result = optimizer.optimize("FROM golang:1.22 AS build\nWORKDIR /src\nCOPY . .\nRUN go build -o /bin/app .\n")
+
+    assert lines(result)[3:] == [
+        "COPY go.mod go.sum* ./",
+        "RUN --mount=type=cache,target=/go/pkg/mod go mod download",
+        "COPY . .",
+        "RUN --mount=type=cache,target=/go/pkg/mod --mount=type=cache,target=/root/.cache/go-build go build -o /bin/app .",
+    ]
+    assert "dependency_download_step" in kinds(result)
+    assert optimizer.optimize(result.content).content == result.content
+
+
+def test_maven_build_gets_go_offline(optimizer):
+    result = optimizer.optimize("FROM maven:3.9-eclipse-temurin-17 AS build\nWORKDIR /app\nCOPY . .\nRUN mvn -B package\n")
+
+    assert "COPY pom.xml ./" in lines(result)
+    assert "RUN --mount=type=cache,target=/root/.m2 mvn -B dependency:go-offline" in lines(result)
+
+
+@pytest.mark.parametrize("run, target", [
+    ("pip install -r requirements.txt", "/root/.cache/pip"),
+    ("npm ci", "/root/.npm"),
+    ("yarn install --frozen-lockfile", "/usr/local/share/.cache/yarn"),
+    ("pnpm install", "/root/.local/share/pnpm/store"),
+    ("go mod download", "/go/pkg/mod"),
+    ("mvn -B package", "/root/.m2"),
+])
+def test_cache_mounts(optimizer, run, target):
+    result = optimizer.optimize(f"FROM golang:1.22\nRUN {run}\n")
+
+    assert f"RUN --mount=type=cache,target={target}" in result.content
+    assert lines(result)[0] == "# syntax=docker/dockerfile:1"
+
+
+def test_no_cache_mounts_for_non_root_users(optimizer):
+    result = optimizer.optimize("FROM python:3.11-slim\nUSER app\nRUN pip install -r requirements.txt\n")
+
+    assert "--mount" not in result.content
+    assert any("non-root" in warning for warning in result.warnings)
+
+
+def test_existing_mounts_and_syntax_are_kept(optimizer):
+    content = "# syntax=docker/dockerfile:1.7\nFROM python:3.11-slim\nRUN --mount=type=cache,target=/root/.cache/pip pip install flask\n"
+    result = optimizer.optimize(content)
+
+    assert result.content == content
+    assert "cache_mount" not in kinds(result)
+
+
+def test_final_stage_is_slimmed(optimizer):
+    result = optimizer.optimize(
+        "FROM node:20 AS build\nWORKDIR /app\nRUN npm ci && npm run build\n"
+        "FROM node:20-bookworm\n"
+        "RUN apt-get update && apt-get install -y \\\n    gcc \\\n    curl\n"
+        "COPY --from=build /app/dist ./dist\n"
+    )
+
+    assert "FROM node:20-slim-bookworm" in lines(result)
+    assert "gcc" not in result.content
+    assert "apt-get install --no-install-recommends -y \\\n    curl ca-certificates && rm -rf /var/lib/apt/lists/*" in result.content
+    assert {"slim_base_image", "build_tools_removed", "apt_no_install_recommends", "apt_lists_cleanup"} <= set(kinds(result))
+
+
+def test_final_stage_keeps_full_base_for_native_packages(optimizer):
+    result = optimizer.optimize(
+        "FROM python:3.11 AS builder\nRUN pip install -r requirements.txt\n"
+        "FROM python:3.11\n"
+        "RUN apt-get update && apt-get install -y gcc libpq5\n"
+        "COPY --from=builder /usr/local/lib/python3.11/site-packages /usr/local/lib/python3.11/site-packages\n"
+    )
+
+    assert "FROM python:3.11" in lines(result)
+    assert "gcc" in result.content
+    assert "slim_base_image" not in kinds(result)
+    assert any("site-packages" in warning for warning in result.warnings)
+
+
+def test_final_stage_slimmed_when_builder_is_slim(optimizer):
+    result = optimizer.optimize(
+        "FROM python:3.11-slim AS builder\nRUN pip install --prefix=/install -r requirements.txt\n"
+        "FROM python:3.11\nCOPY --from=builder /install /usr/local\n"
+    )
+
+    assert "FROM python:3.11-slim" in lines(result)[-2:]
+
+
+def test_single_stage_and_build_image_final_stages_are_warnings(optimizer):
+    single = optimizer.optimize("FROM python:3.11\nRUN pip install flask\n")
+    build_image = optimizer.optimize("FROM golang:1.22 AS build\nRUN go build\nFROM golang:1.22\n")
+
+    assert "FROM python:3.11" in lines(single)
+    assert any("single-stage" in warning for warning in single.warnings)
+    assert any("golang build image" in warning for warning in build_image.warnings)
+
+
+def test_temurin_jdk_becomes_jre(optimizer):
+    result = optimizer.optimize(
+        "FROM maven:3.9 AS build\nRUN mvn package\nFROM eclipse-temurin:17-jdk\nCOPY --from=build /app/target/app.jar /app.jar\n"
+    )
+
+    assert "FROM eclipse-temurin:17-jre" in lines(result)
+
+
+def test_dockerignore_matches_stack_and_keeps_copied_paths(optimizer):
+    result = optimizer.optimize(
+        "FROM node:20\nCOPY .env.production dist ./\nRUN git rev-parse HEAD > REVISION\n", language="TypeScript"
+    )
+    patterns = result.dockerignore.splitlines()
+
+    assert "node_modules" in patterns
+    assert "**/__pycache__" not in patterns
+    assert ".env.*" not in patterns
+    assert ".git" not in patterns
+    assert "dockerignore" in kinds(result)
+
+
+def test_unparseable_dockerfile_is_left_unchanged(optimizer):
+    result = optimizer.optimize("RUN echo hi\n")
+
+    assert result.content == "RUN echo hi\n"
+    assert result.dockerignore is None
+    assert result.warnings
+
+
+def test_disabled_optimizer_returns_the_generated_dockerfile():
+    from src.models import DockerfileContent
+
+    dockerfile = DockerfileContent(content="FROM python:3.11\nCOPY . .\n", explanation="e")
+    optimized = DockerfileOptimizer(enabled=False).apply(dockerfile)
+
+    assert optimized.content == dockerfile.content
+    assert optimized.dockerignore is None
+    assert optimized.optimizations == []
+
+
+def test_merge_dockerignore():
+    generated = "# VCS\n.git\n.env\nnode_modules\n"
+
+    assert merge_dockerignore(None, generated) == generated
+    assert merge_dockerignore(".git\n.env\nnode_modules\n", generated) is None
+    assert merge_dockerignore("# ours\n.git\n!.env\n", generated) == (
+        "# ours\n.git\n!.env\n\n# Added for the container build\nnode_modules\n"
+    )
@@ -0,0 +1,112 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from src.services.github_api import GitHubAPIError, GitHubClient
+
+
+class FakeGitDataAPI:
+    """In-memory stand-in for the Git Data API routes ``commit_files`` uses"""
+
+    def __init__(self):
+        self.commits: Dict[str, dict] = {"base": {"sha": "base", "message": "initial", "tree": {"sha": "tree0"}}}
+        self.refs: Dict[str, str] = {"dockerize": "base"}
+        self.calls: List[Tuple[str, str]] = []
+        self.ref_updates: List[dict] = []
+        self.reject_ref_update = False
+
+    @staticmethod
+    def _sha(payload: dict) -> str:
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        method, path = request.method, request.url.path
+        self.calls.append((method, path))
+        body = json.loads(request.content) if request.content else {}
+
+        if method == "GET" and path.startswith("/repos/octo/app/git/ref/heads/"):
+            branch = path.rsplit("/", 1)[1]
+            if branch not in self.refs:
+                return httpx.Response(404, json={"message": "Not Found"})
+            return httpx.Response(200, json={"object": {"sha": self.refs[branch]}})
+        if method == "GET" and path.startswith("/repos/octo/app/git/commits/"):
+            return httpx.Response(200, json=self.commits[path.rsplit("/", 1)[1]])
+        if method == "POST" and path == "/repos/octo/app/git/trees":
+            return httpx.Response(201, json={"sha": self._sha(body)})
+        if method == "POST" and path == "/repos/octo/app/git/commits":
+            sha = self._sha(body)
+            self.commits[sha] = {"sha": sha, "message": body["message"], "tree": {"sha": body["tree"]}}
+            return httpx.Response(201, json={"sha": sha})
+        if method == "PATCH" and path.startswith("/repos/octo/app/git/refs/heads/"):
+            self.ref_updates.append(body)
+            if self.reject_ref_update:
+                return httpx.Response(422, json={"message": "Update is not a fast forward"})
+            self.refs[path.rsplit("/", 1)[1]] = body["sha"]
+            return httpx.Response(200, json={"object": {"sha": body["sha"]}})
+        return httpx.Response(404, json={"message": "Not Found"})
+
+    def count(self, method: str, suffix: str) -> int:
+        return sum(1 for m, path in self.calls if m == method and path.endswith(suffix))
+
+
+@pytest.fixture
+def api():
+    return FakeGitDataAPI()
+
+
+@pytest_asyncio.fixture
+async def client(api):
+    client = GitHubClient("token")
+    await client.http.aclose()
+    client.http = httpx.AsyncClient(base_url="https://api.github.test", transport=httpx.MockTransport(api.handler))
+    yield client
+    await client.close()
+
+
+FILES = {"Dockerfile": "FROM python:3.12-slim\n", ".github/workflows/ci-cd.yml": "on: push\n"}
+
+
+@pytest.mark.asyncio
+async def test_commit_files_makes_one_tree_commit_and_ref_update(api, client):
+    sha = await client.commit_files("octo", "app", "dockerize", FILES, "Add container build", "task-1")
+
+    assert api.count("POST", "/git/trees") == 1
+    assert api.count("POST", "/git/commits") == 1
+    assert api.ref_updates == [{"sha": sha, "force": False}]
+    assert api.refs["dockerize"] == sha
+    assert api.commits[sha]["message"] == "Add container build\n\nIdempotency-Key: task-1"
+
+
+@pytest.mark.asyncio
+async def test_commit_files_retry_with_same_key_does_not_commit_twice(api, client):
+    first = await client.commit_files("octo", "app", "dockerize", FILES, "Add container build", "task-1")
+    second = await client.commit_files("octo", "app", "dockerize", FILES, "Add container build", "task-1")
+
+    assert second == first
+    assert api.count("POST", "/git/trees") == 1
+    assert api.count("POST", "/git/commits") == 1
+    assert len(api.ref_updates) == 1
+
+
+@pytest.mark.asyncio
+async def test_commit_files_with_new_key_commits_on_top(api, client):
+    first = await client.commit_files("octo", "app", "dockerize", FILES, "Add container build", "task-1")
+    second = await client.commit_files("octo", "app", "dockerize", FILES, "Add container build", "task-2")
+
+    assert second != first
+    assert api.refs["dockerize"] == second
+    assert len(api.ref_updates) == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_ref_update_leaves_branch_untouched(api, client):
+    api.reject_ref_update = True
+    with pytest.raises(GitHubAPIError) as error:
+        await client.commit_files("octo", "app", "dockerize", FILES, "Add container build", "task-1")
+
+    assert error.value.status_code == 422
+    assert api.refs["dockerize"] == "base"
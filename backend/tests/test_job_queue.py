@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+from src.utils import job_queue as job_queue_module
+from src.utils.job_queue import SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"), retry_base_seconds=0.0)
+
+
+@pytest.mark.asyncio
+async def test_lapsed_lease_is_reclaimed_until_attempts_run_out(queue):
+    progress = json.dumps({"task_id": "t", "status": "dockerizing", "message": "working"})
+    await queue.enqueue("dockerize", {"task_id": "t"}, job_id="t", max_attempts=2)
+
+    first = await queue.claim("w1", lease_seconds=-1)
+    await queue.heartbeat("t", "w1", lease_seconds=-1, progress=progress)
+    second = await queue.claim("w2", lease_seconds=-1)
+
+    assert (first.attempts, second.attempts) == (1, 2)
+    # The second worker died too: the job is dead instead of leased forever
+    assert await queue.claim("w3", lease_seconds=60) is None
+    assert await queue.get_state("t") == "dead"
+    assert json.loads(await queue.get_progress("t"))["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_then_dead(queue):
+    await queue.enqueue("dockerize", {"task_id": "t"}, job_id="t", max_attempts=2)
+
+    job = await queue.claim("w", lease_seconds=60)
+    assert await queue.fail(job.id, "w", "boom") is True
+    job = await queue.claim("w", lease_seconds=60)
+    assert await queue.fail(job.id, "w", "boom") is False
+
+    assert await queue.get_state("t") == "dead"
+    assert await queue.requeue("t", max_attempts=1) is True
+    assert (await queue.claim("w", lease_seconds=60)).attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_credentials_are_scrubbed_from_finished_jobs(queue):
+    for job_id in ("done", "dead"):
+        await queue.enqueue("dockerize", {"task_id": job_id, "github_token": "secret"}, job_id=job_id, max_attempts=1)
+
+    done = await queue.claim("w", lease_seconds=60)
+    dead = await queue.claim("w", lease_seconds=60)
+    assert done.payload["github_token"] == "secret"
+    await queue.complete(done.id, "w")
+    await queue.fail(dead.id, "w", "boom")
+
+    for job_id in ("done", "dead"):
+        assert await queue.get_payload(job_id) == {"task_id": job_id}
+
+    assert await queue.requeue("dead", max_attempts=1, payload={"github_token": "fresh"})
+    assert (await queue.claim("w", lease_seconds=60)).payload == {"task_id": "dead", "github_token": "fresh"}
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_are_deleted_after_the_retention_period(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"), retention_seconds=60)
+    now = time.time()
+    monkeypatch.setattr(job_queue_module.time, "time", lambda: now - 120)
+    for job_id in ("done", "dead", "recent"):
+        await queue.enqueue("dockerize", {"task_id": job_id}, job_id=job_id, max_attempts=1)
+    await queue.complete((await queue.claim("w", lease_seconds=60)).id, "w")
+    await queue.fail((await queue.claim("w", lease_seconds=60)).id, "w", "boom")
+    monkeypatch.setattr(job_queue_module.time, "time", lambda: now)
+    await queue.complete((await queue.claim("w", lease_seconds=60)).id, "w")
+
+    assert await queue.claim("w", lease_seconds=60) is None
+    assert await queue.get_state("done") is None
+    assert await queue.get_state("dead") is None
+    assert await queue.get_state("recent") == "done"
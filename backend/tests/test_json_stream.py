@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from src.models import AnalysisContent
+from src.services import LLMAnalyzer
+from src.services import llm_analyzer as llm_analyzer_module
+from src.services.json_stream import IncrementalJSONParser, JSONStreamError
+
+WATCH = [("project_overview",), ("technical_architecture", "technology_stack")]
+TECHNOLOGY_STACK = {
+    "framework": "FastAPI", "language": "Python", "database": None, "runtime": "Python 3.11",
+    "package_manager": "pip", "dependencies": ["fastapi"],
+}
+
+# Scalars the structural scan accepts but json.loads rejects
+INVALID_SECTIONS = [
+    '{"project_overview": {"name": "x",}, "technical_architecture": {"technology_stack": %s}}',
+    '{"project_overview": {"name": "x", "complexity_score": 1-10}, "technical_architecture": {"technology_stack": %s}}',
+]
+
+
+def feed_by_char(parser, document):
+    completed = []
+    for char in document:
+        completed.extend(parser.feed(char))
+    return completed
+
+
+def test_watched_sections_are_reported_when_closed():
+    parser = IncrementalJSONParser(watch=WATCH)
+    document = json.dumps({
+        "project_overview": {"name": "x"}, "technical_architecture": {"technology_stack": TECHNOLOGY_STACK},
+    })
+
+    completed = feed_by_char(parser, document)
+
+    assert completed == [(("project_overview",), {"name": "x"}), (WATCH[1], TECHNOLOGY_STACK)]
+    assert parser.done
+
+
+@pytest.mark.parametrize("template", INVALID_SECTIONS)
+def test_invalid_section_is_skipped_and_later_sections_still_stream(template):
+    parser = IncrementalJSONParser(watch=WATCH)
+
+    completed = feed_by_char(parser, template % json.dumps(TECHNOLOGY_STACK))
+
+    assert completed == [(WATCH[1], TECHNOLOGY_STACK)]
+    assert parser.done
+
+
+def test_structural_errors_still_raise():
+    parser = IncrementalJSONParser(watch=WATCH)
+    with pytest.raises(JSONStreamError):
+        feed_by_char(parser, '{"project_overview": {"name": "x"]}')
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("template", INVALID_SECTIONS)
+async def test_stream_falls_back_to_repair_for_invalid_sections(template, monkeypatch):
+    reply = template % json.dumps(TECHNOLOGY_STACK)
+    recovered = {}
+
+    async def stream_content(messages):
+        for index in range(0, len(reply), 7):
+            yield reply[index:index + 7]
+
+    async def recover(llm, messages, content, model, kind):
+        recovered["content"] = content
+        return AnalysisContent.model_validate({
+            "project_overview": {
+                "name": "x", "description": "d", "purpose": "p", "domain": "Backend/API", "complexity_score": 5,
+            },
+            "technical_architecture": {
+                "technology_stack": TECHNOLOGY_STACK,
+                "system_architecture": {
+                    "architecture_type": "Monolithic", "modules": [], "key_features": [], "patterns": [],
+                },
+            },
+        })
+
+    monkeypatch.setattr(LLMAnalyzer, "llm", None)
+    analyzer = LLMAnalyzer()
+    monkeypatch.setattr(analyzer, "_analysis_messages", lambda *args: [])
+    monkeypatch.setattr(analyzer, "_stream_content", stream_content)
+    monkeypatch.setattr(llm_analyzer_module.structured_output, "recover", recover)
+
+    events = [event async for event in analyzer.stream_repository_intelligence({}, {}, "x")]
+
+    assert [name for name, _ in events] == ["technology_stack", "analysis"]
+    assert recovered["content"] == reply
+    assert events[-1][1].project_overview.complexity_score == 5
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+import pytest
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+
+from src.services.llm_cache import LLMCacheMiss, LLMResponseCache
+
+
+def test_import_does_not_load_langchain_caches():
+    code = "import sys, src.services.llm_cache; print('langchain_core.caches' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+
+def test_langchain_adapter_is_built_once_and_delegates(tmp_path):
+    cache = LLMResponseCache(mode="cache", persist_dir=str(tmp_path))
+    adapter = cache.langchain()
+
+    assert isinstance(adapter, BaseCache)
+    assert cache.langchain() is adapter
+    assert adapter.lookup("prompt", "model") is None
+    adapter.update("prompt", "model", [Generation(text="hello")])
+    assert [generation.text for generation in adapter.lookup("prompt", "model")] == ["hello"]
+    assert cache.stats()["recorded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_serves_recorded_responses_only(tmp_path):
+    recorder = LLMResponseCache(mode="record", persist_dir=str(tmp_path))
+    await recorder.langchain().aupdate("prompt", "model", [Generation(text="hello")])
+
+    replay = LLMResponseCache(mode="replay", persist_dir=str(tmp_path)).langchain()
+    assert [generation.text for generation in await replay.alookup("prompt", "model")] == ["hello"]
+    with pytest.raises(LLMCacheMiss):
+        await replay.alookup("other prompt", "model")
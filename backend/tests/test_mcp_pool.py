@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.mcp_pool import MCPSessionPool, _PooledSession
+from src.services.tokens import token_fingerprint
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = MCPSessionPool(min_size=1, max_size=2, maintenance_interval=3600)
+    clients = []
+
+    async def spawn(token_pool):
+        client = FakeClient()
+        clients.append(client)
+        closing = asyncio.Event()
+
+        async def own():
+            await closing.wait()
+            client.closed = True
+
+        now = time.monotonic()
+        return _PooledSession(client=client, created_at=now, last_used=now,
+                              owner=asyncio.create_task(own()), closing=closing)
+
+    async def healthy(entry):
+        return True
+
+    monkeypatch.setattr(pool, "_spawn", spawn)
+    monkeypatch.setattr(pool, "_is_healthy", healthy)
+    pool.clients = clients
+    return pool
+
+
+async def maintain(pool: MCPSessionPool) -> None:
+    for key, token_pool in list(pool._pools.items()):
+        await pool._maintain_pool(key, token_pool)
+
+
+@pytest.mark.asyncio
+async def test_active_partition_is_kept_warm(pool):
+    client = await pool.acquire("token-a")
+    await pool.release(client)
+    await maintain(pool)
+
+    assert pool.stats()["partitions"] == 1
+    assert pool.stats()["idle"] == 1
+    assert not client.closed
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_unused_partition_is_dropped_despite_min_size(pool):
+    client = await pool.acquire("token-a")
+    await pool.release(client)
+    pool._pools[token_fingerprint("token-a")].last_used -= pool.partition_idle_timeout + 1
+    await maintain(pool)
+
+    assert pool.stats()["partitions"] == 0
+    assert pool.stats()["partitions_evicted"] == 1
+    assert client.closed
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_partition_with_a_lease_is_kept(pool):
+    client = await pool.acquire("token-a")
+    pool._pools[token_fingerprint("token-a")].last_used -= pool.partition_idle_timeout + 1
+    await maintain(pool)
+
+    assert pool.stats()["partitions"] == 1
+    await pool.release(client)
+    assert not client.closed
+    await pool.close()
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+from src.services.prompt_compactor import PromptCompactor, Tokenizer
+
+
+def approximate_tokenizer() -> Tokenizer:
+    """Tokenizer pinned to the regex estimate, so the tests never load tiktoken"""
+    tokenizer = Tokenizer()
+    tokenizer._loaded = True
+    return tokenizer
+
+
+def compactor(**kwargs) -> PromptCompactor:
+    return PromptCompactor(tokenizer=approximate_tokenizer(), **kwargs)
+
+
+def source(lines: int, width: int = 8) -> str:
+    return "\n".join(f"line_{i} = " + " + ".join(f"value_{j}" for j in range(width)) for i in range(lines))
+
+
+def test_approximate_tokenizer_counts_word_runs_and_punctuation():
+    tokenizer = approximate_tokenizer()
+    assert not tokenizer.exact
+    assert tokenizer.count("import os") == 3
+    assert tokenizer.count('{"a": 1}') == 7
+
+
+def test_lockfiles_and_duplicates_are_dropped():
+    key_files = {
+        "package.json": '{"name": "app", "dependencies": {"express": "^4"}}',
+        "package-lock.json": source(50),
+        "services/api/go.sum": "h1:abc",
+        "Dockerfile": "FROM node:20\nCMD node index.js\n",
+        "deploy/Dockerfile": "FROM node:20\n  CMD node index.js",
+    }
+
+    _, compacted, report = compactor().compact({"paths": []}, key_files)
+
+    assert sorted(compacted) == ["Dockerfile", "package.json"]
+    assert sorted(report.files_dropped) == ["package-lock.json", "services/api/go.sum"]
+    # Duplicates differ only in whitespace; the higher-ranked (shallower) copy is kept
+    assert report.duplicates == ["deploy/Dockerfile"]
+
+
+def test_package_json_is_summarized_to_the_keys_the_analysis_reads():
+    package = {"name": "app", "scripts": {"start": "node ."}, "dependencies": {"express": "^4"},
+               "contributors": ["a"] * 50, "jest": {"verbose": True}}
+
+    _, compacted, _ = compactor().compact({"paths": []}, {"package.json": json.dumps(package)})
+
+    assert set(json.loads(compacted["package.json"])) == {"name", "scripts", "dependencies"}
+
+
+def test_oversized_input_is_compacted_to_the_budget():
+    key_files = {
+        "package.json": json.dumps({"name": "app", "dependencies": {f"dep-{i}": "^1" for i in range(300)}}),
+        "requirements.txt": "\n".join(f"package-{i}==1.0.{i}" for i in range(400)),
+        "README.md": source(300),
+        "src/app.py": source(300),
+        "src/worker.py": source(300),
+    }
+    structure = {"paths": [f"src/module_{i}/sub/deeper/file_{i}.py" for i in range(2000)]}
+    budget = 3_000
+    c = compactor(budget=budget, max_file_tokens=800)
+
+    _, _, report = c.compact(structure, key_files)
+
+    assert report.tokens_before > budget
+    assert report.tokens_after <= budget
+    assert c.stats()["reduction"] > 0
+
+
+def test_files_are_truncated_and_dropped_in_rank_order():
+    # Distinct contents, so none of them is dropped as a duplicate
+    key_files = {
+        path: source(200).replace("value", f"file{number}")
+        for number, path in enumerate(("notes/todo.txt", "README.md", "src/requirements.txt", "requirements.txt"))
+    }
+    c = compactor(budget=1_500, max_file_tokens=600, min_file_tokens=200)
+
+    _, compacted, report = c.compact({"paths": []}, key_files)
+
+    ranked = sorted(key_files, key=PromptCompactor._rank)
+    assert ranked == ["requirements.txt", "src/requirements.txt", "README.md", "notes/todo.txt"]
+    # Files are filled in rank order, so whatever runs out of budget is the lowest ranked
+    assert report.files_kept == ranked[:len(report.files_kept)]
+    assert report.files_truncated == report.files_kept
+    assert report.files_dropped == ranked[len(report.files_kept):]
+    assert report.files_dropped
+    assert report.tokens_after <= 1_500
+    assert all("... [truncated" in compacted[path] for path in report.files_truncated)
+    assert compacted["requirements.txt"].startswith("line_0 = file3_0")
+
+
+def test_truncation_keeps_head_and_tail():
+    c = compactor()
+    content = source(100)
+
+    truncated = c._truncate(content, 200)
+
+    assert c.tokenizer.count(truncated) <= 200
+    assert truncated.startswith("line_0 = ")
+    assert truncated.endswith(content.splitlines()[-1])
+    assert "... [truncated" in truncated
+
+
+@pytest.mark.parametrize("max_depth, expected", [
+    (3, ["README.md", "src/app.py", "src/api/v1/routes.py",
+         "src/api/v1/... (2 files)", "web/node/modules/... (1 files)"]),
+    (1, ["README.md", "src/app.py", "src/... (3 files)", "web/... (1 files)"]),
+])
+def test_collapse_paths(max_depth, expected):
+    paths = [
+        "README.md", "src/app.py", "src/api/v1/routes.py",
+        "src/api/v1/handlers/users.py", "src/api/v1/handlers/orders.py", "web/node/modules/x/y.js",
+    ]
+    assert PromptCompactor._collapse_paths(paths, max_depth) == expected
+
+
+def test_deep_trees_are_collapsed_until_the_structure_fits():
+    paths = [f"services/svc_{i}/src/pkg/module_{j}.py" for i in range(50) for j in range(20)]
+    c = compactor(budget=2_000)
+
+    structure, _, report = c.compact({"paths": paths, "file_count": len(paths)}, {})
+
+    assert len(structure["paths"]) < len(paths)
+    assert report.paths_collapsed == len(paths) - len(structure["paths"])
+    assert all("... (" in path for path in structure["paths"])
+    assert structure["file_count"] == len(paths)
+    assert c.tokenizer.count(json.dumps(structure["paths"], indent=2)) <= int(2_000 * c.structure_share)
@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.services.metrics import rate_limit_wait_seconds, rate_limit_waits_total
+from src.services.rate_limiter import (
+    BucketConfig, RateLimitBucket, RateLimitScheduler, RateLimitWaitTimeout, RateLimitedTransport, _parse_seconds
+)
+
+CONFIG = BucketConfig(rate=100.0, burst=10, max_concurrency=8)
+
+
+def bucket(key: str = "test") -> RateLimitBucket:
+    return RateLimitBucket(key, "github", CONFIG)
+
+
+def test_window_halves_on_throttling_and_grows_additively():
+    b = bucket()
+    assert b.observe(429, httpx.Headers({"retry-after": "0"})) == 0.0
+    assert b.window == 4.0
+    b.observe(429, httpx.Headers({"retry-after": "0"}))
+    assert b.window == 2.0
+
+    b.observe(200, httpx.Headers())
+    assert b.window == 2.5
+    for _ in range(100):
+        b.observe(200, httpx.Headers())
+    assert b.window == CONFIG.max_concurrency
+
+
+def test_throttles_without_retry_after_back_off_exponentially():
+    b = bucket()
+    pauses = [b.observe(429, httpx.Headers()) for _ in range(3)]
+    assert pauses == [1.0, 2.0, 4.0]
+    assert b.observe(200, httpx.Headers()) is None
+    assert b.observe(429, httpx.Headers()) == 1.0
+
+
+def test_retry_after_header_sets_the_pause():
+    b = bucket()
+    pause = b.observe(429, httpx.Headers({"retry-after": "7"}))
+    assert pause == 7.0
+    assert 6.5 < b.paused_until - time.monotonic() <= 7.0
+    assert b.observe(429, httpx.Headers({"retry-after-ms": "250"})) == 0.25
+
+
+def test_github_exhausted_quota_pauses_until_reset():
+    b = bucket()
+    reset = int(time.time()) + 30
+    pause = b.observe(403, httpx.Headers({"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(reset)}))
+
+    assert pause is not None and 28 < pause <= 30
+    assert b.throttled == 1
+    # A 403 that is not a rate limit (e.g. missing scope) is not retried
+    assert bucket().observe(403, httpx.Headers({"x-ratelimit-remaining": "10"})) is None
+
+
+def test_openrouter_low_quota_spreads_the_rest_until_reset():
+    b = bucket()
+    reset_ms = int((time.time() + 10) * 1000)
+    assert b.observe(200, httpx.Headers({"x-ratelimit-remaining": "5", "x-ratelimit-reset": str(reset_ms)})) is None
+
+    assert b.remaining == 5
+    assert 0.45 < b.rate < 0.55
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5", 5.0),
+    ("1.5", 1.5),
+    ("6m0s", 360.0),
+    ("250ms", 0.25),
+    ("1h2m3s", 3723.0),
+    (None, None),
+    ("soon", None),
+])
+def test_parse_seconds(value, expected):
+    assert _parse_seconds(value, time.time()) == expected
+
+
+def test_parse_seconds_of_epoch_values():
+    now = time.time()
+    assert _parse_seconds(str(int(now) + 60), now) == pytest.approx(60, abs=1)
+    assert _parse_seconds(str(int((now + 60) * 1000)), now) == pytest.approx(60, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_acquire_fails_fast_when_the_wait_exceeds_max_wait():
+    b = bucket()
+    b.observe(429, httpx.Headers({"retry-after": "10"}))
+    started = time.monotonic()
+    with pytest.raises(RateLimitWaitTimeout):
+        await b.acquire(max_wait=0.5)
+    assert time.monotonic() - started < 0.1
+    assert b.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_waits_are_exported_as_metrics():
+    b = RateLimitBucket("metrics-test", "llm", BucketConfig(rate=20.0, burst=1, max_concurrency=8))
+    await b.acquire()
+    waited = await b.acquire()
+
+    assert waited > 0.02
+    assert rate_limit_wait_seconds.summary(bucket="metrics-test")["count"] == 2
+    assert rate_limit_waits_total.get(bucket="metrics-test") == 1
+
+
+class ThrottlingTransport(httpx.AsyncBaseTransport):
+    """Answers 429 until ``throttles`` calls were made, without reading request bodies"""
+
+    def __init__(self, throttles: int):
+        self.throttles = throttles
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+
+        # Streamed like a network response, so closing it goes through the transport's wrapper
+        async def body():
+            yield b"{}"
+
+        status_code = 429 if self.calls <= self.throttles else 200
+        return httpx.Response(status_code, headers={"retry-after": "0"}, content=body())
+
+
+def transport(upstream: ThrottlingTransport, max_retries: int = 5) -> RateLimitedTransport:
+    scheduler = RateLimitScheduler({"llm": CONFIG}, max_retries=max_retries, max_wait=5.0)
+    return RateLimitedTransport(upstream, "llm", lambda request: "llm:test", scheduler)
+
+
+@pytest.mark.asyncio
+async def test_throttled_requests_are_retried_up_to_max_retries():
+    upstream = ThrottlingTransport(throttles=2)
+    rate_limited = transport(upstream)
+    async with httpx.AsyncClient(transport=rate_limited, base_url="http://llm.test") as client:
+        response = await client.post("/chat", json={"model": "m"})
+    assert response.status_code == 200
+    assert upstream.calls == 3
+    bucket = rate_limited.scheduler.bucket("llm:test", "llm")
+    assert (bucket.retries, bucket.throttled, bucket.in_flight) == (2, 2, 0)
+
+    upstream = ThrottlingTransport(throttles=10)
+    async with httpx.AsyncClient(transport=transport(upstream, max_retries=2), base_url="http://llm.test") as client:
+        response = await client.post("/chat", json={"model": "m"})
+    assert response.status_code == 429
+    assert upstream.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_streamed_request_bodies_are_not_replayed():
+    async def body():
+        yield b'{"model": "m"}'
+
+    upstream = ThrottlingTransport(throttles=1)
+    rate_limited = transport(upstream)
+    async with httpx.AsyncClient(transport=rate_limited, base_url="http://llm.test") as client:
+        response = await client.post("/chat", content=body())
+
+    assert response.status_code == 429
+    assert upstream.calls == 1
+    # The concurrency slot is returned once the response is closed
+    assert rate_limited.scheduler.bucket("llm:test", "llm").in_flight == 0
@@ -0,0 +1,157 @@
+import io
+import os
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.services import repo_ingest
+from src.services.repo_ingest import IngestionError, TarballIngestor
+
+PREFIX = "octo-app-abc123"
+
+
+def build_tarball() -> bytes:
+    """Gzipped tarball in GitHub's layout: everything under one top-level directory"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        def add(name: str, data: bytes = b"", kind: bytes = tarfile.REGTYPE, target: str = "") -> None:
+            info = tarfile.TarInfo(f"{PREFIX}/{name}" if name else PREFIX)
+            info.type = kind
+            info.size = len(data) if kind == tarfile.REGTYPE else 0
+            info.linkname = target
+            tar.addfile(info, io.BytesIO(data) if kind == tarfile.REGTYPE else None)
+
+        add("", kind=tarfile.DIRTYPE)
+        add("package.json", b'{"name": "octo-app", "dependencies": {"express": "^4"}}')
+        add("README.md", b"# " + b"x" * 4096)
+        add("src", kind=tarfile.DIRTYPE)
+        add("src/index.ts", b"console.log('hi')")
+        add("src/requirements.txt", b"flask\n")
+        add("packages/web/package.json", b'{"name": "web"}')
+        add("node_modules/express/index.js", b"module.exports = {}")
+        add("assets/logo.png", b"\x89PNG" + b"\x00" * 64)
+        add("current", kind=tarfile.SYMTYPE, target="src")
+    return buffer.getvalue()
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    archive = b""
+    declare_length = True
+
+    def do_GET(self):
+        if self.path.startswith("/repos/octo/app/tarball"):
+            # GitHub answers with a redirect to the archive host
+            self.send_response(302)
+            self.send_header("Location", "/archive/octo-app.tar.gz")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/archive/octo-app.tar.gz":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-gzip")
+            if self.declare_length:
+                self.send_header("Content-Length", str(len(self.archive)))
+            else:
+                self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(self.archive)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def github(monkeypatch):
+    ArchiveHandler.archive = build_tarball()
+    ArchiveHandler.declare_length = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArchiveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(repo_ingest, "GITHUB_API_URL", f"http://127.0.0.1:{server.server_port}")
+    yield ArchiveHandler
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_ingest_indexes_paths_and_key_files(github):
+    index = await TarballIngestor("token", max_key_file_bytes=1024).ingest("octo", "app", "main")
+
+    assert index.archive_bytes == len(github.archive)
+    assert sorted(index.files) == [
+        "README.md", "current", "package.json", "packages/web/package.json",
+        "src", "src/index.ts", "src/requirements.txt",
+    ]
+    assert index.files["current"].type == "symlink"
+    assert index.files["src"].type == "dir"
+    # Vendored directories and binary files are counted but not indexed
+    assert index.skipped == 2
+    assert "node_modules/express/index.js" not in index.files
+    assert "assets/logo.png" not in index.files
+
+    # Oversized and too-deep manifests are listed but not read
+    assert sorted(index.key_files) == ["package.json", "src/requirements.txt"]
+    assert "express" in index.key_files["package.json"]
+    assert index.files["README.md"].size > 1024
+
+    structure = index.to_structure()
+    assert structure["file_count"] == 5
+    assert structure["paths_truncated"] is False
+
+
+@pytest.mark.asyncio
+async def test_ingest_truncates_at_max_files(github):
+    index = await TarballIngestor("token", max_files=3).ingest("octo", "app")
+
+    assert len(index.files) == 3
+    assert index.truncated
+    assert index.to_structure()["paths_truncated"] is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("declare_length", [True, False])
+async def test_ingest_rejects_oversized_archive(github, declare_length):
+    github.declare_length = declare_length
+    with pytest.raises(IngestionError, match="exceeds"):
+        await TarballIngestor("token", max_archive_bytes=len(github.archive) - 1).ingest("octo", "app")
+
+
+@pytest.mark.asyncio
+async def test_ingest_reports_http_errors(github):
+    with pytest.raises(IngestionError, match="HTTP 404"):
+        await TarballIngestor("token").ingest("octo", "missing")
+
+
+def test_invalid_archive_is_rejected():
+    with pytest.raises(IngestionError, match="Invalid repository archive"):
+        TarballIngestor("token").build_index(b"not a tarball")
+
+
+@pytest.mark.asyncio
+async def test_download_stops_once_the_parser_has_enough(github):
+    # Incompressible contents, so the archive is far larger than the pipe holds
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for i in range(50):
+            data = os.urandom(16 * 1024)
+            info = tarfile.TarInfo(f"{PREFIX}/file_{i}.txt")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    github.archive = buffer.getvalue()
+
+    index = await TarballIngestor("token", max_files=3, chunk_bytes=4096, max_chunks=2).ingest("octo", "app")
+
+    assert index.truncated
+    assert index.archive_bytes < len(github.archive) // 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_downloaded_archive_is_rejected(github):
+    github.archive = b"not a tarball" * 1000
+    with pytest.raises(IngestionError, match="Invalid repository archive"):
+        await TarballIngestor("token", chunk_bytes=1024, max_chunks=2).ingest("octo", "app")
@@ -0,0 +1,73 @@
+import asyncio
+import importlib
+
+import httpx
+import pytest
+
+from src.services.github_api import GitHubClient
+from src.services.repo_metadata import RepoMetadataCache
+
+# The package re-exports the ``repo_metadata`` singleton under the module's name
+repo_metadata_module = importlib.import_module("src.services.repo_metadata")
+
+
+@pytest.fixture
+def github_api(monkeypatch):
+    """Routes every GitHubClient the cache creates to a slow in-memory API"""
+    calls = []
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await release.wait()
+        if request.url.path == "/repos/octo/app":
+            return httpx.Response(200, json={"default_branch": "main", "visibility": "public", "size": 12})
+        return httpx.Response(200, text="abc123")
+
+    real_client = GitHubClient
+
+    def client(github_token: str) -> GitHubClient:
+        github = real_client(github_token)
+        github.http = httpx.AsyncClient(base_url="https://api.github.test", transport=httpx.MockTransport(handler))
+        return github
+
+    monkeypatch.setattr(repo_metadata_module, "GitHubClient", client)
+    return calls, release
+
+
+@pytest.mark.asyncio
+async def test_follower_survives_the_leader_closing_its_client(github_api):
+    calls, release = github_api
+    cache = RepoMetadataCache()
+    leader_client, follower_client = GitHubClient("token"), GitHubClient("token")
+
+    leader = asyncio.create_task(cache.get(leader_client, "octo", "app"))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(cache.get(follower_client, "octo", "app"))
+    await asyncio.sleep(0.01)
+
+    # The leader gives up and closes its client while the fetch is in flight
+    leader.cancel()
+    await leader_client.close()
+    release.set()
+
+    metadata = await asyncio.wait_for(follower, 1)
+    assert (metadata.default_branch, metadata.head_sha) == ("main", "abc123")
+    assert calls == ["/repos/octo/app", "/repos/octo/app/commits/main"]
+    await follower_client.close()
+
+
+@pytest.mark.asyncio
+async def test_fresh_entries_are_served_from_memory(github_api):
+    calls, release = github_api
+    release.set()
+    cache = RepoMetadataCache(ttl_seconds=60)
+    github = GitHubClient("token")
+
+    first = await cache.get(github, "octo", "app")
+    second = await cache.get(github, "Octo", "App")
+
+    assert second is first
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+    await github.close()
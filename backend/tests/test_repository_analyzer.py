@@ -0,0 +1,126 @@
+from typing import List, Optional
+
+import pytest
+
+from src.models import AnalysisResponse
+from src.services.github_api import GitHubAPIError
+from src.services.metrics import repository_analyses_total
+from src.services.repository_analyzer import RepositoryAnalyzer
+
+PREVIOUS = AnalysisResponse.model_validate({
+    "project_overview": {"name": "app", "description": "An API", "purpose": "Serve", "complexity_score": 3},
+    "technical_architecture": {
+        "technology_stack": {"language": "Python", "framework": "FastAPI"},
+        "system_architecture": {"architecture_type": "monolith"},
+    },
+    "analysis_id": "a1",
+    "timestamp": "2026-01-01T00:00:00",
+    "commit_sha": "old",
+})
+
+
+class FakeGitHub:
+    """Answers ``changed_paths`` with fixed paths (None raises like a failed compare)"""
+
+    def __init__(self, changed: Optional[List[str]]):
+        self.changed = changed
+        self.compared = []
+
+    async def changed_paths(self, owner, repo, base, head):
+        self.compared.append((base, head))
+        if self.changed is None:
+            raise GitHubAPIError("Compare failed", status_code=404)
+        return self.changed
+
+    async def close(self):
+        pass
+
+
+class FullAnalysis(Exception):
+    pass
+
+
+def analyzer(changed: Optional[List[str]]) -> RepositoryAnalyzer:
+    analyzer = RepositoryAnalyzer("token", "key")
+    analyzer.github = FakeGitHub(changed)
+
+    async def full_run(owner, repo, ref=None):
+        raise FullAnalysis(ref)
+
+    analyzer.get_repository_structure = full_run
+    return analyzer
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("changed", [
+    [],
+    ["src/app/routes.py", "tests/test_routes.py"],
+    ["docs/guide.md", "node_modules/express/package.json"],
+    ["packages/web/src/deep/requirements.txt"],
+])
+async def test_analysis_is_carried_forward_when_no_path_affects_it(changed):
+    before = repository_analyses_total.get(path="incremental")
+
+    refreshed = await analyzer(changed).analyze_repository("octo", "app", "new", PREVIOUS)
+
+    assert refreshed.commit_sha == "new"
+    assert refreshed.analysis_id != PREVIOUS.analysis_id
+    assert refreshed.project_overview == PREVIOUS.project_overview
+    assert refreshed.technical_architecture == PREVIOUS.technical_architecture
+    assert PREVIOUS.commit_sha == "old"
+    assert repository_analyses_total.get(path="incremental") == before + 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("changed", [
+    ["requirements.txt"],
+    ["src/app/routes.py", "package.json"],
+    ["main.py"],
+    ["api/go.mod"],
+])
+async def test_relevant_changes_force_a_full_analysis(changed):
+    before = repository_analyses_total.get(path="changed")
+
+    with pytest.raises(FullAnalysis, match="new"):
+        await analyzer(changed).analyze_repository("octo", "app", "new", PREVIOUS)
+    assert repository_analyses_total.get(path="changed") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_unlistable_changes_force_a_full_analysis():
+    before = repository_analyses_total.get(path="no_diff")
+
+    with pytest.raises(FullAnalysis):
+        await analyzer(None).analyze_repository("octo", "app", "new", PREVIOUS)
+    # Without a head SHA nothing can be compared
+    unresolved = analyzer([])
+    with pytest.raises(FullAnalysis):
+        await unresolved.analyze_repository("octo", "app", None, PREVIOUS)
+
+    assert unresolved.github.compared == []
+    assert repository_analyses_total.get(path="no_diff") == before + 2
+
+
+@pytest.mark.asyncio
+async def test_readme_only_change_is_counted_as_possibly_stale():
+    before = repository_analyses_total.get(path="incremental_readme_changed")
+
+    refreshed = await analyzer(["README.md", "src/app/routes.py"]).analyze_repository("octo", "app", "new", PREVIOUS)
+
+    assert refreshed.project_overview.description == PREVIOUS.project_overview.description
+    assert repository_analyses_total.get(path="incremental_readme_changed") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_same_commit_is_carried_forward_without_a_compare():
+    same = analyzer([])
+    refreshed = await same.analyze_repository("octo", "app", "old", PREVIOUS)
+
+    assert refreshed.commit_sha == "old"
+    assert same.github.compared == []
+
+
+@pytest.mark.asyncio
+async def test_without_a_previous_analysis_the_repository_is_analyzed():
+    with pytest.raises(FullAnalysis):
+        await analyzer([]).analyze_repository("octo", "app", "new", None)
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from src.services.single_flight import SingleFlight
+
+
+class Work:
+    """Counts executions; each one waits for ``release`` and then returns or raises"""
+
+    def __init__(self, result="value"):
+        self.result = result
+        self.release = asyncio.Event()
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_followers_share_the_leaders_result():
+    flights, work = SingleFlight(), Work()
+    callers = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+    await settle()
+    work.release.set()
+
+    assert await asyncio.gather(*callers) == ["value"] * 3
+    assert work.started == 1
+    assert flights.stats() == {"executed": 1, "coalesced": 2, "failed": 0, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_followers_share_the_leaders_exception():
+    flights, work = SingleFlight(), Work(RuntimeError("boom"))
+    callers = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+    await settle()
+    work.release.set()
+
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) and str(result) == "boom" for result in results)
+    assert work.started == 1
+    assert flights.stats() == {"executed": 1, "coalesced": 2, "failed": 1, "in_flight": 0}
+
+    # A failed flight is not cached: the next call runs again
+    work.result = "recovered"
+    assert await flights.do("key", work) == "recovered"
+    assert work.started == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_leader_does_not_cancel_the_shared_work():
+    flights, work = SingleFlight(), Work()
+    leader = asyncio.create_task(flights.do("key", work))
+    await settle()
+    follower = asyncio.create_task(flights.do("key", work))
+    await settle()
+
+    leader.cancel()
+    await settle()
+    assert leader.cancelled()
+    assert work.cancelled == 0
+
+    work.release.set()
+    assert await follower == "value"
+    assert work.started == 1
+
+
+@pytest.mark.asyncio
+async def test_work_is_cancelled_once_the_last_waiter_leaves():
+    flights, work = SingleFlight(), Work()
+    callers = [asyncio.create_task(flights.do("key", work)) for _ in range(2)]
+    await settle()
+
+    callers[0].cancel()
+    await settle()
+    assert work.cancelled == 0
+    callers[1].cancel()
+    await settle()
+
+    assert work.cancelled == 1
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_live_follower_retries_as_leader_after_the_work_is_cancelled():
+    flights, work = SingleFlight(), Work()
+    leader = asyncio.create_task(flights.do("key", work))
+    await settle()
+    follower = asyncio.create_task(flights.do("key", work))
+    await settle()
+
+    # The shared task is cancelled underneath its live waiters: one of them
+    # starts a new flight and the other joins it
+    flights._flights["key"].task.cancel()
+    await settle()
+    assert work.cancelled == 1
+    assert work.started == 2
+
+    work.release.set()
+    assert await follower == "value"
+    assert await leader == "value"
+    assert flights.stats()["executed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_keys_do_not_share_flights():
+    flights, work = SingleFlight(), Work()
+    callers = [asyncio.create_task(flights.do(key, work)) for key in ("a", "b", "a")]
+    await settle()
+    work.release.set()
+
+    await asyncio.gather(*callers)
+    assert (work.started, flights.executed, flights.coalesced) == (2, 2, 1)
@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+from src.services.stack_detector import detect_stack
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "stacks.json")
+
+with open(FIXTURES) as f:
+    STACKS = {stack["name"]: stack for stack in json.load(f)}
+
+
+@pytest.mark.parametrize("name", sorted(STACKS))
+def test_fixture_stack_is_detected(name):
+    stack = STACKS[name]
+    detection = detect_stack(stack["key_files"], stack["paths"])
+
+    detected = detection.technology_stack.model_dump(include=set(stack["expected"]))
+    assert detected == stack["expected"]
+    # Only manifests naming a framework are trusted without the LLM
+    assert detection.is_confident == (stack["expected"]["framework"] is not None)
+
+
+def test_fixture_detection_builds_an_analysis():
+    stack = STACKS["fastapi-service"]
+    analysis = detect_stack(stack["key_files"], stack["paths"]).to_analysis("fastapi-service", stack["paths"])
+
+    assert analysis.project_overview.name == "fastapi-service"
+    assert analysis.technical_architecture.technology_stack.framework == "FastAPI"
+    assert analysis.technical_architecture.system_architecture.architecture_type == "Monolithic"
+
+
+def test_competing_root_stacks_lower_the_confidence():
+    express, fastapi = STACKS["express-api"], STACKS["fastapi-service"]
+    alone = detect_stack(fastapi["key_files"], fastapi["paths"])
+    both = detect_stack({**express["key_files"], **fastapi["key_files"]}, express["paths"] + fastapi["paths"])
+
+    assert both.confidence == pytest.approx(alone.confidence - 0.2)
+    assert "competing JavaScript stack in package.json" in both.evidence
+    assert not both.is_confident
+
+
+def test_nested_stack_in_a_monorepo_does_not_compete():
+    next_app, fastapi = STACKS["next-app"], STACKS["fastapi-service"]
+    key_files = {**next_app["key_files"], "api/requirements.txt": fastapi["key_files"]["requirements.txt"]}
+    paths = next_app["paths"] + ["api/requirements.txt", "api/main.py"]
+    detection = detect_stack(key_files, paths)
+
+    assert detection.technology_stack.framework == "Next.js"
+    assert detection.is_confident
+    # The nested service still supplies the database and makes the layout modular
+    assert detection.technology_stack.database == "PostgreSQL"
+    assert detection.to_analysis("mono", paths).technical_architecture.system_architecture.architecture_type == "Modular"
+
+
+def test_nested_only_manifest_is_not_confident():
+    fastapi = STACKS["fastapi-service"]
+    detection = detect_stack({"services/api/requirements.txt": fastapi["key_files"]["requirements.txt"]})
+
+    assert detection.technology_stack.framework == "FastAPI"
+    assert not detection.is_confident
+
+
+def test_unparseable_manifest_is_ignored():
+    detection = detect_stack({"package.json": "{not json"})
+
+    assert detection.technology_stack is None
+    assert detection.confidence == 0.0
@@ -0,0 +1,121 @@
+import socketserver
+import threading
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from src.models import AnalysisResponse, DockerizationStatus, TaskStatus
+from src.utils.state_store import KVStateStore, MemoryStateStore, SQLiteStateStore, create_state_store
+from tests.fake_kv import FakeKV, KVHandler
+
+
+@pytest.fixture
+def kv_url():
+    KVHandler.kv = FakeKV()
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), KVHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "kv"])
+async def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemoryStateStore()
+    elif request.param == "sqlite":
+        store = SQLiteStateStore(str(tmp_path / "state.db"), status_ttl_seconds=60)
+    else:
+        store = KVStateStore.from_url(request.getfixturevalue("kv_url"), status_ttl_seconds=60)
+    yield store
+    await store.close()
+
+
+ANALYSIS = {
+    "project_overview": {"name": "app", "description": "An API", "purpose": "Serve", "complexity_score": 3},
+    "technical_architecture": {
+        "technology_stack": {"language": "Python", "framework": "FastAPI"},
+        "system_architecture": {"architecture_type": "monolith"},
+    },
+    "timestamp": "2026-01-01T00:00:00",
+}
+
+
+def pending(task_id: str) -> DockerizationStatus:
+    return DockerizationStatus(
+        task_id=task_id, status=TaskStatus.PENDING, message="Queued", progress=0, timestamp=datetime.now()
+    )
+
+
+@pytest.mark.asyncio
+async def test_update_status_changes_only_the_given_fields(store):
+    await store.put_status(pending("t1"))
+    await store.update_status("t1", {"status": TaskStatus.DOCKERIZING, "progress": 40},
+                              artifacts=["Dockerfile"], timings={"dockerfile": 1.5})
+    await store.update_status("t1", artifacts=["docker-compose.yml"], timings={"compose": 0.5})
+
+    status = await store.get_status("t1")
+    assert status.status == TaskStatus.DOCKERIZING
+    assert status.progress == 40
+    assert status.message == "Queued"
+    assert status.artifacts == ["Dockerfile", "docker-compose.yml"]
+    assert status.timings == {"dockerfile": 1.5, "compose": 0.5}
+
+
+@pytest.mark.asyncio
+async def test_update_of_a_missing_status_writes_nothing(store):
+    await store.update_status("gone", {"status": TaskStatus.COMPLETED, "progress": 100},
+                              artifacts=["Dockerfile"], timings={"total": 3.0})
+
+    assert await store.get_status("gone") is None
+
+
+@pytest.mark.asyncio
+async def test_kv_update_after_expiry_does_not_recreate_the_status(kv_url):
+    store = KVStateStore.from_url(kv_url, status_ttl_seconds=60)
+    try:
+        await store.put_status(pending("t1"))
+        await store.update_status("t1", {"status": TaskStatus.COMPLETED, "progress": 100})
+        assert KVHandler.kv.expires
+
+        # Simulate the finished status expiring before a late timing update
+        for key in list(KVHandler.kv.expires):
+            KVHandler.kv.expires[key] = 0
+        await store.update_status("t1", timings={"total": 3.0})
+
+        assert await store.get_status("t1") is None
+        assert not any(key.startswith("devops-agent:status:t1") for key in KVHandler.kv.data)
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_analyses_are_pruned_to_the_byte_budget(tmp_path):
+    def analysis(analysis_id: str) -> AnalysisResponse:
+        return AnalysisResponse.model_validate({**ANALYSIS, "analysis_id": analysis_id})
+
+    size = len(analysis("a0").model_dump_json())
+    store = SQLiteStateStore(str(tmp_path / "state.db"), analysis_max_bytes=int(size * 2.5))
+    for i in range(4):
+        await store.put_analysis(analysis(f"a{i}"), "octo", "app", commit_sha=f"sha{i}")
+    store.local_analyses = type(store.local_analyses)()
+
+    assert sorted(await store.analysis_ids()) == ["a2", "a3"]
+    assert await store.lookup_analysis("octo", "app", "sha0") is None
+    assert (await store.lookup_analysis("octo", "app", "sha3")).analysis_id == "a3"
+    assert (await store.latest_analysis("octo", "app")).analysis_id == "a3"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url, tls", [("redis://localhost:6379/0", False), ("rediss://localhost:6380/0", True)])
+async def test_kv_store_urls_with_and_without_tls(monkeypatch, url, tls):
+    monkeypatch.setenv("STATE_STORE_URL", url)
+
+    store = create_state_store()
+    try:
+        assert isinstance(store, KVStateStore)
+        assert (store.redis.connection_pool.connection_class.__name__ == "SSLConnection") == tls
+    finally:
+        await store.close()
@@ -0,0 +1,123 @@
+import json
+from typing import List
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel
+
+from src.services.structured_output import (
+    StructuredOutput, StructuredOutputError, parse_structured, repair_json, response_format
+)
+
+
+class Stack(BaseModel):
+    language: str
+    frameworks: List[str]
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"language": "Python", "frameworks": ["FastAPI"]}', {"language": "Python", "frameworks": ["FastAPI"]}),
+    ('```json\n{"language": "Go", "frameworks": []}\n```', {"language": "Go", "frameworks": []}),
+    ('```\n{"language": "Go", "frameworks": []}\n```', {"language": "Go", "frameworks": []}),
+    ('Here is the analysis:\n{"language": "Go", "frameworks": []}\nLet me know!', {"language": "Go", "frameworks": []}),
+    ('{"language": "Go", "frameworks": ["gin",],}', {"language": "Go", "frameworks": ["gin"]}),
+    ('{"language": "Go", "frameworks": ["gin", "ech', {"language": "Go", "frameworks": ["gin", "ech"]}),
+    ('{"language": "Go", "frameworks": ["gin",', {"language": "Go", "frameworks": ["gin"]}),
+    ('{"language": "Go", "frameworks": {"web": "gin"', {"language": "Go", "frameworks": {"web": "gin"}}),
+    ('{"language": "Go", "frameworks":', {"language": "Go", "frameworks": None}),
+    ('{"language": "a {b} [c]", "frameworks": []} trailing }', {"language": "a {b} [c]", "frameworks": []}),
+    ('{"language": "say \\"hi\\"", "frameworks": []}', {"language": 'say "hi"', "frameworks": []}),
+])
+def test_repair_json(raw, expected):
+    assert json.loads(repair_json(raw), strict=False) == expected
+
+
+def test_repair_json_leaves_text_without_an_object_alone():
+    assert repair_json("  no json here  ") == "no json here"
+
+
+def test_parse_structured_reports_whether_it_repaired():
+    assert parse_structured('{"language": "Go", "frameworks": []}', Stack) == (Stack(language="Go", frameworks=[]), False)
+    assert parse_structured('```json\n{"language": "Go", "frameworks": []}\n```', Stack)[1] is True
+    with pytest.raises(StructuredOutputError, match="frameworks"):
+        parse_structured('{"language": "Go"}', Stack)
+    with pytest.raises(StructuredOutputError):
+        parse_structured('```json\n{"language": "Go", "frameworks": []}\n```', Stack, repair=False)
+
+
+def test_response_format_by_mode():
+    assert response_format(Stack, "json_schema")["json_schema"]["schema"] == Stack.model_json_schema()
+    assert response_format(Stack, "json_object") == {"type": "json_object"}
+    assert response_format(Stack, "prompt") is None
+
+
+class FakeLLM:
+    """Chat model stand-in answering with canned replies and recording each request"""
+
+    def __init__(self, *replies: str):
+        self.replies = list(replies)
+        self.requests = []
+        self.bound = []
+
+    def bind(self, **kwargs):
+        self.bound.append(kwargs)
+        return self
+
+    async def ainvoke(self, messages):
+        self.requests.append(messages)
+        return AIMessage(content=self.replies.pop(0))
+
+
+VALID = '{"language": "Go", "frameworks": ["gin"]}'
+INVALID = '{"language": "Go"}'
+
+
+@pytest.mark.asyncio
+async def test_generate_constrains_the_request_and_repairs_locally():
+    output = StructuredOutput(max_retries=1)
+    llm = FakeLLM("Sure!\n" + VALID + "\nDone.")
+
+    value = await output.generate(llm, [HumanMessage(content="analyze")], Stack, "stack")
+
+    assert value == Stack(language="Go", frameworks=["gin"])
+    assert len(llm.requests) == 1
+    assert llm.bound[0]["response_format"]["type"] == "json_schema"
+    assert dict(output.counters["stack"]) == {"calls": 1, "repaired": 1}
+
+
+@pytest.mark.asyncio
+async def test_recover_asks_for_a_correction_with_the_validation_error():
+    output = StructuredOutput(max_retries=2)
+    llm = FakeLLM(VALID)
+
+    value = await output.recover(llm, [HumanMessage(content="analyze")], INVALID, Stack, "stack")
+
+    assert value.frameworks == ["gin"]
+    assert len(llm.requests) == 1
+    correction = llm.requests[0]
+    assert correction[1].content == INVALID
+    assert "frameworks" in correction[2].content
+    counters = output.counters["stack"]
+    assert (counters["retries"], counters["wasted_calls"], counters["retry_successes"], counters["failures"]) == (1, 1, 1, 0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_retries", [0, 1, 3])
+async def test_recover_makes_at_most_max_retries_corrections(max_retries):
+    output = StructuredOutput(max_retries=max_retries)
+    llm = FakeLLM(*[INVALID] * 10)
+
+    with pytest.raises(StructuredOutputError):
+        await output.recover(llm, [HumanMessage(content="analyze")], INVALID, Stack, "stack")
+
+    assert len(llm.requests) == max_retries
+    counters = output.counters["stack"]
+    assert counters["retries"] == max_retries
+    assert counters["wasted_calls"] == max_retries + 1
+    assert counters["failures"] == 1
+    assert output.stats()["failures"] == 1
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError, match="Unknown structured output mode"):
+        StructuredOutput(mode="xml")
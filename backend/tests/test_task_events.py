@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.models import DockerizationStatus, TaskStatus
+from src.services.task_events import TaskEventBus
+
+
+def status(progress: int) -> DockerizationStatus:
+    return DockerizationStatus(
+        task_id="t1", status=TaskStatus.DOCKERIZING, message=f"{progress}%", progress=progress,
+        timestamp=datetime.now(),
+    )
+
+
+async def collect(bus: TaskEventBus, last_event_id: int):
+    return [event.id async for event in bus.subscribe("t1", last_event_id)]
+
+
+@pytest.mark.asyncio
+async def test_subscriber_resumes_after_last_event_id():
+    bus = TaskEventBus()
+    for progress in (10, 20, 30):
+        bus.publish(status(progress))
+    bus.close("t1")
+
+    assert await collect(bus, 0) == [1, 2, 3]
+    assert await collect(bus, 2) == [3]
+    assert await collect(bus, 3) == []
+
+
+@pytest.mark.asyncio
+async def test_cursor_from_before_a_restart_replays_the_history():
+    # A fresh bus stands in for the restarted process; the client saw id 7 before
+    bus = TaskEventBus()
+    for progress in (10, 20):
+        bus.publish(status(progress))
+    bus.close("t1")
+
+    assert await collect(bus, 7) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_waiting_subscriber_ahead_of_the_history_gets_new_events():
+    bus = TaskEventBus()
+    subscriber = asyncio.create_task(collect(bus, 5))
+    await asyncio.sleep(0)
+    bus.publish(status(10))
+    bus.publish(status(20))
+    bus.close("t1")
+
+    assert await asyncio.wait_for(subscriber, 1) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_status_is_not_republished():
+    bus = TaskEventBus()
+    assert bus.publish(status(10)) is not None
+    assert bus.publish(status(10)) is None
+    assert bus.stats()["deduplicated"] == 1
@@ -0,0 +1,143 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import main
+from src.services import warmup
+from src.services.warmup import StartupWarmup
+
+
+class FakeClients:
+    def __init__(self):
+        self.models = []
+
+    def get(self, model):
+        self.models.append(model)
+
+
+class FakePool:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.prewarmed = []
+
+    async def prewarm(self, token, count):
+        if token in self.failing:
+            raise RuntimeError(f"{token} rejected")
+        self.prewarmed.append((token, count))
+
+
+class FakeTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return 0
+
+
+class FakeCompactor:
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+
+
+@pytest.fixture
+def resources(monkeypatch):
+    clients, pool, compactor = FakeClients(), FakePool(failing={"bad-token"}), FakeCompactor()
+    monkeypatch.setattr(warmup, "llm_clients", clients)
+    monkeypatch.setattr(warmup, "mcp_pool", pool)
+    monkeypatch.setattr(warmup, "prompt_compactor", compactor)
+    return clients, pool, compactor
+
+
+@pytest.mark.asyncio
+async def test_run_warms_clients_tokenizer_and_mcp_sessions(resources):
+    clients, pool, compactor = resources
+    startup = StartupWarmup(enabled=True, github_tokens=["token-a", " token-b "], mcp_sessions=2)
+    assert not startup.ready
+
+    await startup.run()
+
+    assert set(clients.models) == {warmup.ANALYSIS_MODEL, warmup.AGENT_MODEL}
+    assert compactor.tokenizer.calls == 1
+    assert pool.prewarmed == [("token-a", 2), ("token-b", 2)]
+    assert startup.completed and startup.ready
+    assert startup.errors == []
+    assert set(startup.timings) == {"imports", "llm_clients", "tokenizer", "mcp_sessions", "total"}
+
+
+@pytest.mark.asyncio
+async def test_mcp_prewarm_failure_is_recorded_without_failing_startup(resources):
+    _, pool, _ = resources
+    startup = StartupWarmup(enabled=True, github_tokens=["bad-token", "token-a"])
+
+    await startup.run()
+
+    assert startup.completed and startup.ready
+    assert startup.errors == ["mcp: bad-token rejected"]
+    assert pool.prewarmed == [("token-a", 1)]
+    assert startup.stats()["errors"] == startup.errors
+
+
+def test_disabled_warmup_is_ready_without_running():
+    startup = StartupWarmup()
+    assert not startup.completed
+    assert startup.ready
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("STARTUP_WARMUP", "yes")
+    monkeypatch.setenv("STARTUP_WARMUP_GITHUB_TOKENS", "a, ,b")
+    monkeypatch.setenv("STARTUP_WARMUP_MCP_SESSIONS", "3")
+
+    startup = StartupWarmup.from_env()
+
+    assert startup.enabled
+    assert startup.github_tokens == ["a", "b"]
+    assert startup.mcp_sessions == 3
+
+
+@pytest.mark.asyncio
+async def test_health_is_not_ready_until_warmup_completes(resources, monkeypatch, tmp_path):
+    monkeypatch.setenv("JOB_QUEUE_URL", f"sqlite:///{tmp_path / 'jobs.sqlite3'}")
+    monkeypatch.setenv("DOCKERIZE_WORKERS", "0")
+    startup = StartupWarmup(enabled=True)
+    release = asyncio.Event()
+    original_run = startup.run
+
+    async def run():
+        await release.wait()
+        await original_run()
+
+    startup.run = run
+    monkeypatch.setattr(main, "startup_warmup", startup)
+
+    async def health():
+        # ASGITransport does not run the lifespan, so the endpoint can be probed while it is starting
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.get("/health")
+
+    async def serve():
+        async with main.lifespan(main.app):
+            started.set()
+            await stop.wait()
+
+    started, stop = asyncio.Event(), asyncio.Event()
+    server = asyncio.create_task(serve())
+    await asyncio.sleep(0.05)
+
+    response = await health()
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+    assert response.json()["status"] == "starting"
+    assert not started.is_set()
+
+    release.set()
+    await asyncio.wait_for(started.wait(), 5)
+    response = await health()
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+    assert response.json()["warmup"]["completed"] is True
+
+    stop.set()
+    await server
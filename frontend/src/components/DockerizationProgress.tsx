@@ -94,13 +94,35 @@ const DockerizationProgress: React.FC<DockerizationProgressProps> = ({
       }
     };
 
-    // Initial fetch
-    pollStatus();
+    const startPolling = () => {
+      // Initial fetch
+      pollStatus();
 
-    // Poll every 2 seconds
-    intervalId = setInterval(pollStatus, 2000);
+      // Poll every 2 seconds
+      intervalId = setInterval(pollStatus, 2000);
+    };
+
+    // Prefer pushed updates; fall back to polling if the stream is unavailable
+    let closeStream: (() => void) | undefined;
+    if (typeof EventSource !== 'undefined') {
+      let latest: DockerizationStatus | null = null;
+      closeStream = apiService.streamDockerizationStatus(
+        taskId,
+        (statusData) => {
+          latest = statusData;
+          setStatus(statusData);
+        },
+        () => {
+          if (latest) onCompleteRef.current(latest);
+        },
+        startPolling
+      );
+    } else {
+      startPolling();
+    }
 
     return () => {
+      if (closeStream) closeStream();
       if (intervalId) clearInterval(intervalId);
     };
   }, [taskId]);
@@ -36,6 +36,29 @@ export const apiService = {
     return response.data;
   },
 
+  streamDockerizationStatus(
+    taskId: string,
+    onStatus: (status: DockerizationStatus) => void,
+    onEnd: () => void,
+    onError: () => void
+  ): () => void {
+    // EventSource reconnects on its own and resumes after the last received event id
+    const source = new EventSource(`${API_BASE_URL}/status/${taskId}/stream`);
+    source.addEventListener('status', (event) => {
+      onStatus(JSON.parse((event as MessageEvent).data));
+    });
+    source.addEventListener('end', () => {
+      source.close();
+      onEnd();
+    });
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        onError();
+      }
+    };
+    return () => source.close();
+  },
+
   async healthCheck(): Promise<{ status: string; timestamp: string }> {
     const response = await api.get<{ status: string; timestamp: string }>('/health');
     return response.data;